@@ -5,6 +5,7 @@ Class for guiding calibration object generation in PypeIt
 .. include:: ../links.rst
 """
 import os
+import time
 
 from abc import ABCMeta
 
@@ -15,6 +16,7 @@ import numpy as np
 from astropy.io import fits
 
 from pypeit import msgs
+from pypeit import masterframe
 from pypeit import arcimage
 from pypeit import tiltimage
 from pypeit import biasframe
@@ -39,6 +41,11 @@ class Calibrations(object):
     of PypeIt, the class performs book-keeping of these master frames and
     holds that info in self.calib_dict
 
+    If a master frame store is defined by the parameters
+    (`CalibrationsPar['master_store']`), master frames are also
+    retrieved from and added to the store, using their digest to
+    identify them; see :class:`pypeit.masterframe.MasterStore`.
+
     Args:
         fitstbl (:class:`pypeit.metadata.PypeItMetaData`, None):
             The class holding the metadata for all the frames in this
@@ -80,6 +87,12 @@ class Calibrations(object):
             :attr:`fitstbl`.
         calib_ID (:obj:`int`):
             calib group ID of the current frame
+        store (:class:`pypeit.masterframe.MasterStore`):
+            Store of master frames shared by different reductions.
+            None if no store is used.
+        master_digest_dict (:obj:`dict`):
+            Digests of the master frames of the current frame, keyed
+            by calibration type.
 
     """
     __metaclass__ = ABCMeta
@@ -131,6 +144,14 @@ class Calibrations(object):
         # TODO: This should be done when the masters are saved
         if self.save_masters and not os.path.isdir(self.master_dir):
             os.makedirs(self.master_dir)
+
+        # Shared store of master frames
+        self.store = None
+        if self.par['master_store'] is not None:
+            if self.save_masters:
+                self.store = masterframe.MasterStore(self.par['master_store'])
+            else:
+                msgs.warn('Masters are not saved.  The master frame store will not be used!')
         # TODO: This should be done when the qa plots are saved
         if self.write_qa and not os.path.isdir(os.path.join(self.qa_path, 'PNGs')):
             os.makedirs(os.path.join(self.qa_path, 'PNGs'))
@@ -168,6 +189,7 @@ class Calibrations(object):
         self.mswave = None
         self.calib_ID = None
         self.master_key_dict = {}
+        self.master_digest_dict = {}
 
     def _update_cache(self, master_key, master_type, data):
         """
@@ -233,6 +255,106 @@ class Calibrations(object):
         self.calib_dict[master_key][master_type] = {}
         return False
 
+    def _master_digest(self, calib_type, files=None, pars=None, inputs=None):
+        """
+        Compute and record the digest of a master frame.
+
+        Args:
+            calib_type (:obj:`str`):
+                Calibration type, used to key
+                :attr:`master_digest_dict`.
+            files (:obj:`list`, optional):
+                Raw files used to build the master frame.
+            pars (:obj:`list`, optional):
+                Parameter sets used to build the master frame.
+            inputs (:obj:`list`, optional):
+                Calibration types (keys in :attr:`master_digest_dict`)
+                and arrays the master frame depends on.
+
+        Returns:
+            :obj:`str`: The digest, or None if no store is used.
+        """
+        if self.store is None:
+            return None
+        _inputs = None if inputs is None else \
+                    [self.master_digest_dict.get(inp) if isinstance(inp, str) else inp
+                        for inp in inputs]
+        self.master_digest_dict[calib_type] \
+                = masterframe.master_digest(calib_type, self.spectrograph, self.det, files=files,
+                                            pars=pars, inputs=_inputs)
+        return self.master_digest_dict[calib_type]
+
+    def _master_lock(self, digest):
+        """
+        Lock the entry of a master frame in the store while it is
+        retrieved or built.
+
+        Args:
+            digest (:obj:`str`):
+                Digest of the master frame.  If None, nothing is locked.
+
+        Returns:
+            :class:`pypeit.masterframe.FileLock`: Context manager
+            holding the lock.
+        """
+        return masterframe.FileLock(None) if self.store is None or digest is None \
+                    else self.store.lock(digest)
+
+    def _fetch_master(self, master, digest):
+        """
+        Retrieve a master frame from the store.
+
+        If found, the master frame is copied to its file in
+        :attr:`master_dir` and `master` is set to reuse it.  An
+        existing master file is never overwritten if masters are
+        reused, such that the store does not change the behavior of
+        `reuse_masters`.
+
+        Args:
+            master (:class:`pypeit.masterframe.MasterFrame`):
+                The master frame.
+            digest (:obj:`str`):
+                Digest of the master frame.
+
+        Returns:
+            :obj:`bool`: True if the master frame was retrieved.
+        """
+        if self.store is None or digest is None \
+                or (master.reuse_masters and os.path.isfile(master.master_file_path)) \
+                or not self.store.fetch(master, digest):
+            return False
+        master.reuse_masters = True
+        return True
+
+    def _tweak_slits(self):
+        """
+        Check if the flats will tweak the slit edges.
+
+        Tweaking the slit edges rewrites the trace and tilts master
+        files, so these cannot be shared through the store.
+
+        Returns:
+            :obj:`bool`: True if the slit edges are tweaked.
+        """
+        return self.par['flatfield']['method'] != 'skip' \
+                    and self.par['flatfield']['frame'] == 'pixelflat' \
+                    and self.par['flatfield']['tweak_slits']
+
+    def _store_master(self, master, digest, since):
+        """
+        Add a newly saved master frame to the store.
+
+        Args:
+            master (:class:`pypeit.masterframe.MasterFrame`):
+                The master frame.
+            digest (:obj:`str`):
+                Digest of the master frame.
+            since (:obj:`float`):
+                Time at which the master frame started to be built.
+        """
+        if self.store is not None and digest is not None:
+            self.store.add(master, digest, since=since)
+
     def set_config(self, frame, det, par=None):
         """
         Specify the parameters of the Calibrations class and reset all
@@ -283,6 +405,8 @@ class Calibrations(object):
         self.master_key_dict['arc'] \
                 = self.fitstbl.master_key(arc_rows[0] if len(arc_rows) > 0 else self.frame,
                                           det=self.det)
+        digest = self._master_digest('arc', files=self.arc_files, pars=[self.par['arcframe']],
+                                     inputs=['bias', self.msbpm])
 
         if self._cached('arc', self.master_key_dict['arc']):
             # Previously calculated
@@ -298,13 +422,17 @@ class Calibrations(object):
                                           reuse_masters=self.reuse_masters)
 
         # Load the MasterFrame (if it exists and is desired)?
-        self.msarc = self.arcImage.load()
-        if self.msarc is None:  # Otherwise build it
-            msgs.info("Preparing a master {0:s} frame".format(self.arcImage.frametype))
-            self.msarc = self.arcImage.build_image(bias=self.msbias, bpm=self.msbpm)
-            # Save to Masters
-            if self.save_masters:
-                self.arcImage.save()
+        with self._master_lock(digest):
+            self._fetch_master(self.arcImage, digest)
+            self.msarc = self.arcImage.load()
+            if self.msarc is None:  # Otherwise build it
+                start = time.time()
+                msgs.info("Preparing a master {0:s} frame".format(self.arcImage.frametype))
+                self.msarc = self.arcImage.build_image(bias=self.msbias, bpm=self.msbpm)
+                # Save to Masters
+                if self.save_masters:
+                    self.arcImage.save()
+                    self._store_master(self.arcImage, digest, start)
 
         # Save & return
         self._update_cache('arc', 'arc', self.msarc)
@@ -335,6 +463,8 @@ class Calibrations(object):
         self.master_key_dict['tilt'] \
                 = self.fitstbl.master_key(tilt_rows[0] if len(tilt_rows) > 0 else self.frame,
                                           det=self.det)
+        digest = self._master_digest('tiltimg', files=self.tilt_files,
+                                     pars=[self.par['tiltframe']], inputs=['bias', self.msbpm])
 
         if self._cached('tiltimg', self.master_key_dict['tilt']):
             # Previously calculated
@@ -350,15 +480,19 @@ class Calibrations(object):
                                           reuse_masters=self.reuse_masters)
 
         # Load the MasterFrame (if it exists and is desired)?
-        self.mstilt = self.tiltImage.load()
-        if self.mstilt is None:  # Otherwise build it
-            msgs.info("Preparing a master {0:s} frame".format(self.tiltImage.frametype))
-            self.mstilt = self.tiltImage.build_image(bias=self.msbias, bpm=self.msbpm)
-            # JFH Add a cr_masking option here. The image processing routines are not ready for it yet.
-
-            # Save to Masters
-            if self.save_masters:
-                self.tiltImage.save()
+        with self._master_lock(digest):
+            self._fetch_master(self.tiltImage, digest)
+            self.mstilt = self.tiltImage.load()
+            if self.mstilt is None:  # Otherwise build it
+                start = time.time()
+                msgs.info("Preparing a master {0:s} frame".format(self.tiltImage.frametype))
+                self.mstilt = self.tiltImage.build_image(bias=self.msbias, bpm=self.msbpm)
+                # JFH Add a cr_masking option here. The image processing routines are not ready for it yet.
+
+                # Save to Masters
+                if self.save_masters:
+                    self.tiltImage.save()
+                    self._store_master(self.tiltImage, digest, start)
 
         # Save & return
         self._update_cache('tilt', 'tiltimg', self.mstilt)
@@ -388,6 +522,7 @@ class Calibrations(object):
         self.master_key_dict['bias'] \
                 = self.fitstbl.master_key(bias_rows[0] if len(bias_rows) > 0 else self.frame,
                                           det=self.det)
+        digest = self._master_digest('bias', files=self.bias_files, pars=[self.par['biasframe']])
 
         # Grab from internal dict (or hard-drive)?
         if self._cached('bias', self.master_key_dict['bias']):
@@ -403,12 +538,16 @@ class Calibrations(object):
                                              reuse_masters=self.reuse_masters)
 
         # Try to load the master bias
-        self.msbias = self.biasFrame.load()
-        if self.msbias is None:
-            # Build it and save it
-            self.msbias = self.biasFrame.build_image()
-            if self.save_masters:
-                self.biasFrame.save()
+        with self._master_lock(digest):
+            self._fetch_master(self.biasFrame, digest)
+            self.msbias = self.biasFrame.load()
+            if self.msbias is None:
+                # Build it and save it
+                start = time.time()
+                self.msbias = self.biasFrame.build_image()
+                if self.save_masters:
+                    self.biasFrame.save()
+                    self._store_master(self.biasFrame, digest, start)
 
         # Save & return
         self._update_cache('bias', 'bias', self.msbias)
@@ -519,6 +658,14 @@ class Calibrations(object):
         self.master_key_dict['flat'] \
                 = self.fitstbl.master_key(pixflat_rows[0] if len(pixflat_rows) > 0 else self.frame,
                                           det=self.det)
+        # Flats from a user-supplied file or that tweak the slit edges
+        # (which also changes the trace and tilts master frames) are
+        # not stored
+        digest = None
+        if self.par['flatfield']['frame'] == 'pixelflat' and not self._tweak_slits():
+            digest = self._master_digest('flat', files=pixflat_image_files,
+                                         pars=[self.par['pixelflatframe'], self.par['flatfield']],
+                                         inputs=['bias', 'trace', 'wavecalib', 'tilts', self.msbpm])
 
         # Return already generated data
         if self._cached('pixelflat', self.master_key_dict['flat']) \
@@ -543,54 +690,58 @@ class Calibrations(object):
 
         # --- Pixel flats
 
-        # 1)  Try to load master files from disk (MasterFrame)?
-        _, self.mspixelflat, self.msillumflat = self.flatField.load()
-
-        # 2) Did the user specify a flat? If so load it in  (e.g. LRISb with pixel flat)?
-        # TODO: We need to document this format for the user!
-        if self.par['flatfield']['frame'] != 'pixelflat':
-            # - Name is explicitly correct?
-            if os.path.isfile(self.par['flatfield']['frame']):
-                flat_file = self.par['flatfield']['frame']
-            # - Is it in the master directory?
-            elif os.path.isfile(os.path.join(self.flatField.master_dir,
-                                             self.par['flatfield']['frame'])):
-                flat_file = os.path.join(self.flatField.master_dir, self.par['flatfield']['frame'])
-            else:
-                msgs.error('Could not find user-defined flatfield file: {0}'.format(
-                           self.par['flatfield']['frame']))
-            msgs.info('Using user-defined file: {0}'.format(flat_file))
-            with fits.open(flat_file) as hdu:
-                self.mspixelflat = hdu[self.det].data
-            self.msillumflat = None
-
-        # 3) there is no master or no user supplied flat, generate the flat
-        if self.mspixelflat is None and len(pixflat_image_files) != 0:
-            # Run
-            self.mspixelflat, self.msillumflat = self.flatField.run(show=self.show,
-                                                                    maskslits=self.tslits_dict['maskslits'])
-
-            # If we tweaked the slits, update the tilts_dict and
-            # tslits_dict to reflect new slit edges
-            if self.par['flatfield']['tweak_slits']:
-                msgs.info('Using slit boundary tweaks from IllumFlat and updated tilts image')
-                self.tslits_dict = self.flatField.tslits_dict
-                self.tilts_dict = self.flatField.tilts_dict
-
-            # Save to Masters
-            if self.save_masters:
-                self.flatField.save()
-
-                # If we tweaked the slits update the master files for tilts and slits
-                # TODO: These should be saved separately
+        with self._master_lock(digest):
+            # 1)  Try to load master files from the store or disk (MasterFrame)?
+            self._fetch_master(self.flatField, digest)
+            _, self.mspixelflat, self.msillumflat = self.flatField.load()
+
+            # 2) Did the user specify a flat? If so load it in  (e.g. LRISb with pixel flat)?
+            # TODO: We need to document this format for the user!
+            if self.par['flatfield']['frame'] != 'pixelflat':
+                # - Name is explicitly correct?
+                if os.path.isfile(self.par['flatfield']['frame']):
+                    flat_file = self.par['flatfield']['frame']
+                # - Is it in the master directory?
+                elif os.path.isfile(os.path.join(self.flatField.master_dir,
+                                                 self.par['flatfield']['frame'])):
+                    flat_file = os.path.join(self.flatField.master_dir, self.par['flatfield']['frame'])
+                else:
+                    msgs.error('Could not find user-defined flatfield file: {0}'.format(
+                               self.par['flatfield']['frame']))
+                msgs.info('Using user-defined file: {0}'.format(flat_file))
+                with fits.open(flat_file) as hdu:
+                    self.mspixelflat = hdu[self.det].data
+                self.msillumflat = None
+
+            # 3) there is no master or no user supplied flat, generate the flat
+            if self.mspixelflat is None and len(pixflat_image_files) != 0:
+                start = time.time()
+                # Run
+                self.mspixelflat, self.msillumflat = self.flatField.run(show=self.show,
+                                                                        maskslits=self.tslits_dict['maskslits'])
+
+                # If we tweaked the slits, update the tilts_dict and
+                # tslits_dict to reflect new slit edges
                 if self.par['flatfield']['tweak_slits']:
-                    msgs.info('Updating MasterTrace and MasterTilts using tweaked slit boundaries')
-                    self.edges.update_using_tslits_dict(self.flatField.tslits_dict)
-                    self.edges.save()
-                    # Write the final_tilts using the new slit boundaries to the MasterTilts file
-                    self.waveTilts.final_tilts = self.flatField.tilts_dict['tilts']
-                    self.waveTilts.tilts_dict = self.flatField.tilts_dict
-                    self.waveTilts.save()
+                    msgs.info('Using slit boundary tweaks from IllumFlat and updated tilts image')
+                    self.tslits_dict = self.flatField.tslits_dict
+                    self.tilts_dict = self.flatField.tilts_dict
+
+                # Save to Masters
+                if self.save_masters:
+                    self.flatField.save()
+                    self._store_master(self.flatField, digest, start)
+
+                    # If we tweaked the slits update the master files for tilts and slits
+                    # TODO: These should be saved separately
+                    if self.par['flatfield']['tweak_slits']:
+                        msgs.info('Updating MasterTrace and MasterTilts using tweaked slit boundaries')
+                        self.edges.update_using_tslits_dict(self.flatField.tslits_dict)
+                        self.edges.save()
+                        # Write the final_tilts using the new slit boundaries to the MasterTilts file
+                        self.waveTilts.final_tilts = self.flatField.tilts_dict['tilts']
+                        self.waveTilts.tilts_dict = self.flatField.tilts_dict
+                        self.waveTilts.save()
 
         # 4) If either of the two flats are still None, use unity
         # everywhere and print out a warning
@@ -641,6 +792,12 @@ class Calibrations(object):
         self.master_key_dict['trace'] \
                 = self.fitstbl.master_key(trace_rows[0] if len(trace_rows) > 0 else self.frame,
                                           det=self.det)
+        # Slit edges tweaked by the flats are not stored
+        digest = None
+        if not self._tweak_slits():
+            digest = self._master_digest('trace', files=self.trace_image_files,
+                                         pars=[self.par['traceframe'], self.par['slitedges']],
+                                         inputs=['bias', self.msbpm])
 
         # Return already generated data
         if self._cached('trace', self.master_key_dict['trace']) and not redo:
@@ -653,32 +810,36 @@ class Calibrations(object):
                                             master_dir=self.master_dir,
                                             qa_path=self.qa_path if write_qa else None)
 
-        if self.reuse_masters and self.edges.exists():
-            self.edges.load()
-            self.tslits_dict = self.edges.convert_to_tslits_dict()
-        else:
-            # Build the trace image
-            self.traceImage = traceimage.TraceImage(self.spectrograph,
-                                                    files=self.trace_image_files, det=self.det,
-                                                    par=self.par['traceframe'],
-                                                    bias=self.msbias)
-            self.traceImage.build_image(bias=self.msbias, bpm=self.msbpm)
-
-            try:
-                self.edges.auto_trace(self.traceImage, bpm=self.msbpm, det=self.det,
-                                      save=self.save_masters) #, debug=True, show_stages=True)
-            except:
-                self.edges.save()
-                msgs.error('Crashed out of finding the slits. Have saved the work done to disk '
-                           'but it needs fixing.')
-                return None
-
-            # Show the result if requested
-            if self.show:
-                self.edges.show(thin=10, in_ginga=True)
-
-            # TODO: Stop-gap until we can get rid of tslits_dict
-            self.tslits_dict = self.edges.convert_to_tslits_dict()
+        with self._master_lock(digest):
+            if (self._fetch_master(self.edges, digest) or self.reuse_masters) and self.edges.exists():
+                self.edges.load()
+                self.tslits_dict = self.edges.convert_to_tslits_dict()
+            else:
+                start = time.time()
+                # Build the trace image
+                self.traceImage = traceimage.TraceImage(self.spectrograph,
+                                                        files=self.trace_image_files, det=self.det,
+                                                        par=self.par['traceframe'],
+                                                        bias=self.msbias)
+                self.traceImage.build_image(bias=self.msbias, bpm=self.msbpm)
+
+                try:
+                    self.edges.auto_trace(self.traceImage, bpm=self.msbpm, det=self.det,
+                                          save=self.save_masters) #, debug=True, show_stages=True)
+                except:
+                    self.edges.save()
+                    msgs.error('Crashed out of finding the slits. Have saved the work done to disk '
+                               'but it needs fixing.')
+                    return None
+                if self.save_masters:
+                    self._store_master(self.edges, digest, start)
+
+                # Show the result if requested
+                if self.show:
+                    self.edges.show(thin=10, in_ginga=True)
+
+                # TODO: Stop-gap until we can get rid of tslits_dict
+                self.tslits_dict = self.edges.convert_to_tslits_dict()
 
         # Save, initialize maskslits, and return
         self._update_cache('trace', 'trace', self.tslits_dict)
@@ -703,6 +864,12 @@ class Calibrations(object):
 
         # Check internals
         self._chk_set(['det', 'par'])
+        # The slits and tilts may have been tweaked by the flats, so
+        # they are included by content
+        digest = self._master_digest('wave', inputs=['wavecalib', self.tilts_dict['tilts'],
+                                                     self.tslits_dict['slit_left'],
+                                                     self.tslits_dict['slit_righ'],
+                                                     self.tslits_dict['maskslits']])
 
         # Return existing data
         if self._cached('wave', self.master_key_dict['arc']):
@@ -726,12 +893,16 @@ class Calibrations(object):
                                              reuse_masters=self.reuse_masters)
 
         # Attempt to load master
-        self.mswave = self.waveImage.load()
-        if self.mswave is None:
-            self.mswave = self.waveImage.build_wave()
-            # Save to hard-drive
-            if self.save_masters:
-                self.waveImage.save()
+        with self._master_lock(digest):
+            self._fetch_master(self.waveImage, digest)
+            self.mswave = self.waveImage.load()
+            if self.mswave is None:
+                start = time.time()
+                self.mswave = self.waveImage.build_wave()
+                # Save to hard-drive
+                if self.save_masters:
+                    self.waveImage.save()
+                    self._store_master(self.waveImage, digest, start)
 
         # Save & return
         self._update_cache('arc', 'wave', self.mswave)
@@ -756,6 +927,12 @@ class Calibrations(object):
         self._chk_set(['det', 'calib_ID', 'par'])
         if 'arc' not in self.master_key_dict.keys():
             msgs.error('Arc master key not set.  First run get_arc.')
+        # The slits are included by content because they may have been
+        # tweaked by the flats in a previous reduction
+        digest = self._master_digest('wavecalib', pars=[self.par['wavelengths']],
+                                     inputs=['arc', self.msbpm, self.tslits_dict['slit_left'],
+                                             self.tslits_dict['slit_righ'],
+                                             self.tslits_dict['maskslits']])
 
         # Return existing data
         if self._cached('wavecalib', self.master_key_dict['arc']) \
@@ -785,13 +962,17 @@ class Calibrations(object):
                                              master_dir=self.master_dir,
                                              reuse_masters=self.reuse_masters,
                                              qa_path=self.qa_path, msbpm=self.msbpm)
-        # Load from disk (MasterFrame)?
-        self.wv_calib = self.waveCalib.load()
-        if self.wv_calib is None:
-            self.wv_calib, _ = self.waveCalib.run(skip_QA=(not self.write_qa))
-            # Save to Masters
-            if self.save_masters:
-                self.waveCalib.save()
+        # Load from the store or disk (MasterFrame)?
+        with self._master_lock(digest):
+            self._fetch_master(self.waveCalib, digest)
+            self.wv_calib = self.waveCalib.load()
+            if self.wv_calib is None:
+                start = time.time()
+                self.wv_calib, _ = self.waveCalib.run(skip_QA=(not self.write_qa))
+                # Save to Masters
+                if self.save_masters:
+                    self.waveCalib.save()
+                    self._store_master(self.waveCalib, digest, start)
 
         # Create the mask (needs to be done here in case wv_calib was loaded from Masters)
         # TODO: This should either be done here or save as part of the
@@ -832,6 +1013,15 @@ class Calibrations(object):
         self._chk_set(['det', 'calib_ID', 'par'])
         if 'tilt' not in self.master_key_dict.keys():
             msgs.error('Tilt master key not set.  First run get_tiltimage.')
+        # Tilts rewritten with the slit edges tweaked by the flats are
+        # not stored
+        digest = None
+        if not self._tweak_slits():
+            digest = self._master_digest('tilts', pars=[self.par['tilts'], self.par['wavelengths']],
+                                         inputs=['tiltimg', 'wavecalib', self.msbpm,
+                                                 self.tslits_dict['slit_left'],
+                                                 self.tslits_dict['slit_righ'],
+                                                 self.tslits_dict['maskslits']])
 
         # Return existing data
         if self._cached('tilts_dict', self.master_key_dict['tilt']) \
@@ -850,16 +1040,20 @@ class Calibrations(object):
                                              qa_path=self.qa_path, msbpm=self.msbpm)
 
         # Master
-        self.tilts_dict = self.waveTilts.load()
-        if self.tilts_dict is None:
-            # TODO still need to deal with syntax for LRIS ghosts. Maybe we don't need it
-            self.tilts_dict, self.wt_maskslits \
-                    = self.waveTilts.run(maskslits=self.tslits_dict['maskslits'], doqa=self.write_qa,
-                                         show=self.show)
-            if self.save_masters:
-                self.waveTilts.save()
-        else:
-            self.wt_maskslits = np.zeros_like(self.tslits_dict['maskslits'], dtype=bool)
+        with self._master_lock(digest):
+            self._fetch_master(self.waveTilts, digest)
+            self.tilts_dict = self.waveTilts.load()
+            if self.tilts_dict is None:
+                start = time.time()
+                # TODO still need to deal with syntax for LRIS ghosts. Maybe we don't need it
+                self.tilts_dict, self.wt_maskslits \
+                        = self.waveTilts.run(maskslits=self.tslits_dict['maskslits'],
+                                             doqa=self.write_qa, show=self.show)
+                if self.save_masters:
+                    self.waveTilts.save()
+                    self._store_master(self.waveTilts, digest, start)
+            else:
+                self.wt_maskslits = np.zeros_like(self.tslits_dict['maskslits'], dtype=bool)
 
         # Save & return
         self._update_cache('tilt', ('tilts_dict','wtmask'), (self.tilts_dict,self.wt_maskslits))
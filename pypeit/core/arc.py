@@ -754,7 +754,7 @@ def iter_continuum(spec, inmask=None, fwhm=4.0, sigthresh = 2.0, sigrej=3.0, nit
             cont_mask = np.ones_like(cont_mask) & inmask
         ngood = np.sum(cont_mask)
         samp_width = np.ceil(ngood/cont_samp).astype(int)
-        cont_med = utils.fast_running_median(spec[cont_mask], samp_width)
+        cont_med = utils.running_median(spec[cont_mask], samp_width)
         if npoly is not None:
             # ToDO robust_poly_fit needs to return minv and maxv as outputs for the fits to be usable downstream
             msk, poly = utils.robust_polyfit_djs(spec_vec[cont_mask], cont_med, npoly, function='polynomial', maxiter=25,
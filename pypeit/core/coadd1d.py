@@ -438,7 +438,7 @@ def poly_ratio_fitfunc(flux_ref, thismask, arg_dict, **kwargs_opt):
 def median_filt_spec(flux, ivar, mask, med_width):
     '''
     Utility routine to median filter a spectrum using the mask and propagating the errors using the
-    utils.fast_running_median function.
+    utils.running_median function.
 
     Args:
         flux: ndarray, (nspec,) flux
@@ -452,7 +452,7 @@ def median_filt_spec(flux, ivar, mask, med_width):
 
     flux_med = np.zeros_like(flux)
     ivar_med = np.zeros_like(ivar)
-    flux_med0 = utils.fast_running_median(flux[mask], med_width)
+    flux_med0 = utils.running_median(flux[mask], med_width)
     flux_med[mask] = flux_med0
     var = utils.inverse(ivar)
     var_med0 =  utils.smooth(var[mask], med_width)
@@ -578,7 +578,7 @@ def interp_oned(wave_new, wave_old, flux_old, ivar_old, mask_old):
     Utility routine to perform 1d linear nterpolation of spectra onto a new wavelength grid
 
     Args:
-       wave_new: ndarray, (nspec_new)
+       wave_new: ndarray, (nspec_new) or (nspec_new, nexp)
             New wavelengths that you want to interpolate onto.
        wave_old: ndarray, (nspec_old)
             Old wavelength grid
@@ -590,10 +590,10 @@ def interp_oned(wave_new, wave_old, flux_old, ivar_old, mask_old):
             Old mask on the wave_old grid. True=Good
 
     Returns:
-        (1) flux_new: ndarray, (nspec_new,) -- interpolated flux; (2)
-        ivar_new: ndarray, (nspec_new,) -- interpolated ivar; (3)
-        mask_new: ndarray, bool, (nspec_new,) -- interpolated mask.
-        True=Good.
+        (1) flux_new: ndarray, same shape as wave_new -- interpolated
+        flux; (2) ivar_new: ndarray, same shape as wave_new --
+        interpolated ivar; (3) mask_new: ndarray, bool, same shape as
+        wave_new -- interpolated mask.  True=Good.
     '''
 
     # Do not interpolate if the wavelength is exactly same with wave_new
@@ -656,14 +656,12 @@ def interp_spec(wave_new, waves, fluxes, ivars, masks):
     elif (wave_new.ndim == 2):
         if fluxes.ndim != 1:
             msgs.error('If wave_new is two dimensional, all other input arrays must be one dimensional')
-        nexp = wave_new.shape[1]
-        fluxes_inter = np.zeros_like(wave_new)
-        ivars_inter = np.zeros_like(wave_new)
-        masks_inter = np.zeros_like(wave_new, dtype=bool)
-
-        for ii in range(nexp):
-            fluxes_inter[:, ii], ivars_inter[:, ii], masks_inter[:, ii] = interp_oned(
-                wave_new[:, ii], waves, fluxes, ivars, masks)
+        # Construct the interpolating functions once and evaluate them for all the exposures at once
+        fluxes_inter, ivars_inter, masks_inter = interp_oned(wave_new, waves, fluxes, ivars, masks)
+        # Do not interpolate if the wavelength is exactly same with wave_new
+        for ii in range(wave_new.shape[1]):
+            if np.array_equal(wave_new[:, ii], waves):
+                fluxes_inter[:, ii], ivars_inter[:, ii], masks_inter[:, ii] = fluxes, ivars, masks
 
         return fluxes_inter, ivars_inter, masks_inter
 
@@ -739,7 +737,7 @@ def sn_weights(waves, fluxes, ivars, masks, sn_smooth_npix, const_weights=False,
             msgs.info("Using ivar weights for merging orders")
         weights = np.zeros_like(flux_stack) # Should this be zeros_like?
         for iexp in range(nstack):
-            sn_med1 = utils.fast_running_median(ivar_stack[mask_stack[:, iexp],iexp], sn_smooth_npix)
+            sn_med1 = utils.running_median(ivar_stack[mask_stack[:, iexp],iexp], sn_smooth_npix)
             # TODO Change to scipy.interpolate?
             sn_med2 = scipy.interpolate.interp1d(spec_vec[mask_stack[:, iexp]], sn_med1, kind='cubic',
                                                  bounds_error=False, fill_value=0.0)(spec_vec)
@@ -755,7 +753,7 @@ def sn_weights(waves, fluxes, ivars, masks, sn_smooth_npix, const_weights=False,
                 weights[:, iexp] = np.full(nspec, np.fmax(sn2[iexp], 1e-2)) # set the minimum  to be 1e-2 to avoid zeros
             else:
                 weight_method = 'wavelength dependent'
-                sn_med1 = utils.fast_running_median(sn_val[mask_stack[:, iexp],iexp]**2, sn_smooth_npix)
+                sn_med1 = utils.running_median(sn_val[mask_stack[:, iexp],iexp]**2, sn_smooth_npix)
                 sn_med2 = scipy.interpolate.interp1d(spec_vec[mask_stack[:, iexp]], sn_med1, kind = 'cubic',
                                                      bounds_error = False, fill_value = 0.0)(spec_vec)
                 sig_res = np.fmax(sn_smooth_npix/10.0, 3.0)
@@ -1208,10 +1206,32 @@ def scale_spec(wave, flux, ivar, sn, wave_ref, flux_ref, ivar_ref, mask=None, ma
     return flux_scale, ivar_scale, scale, scale_method
 
 
-def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights):
+def wave_grid_index(wave_grid, waves):
+    '''
+    Determine the wave_grid bin of each pixel of a set of spectra, following the np.histogram conventions: the bins
+    include their lower edge, and the last bin also includes its upper edge.
+
+    Args:
+        wave_grid: ndarray, (ngrid +1,)
+            Wavelength bin edges; see compute_stack.
+        waves: ndarray
+            Wavelengths of the spectra, with any shape.
+
+    Returns:
+        ndarray: Integer array with the same shape as waves with the index of the bin of each pixel, and -1 for the
+        pixels outside of the grid.
+    '''
+    bin_index = np.searchsorted(wave_grid, waves, side='right') - 1
+    # Include the right edge in the last bin
+    bin_index[waves == wave_grid[-1]] -= 1
+    bin_index[bin_index >= wave_grid.size - 1] = -1
+    return bin_index
+
+
+def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights, bin_index=None):
     '''
     Compute a stacked spectrum from a set of exposures on the specified wave_grid with proper treatment of
-    weights and masking. This code uses np.histogram to combine the data using NGP and does not perform any
+    weights and masking. This code bins the data (as in np.histogram) to combine the data using NGP and does not perform any
     interpolations and thus does not correlate errors. It uses wave_grid to determine the set of wavelength bins that
     the data are averaged on. The final spectrum will be on an ouptut wavelength grid which is not the same as wave_grid.
     The ouput wavelength grid is the weighted average of the individual wavelengths used for each exposure that fell into
@@ -1240,6 +1260,10 @@ def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights):
             Masks for each exposure on the waves grid. True=Good.
         weights: ndarray, (nspec, nexp)
             Weights to be used for combining your spectra. These are computed using sn_weights
+        bin_index: ndarray, int, (nspec, nexp), optional
+            Index of the wave_grid bin of each pixel in waves, as returned by wave_grid_index. This only depends on
+            wave_grid and waves, and can be computed once when stacking the same spectra repeatedly with different
+            masks or weights. If None, it is computed here.
 
     Returns:
         tuple: Returns the following objects
@@ -1268,29 +1292,32 @@ def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights):
     '''
 
     #mask bad values and extreme values (usually caused by extreme low sensitivity at the edge of detectors)
-    ubermask = masks & (weights > 0.0) & (waves > 1.0) & (ivars > 0.0) & (utils.inverse(ivars)<1e10)
-    waves_flat = waves[ubermask].flatten()
-    fluxes_flat = fluxes[ubermask].flatten()
-    ivars_flat = ivars[ubermask].flatten()
-    vars_flat = utils.inverse(ivars_flat)
-    weights_flat = weights[ubermask].flatten()
+    if bin_index is None:
+        bin_index = wave_grid_index(wave_grid, waves)
+    ubermask = masks & (weights > 0.0) & (waves > 1.0) & (ivars > 0.0) & (utils.inverse(ivars)<1e10) & (bin_index > -1)
+    bins_flat = bin_index[ubermask]
+    waves_flat = waves[ubermask]
+    fluxes_flat = fluxes[ubermask]
+    vars_flat = utils.inverse(ivars[ubermask])
+    weights_flat = weights[ubermask]
+    ngrid = wave_grid.size - 1
 
     # Counts how many pixels in each wavelength bin
-    nused, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False)
+    nused = np.bincount(bins_flat, minlength=ngrid)
 
     # Calculate the summed weights for the denominator
-    weights_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=weights_flat)
+    weights_total = np.bincount(bins_flat, weights=weights_flat, minlength=ngrid)
 
     # Calculate the stacked wavelength
-    wave_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=waves_flat*weights_flat)
+    wave_stack_total = np.bincount(bins_flat, weights=waves_flat*weights_flat, minlength=ngrid)
     wave_stack = (weights_total > 0.0)*wave_stack_total/(weights_total+(weights_total==0.))
 
     # Calculate the stacked flux
-    flux_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=fluxes_flat*weights_flat)
+    flux_stack_total = np.bincount(bins_flat, weights=fluxes_flat*weights_flat, minlength=ngrid)
     flux_stack = (weights_total > 0.0)*flux_stack_total/(weights_total+(weights_total==0.))
 
     # Calculate the stacked ivar
-    var_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=vars_flat*weights_flat**2)
+    var_stack_total = np.bincount(bins_flat, weights=vars_flat*weights_flat**2, minlength=ngrid)
     var_stack = (weights_total > 0.0)*var_stack_total/(weights_total+(weights_total==0.))**2
     ivar_stack = utils.inverse(var_stack)
 
@@ -1711,7 +1738,7 @@ def update_errors(fluxes, ivars, masks, fluxes_stack, ivars_stack, masks_stack,
 
 
 def spec_reject_comb(wave_grid, waves, fluxes, ivars, masks, weights, sn_clip=30.0, lower=3.0, upper=3.0,
-                     maxrej=None, maxiter_reject=5, title='', debug=False):
+                     maxrej=None, maxiter_reject=5, title='', debug=False, bin_index=None):
     '''
     Routine for executing the iterative combine and rejection of a set of spectra to compute a final stacked spectrum.
 
@@ -1753,6 +1780,9 @@ def spec_reject_comb(wave_grid, waves, fluxes, ivars, masks, weights, sn_clip=30
              Title for QA plot
         debug: bool, default=False,
             Show QA plots useful for debugging.
+        bin_index: ndarray, int, (nspec, nexp), optional
+            Index of the wave_grid bin of each pixel in waves; see compute_stack. If None, it is computed once and
+            used for all the iterations.
 
     Returns:
         tuple: Returns the following:
@@ -1784,12 +1814,14 @@ def spec_reject_comb(wave_grid, waves, fluxes, ivars, masks, weights, sn_clip=30
               in one bin versus another depending on the sampling.
 
     '''
+    if bin_index is None:
+        bin_index = wave_grid_index(wave_grid, waves)
     thismask = np.copy(masks)
     iter = 0
     qdone = False
     while (not qdone) and (iter < maxiter_reject):
         wave_stack, flux_stack, ivar_stack, mask_stack, nused = compute_stack(
-            wave_grid, waves, fluxes, ivars, thismask, weights)
+            wave_grid, waves, fluxes, ivars, thismask, weights, bin_index=bin_index)
         flux_stack_nat, ivar_stack_nat, mask_stack_nat = interp_spec(
             waves, wave_stack, flux_stack, ivar_stack, mask_stack)
         rejivars, sigma_corrs, outchi, maskchi = update_errors(fluxes, ivars, thismask,
@@ -1814,7 +1846,8 @@ def spec_reject_comb(wave_grid, waves, fluxes, ivars, masks, weights, sn_clip=30
         msgs.info("Rejected {:d} pixels in exposure {:d}/{:d}".format(nrej[iexp], iexp, nexp))
 
     # Compute the final stack using this outmask
-    wave_stack, flux_stack, ivar_stack, mask_stack, nused = compute_stack(wave_grid, waves, fluxes, ivars, outmask, weights)
+    wave_stack, flux_stack, ivar_stack, mask_stack, nused = compute_stack(wave_grid, waves, fluxes, ivars, outmask, weights,
+                                                                          bin_index=bin_index)
 
     # Used only for plotting below
     if debug:
@@ -1839,7 +1872,8 @@ def spec_reject_comb(wave_grid, waves, fluxes, ivars, masks, weights, sn_clip=30
 
 
 def scale_spec_stack(wave_grid, waves, fluxes, ivars, masks, sn, weights, ref_percentile=30.0, maxiter_scale=5, sigrej_scale=3,
-                     scale_method=None, hand_scale=None, sn_max_medscale=2.0, sn_min_medscale=0.5, debug=False, show=False):
+                     scale_method=None, hand_scale=None, sn_max_medscale=2.0, sn_min_medscale=0.5, debug=False, show=False,
+                     bin_index=None):
 
     '''
     Routine for optimally combining long or multi-slit spectra or echelle spectra of individual orders. It will
@@ -1917,6 +1951,8 @@ def scale_spec_stack(wave_grid, waves, fluxes, ivars, masks, sn, weights, ref_pe
             Title prefix for spec_reject_comb QA plots
         debug (bool): default=False
             show interactive QA plot
+        bin_index: ndarray, int, (nspec, nexp), optional
+            Index of the wave_grid bin of each pixel in waves; see compute_stack.
 
     Returns:
         tuple: Returns the following:
@@ -1956,7 +1992,8 @@ def scale_spec_stack(wave_grid, waves, fluxes, ivars, masks, sn, weights, ref_pe
     '''
 
     # Compute an initial stack as the reference, this has its own wave grid based on the weighted averages
-    wave_stack, flux_stack, ivar_stack, mask_stack, nused = compute_stack(wave_grid, waves, fluxes, ivars, masks, weights)
+    wave_stack, flux_stack, ivar_stack, mask_stack, nused = compute_stack(wave_grid, waves, fluxes, ivars, masks, weights,
+                                                                          bin_index=bin_index)
 
     # Rescale spectra to line up with our preliminary stack so that we can sensibly reject outliers
     nexp = np.shape(fluxes)[1]
@@ -2086,18 +2123,22 @@ def combspec(waves, fluxes, ivars, masks, sn_smooth_npix,
     wave_grid, _, _ = get_wave_grid(waves, masks = masks, wave_method=wave_method, wave_grid_min=wave_grid_min,
                                     wave_grid_max=wave_grid_max,dwave=dwave, dv=dv, dloglam=dloglam, samp_fact=samp_fact)
 
+    # Assign the pixels to the wave_grid bins once, for all the stacks below
+    bin_index = wave_grid_index(wave_grid, waves)
+
     # Evaluate the sn_weights. This is done once at the beginning
     rms_sn, weights = sn_weights(waves, fluxes, ivars, masks, sn_smooth_npix, const_weights=const_weights, verbose=True)
 
     fluxes_scale, ivars_scale, scales, scale_method_used = scale_spec_stack(
         wave_grid, waves, fluxes, ivars, masks, rms_sn, weights, ref_percentile=ref_percentile, maxiter_scale=maxiter_scale,
         sigrej_scale=sigrej_scale, scale_method=scale_method, hand_scale=hand_scale,
-        sn_max_medscale=sn_max_medscale, sn_min_medscale=sn_min_medscale, debug=debug_scale, show=show_scale)
+        sn_max_medscale=sn_max_medscale, sn_min_medscale=sn_min_medscale, debug=debug_scale, show=show_scale,
+        bin_index=bin_index)
 
     # Rejecting and coadding
     wave_stack, flux_stack, ivar_stack, mask_stack, outmask, nused = spec_reject_comb(
         wave_grid, waves, fluxes_scale, ivars_scale, masks, weights, sn_clip=sn_clip, lower=lower, upper=upper,
-        maxrej=maxrej, maxiter_reject=maxiter_reject, debug=debug, title=title)
+        maxrej=maxrej, maxiter_reject=maxiter_reject, debug=debug, title=title, bin_index=bin_index)
 
     if show:
         coadd_qa(wave_stack, flux_stack, ivar_stack, nused, mask=mask_stack, title='Stacked spectrum', qafile=qafile)
@@ -2299,13 +2340,12 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
         sn_smooth_npix = int(np.round(0.1 * nspec_eff))
         msgs.info('Using a sn_smooth_pix={:d} to decide how to scale and weight your spectra'.format(sn_smooth_npix))
 
-    # create some arrays
-    scales = np.zeros_like(waves)
-
     # Generate a giant wave_grid
     wave_grid, _, _ = get_wave_grid(waves, masks=masks, wave_method=wave_method,
                                     wave_grid_min=wave_grid_min, wave_grid_max=wave_grid_max,
                                     dwave=dwave, dv=dv, dloglam=dloglam, samp_fact=samp_fact)
+    # Assign the pixels to the wave_grid bins once, for all the stacks below
+    bin_index = wave_grid_index(wave_grid, waves)
 
     # Evaluate the sn_weights. This is done once at the beginning
     rms_sn, weights_sn = sn_weights(waves, fluxes, ivars, masks, sn_smooth_npix, const_weights=const_weights, verbose=True)
@@ -2313,7 +2353,9 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
     mean_sn_ord = np.mean(rms_sn, axis=1)
     best_orders = np.argsort(mean_sn_ord)[::-1][0:nbest]
     rms_sn_per_exp = np.mean(rms_sn[best_orders, :], axis=0)
-    weights_exp = np.tile(rms_sn_per_exp**2, (nspec, norder, 1))
+    # Broadcast the per exposure weights along the last axis rather than tiling them into another (nspec, norder, nexp)
+    # array
+    weights_exp = rms_sn_per_exp**2
     if sensfile is not None:
         weights_sens = sensfunc_weights(sensfile, waves, debug=debug)
         weights = weights_exp*weights_sens
@@ -2339,7 +2381,8 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
                              rms_sn[iord, :], weights[:, iord, :], ref_percentile=ref_percentile,
                              maxiter_scale=maxiter_scale,sigrej_scale=sigrej_scale, scale_method=scale_method,
                              hand_scale=hand_scale,
-                             sn_max_medscale=sn_max_medscale, sn_min_medscale=sn_min_medscale, debug=debug_scale)
+                             sn_max_medscale=sn_max_medscale, sn_min_medscale=sn_min_medscale, debug=debug_scale,
+                             bin_index=bin_index[:, iord, :])
 
     # Arrays to store rescaled spectra. Need Fortran like order reshaping to create a (nspec, norder*nexp) stack of spectra.
     # The order of the reshaping in the second dimension is such that blocks norder long for each exposure are stacked
@@ -2352,10 +2395,14 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
     masks_2d = np.reshape(masks, shape_2d, order='F')
     scales_2d = np.reshape(scales_interord, shape_2d, order='F')
     weights_2d = np.reshape(weights, shape_2d, order='F')
+    bin_index_2d = np.reshape(bin_index, shape_2d, order='F')
     rms_sn_2d = np.reshape(rms_sn, (norder*nexp), order='F')
-    # Iteratively scale and stack the spectra, this takes or the order re-scaling we were doing previously
-    fluxes_pre_scale = fluxes_2d.copy()
-    ivars_pre_scale = ivars_2d.copy()
+    # The Fortran ordered reshapes above are copies, so drop the (nspec, norder, nexp) versions
+    del fluxes_scl_interord, ivars_scl_interord, scales_interord
+    # Iteratively scale and stack the spectra, this takes or the order re-scaling we were doing previously. The
+    # scaling never modifies its inputs, so there is no need to copy them between iterations.
+    fluxes_pre_scale = fluxes_2d
+    ivars_pre_scale = ivars_2d
     # For the first iteration use the scale_method input as an argument (default=None, which will allow
     # soly_poly_ratio scaling which is very slow). For all the other iterations simply use median rescaling since
     # we are then applying tiny corrections and median scaling is much faster
@@ -2365,10 +2412,10 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
             wave_grid, waves_2d, fluxes_pre_scale, ivars_pre_scale, masks_2d, rms_sn_2d, weights_2d, ref_percentile=ref_percentile,
             maxiter_scale=maxiter_scale, sigrej_scale=sigrej_scale, scale_method=scale_method_iter[iter], hand_scale=hand_scale,
             sn_max_medscale=sn_max_medscale, sn_min_medscale=sn_min_medscale,
-            show=(show_order_scale & (iter == (niter_order_scale-1))))
+            show=(show_order_scale & (iter == (niter_order_scale-1))), bin_index=bin_index_2d)
         scales_2d *= scales_iter
-        fluxes_pre_scale = fluxes_scale_2d.copy()
-        ivars_pre_scale = ivars_scale_2d.copy()
+        fluxes_pre_scale = fluxes_scale_2d
+        ivars_pre_scale = ivars_scale_2d
 
     # Reshape the outputs to be (nspec, norder, nexp)
     fluxes_scale = np.reshape(fluxes_scale_2d, (nspec, norder, nexp), order='F')
@@ -2388,7 +2435,7 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
         masks_stack_orders[:, iord],  outmasks_orders[:,iord,:], nused_iord = spec_reject_comb(
             wave_grid, waves[:, iord, :], fluxes_scale[:, iord, :], ivars_scale[:, iord, :], masks[:, iord, :], weights[:, iord, :],
             sn_clip=sn_clip, lower=lower, upper=upper, maxrej=maxrej, maxiter_reject=maxiter_reject, debug=debug,
-            title='order_stacks')
+            title='order_stacks', bin_index=bin_index[:, iord, :])
         if show_order_stacks:
             # TODO can we make this bit below more modular for the telluric?
             if sensfile is not None:
@@ -2412,7 +2459,8 @@ def ech_combspec(fnames, objids, sensfile=None, nbest=None, ex_value='OPT', flux
     # Now compute the giant stack
     wave_giant_stack, flux_giant_stack, ivar_giant_stack, mask_giant_stack, outmask_giant_stack, nused_giant_stack = \
         spec_reject_comb(wave_grid, waves_2d, fluxes_2d, ivars_2d, masks_2d, weights_2d, sn_clip=sn_clip,
-                         lower=lower, upper=upper, maxrej=maxrej, maxiter_reject=maxiter_reject, debug=debug)
+                         lower=lower, upper=upper, maxrej=maxrej, maxiter_reject=maxiter_reject, debug=debug,
+                         bin_index=bin_index_2d)
 
     # Reshape everything now exposure-wise
     waves_2d_exps = waves_2d.reshape((nspec * norder, nexp), order='F')
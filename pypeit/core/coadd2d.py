@@ -11,6 +11,7 @@ from IPython import embed
 
 import numpy as np
 import scipy
+from scipy import sparse
 from matplotlib import pyplot as plt
 
 from astropy.io import fits
@@ -394,8 +395,10 @@ def compute_coadd2d(ref_trace_stack, sciimg_stack, sciivar_stack, skymodel_stack
 def rebin2d(spec_bins, spat_bins, waveimg_stack, spatimg_stack, thismask_stack, inmask_stack, sci_list, var_list):
     """
     Rebin a set of images and propagate variance onto a new spectral and spatial grid. This routine effectively
-    "recitifies" images using np.histogram2d which is extremely fast and effectiveluy performs
-    nearest grid point interpolation.
+    "recitifies" images using the same binning as np.histogram2d, which effectiveluy performs
+    nearest grid point interpolation.  For each image in the stack, the binning is constructed once as a sparse
+    matrix (see :func:`rebin2d_operator`) and applied to all the science and variance images with a single
+    sparse matrix product.
 
     Args:
         spec_bins: float ndarray, shape = (nspec_rebin)
@@ -460,40 +463,76 @@ def rebin2d(spec_bins, spat_bins, waveimg_stack, spatimg_stack, thismask_stack,
     for jj in range(len(var_list)):
         var_list_out.append(np.zeros(shape_out))
 
+    nsci = len(sci_list)
     for img in range(nimgs):
         # This fist image is purely for bookeeping purposes to determine the number of times each pixel
         # could have been sampled
         thismask = thismask_stack[img, :, :]
-        spec_rebin_this = waveimg_stack[img, :, :][thismask]
-        spat_rebin_this = spatimg_stack[img, :, :][thismask]
-
-        nsmp_rebin_stack[img, :, :], spec_edges, spat_edges = np.histogram2d(spec_rebin_this, spat_rebin_this,
-                                                               bins=[spec_bins, spat_bins], density=False)
+        rebin_op = rebin2d_operator(spec_bins, spat_bins, waveimg_stack[img, :, :], spatimg_stack[img, :, :],
+                                    thismask)
+        nsmp_rebin_stack[img, :, :] = np.asarray(rebin_op.sum(axis=1)).reshape(nspec_rebin, nspat_rebin)
 
+        # Only keep the unmasked pixels
         finmask = thismask & inmask_stack[img,:,:]
-        spec_rebin = waveimg_stack[img, :, :][finmask]
-        spat_rebin = spatimg_stack[img, :, :][finmask]
-        norm_img, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                          bins=[spec_bins, spat_bins], density=False)
+        rebin_op = rebin_op[:, finmask.ravel()]
+        norm_img = np.asarray(rebin_op.sum(axis=1)).reshape(nspec_rebin, nspat_rebin)
         norm_rebin_stack[img, :, :] = norm_img
+        if nsci + len(var_list) == 0:
+            continue
 
-        # Rebin the science images
-        for indx, sci in enumerate(sci_list):
-            weigh_sci, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                               bins=[spec_bins, spat_bins], density=False,
-                                                               weights=sci[img,:,:][finmask])
-            sci_list_out[indx][img, :, :] = (norm_img > 0.0) * weigh_sci/(norm_img + (norm_img == 0.0))
+        # Rebin all the science and variance images at once
+        weigh = rebin_op.dot(np.stack([sci[img,:,:][finmask] for sci in sci_list]
+                                      + [var[img,:,:][finmask] for var in var_list], axis=1))
+        weigh = weigh.T.reshape(-1, nspec_rebin, nspat_rebin)
+        for indx in range(nsci):
+            sci_list_out[indx][img, :, :] = (norm_img > 0.0) * weigh[indx]/(norm_img + (norm_img == 0.0))
 
         # Rebin the variance images, note the norm_img**2 factor for correct error propagation
-        for indx, var in enumerate(var_list):
-            weigh_var, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                               bins=[spec_bins, spat_bins], density=False,
-                                                               weights=var[img, :, :][finmask])
-            var_list_out[indx][img, :, :] = (norm_img > 0.0)*weigh_var/(norm_img + (norm_img == 0.0))**2
-
+        for indx in range(len(var_list)):
+            var_list_out[indx][img, :, :] = (norm_img > 0.0)*weigh[nsci+indx]/(norm_img + (norm_img == 0.0))**2
 
     return sci_list_out, var_list_out, norm_rebin_stack.astype(int), nsmp_rebin_stack.astype(int)
 
+
+def rebin2d_operator(spec_bins, spat_bins, waveimg, spatimg, mask):
+    """
+    Construct the sparse matrix that rebins an image onto a new spectral and spatial grid.
+
+    The pixels are assigned to the bins exactly as in np.histogram2d: the bins include their lower edge, the
+    last bin also includes its upper edge, and pixels outside the grid are ignored.
+
+    Args:
+        spec_bins: float ndarray, shape = (nspec_rebin+1)
+           Spectral bins to rebin to.
+        spat_bins: float ndarray, shape = (nspat_rebin+1)
+           Spatial bins to rebin to.
+        waveimg: float ndarray, shape = (nspec, nspat)
+            Wavelength image
+        spatimg: float ndarray, shape = (nspec, nspat)
+            Spatial position image
+        mask: bool ndarray, shape = (nspec, nspat)
+            Pixels to rebin.
+
+    Returns:
+        scipy.sparse.csr_matrix: Matrix with shape (nspec_rebin*nspat_rebin, nspec*nspat) and unity elements that
+        connect each selected pixel to its bin.  The product with a flattened image gives the flattened image
+        with the sum of the pixel values in each bin; the sums over its rows give the number of pixels in each bin.
+    """
+    nspec_rebin = spec_bins.size - 1
+    nspat_rebin = spat_bins.size - 1
+    pix = np.flatnonzero(mask)
+    ibin = []
+    for bins, img in zip([spec_bins, spat_bins], [waveimg, spatimg]):
+        coo = img.ravel()[pix]
+        _ibin = np.searchsorted(bins, coo, side='right') - 1
+        # Include the right edge in the last bin
+        _ibin[coo == bins[-1]] -= 1
+        ibin += [_ibin]
+    indx = (ibin[0] >= 0) & (ibin[0] < nspec_rebin) & (ibin[1] >= 0) & (ibin[1] < nspat_rebin)
+    return sparse.csr_matrix((np.ones(np.sum(indx)), (ibin[0][indx]*nspat_rebin + ibin[1][indx], pix[indx])),
+                             shape=(nspec_rebin*nspat_rebin, mask.size))
+
+
 # TODO Break up into separate methods?
 
 class Coadd2d(object):
@@ -1617,6 +1617,120 @@ def objfind(image, thismask, slit_left, slit_righ, inmask=None, fwhm=3.0, maxdev
 
     return sobjs, skymask[thismask]
 
+
+def multislit_objfind(image, slitmask, slit_left, slit_righ, gdslits, inmask=None, fwhm=3.0, std_trace=None,
+                      hand_extract_dict=None, specobj_dict=None, qa_title='Finding objects on slit', **kwargs):
+    """
+    Find the objects in a set of slits of a multi-slit image.
+
+    This performs the same calculation as calling :func:`objfind`
+    separately for each slit, but each slit is only searched over the
+    sub-image that spans its spatial extent.  The extent of all slits
+    is determined in a single pass over `slitmask`, and no full-frame
+    array is created for an individual slit.  For masks with many
+    slits, this removes the overhead of :func:`objfind` that scales
+    with the size of the full image instead of that of the slit.
+
+    The sub-images are padded by ``4*fwhm + 4`` pixels on both sides
+    of each slit so that the trace fitting is not affected by their
+    edges.
+
+    Args:
+        image (`numpy.ndarray`_):
+            Image to search for objects, with shape (nspec, nspat).
+        slitmask (`numpy.ndarray`_):
+            Integer image with the index of the slit of each pixel;
+            -1 for pixels that are not on a slit.
+        slit_left (`numpy.ndarray`_):
+            Left boundaries of all slits, shape (nspec, nslits).
+        slit_righ (`numpy.ndarray`_):
+            Right boundaries of all slits, shape (nspec, nslits).
+        gdslits (`numpy.ndarray`_):
+            Indices of the slits to search.
+        inmask (`numpy.ndarray`_, optional):
+            Boolean image with the good pixels (True = good).  If
+            None, all pixels are good.
+        fwhm (:obj:`float`, optional):
+            Estimated FWHM of the objects in pixels; see
+            :func:`objfind`.
+        std_trace (`numpy.ndarray`_, optional):
+            Trace of the standard star used as a crutch; see
+            :func:`objfind`.
+        hand_extract_dict (:obj:`dict`, optional):
+            Hand-selected apertures; see :func:`objfind`.
+        specobj_dict (:obj:`dict`, optional):
+            Meta-data for the objects; the `slitid` is set to the
+            index of each slit.  See :func:`objfind`.
+        qa_title (:obj:`str`, optional):
+            Prefix of the title of the QA plots.  The slit number is
+            appended.
+        **kwargs:
+            Other keyword arguments passed to :func:`objfind`.
+
+    Returns:
+        tuple: Returns the following:
+            - sobjs: SpecoObjs object with the objects found on all
+              slits
+            - np.ndarray: Boolean skymask image; pixels off the
+              searched slits are False
+    """
+    nspec, nspat = image.shape
+    if specobj_dict is None:
+        specobj_dict = dict(setup=None, slitid=999, det=1, objtype='unknown', pypeline='MultiSlit',
+                            orderindx=999)
+    if hand_extract_dict is not None:
+        hand_extract = dict(zip(['hand_extract_spec', 'hand_extract_spat', 'hand_extract_det',
+                                 'hand_extract_fwhm'], parse_hand_dict(hand_extract_dict)))
+        hand_extract_spat = np.rint(hand_extract['hand_extract_spat']).astype(int)
+
+    # Find the spatial extent of all slits in one pass
+    onslit = slitmask > -1
+    slit_cols = np.zeros((max(slit_left.shape[1], np.amax(slitmask)+1), nspat), dtype=bool)
+    slit_cols[slitmask[onslit], np.nonzero(onslit)[1]] = True
+    pad = int(np.ceil(4*fwhm)) + 4
+
+    skymask = np.zeros_like(image, dtype=bool)
+    sobjs = specobjs.SpecObjs()
+    for slit in gdslits:
+        msgs.info('{0} # {1:d}'.format(qa_title, slit))
+        cols = np.where(slit_cols[slit])[0]
+        if cols.size == 0:
+            msgs.warn('There are no pixels in slit {:d}'.format(slit))
+            continue
+        spat_min = max(cols[0] - pad, 0)
+        spat_max = min(cols[-1] + pad + 1, nspat)
+        cutout = np.s_[:,spat_min:spat_max]
+
+        thismask = slitmask[cutout] == slit
+        thisinmask = thismask if inmask is None else inmask[cutout] & thismask
+        if hand_extract_dict is None:
+            thishand = None
+        else:
+            # Only keep the hand apertures within the sub-image
+            indx = (hand_extract_spat >= spat_min) & (hand_extract_spat < spat_max)
+            thishand = dict(hand_extract_dict, **{key: val[indx] for key, val in hand_extract.items()})
+            thishand['hand_extract_spat'] = thishand['hand_extract_spat'] - spat_min
+        sobjs_slit, skymask[cutout][thismask] \
+                = objfind(image[cutout], thismask, slit_left[:,slit] - spat_min,
+                          slit_righ[:,slit] - spat_min, inmask=thisinmask, fwhm=fwhm,
+                          std_trace=None if std_trace is None else std_trace - spat_min,
+                          hand_extract_dict=thishand, specobj_dict=dict(specobj_dict, slitid=slit),
+                          qa_title='{0} # {1:d}'.format(qa_title, slit), **kwargs)
+
+        # Shift the objects back to the coordinates of the full image
+        for iobj in range(len(sobjs_slit)):
+            sobj = sobjs_slit[iobj]
+            sobj.TRACE_SPAT = sobj.TRACE_SPAT + spat_min
+            sobj.SPAT_PIXPOS = sobj.SPAT_PIXPOS + spat_min
+            if sobj.hand_extract_flag:
+                sobj.hand_extract_spat = sobj.hand_extract_spat + spat_min
+            sobj.set_name()
+        if len(sobjs_slit) > 0:
+            sobjs.add_sobj(sobjs_slit)
+
+    return sobjs, skymask
+
+
 def remap_orders(xinit, spec_min_max, inverse=False):
 
     """
@@ -292,7 +292,7 @@ def fit_flat(flat, tilts_dict, tslits_dict_in, slit, inmask = None,
     specfit_interp = interp1d(pix_fit, specfit, kind='linear', bounds_error=False, fill_value=-np.inf)
     log_specfit = specfit_interp(pixvec)
     specvec = np.exp(log_specfit)
-    spec_sm = utils.fast_running_median(specvec,np.fmax(np.ceil(0.10*nspec).astype(int),10))
+    spec_sm = utils.running_median(specvec,np.fmax(np.ceil(0.10*nspec).astype(int),10))
     spec_sm_max = spec_sm.max()
     fit_spat = thismask & inmask &  (spec_model > 1.0) & (spec_model > 0.1*spec_sm_max) & \
                (norm_spec > 0.0) & (norm_spec < 1.7)  #& (flat < nonlinear_counts)
@@ -314,7 +314,7 @@ def fit_flat(flat, tilts_dict, tslits_dict_in, slit, inmask = None,
     ximg_resln = spat_samp/slitwidth
 
     med_width = (np.ceil(nfit_spat*ximg_resln)).astype(int)
-    normimg_raw = utils.fast_running_median(norm_spec_fit,med_width)
+    normimg_raw = utils.running_median(norm_spec_fit,med_width)
     sig_res = np.fmax(med_width/20.0,0.5)
     normimg = scipy.ndimage.filters.gaussian_filter1d(normimg_raw,sig_res, mode='nearest')
 
@@ -17,6 +17,7 @@ import IPython
 
 from pypeit import msgs
 from pypeit import debugger
+from pypeit import specobjs
 from pypeit.core import parse
 
 
@@ -28,7 +29,9 @@ def load_ext_to_array(hdulist, ext_id, ex_value='OPT', flux_value=True, nmaskedg
     Load one-d spectra from ext_id in the hdulist
 
     Args:
-        hdulist: FITS HDU list
+        hdulist: FITS HDU list or :class:`pypeit.specobjs.LazySpecObjs`
+            of a spec1d file in either the multi-extension or the
+            columnar layout
         ext_id: extension name, i.e., 'SPAT1073-SLIT0001-DET03', 'OBJID0001-ORDER0003', 'OBJID0001-ORDER0002-DET01'
         ex_value: 'OPT' or 'BOX'
         flux_value: if True load fluxed data, else load unfluxed data
@@ -40,24 +43,20 @@ def load_ext_to_array(hdulist, ext_id, ex_value='OPT', flux_value=True, nmaskedg
     if (ex_value != 'OPT') and (ex_value != 'BOX'):
         msgs.error('{:} is not recognized. Please change to either BOX or OPT.'.format(ex_value))
 
-    # get the order/slit information
-    ntrace0 = np.size(hdulist)-1
-    idx_names = []
-    for ii in range(ntrace0):
-        idx_names.append(hdulist[ii+1].name) # idx name
+    lazy = hdulist if isinstance(hdulist, specobjs.LazySpecObjs) else specobjs.LazySpecObjs(hdulist)
 
     # Initialize ext
     ext = None
-    for indx in (idx_names):
-        if ext_id in indx:
+    for indx, name in enumerate(lazy.names):
+        if ext_id in name:
             ext = indx
     if ext is None:
         msgs.error('Can not find extension {:}.'.format(ext_id))
-    else:
-        hdu_iexp = hdulist[ext]
 
-    wave = hdu_iexp.data['{:}_WAVE'.format(ex_value)]
-    mask = hdu_iexp.data['{:}_MASK'.format(ex_value)]
+    # Copy the columns so that they do not depend on the (possibly
+    # memory-mapped) file
+    wave = np.array(lazy.get_column(ext, '{:}_WAVE'.format(ex_value)))
+    mask = np.array(lazy.get_column(ext, '{:}_MASK'.format(ex_value)))
 
     # Mask Edges
     if nmaskedge is not None:
@@ -65,15 +64,59 @@ def load_ext_to_array(hdulist, ext_id, ex_value='OPT', flux_value=True, nmaskedg
         mask[-int(nmaskedge):] = False
 
     if flux_value:
-        flux = hdu_iexp.data['{:}_FLAM'.format(ex_value)]
-        ivar = hdu_iexp.data['{:}_FLAM_IVAR'.format(ex_value)]
+        flux = np.array(lazy.get_column(ext, '{:}_FLAM'.format(ex_value)))
+        ivar = np.array(lazy.get_column(ext, '{:}_FLAM_IVAR'.format(ex_value)))
     else:
         msgs.warn('Loading unfluxed spectra')
-        flux = hdu_iexp.data['{:}_COUNTS'.format(ex_value)]
-        ivar = hdu_iexp.data['{:}_COUNTS_IVAR'.format(ex_value)]
+        flux = np.array(lazy.get_column(ext, '{:}_COUNTS'.format(ex_value)))
+        ivar = np.array(lazy.get_column(ext, '{:}_COUNTS_IVAR'.format(ex_value)))
 
     return wave, flux, ivar, mask
 
+def iter_1dspec(fnames, gdobj, order=None, ex_value='OPT', flux_value=True, nmaskedge=None):
+    '''
+    Load the spectra from a set of 1d fits files, one file at a time.
+
+    Each file is memory-mapped, only the data of the requested object
+    (and order) are read, and the file is closed before moving to the
+    next one.  Both the multi-extension and the columnar spec1d layouts
+    are supported; see :class:`pypeit.specobjs.LazySpecObjs`.  This limits the memory and the number of open
+    files needed to loop over many exposures.
+
+    Args:
+        fnames (list): 1D spectra fits file(s)
+        gdobj (list): extension name (longslit/multislit) or objID (Echelle), one per file
+        order (None or int): order number.  If None, all orders are loaded for Echelle data.
+        ex_value (str): 'OPT' or 'BOX'
+        flux_value (bool): if True it will load fluxed spectra, otherwise load counts
+        nmaskedge (int): number of pixels to mask at the edges of each spectrum
+
+    Yields:
+        tuple: The primary header and the wavelength, flux, ivar, and
+        mask (bool) arrays of each file.  The arrays have shape
+        (Nspec,) for Longslit or a single Echelle order, and shape
+        (Nspec, Norders) for all Echelle orders.
+    '''
+    for fname, obj in zip(fnames, gdobj):
+        with specobjs.LazySpecObjs(fname) as spec1d:
+            header = spec1d.header.copy()
+            pypeline = header['PYPELINE']
+            if (order is None) and (pypeline == "Echelle"):
+                # Get the order information
+                idx_orders = [int(name.split('-')[1][5:]) for name in spec1d.names]
+                ## np.unique automatically sort the returned array which is not what I want!!!
+                dum, order_vec_idx = np.unique(idx_orders, return_index=True)
+                order_vec = np.array(idx_orders)[np.sort(order_vec_idx)]
+                spec = [load_ext_to_array(spec1d, obj+'-ORDER{:04d}'.format(iord), ex_value=ex_value,
+                                          flux_value=flux_value, nmaskedge=nmaskedge) for iord in order_vec]
+                wave, flux, ivar, mask = [np.stack(s, axis=1) for s in zip(*spec)]
+            else:
+                ext_id = obj+'-ORDER{:04d}'.format(order) if pypeline == "Echelle" else obj
+                wave, flux, ivar, mask = load_ext_to_array(spec1d, ext_id, ex_value=ex_value,
+                                                           flux_value=flux_value, nmaskedge=nmaskedge)
+        yield header, wave, flux, ivar, mask
+
+
 # TODO merge this with unpack orders
 def load_1dspec_to_array(fnames, gdobj=None, order=None, ex_value='OPT', flux_value=True, nmaskedge=None):
     '''
@@ -81,6 +124,11 @@ def load_1dspec_to_array(fnames, gdobj=None, order=None, ex_value='OPT', flux_va
     If Echelle, you need to specify which order you want to load.
     It can NOT load all orders for Echelle data.
 
+    The files are read one at a time using :func:`iter_1dspec`, and
+    the spectra are copied into the output arrays as they are read.
+    Only the reading is streamed: the output arrays hold the spectra of
+    all the files, as needed by the coadd algorithms.
+
     Args:
         fnames (list): 1D spectra fits file(s)
         gdobj (list): extension name (longslit/multislit) or objID (Echelle)
@@ -95,6 +143,8 @@ def load_1dspec_to_array(fnames, gdobj=None, order=None, ex_value='OPT', flux_va
             - fluxes (ndarray): flux array of your spectra
             - ivars (ndarray): ivars of your spectra
             - masks (ndarray, bool): mask array of your spectra
+            - header (`astropy.io.fits.Header`): primary header of the
+              first file
 
         The shapes of all returns are exactly the same.
             - Case 1: np.size(fnames)=np.size(gdobj)=1, order=None for
@@ -112,114 +162,28 @@ def load_1dspec_to_array(fnames, gdobj=None, order=None, ex_value='OPT', flux_va
               Echelle orders for a list of fits files, 3D array, the
               shapres are Nspec by Norders by Nexp
     '''
-
-    # read in the first fits file
-    if isinstance(fnames, (list, np.ndarray)):
-        nexp = np.size(fnames)
-        fname0 = fnames[0]
-    elif isinstance(fnames, str):
-        nexp = 1
-        fname0 = fnames
-
-    hdulist = fits.open(fname0)
-    header = hdulist[0].header
-    npix = header['NPIX']
-    pypeline = header['PYPELINE']
-
-    # get the order/slit information
-    ntrace0 = np.size(hdulist)-1
-    idx_orders = []
-    for ii in range(ntrace0):
-        idx_orders.append(int(hdulist[ii+1].name.split('-')[1][5:])) # slit ID or order ID
-
-
-    if pypeline == "Echelle":
-        ## np.unique automatically sort the returned array which is not what I want!!!
-        ## order_vec = np.unique(idx_orders)
-        dum, order_vec_idx = np.unique(idx_orders, return_index=True)
-        order_vec = np.array(idx_orders)[np.sort(order_vec_idx)]
-        norder = np.size(order_vec)
-    else:
-        norder = 1
-
-    #TODO This is unneccessarily complicated. The nexp=1 case does the same operations as the nexp > 1 case. Refactor
-    # this so that it just does the same set of operations once and then reshapes the array at the end to give you what
-    # you want. Let's merge this with unpack orders
-
-    ## Loading data from a single fits file
-    if nexp == 1:
-        # initialize arrays
-        if (order is None) and (pypeline == "Echelle"):
-            waves = np.zeros((npix, norder,nexp))
-            fluxes = np.zeros_like(waves)
-            ivars = np.zeros_like(waves)
-            masks = np.zeros_like(waves, dtype=bool)
-
-            for ii, iord in enumerate(order_vec):
-                ext_id = gdobj[0]+'-ORDER{:04d}'.format(iord)
-                wave_iord, flux_iord, ivar_iord, mask_iord = load_ext_to_array(hdulist, ext_id, ex_value=ex_value,
-                                                                               flux_value=flux_value, nmaskedge=nmaskedge)
-                waves[:,ii,0] = wave_iord
-                fluxes[:,ii,0] = flux_iord
-                ivars[:,ii,0] = ivar_iord
-                masks[:,ii,0] = mask_iord
-        else:
-            if pypeline == "Echelle":
-                ext_id = gdobj[0]+'-ORDER{:04d}'.format(order)
-            else:
-                ext_id = gdobj[0]
-            waves, fluxes, ivars, masks = load_ext_to_array(hdulist, ext_id, ex_value=ex_value, flux_value=flux_value,
-                                                            nmaskedge=nmaskedge)
-
-    ## Loading data from a list of fits files
-    else:
-        # initialize arrays
-        if (order is None) and (pypeline == "Echelle"):
-            # store all orders into one single array
-            waves = np.zeros((npix, norder, nexp))
-        else:
-            # store a specific order or longslit
-            waves = np.zeros((npix, nexp))
-        fluxes = np.zeros_like(waves)
-        ivars = np.zeros_like(waves)
-        masks = np.zeros_like(waves,dtype=bool)
-
-        for iexp in range(nexp):
-            hdulist_iexp = fits.open(fnames[iexp])
-
-            # ToDo: The following part can be removed if all data are reduced using the leatest pipeline
-            if pypeline == "Echelle":
-                ntrace = np.size(hdulist_iexp) - 1
-                idx_orders = []
-                for ii in range(ntrace):
-                    idx_orders.append(int(hdulist_iexp[ii + 1].name.split('-')[1][5:]))  # slit ID or order ID
-                    dum, order_vec_idx = np.unique(idx_orders, return_index=True)
-                    order_vec = np.array(idx_orders)[np.sort(order_vec_idx)]
-            # ToDo: The above part can be removed if all data are reduced using the leatest pipeline
-
-            if (order is None) and (pypeline == "Echelle"):
-                for ii, iord in enumerate(order_vec):
-                    ext_id = gdobj[iexp]+'-ORDER{:04d}'.format(iord)
-                    wave_iord, flux_iord, ivar_iord, mask_iord = load_ext_to_array(hdulist_iexp, ext_id, ex_value=ex_value,
-                                                                                   nmaskedge = nmaskedge, flux_value=flux_value)
-                    waves[:,ii,iexp] = wave_iord
-                    fluxes[:,ii,iexp] = flux_iord
-                    ivars[:,ii,iexp] = ivar_iord
-                    masks[:,ii,iexp] = mask_iord
-            else:
-                if pypeline == "Echelle":
-                    ext_id = gdobj[iexp]+'-ORDER{:04d}'.format(order)
-                else:
-                    ext_id = gdobj[iexp]
-                wave, flux, ivar, mask = load_ext_to_array(hdulist_iexp, ext_id, ex_value=ex_value, flux_value=flux_value,
-                                                           nmaskedge=nmaskedge)
-                waves[:, iexp] = wave
-                fluxes[:, iexp] = flux
-                ivars[:, iexp] = ivar
-                masks[:, iexp] = mask
+    if isinstance(fnames, str):
+        fnames = [fnames]
+    nexp = np.size(fnames)
+
+    spectra = iter_1dspec(fnames, gdobj, order=order, ex_value=ex_value, flux_value=flux_value,
+                          nmaskedge=nmaskedge)
+    header, wave, flux, ivar, mask = next(spectra)
+    if nexp == 1 and wave.ndim == 1:
+        return wave, flux, ivar, mask, header
+
+    # Allocate the arrays and fill them as the files are read
+    waves = np.zeros(wave.shape + (nexp,))
+    fluxes = np.zeros_like(waves)
+    ivars = np.zeros_like(waves)
+    masks = np.zeros_like(waves, dtype=bool)
+    waves[...,0], fluxes[...,0], ivars[...,0], masks[...,0] = wave, flux, ivar, mask
+    for iexp, (_, wave, flux, ivar, mask) in enumerate(spectra, start=1):
+        waves[...,iexp], fluxes[...,iexp], ivars[...,iexp], masks[...,iexp] = wave, flux, ivar, mask
 
     return waves, fluxes, ivars, masks, header
 
+
 def load_spec_order(fname,norder, objid=None, order=None, extract='OPT', flux=True):
     """
     Loading single order spectrum from a PypeIt 1D specctrum fits file.
@@ -0,0 +1,145 @@
+"""
+Utilities used to distribute independent pieces of a reduction (e.g.,
+the slits of a multi-slit mask) to a pool of worker processes.
+
+Large images are shared with the workers through memory-mapped files;
+see :class:`SharedArrays`.  This avoids pickling the full images for
+every task submitted to the pool.
+
+.. include common links, assuming primary doc root is up one directory
+.. include:: ../links.rst
+"""
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pypeit import msgs
+
+
+class SharedArray(object):
+    """
+    Picklable, read-only handle to an array held in a memory-mapped
+    file.
+
+    Pickling the handle only pickles the file name.  The array is
+    mapped the first time :attr:`data` is accessed in each process.
+
+    Args:
+        filename (:obj:`str`):
+            Name of the ``.npy`` file with the array.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._data = None
+
+    @property
+    def data(self):
+        """
+        The read-only, memory-mapped array.
+        """
+        if self._data is None:
+            self._data = np.load(self.filename, mmap_mode='r')
+        return self._data
+
+    def __getstate__(self):
+        return {'filename': self.filename}
+
+    def __setstate__(self, state):
+        self.filename = state['filename']
+        self._data = None
+
+
+class SharedArrays(object):
+    """
+    Context manager that shares a set of arrays with worker processes.
+
+    On entry, each array is written to a memory-mapped file in a
+    temporary directory, in shared memory if the system provides it
+    (``/dev/shm``).  The directory is removed on exit.
+
+    Usage::
+
+        with SharedArrays(image=image, ivar=ivar) as shared:
+            # shared['image'] is a picklable SharedArray
+            results = run_tasks(func, tasks, n_proc=n_proc, image=shared['image'])
+
+    Args:
+        **arrays:
+            The arrays to share, keyed by name.
+    """
+    def __init__(self, **arrays):
+        self._arrays = arrays
+        self.shared = None
+        self.path = None
+
+    def __enter__(self):
+        shm = '/dev/shm'
+        self.path = tempfile.mkdtemp(prefix='pypeit_',
+                                     dir=shm if os.access(shm, os.W_OK) else None)
+        self.shared = {}
+        for key, arr in self._arrays.items():
+            ofile = os.path.join(self.path, '{0}.npy'.format(key))
+            np.save(ofile, np.ascontiguousarray(arr))
+            self.shared[key] = SharedArray(ofile)
+        return self.shared
+
+    def __exit__(self, *args):
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.shared = None
+        self.path = None
+
+
+def as_array(arr):
+    """
+    Return the array referenced by a :class:`SharedArray` or the input
+    otherwise.
+
+    Args:
+        arr (:class:`SharedArray`, object):
+            Object to convert.
+
+    Returns:
+        object: The memory-mapped array, if `arr` is a
+        :class:`SharedArray`; otherwise `arr` is returned unchanged.
+    """
+    return arr.data if isinstance(arr, SharedArray) else arr
+
+
+def run_tasks(func, tasks, n_proc=1, **kwargs):
+    """
+    Call a function for a set of independent tasks, possibly in a pool of
+    worker processes.
+
+    The function is called as ``func(*task, **kwargs)`` for each task.
+    With a single process (or a single task), the calls are made
+    serially in the current process.  Otherwise, `func` and all its
+    arguments must be picklable; use :class:`SharedArrays` to pass
+    large arrays.
+
+    Args:
+        func (callable):
+            Function to call.  Must be defined at the top level of a
+            module for use with more than one process.
+        tasks (:obj:`list`):
+            List of tuples with the positional arguments of each call.
+        n_proc (:obj:`int`, optional):
+            Maximum number of worker processes.
+        **kwargs:
+            Keyword arguments passed to all calls.
+
+    Returns:
+        :obj:`list`: The results of each call, in the order of
+        `tasks`.
+    """
+    if n_proc is None or n_proc < 2 or len(tasks) < 2:
+        return [func(*task, **kwargs) for task in tasks]
+
+    n_proc = min(n_proc, len(tasks))
+    msgs.info('Distributing {0} tasks to {1} processes'.format(len(tasks), n_proc))
+    with ProcessPoolExecutor(max_workers=n_proc) as executor:
+        futures = [executor.submit(func, *task, **kwargs) for task in tasks]
+        return [future.result() for future in futures]
@@ -306,17 +306,18 @@ def ximg_and_edgemask(lord_in, rord_in, slitpix, trim_edg=(3,3), xshift=0.):
             #debugger.set_trace()
             #rord[:, islit] = lord[:, islit] + meds
 
-        # Loop down the slit
-        for iy in range(lord.shape[0]):
-            # Set the pixels
-            ix1 = max(int(np.ceil(lord[iy, islit])),0)
-            ix2 = min(int(rord[iy, islit]),ximg.shape[1]-1)
-            ix1 = min(ix1,ximg.shape[1] - 1)
-            ix2 = max(ix2, 0)
-            #
-            ximg[iy, ix1:ix2+1] = (np.arange(ix2 - ix1 + 1) + ix1 - lord[iy, islit]) / xsize[iy]
-            pixleft[iy, ix1:ix2+1] = (np.arange(ix2 - ix1 + 1) + ix1 - lord[iy, islit])
-            pixright[iy, ix1:ix2+1] = (rord[iy, islit] - ix2 + np.flip(np.arange(ix2-ix1+1),0))
+        # First and last pixel of the slit in each row
+        ix1 = np.clip(np.ceil(lord[:, islit]).astype(int), 0, ximg.shape[1]-1)
+        ix2 = np.clip(rord[:, islit].astype(int), 0, ximg.shape[1]-1)
+        npix = ix2 - ix1 + 1
+        if np.amax(npix) < 1:
+            continue
+        # Set the pixels in all rows at once
+        iy, k = np.where(np.arange(np.amax(npix))[None,:] < npix[:,None])
+        ix = ix1[iy] + k
+        pixleft[iy, ix] = ix - lord[iy, islit]
+        ximg[iy, ix] = pixleft[iy, ix] / xsize[iy]
+        pixright[iy, ix] = (rord[iy, islit] - ix2[iy]) + (ix2[iy] - ix)
 
     # Generate the edge mask
     edgemask = (slitpix > 0) & np.any([pixleft < trim_edg[0], pixright < trim_edg[1]], axis=0)
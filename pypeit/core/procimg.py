@@ -3,6 +3,8 @@
 .. include common links, assuming primary doc root is up one directory
 .. include:: ../links.rst
 """
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from scipy import signal, ndimage
 from IPython import embed
@@ -13,13 +15,20 @@ from pypeit.core import parse
 
 
 def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, grow=1.5,
-             remove_compact_obj=True, sigclip=5.0, sigfrac=0.3, objlim=5.0):
+             remove_compact_obj=True, sigclip=5.0, sigfrac=0.3, objlim=5.0, mask=None,
+             tile_size=512, n_threads=1):
     """
     Identify cosmic rays using the L.A.Cosmic algorithm
     U{http://www.astro.yale.edu/dokkum/lacosmic/}
     (article : U{http://arxiv.org/abs/astro-ph/0108003})
     This routine is mostly courtesy of Malte Tewes
 
+    The image is processed in square tiles, padded by enough pixels
+    that the result in each tile is identical to processing the full
+    image.  If a mask is provided, only the tiles that overlap it are
+    processed, and the tiles can be processed concurrently by a pool
+    of threads.
+
     Args:
         det:
         sciframe:
@@ -32,6 +41,15 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         sigclip:
         sigfrac:
         objlim:
+        mask (`numpy.ndarray`_, optional):
+            Boolean image selecting the pixels to search for cosmic
+            rays (e.g., the pixels in the slits).  Cosmic rays are
+            only flagged within the mask.  If None, the full image is
+            searched.
+        tile_size (:obj:`int`, optional):
+            Size of the (square) tiles.
+        n_threads (:obj:`int`, optional):
+            Number of threads used to process the tiles.
 
     Returns:
         ndarray: mask of cosmic rays (0=no CR, 1=CR)
@@ -43,39 +61,238 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
     msgs.info("Detecting cosmic rays with the L.A.Cosmic algorithm")
 #    msgs.work("Include these parameters in the settings files to be adjusted by the user")
     # Set the settings
-    scicopy = sciframe.copy()
-    crmask = np.cast['bool'](np.zeros(sciframe.shape))
-    sigcliplow = sigclip * sigfrac
+    crmask = np.zeros(sciframe.shape, dtype=bool)
 
     # Determine if there are saturated pixels
-    satpix = np.zeros_like(sciframe)
-#    satlev = settings_det['saturation']*settings_det['nonlinear']
-    satlev = saturation*nonlinear
-    wsat = np.where(sciframe >= satlev)
-    if wsat[0].size == 0: satpix = None
+    satpix = sciframe >= saturation*nonlinear
+    if not np.any(satpix):
+        satpix = None
+
+    # Select the tiles to process.  The tiles must include any cosmic
+    # ray that can be grown into the mask.
+    tiles = lacosmic_tiles(sciframe.shape, tile_size, mask=mask, pad=int(1+grow))
+    msgs.info('Searching {0} tiles of {1}x{1} pixels'.format(len(tiles), tile_size))
+
+    def _lacosmic_tile(tile):
+        # Pad the tile so that all the filters are exact in its interior
+        inner, outer = lacosmic_tile_slices(tile, sciframe.shape, tile_size, lacosmic_tile_pad)
+        return inner, lacosmic_tile(sciframe[outer],
+                                    varframe=None if varframe is None else varframe[outer],
+                                    satpix=None if satpix is None else satpix[outer],
+                                    maxiter=maxiter, remove_compact_obj=remove_compact_obj,
+                                    sigclip=sigclip, sigfrac=sigfrac, objlim=objlim)[inner[1]]
+
+    if n_threads is not None and n_threads > 1 and len(tiles) > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            results = list(executor.map(_lacosmic_tile, tiles))
     else:
-        satpix[wsat] = 1.0
-        satpix = np.cast['bool'](satpix)
+        results = [_lacosmic_tile(tile) for tile in tiles]
+    for inner, tile_mask in results:
+        crmask[inner[0]] = tile_mask
+    msgs.info("{0:d} pixels identified as cosmic rays".format(np.sum(crmask)))
+
+    # Additional algorithms (not traditionally implemented by LA cosmic) to remove some false positives.
+    msgs.work("The following algorithm would be better on the rectified, tilts-corrected image")
+    filt  = ndimage.sobel(sciframe, axis=1, mode='constant')
+    filty = ndimage.sobel(filt/np.sqrt(np.abs(sciframe)), axis=0, mode='constant')
+    filty[np.where(np.isnan(filty))]=0.0
+
+    sigimg = cr_screen(filty)
+
+    sigsmth = ndimage.filters.gaussian_filter(sigimg,1.5)
+    sigsmth[np.where(np.isnan(sigsmth))]=0.0
+    sigmask = np.zeros(sciframe.shape, dtype=bool)
+    sigmask[np.where(sigsmth>sigclip)] = True
+    crmask = np.logical_and(crmask, sigmask)
+    msgs.info("Growing cosmic ray mask by 1 pixel")
+    crmask = grow_masked(crmask.astype(float), grow, 1.0).astype(bool)
+    if mask is not None:
+        crmask &= mask
+
+    return crmask
+
+
+# Number of pixels needed around a tile for the L.A.Cosmic filters to
+# be exact in the tile:  2 for the noise model, 2 for the large-scale
+# structure filter, and 1 for each of the two neighbor searches.
+lacosmic_tile_pad = 6
+
+
+def lacosmic_tiles(shape, tile_size, mask=None, pad=0):
+    """
+    Select the tiles of an image to search for cosmic rays.
+
+    Args:
+        shape (:obj:`tuple`):
+            Shape of the image.
+        tile_size (:obj:`int`):
+            Size of the (square) tiles.
+        mask (`numpy.ndarray`_, optional):
+            Boolean image selecting the pixels of interest.  If None,
+            all tiles are selected.
+        pad (:obj:`int`, optional):
+            Select tiles with any selected pixel within this number of
+            pixels of the tile.
+
+    Returns:
+        :obj:`list`: List of tuples with the indices of the selected
+        tiles along each axis.
+    """
+    ntile = [(s + tile_size - 1)//tile_size for s in shape]
+    if mask is None:
+        return [(i, j) for i in range(ntile[0]) for j in range(ntile[1])]
+    _mask = ndimage.binary_dilation(mask, structure=np.ones((2*pad+1,2*pad+1), dtype=bool)) \
+                if pad > 0 else mask.astype(bool)
+    # Sum the mask in each tile
+    _mask = np.pad(_mask, [(0, n*tile_size-s) for n, s in zip(ntile, shape)], mode='constant')
+    occupied = np.any(_mask.reshape(ntile[0], tile_size, ntile[1], tile_size), axis=(1,3))
+    return [tuple(t) for t in np.argwhere(occupied)]
+
+
+def lacosmic_tile_slices(tile, shape, tile_size, pad):
+    """
+    Construct the slices used to process a tile.
+
+    Args:
+        tile (:obj:`tuple`):
+            Indices of the tile along each axis.
+        shape (:obj:`tuple`):
+            Shape of the image.
+        tile_size (:obj:`int`):
+            Size of the (square) tiles.
+        pad (:obj:`int`):
+            Number of pixels to pad the tile on each side, limited by
+            the image edges.
+
+    Returns:
+        :obj:`tuple`: Two objects are returned: (1) a tuple with the
+        slices selecting the tile in the image and in the padded tile,
+        respectively, and (2) the slices selecting the padded tile in
+        the image.
+    """
+    image_slices = []
+    padded_slices = []
+    tile_slices = []
+    for t, s in zip(tile, shape):
+        start = t*tile_size
+        end = min(start+tile_size, s)
+        pstart = max(start-pad, 0)
+        pend = min(end+pad, s)
+        image_slices += [slice(start, end)]
+        padded_slices += [slice(pstart, pend)]
+        tile_slices += [slice(start-pstart, end-pstart)]
+    return (tuple(image_slices), tuple(tile_slices)), tuple(padded_slices)
+
+
+def laplacian_plus(img):
+    """
+    Compute the positive part of the Laplacian of an image, as used by
+    L.A.Cosmic.
+
+    This is identical to subsampling the image by a factor of 2,
+    convolving it with the Laplacian kernel (with symmetric
+    boundaries), clipping the negative values, and rebinning the
+    result to the original size.  Each subpixel of a pixel has two of
+    its four neighbors in the same pixel; the Laplacian of each
+    subpixel therefore only depends on one neighboring pixel along
+    each axis.
+
+    Args:
+        img (`numpy.ndarray`_):
+            Image.
+
+    Returns:
+        `numpy.ndarray`_: The mean of the clipped Laplacian of the
+        four subpixels of each pixel.
+    """
+    _img = np.pad(img, 1, mode='edge')
+    img2 = 2*img
+    lplus = np.zeros(img.shape, dtype=float)
+    for dy in [_img[:-2,1:-1], _img[2:,1:-1]]:
+        for dx in [_img[1:-1,:-2], _img[1:-1,2:]]:
+            lplus += np.clip(img2 - dy - dx, 0.0, None)
+    return lplus/4.0
+
+
+def fine_structure(img, indx, chunk=10000):
+    """
+    Compute the L.A.Cosmic fine structure image at a set of pixels.
+
+    The fine structure image is the 3x3 median filtered image minus the
+    7x7 median filter of the latter, both with mirrored boundaries.
+    Only the 9x9 region around each selected pixel is used.
+
+    Args:
+        img (`numpy.ndarray`_):
+            Image.
+        indx (:obj:`tuple`):
+            Indices of the selected pixels, as returned by
+            `numpy.where`.
+        chunk (:obj:`int`, optional):
+            Number of pixels to process at once.
+
+    Returns:
+        `numpy.ndarray`_: The fine structure at each selected pixel.
+    """
+    # Mirroring the image is the same as mirroring the 3x3 median
+    # filtered image.
+    _img = np.pad(img, 4, mode='reflect')
+    offset = np.arange(9)
+    fine = np.empty(indx[0].size, dtype=float)
+    for s in range(0, fine.size, chunk):
+        rows = indx[0][s:s+chunk,None,None] + offset[None,:,None]
+        cols = indx[1][s:s+chunk,None,None] + offset[None,None,:]
+        sub = _img[rows,cols]
+        # 3x3 windows of each 9x9 sub-image; views of `sub`
+        windows = np.lib.stride_tricks.as_strided(sub, shape=sub.shape[:1] + (7,7,3,3),
+                                                  strides=sub.strides + sub.strides[1:],
+                                                  writeable=False)
+        m3 = np.median(windows.reshape(windows.shape[:3] + (-1,)), axis=-1)
+        fine[s:s+chunk] = m3[:,3,3] - np.median(m3.reshape(m3.shape[0], -1), axis=-1)
+    return fine
+
+
+def lacosmic_tile(sciframe, varframe=None, satpix=None, maxiter=1, remove_compact_obj=True,
+                  sigclip=5.0, sigfrac=0.3, objlim=5.0):
+    """
+    Run the L.A.Cosmic iterations for an image (tile).
+
+    See :func:`lacosmic`.
+
+    Args:
+        sciframe (`numpy.ndarray`_):
+            Image.
+        varframe (`numpy.ndarray`_, optional):
+            Variance image.  If None, the noise is estimated from the
+            median filtered image.
+        satpix (`numpy.ndarray`_, optional):
+            Boolean image flagging the saturated pixels.
+        maxiter:
+        remove_compact_obj:
+        sigclip:
+        sigfrac:
+        objlim:
 
-    # Define the kernels
-    laplkernel = np.array([[0.0, -1.0, 0.0], [-1.0, 4.0, -1.0], [0.0, -1.0, 0.0]])  # Laplacian kernal
-    growkernel = np.ones((3,3))
+    Returns:
+        `numpy.ndarray`_: Boolean mask with the detected cosmic rays.
+    """
+    scicopy = sciframe.copy()
+    crmask = np.zeros(sciframe.shape, dtype=bool)
+    sigcliplow = sigclip * sigfrac
+
+    # Define the kernel
+    growkernel = np.ones((3,3), dtype=bool)
     for i in range(1, maxiter+1):
-        msgs.info("Convolving image with Laplacian kernel")
-        # Subsample, convolve, clip negative values, and rebin to original size
-        subsam = utils.subsample(scicopy)
-        conved = signal.convolve2d(subsam, laplkernel, mode="same", boundary="symm")
-        cliped = conved.clip(min=0.0)
-        lplus = utils.rebin_evlist(cliped, np.array(cliped.shape)/2.0)
-
-        msgs.info("Creating noise model")
+        # Laplacian of the subsampled image, clipped and rebinned to
+        # the original size
+        lplus = laplacian_plus(scicopy)
+
         # Build a custom noise map, and compare  this to the laplacian
-        m5 = ndimage.filters.median_filter(scicopy, size=5, mode='mirror')
         if varframe is None:
+            m5 = ndimage.filters.median_filter(scicopy, size=5, mode='mirror')
             noise = np.sqrt(np.abs(m5))
         else:
             noise = np.sqrt(varframe)
-        msgs.info("Calculating Laplacian signal to noise ratio")
 
         # Laplacian S/N
         s = lplus / (2.0 * noise)  # Note that the 2.0 is from the 2x2 subsampling
@@ -83,93 +300,53 @@ def lacosmic(det, sciframe, saturation, nonlinear, varframe=None, maxiter=1, gro
         # Remove the large structures
         sp = s - ndimage.filters.median_filter(s, size=5, mode='mirror')
 
-        msgs.info("Selecting candidate cosmic rays")
         # Candidate cosmic rays (this will include HII regions)
         candidates = sp > sigclip
-        nbcandidates = np.sum(candidates)
-
-        msgs.info("{0:5d} candidate pixels".format(nbcandidates))
 
         # At this stage we use the saturated stars to mask the candidates, if available :
         if satpix is not None:
-            msgs.info("Masking saturated pixels")
             candidates = np.logical_and(np.logical_not(satpix), candidates)
-            nbcandidates = np.sum(candidates)
-
-            msgs.info("{0:5d} candidate pixels not part of saturated stars".format(nbcandidates))
-
-        msgs.info("Building fine structure image")
-
-        # We build the fine structure image :
-        m3 = ndimage.filters.median_filter(scicopy, size=3, mode='mirror')
-        m37 = ndimage.filters.median_filter(m3, size=7, mode='mirror')
-        f = m3 - m37
-        f /= noise
-        f = f.clip(min=0.01)
-
-        msgs.info("Removing suspected compact bright objects")
 
         # Now we have our better selection of cosmics :
-
         if remove_compact_obj:
-            cosmics = np.logical_and(candidates, sp/f > objlim)
+            # We build the fine structure image, only needed for the
+            # candidates :
+            cosmics = candidates.copy()
+            indx = np.where(candidates)
+            f = fine_structure(scicopy, indx) / noise[indx]
+            f = f.clip(min=0.01)
+            cosmics[indx] = sp[indx]/f > objlim
         else:
             cosmics = candidates
-        nbcosmics = np.sum(cosmics)
-
-        msgs.info("{0:5d} remaining candidate pixels".format(nbcosmics))
 
         # What follows is a special treatment for neighbors, with more relaxed constains.
 
-        msgs.info("Finding neighboring pixels affected by cosmic rays")
-
         # We grow these cosmics a first time to determine the immediate neighborhod  :
-        growcosmics = np.cast['bool'](signal.convolve2d(np.cast['float32'](cosmics), growkernel, mode="same", boundary="symm"))
+        growcosmics = ndimage.binary_dilation(cosmics, structure=growkernel)
 
         # From this grown set, we keep those that have sp > sigmalim
         # so obviously not requiring sp/f > objlim, otherwise it would be pointless
         growcosmics = np.logical_and(sp > sigclip, growcosmics)
 
         # Now we repeat this procedure, but lower the detection limit to sigmalimlow :
-
-        finalsel = np.cast['bool'](signal.convolve2d(np.cast['float32'](growcosmics), growkernel, mode="same", boundary="symm"))
+        finalsel = ndimage.binary_dilation(growcosmics, structure=growkernel)
         finalsel = np.logical_and(sp > sigcliplow, finalsel)
 
         # Unmask saturated pixels:
         if satpix is not None:
-            msgs.info("Masking saturated stars")
             finalsel = np.logical_and(np.logical_not(satpix), finalsel)
 
-        ncrp = np.sum(finalsel)
-
-        msgs.info("{0:5d} pixels detected as cosmics".format(ncrp))
-
         # We find how many cosmics are not yet known :
-        newmask = np.logical_and(np.logical_not(crmask), finalsel)
-        nnew = np.sum(newmask)
+        nnew = np.sum(np.logical_and(np.logical_not(crmask), finalsel))
 
         # We update the mask with the cosmics we have found :
         crmask = np.logical_or(crmask, finalsel)
 
-        msgs.info("Iteration {0:d} -- {1:d} pixels identified as cosmic rays ({2:d} new)".format(i, ncrp, nnew))
-        if ncrp == 0: break
-    # Additional algorithms (not traditionally implemented by LA cosmic) to remove some false positives.
-    msgs.work("The following algorithm would be better on the rectified, tilts-corrected image")
-    filt  = ndimage.sobel(sciframe, axis=1, mode='constant')
-    filty = ndimage.sobel(filt/np.sqrt(np.abs(sciframe)), axis=0, mode='constant')
-    filty[np.where(np.isnan(filty))]=0.0
-
-    sigimg = cr_screen(filty)
-
-    sigsmth = ndimage.filters.gaussian_filter(sigimg,1.5)
-    sigsmth[np.where(np.isnan(sigsmth))]=0.0
-    sigmask = np.cast['bool'](np.zeros(sciframe.shape))
-    sigmask[np.where(sigsmth>sigclip)] = True
-    crmask = np.logical_and(crmask, sigmask)
-    msgs.info("Growing cosmic ray mask by 1 pixel")
-    crmask = grow_masked(crmask.astype(np.float), grow, 1.0)
-
-    return crmask.astype(bool)
+        # The image is not altered between iterations, meaning that
+        # subsequent iterations cannot find new pixels
+        if nnew == 0:
+            break
+    return crmask
 
 
 def cr_screen(a, mask_value=0.0, spatial_axis=1):
@@ -217,26 +394,11 @@ def grow_masked(img, grow, growval):
     if not np.any(img == growval):
         return img
 
-    _img = img.copy()
-    sz_x, sz_y = img.shape
-    d = int(1+grow)
-    rsqr = grow*grow
-
     # Grow any masked values by the specified amount
-    for x in range(sz_x):
-        for y in range(sz_y):
-            if img[x,y] != growval:
-                continue
-
-            mnx = 0 if x-d < 0 else x-d
-            mxx = x+d+1 if x+d+1 < sz_x else sz_x
-            mny = 0 if y-d < 0 else y-d
-            mxy = y+d+1 if y+d+1 < sz_y else sz_y
-
-            for i in range(mnx,mxx):
-                for j in range(mny, mxy):
-                    if (i-x)*(i-x)+(j-y)*(j-y) <= rsqr:
-                        _img[i,j] = growval
+    d = int(1+grow)
+    x, y = np.mgrid[-d:d+1,-d:d+1]
+    _img = img.copy()
+    _img[ndimage.binary_dilation(img == growval, structure=x*x+y*y <= grow*grow)] = growval
     return _img
 
 
@@ -1,7 +1,10 @@
 # Licensed under a 3-clause BSD style license - see PYDL_LICENSE.rst
 # -*- coding: utf-8 -*-
 # Also cite https://doi.org/10.5281/zenodo.1095150 when referencing PYDL
+import functools
+
 import numpy as np
+import numba as nb
 from warnings import warn
 
 from pypeit import msgs
@@ -401,7 +404,7 @@ class bspline(object):
                      xmax=self.xmax,
                      funcname=self.funcname))
 
-    def fit(self, xdata, ydata, invvar, x2=None):
+    def fit(self, xdata, ydata, invvar, x2=None, action=None, lower=None, upper=None):
         """Calculate a B-spline in the least-squares sense.
 
         Fit is based on two variables: x which is sorted and spans a large range
@@ -418,6 +421,16 @@ class bspline(object):
             Inverse variance of `ydata`.
         x2 : :class:`numpy.ndarray`, optional
             Orthogonal dependent variable for 2d fits.
+        action : :class:`numpy.ndarray`, optional
+            Action matrix to use, as returned by :func:`action` for
+            `xdata` and `x2` and the current breakpoint mask.  If not
+            supplied it is calculated.
+        lower : :class:`numpy.ndarray`, optional
+            If the action parameter is supplied, this parameter must also
+            be supplied.
+        upper : :class:`numpy.ndarray`, optional
+            If the action parameter is supplied, this parameter must also
+            be supplied.
 
         Returns
         -------
@@ -434,25 +447,16 @@ class bspline(object):
             return (-2, yfit)
         nfull = nn * self.npoly
         bw = self.npoly * self.nord
-        a1, lower, upper = self.action(xdata, x2=x2)
+        if action is None:
+            a1, lower, upper = self.action(xdata, x2=x2)
+        elif lower is None or upper is None:
+            raise ValueError('Must specify lower and upper if action is set.')
+        else:
+            a1 = action
         foo = np.tile(invvar, bw).reshape(bw, invvar.size).transpose()
         a2 = a1 * foo
-        alpha = np.zeros((bw, nfull+bw), dtype='d')
-        beta = np.zeros((nfull+bw,), dtype='d')
-        bi = np.arange(bw, dtype='i4')
-        bo = np.arange(bw, dtype='i4')
-        for k in range(1, bw):
-            bi = np.append(bi, np.arange(bw-k, dtype='i4')+(bw+1)*k)
-            bo = np.append(bo, np.arange(bw-k, dtype='i4')+bw*k)
-        for k in range(nn-self.nord+1):
-            itop = k*self.npoly
-            ibottom = min(itop, nfull) + bw - 1
-            ict = upper[k] - lower[k] + 1
-            if ict > 0:
-                work = np.dot(a1[lower[k]:upper[k]+1, :].T, a2[lower[k]:upper[k]+1, :])
-                wb = np.dot(ydata[lower[k]:upper[k]+1], a2[lower[k]:upper[k]+1, :])
-                alpha.T.flat[bo+itop*bw] += work.flat[bi]
-                beta[itop:ibottom+1] += wb
+        alpha, beta = bspline_normal_equations(a1, a2, ydata, lower, upper, nn, self.nord,
+                                               self.npoly)
         min_influence = 1.0e-10 * invvar.sum() / nfull
         errb = cholesky_band(alpha, mininf=min_influence)  # ,verbose=True)
         if isinstance(errb[0], int) and errb[0] == -1:
@@ -774,25 +778,8 @@ class bspline(object):
         a2 = action * foo
         #a2 = action*np.sqrt(np.outer(invvar,np.ones(bw)))
 
-        alpha = np.zeros((bw, nfull+bw), dtype='d')
-        beta = np.zeros((nfull+bw,), dtype='d')
-        bi = np.arange(bw, dtype='i4')
-        bo = np.arange(bw, dtype='i4')
-        for k in range(1, bw):
-            bi = np.append(bi, np.arange(bw-k, dtype='i4')+(bw+1)*k)
-            bo = np.append(bo, np.arange(bw-k, dtype='i4')+bw*k)
-        for k in range(nn-self.nord+1):
-            itop = k*self.npoly
-            ibottom = min(itop, nfull) + bw - 1
-            try:
-                ict = upper[k] - lower[k] + 1
-            except:
-                debugger.set_trace()
-            if ict > 0:
-                work = np.dot(a2[lower[k]:upper[k]+1, :].T, a2[lower[k]:upper[k]+1, :])
-                wb = np.dot(ydata[lower[k]:upper[k]+1]*np.sqrt(invvar[lower[k]:upper[k]+1]), a2[lower[k]:upper[k]+1, :])
-                alpha.T.flat[bo+itop*bw] += work.flat[bi]
-                beta[itop:ibottom+1] += wb
+        alpha, beta = bspline_normal_equations(a2, a2, ydata*np.sqrt(invvar), lower, upper, nn,
+                                               self.nord, self.npoly)
         min_influence = 1.0e-10 * invvar.sum() / nfull
         # Right now we are not returning the covariance, although it may arise that we should
         covariance = alpha
@@ -826,9 +813,119 @@ class bspline(object):
 
 
 
+@functools.lru_cache(maxsize=None)
+def _band_indices(nord, npoly):
+    """Index tables for the upper triangle of the b-spline band matrix.
+
+    Parameters
+    ----------
+    nord : :class:`int`
+        Order of the b-spline.
+    npoly : :class:`int`
+        Polynomial order of the fit along the second variable.
+
+    Returns
+    -------
+    :func:`tuple`
+        Two arrays with the row, `r`, and offset, `m`, of each element
+        in the upper triangle of a bandwidth ``nord*npoly`` matrix, such
+        that each element is at row ``r`` and column ``r+m``.  The arrays
+        are cached and should not be altered.
+    """
+    bw = nord*npoly
+    row, col = np.triu_indices(bw)
+    row.flags.writeable = False
+    offset = col - row
+    offset.flags.writeable = False
+    return row, offset
+
+
+def bspline_normal_equations(left, right, yw, lower, upper, nn, nord, npoly, chunk=2**22):
+    """Construct the banded normal equations of a b-spline fit.
+
+    The contribution of each breakpoint interval ``k`` to the normal
+    matrix is ``left[i].T @ right[i]``, where ``i`` selects the data in
+    the interval (``lower[k]:upper[k]+1``), and its contribution to the
+    right-hand side is ``yw[i] @ right[i]``.  The intervals are
+    accumulated by segmented sums over the (sorted) data, for chunks of
+    consecutive intervals at a time to limit the size of the band
+    products held in memory.
+
+    Parameters
+    ----------
+    left : :class:`numpy.ndarray`
+        Left-hand factor of the normal matrix, with shape (ndata,
+        bandwidth), typically the b-spline action matrix.
+    right : :class:`numpy.ndarray`
+        Right-hand factor of the normal matrix, typically the action
+        matrix weighted by the inverse variance.
+    yw : :class:`numpy.ndarray`
+        Data, weighted for consistency with `right`.
+    lower : :class:`numpy.ndarray`
+        First data index in each breakpoint interval.
+    upper : :class:`numpy.ndarray`
+        Last data index in each breakpoint interval; intervals with
+        ``upper < lower`` are empty.
+    nn : :class:`int`
+        Number of good breakpoints, excluding the first `nord`.
+    nord : :class:`int`
+        Order of the b-spline.
+    npoly : :class:`int`
+        Polynomial order of the fit along the second variable.
+    chunk : :class:`int`, optional
+        Maximum number of band products (data times band elements)
+        computed at once.  A single interval is always computed at
+        once, regardless of its size.
+
+    Returns
+    -------
+    :func:`tuple`
+        The band matrix, with shape (bandwidth, nn*npoly+bandwidth),
+        in the format expected by :func:`cholesky_band`, and the
+        right-hand side of the normal equations.
+    """
+    bw = nord*npoly
+    nfull = nn*npoly
+    alpha = np.zeros((bw, nfull+bw), dtype='d')
+    beta = np.zeros((nfull+bw,), dtype='d')
+
+    nint = nn-nord+1
+    k = np.where(upper[:nint] >= lower[:nint])[0]
+    if k.size == 0:
+        return alpha, beta
+    row, offset = _band_indices(nord, npoly)
+    itop = k*npoly
+    starts = lower[k]
+    ends = upper[k]+1
+    nrows = max(1, chunk//row.size)
+    s = 0
+    while s < k.size:
+        # Consecutive intervals that span at most nrows data
+        e = max(s+1, np.searchsorted(ends, starts[s]+nrows, side='right'))
+        d0, d1 = starts[s], ends[e-1]
+        # Segment boundaries within the chunk; the extra row of zeros
+        # allows the last segment to end at the last datum.
+        edges = np.column_stack((starts[s:e]-d0, ends[s:e]-d0)).ravel()
+        prod = np.zeros((d1-d0+1, row.size), dtype='d')
+        np.multiply(left[d0:d1,row], right[d0:d1,row+offset], out=prod[:-1])
+        work = np.add.reduceat(prod, edges, axis=0)[::2]
+        prod = np.zeros((d1-d0+1, bw), dtype='d')
+        np.multiply(yw[d0:d1,None], right[d0:d1], out=prod[:-1])
+        wb = np.add.reduceat(prod, edges, axis=0)[::2]
+        np.add.at(alpha, (offset[None,:], itop[s:e,None]+row[None,:]), work)
+        np.add.at(beta, itop[s:e,None]+np.arange(bw)[None,:], wb)
+        s = e
+    return alpha, beta
+
+
 def cholesky_band(l, mininf=0.0):
     """Compute Cholesky decomposition of banded matrix.
 
+    The decomposition of double-precision matrices is performed by the
+    compiled function :func:`_cholesky_band_nb`; any other input type
+    uses the (equivalent) pure python loop in
+    :func:`_cholesky_band_loop`.
+
     Parameters
     ----------
     l : :class:`numpy.ndarray`
@@ -862,6 +959,34 @@ def cholesky_band(l, mininf=0.0):
 #        msgs.warn('Found {:d}'.format(len(negative.nonzero()[0])) +
 #                  ' bad entries: ' + str(negative.nonzero()[0]))
 #        return (negative.nonzero()[0], l)
+    j = _cholesky_band_nb(lower, n) if lower.dtype == np.float64 \
+            else _cholesky_band_loop(lower, n)
+    if j >= 0:
+        msgs.warn('NaN found in cholesky_band.')
+        return (int(j), l)
+    return (-1, lower)
+
+
+def _cholesky_band_loop(lower, n):
+    """Perform the Cholesky decomposition of a banded matrix in place.
+
+    This is the pure python version of :func:`_cholesky_band_nb`, used
+    for input arrays that are not double precision.
+
+    Parameters
+    ----------
+    lower : :class:`numpy.ndarray`
+        The banded matrix, which is replaced by its decomposition.
+    n : :class:`int`
+        Number of columns to decompose.
+
+    Returns
+    -------
+    :class:`int`
+        The column where a non-finite value was found, or -1 if the
+        decomposition was successful.
+    """
+    bw = lower.shape[0]
     kn = bw - 1
     spot = np.arange(kn, dtype='i4') + 1
     bi = np.arange(kn, dtype='i4')
@@ -872,17 +997,43 @@ def cholesky_band(l, mininf=0.0):
         lower[spot, j] /= lower[0, j]
         x = lower[spot, j]
         if not np.all(np.isfinite(x)):
-            msgs.warn('NaN found in cholesky_band.')
-            return (j, l)
+            return j
         hmm = np.outer(x, x)
         here = bi+(j+1)*bw
         lower.T.flat[here] -= hmm.flat[bi]
-    return (-1, lower)
+    return -1
+
+
+@nb.jit(nopython=True, cache=True)
+def _cholesky_band_nb(lower, n):
+    """Perform the Cholesky decomposition of a banded matrix in place.
+
+    Compiled equivalent of :func:`_cholesky_band_loop`; see there for
+    the parameters and return value.
+    """
+    bw = lower.shape[0]
+    for j in range(n):
+        lower[0, j] = np.sqrt(lower[0, j])
+        for k in range(1, bw):
+            lower[k, j] /= lower[0, j]
+        for k in range(1, bw):
+            if not np.isfinite(lower[k, j]):
+                return j
+        # Subtract the outer product of the column from the
+        # following columns of the band
+        for i in range(bw-1):
+            for m in range(bw-1-i):
+                lower[m, j+1+i] -= lower[1+i, j]*lower[1+i+m, j]
+    return -1
 
 
 def cholesky_solve(a, bb):
     """Solve the equation Ax=b where A is a Cholesky-banded matrix.
 
+    Double-precision systems are solved by the compiled function
+    :func:`_cholesky_solve_nb`; any other input type uses the
+    (equivalent) pure python loop in :func:`_cholesky_solve_loop`.
+
     Parameters
     ----------
     a : :class:`numpy.ndarray`
@@ -899,7 +1050,29 @@ def cholesky_solve(a, bb):
     b = bb.copy()
     bw = a.shape[0]
     n = b.shape[0] - bw
-    kn = bw - 1
+    if a.dtype == np.float64 and b.dtype == np.float64:
+        _cholesky_solve_nb(a, b, n)
+    else:
+        _cholesky_solve_loop(a, b, n)
+    return (-1, b)
+
+
+def _cholesky_solve_loop(a, b, n):
+    """Solve the Cholesky-banded system in place.
+
+    This is the pure python version of :func:`_cholesky_solve_nb`, used
+    for input arrays that are not double precision.
+
+    Parameters
+    ----------
+    a : :class:`numpy.ndarray`
+        The Cholesky decomposition of the banded matrix.
+    b : :class:`numpy.ndarray`
+        The right-hand side, which is replaced by the solution.
+    n : :class:`int`
+        Number of unknowns.
+    """
+    kn = a.shape[0] - 1
     spot = np.arange(kn, dtype='i4') + 1
     for j in range(n):
         b[j] /= a[0, j]
@@ -907,7 +1080,25 @@ def cholesky_solve(a, bb):
     spot = kn - np.arange(kn, dtype='i4')
     for j in range(n-1, -1, -1):
         b[j] = (b[j] - np.sum(a[spot, j] * b[j+spot]))/a[0, j]
-    return (-1, b)
+
+
+@nb.jit(nopython=True, cache=True)
+def _cholesky_solve_nb(a, b, n):
+    """Solve the Cholesky-banded system in place.
+
+    Compiled equivalent of :func:`_cholesky_solve_loop`; see there for
+    the parameters.
+    """
+    bw = a.shape[0]
+    for j in range(n):
+        b[j] /= a[0, j]
+        for k in range(1, bw):
+            b[j+k] -= b[j]*a[k, j]
+    for j in range(n-1, -1, -1):
+        s = 0.
+        for k in range(bw-1, 0, -1):
+            s += a[k, j]*b[j+k]
+        b[j] = (b[j] - s)/a[0, j]
 
 
 def iterfit(xdata, ydata, invvar=None, inmask = None, upper=5, lower=5, x2=None,
@@ -1011,6 +1202,10 @@ def iterfit(xdata, ydata, invvar=None, inmask = None, upper=5, lower=5, x2=None,
         x2work = None
     iiter = 0
     error = -1
+    # The action matrix only changes if breakpoints are dropped, so it
+    # is only recomputed when the breakpoint mask changes
+    action = None
+    action_mask = None
     # JFH fixed major bug here. Codes were not iterating
     qdone = False
     while (error != 0 or qdone is False) and iiter <= maxiter:
@@ -1034,8 +1229,11 @@ def iterfit(xdata, ydata, invvar=None, inmask = None, upper=5, lower=5, x2=None,
                         ct = 0
                     else:
                         sset.mask[goodbk[ileft]] = False
-            error, yfit = sset.fit(xwork, ywork, invwork*maskwork,
-                                   x2=x2work)
+            if action is None or not np.array_equal(sset.mask, action_mask):
+                action, laction, uaction = sset.action(xwork, x2=x2work)
+                action_mask = np.copy(sset.mask)
+            error, yfit = sset.fit(xwork, ywork, invwork*maskwork, x2=x2work, action=action,
+                                   lower=laction, upper=uaction)
         iiter += 1
         inmask_rej = maskwork
         if error == -2:
@@ -23,7 +23,7 @@ from pypeit.core import parse
 
 
 def save_all(sci_dict, master_key_dict, master_dir, spectrograph, head1d, head2d, scipath, basename,
-             update_det=None, binning='None'):
+             update_det=None, binning='None', spec1d_format='multiext'):
     """
     Routine to save PypeIt 1d and 2d outputs
 
@@ -49,6 +49,9 @@ def save_all(sci_dict, master_key_dict, master_dir, spectrograph, head1d, head2d
         update_det : int or list, default=None
             If provided, do not clobber the existing file but only update
             the indicated detectors.  Useful for re-running on a subset of detectors
+        spec1d_format : str, default='multiext'
+            Layout of the spec1d file, 'multiext' or 'columnar'; see
+            :func:`pypeit.specobjs.SpecObjs.write_to_fits`
 
     Returns:
 
@@ -78,7 +81,8 @@ def save_all(sci_dict, master_key_dict, master_dir, spectrograph, head1d, head2d
     if len(all_specobjs) == 0:
         msgs.warn('No objects to save. Only writing spec2d files!')
     else:
-        all_specobjs.write_to_fits(outfile1d, header=head1d, spectrograph=spectrograph, update_det=update_det)
+        all_specobjs.write_to_fits(outfile1d, header=head1d, spectrograph=spectrograph, update_det=update_det,
+                                   columnar=spec1d_format == 'columnar')
         # Txt file
         # TODO JFH: Make this a method in the specobjs class.
         save_obj_info(all_specobjs, spectrograph, outfiletxt, binning=binning)
@@ -6,6 +6,8 @@
 import sys
 import os
 
+from contextlib import nullcontext
+
 import numpy as np
 
 from scipy import ndimage
@@ -17,7 +19,7 @@ from IPython import embed
 
 from pypeit import msgs, utils, ginga
 from pypeit.images import maskimage
-from pypeit.core import pixels, extract, pydl
+from pypeit.core import pixels, extract, pydl, parallel
 from pypeit.core.moment import moment1d
 
 def skysub_npoly(thismask):
@@ -444,7 +446,7 @@ def optimal_bkpts(bkpts_optimal, bsp_min, piximg, sampmask, samp_frac=0.80,
         spat_samp_vec = np.sum(sampmask, axis=1)  # spatial sampling per spectral direction pixel
         spat_samp_med = np.median(spat_samp_vec[spat_samp_vec > 0])
         window_size = int(np.ceil(5 * spat_samp_med))
-        sky_med_filt = utils.fast_running_median(sky, window_size)
+        sky_med_filt = utils.running_median(sky, window_size)
         sky_bkpt_grid = np.interp(fullbkpt_grid, pix, sky_med_filt)
         sky_bkpt = np.interp(fullbkpt, pix, sky_med_filt)
         plt.clf()
@@ -922,11 +924,58 @@ def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img, t
     return (skyimage[thismask], objimage[thismask], modelivar[thismask], outmask[thismask])
 
 
+def local_skysub_extract_slit(slit, slit_left, slit_righ, sobjs, box_rad, sciimg=None, sciivar=None,
+                              tilts=None, waveimg=None, global_sky=None, rn2_img=None, slitmask=None,
+                              gpm=None, spat_pix=None, **kwargs):
+    """
+    Perform local sky subtraction and extraction for a single slit.
+
+    Wrapper to :func:`local_skysub_extract` that can be executed in a
+    worker process; see :func:`pypeit.core.parallel.run_tasks`.  The
+    images can be provided directly or as
+    :class:`pypeit.core.parallel.SharedArray` objects.
+
+    Args:
+        slit (:obj:`int`):
+            Slit index in `slitmask`.
+        slit_left (`numpy.ndarray`_):
+            Left edge of the slit.
+        slit_righ (`numpy.ndarray`_):
+            Right edge of the slit.
+        sobjs (:class:`pypeit.specobjs.SpecObjs`):
+            Objects on the slit.
+        box_rad (:obj:`float`):
+            Boxcar radius in pixels.
+        sciimg, sciivar, tilts, waveimg, global_sky, rn2_img, spat_pix (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            See :func:`local_skysub_extract`.
+        slitmask (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Image with the slit index of each pixel.
+        gpm (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Good-pixel mask, excluding the slit selection.
+        **kwargs:
+            Passed to :func:`local_skysub_extract`.
+
+    Returns:
+        tuple: The sky, object, and inverse variance models and the
+        extraction mask at the pixels in the slit, and the extracted
+        objects.  When run in a worker process, `sobjs` is a copy of
+        the input and must be returned to the caller.
+    """
+    thismask = parallel.as_array(slitmask) == slit
+    inmask = parallel.as_array(gpm) & thismask
+    return local_skysub_extract(parallel.as_array(sciimg), parallel.as_array(sciivar),
+                                parallel.as_array(tilts), parallel.as_array(waveimg),
+                                parallel.as_array(global_sky), parallel.as_array(rn2_img),
+                                thismask, slit_left, slit_righ, sobjs,
+                                spat_pix=parallel.as_array(spat_pix), inmask=inmask,
+                                box_rad=box_rad, **kwargs) + (sobjs,)
+
+
 def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky, rn2img, tslits_dict, sobjs, order_vec,
                              spat_pix=None, fit_fwhm=False, min_snr=2.0,bsp=0.6, extract_maskwidth=4.0, trim_edg=(3,3),
                              std=False, prof_nsigma=None, niter=4, box_rad_order=7, sigrej=3.5, bkpts_optimal=True,
                              sn_gauss=4.0, model_full_slit=False, model_noise=True, debug_bkpts=False,
-                             show_profile=False, show_resids=False, show_fwhm=False):
+                             show_profile=False, show_resids=False, show_fwhm=False, n_proc=1):
     """
     Perform local sky subtraction, profile fitting, and optimal extraction slit by slit
 
@@ -961,6 +1010,14 @@ def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky,
         show_profile:
         show_resids:
         show_fwhm:
+        n_proc (int, optional):
+            Number of processes used to extract the orders. Orders are
+            extracted in order of decreasing S/N of the brightest object.
+            An order with any object at S/N below min_snr may adopt the
+            FWHM measured on the brighter orders, so it is only extracted
+            after all brighter orders are finished; the remaining orders
+            are extracted concurrently. The result does not depend on
+            n_proc.
 
     Returns:
         skymodel, objmodel, ivarmodel, outmask, sobjs
@@ -1015,92 +1072,111 @@ def ech_local_skysub_extract(sciimg, sciivar, mask, tilts, waveimg, global_sky,
     msgs.info(msgs.newline() + 'Reducing orders in order of S/N of brightest object:' + msgs.newline() + dash +
               msgs.newline() + '{:<8s}{:<8s}{:>10s}'.format('slit','order','S/N') + msgs.newline() + dash +
               msgs.newline() + str_out)
-    # Loop over orders in order of S/N ratio (from highest to lowest) for the brightest object
-    for iord in srt_order_snr:
-        order = order_vec[iord]
-        msgs.info("Local sky subtraction and extraction for slit/order: {:d}/{:d}".format(iord,order))
-        other_orders = (fwhm_here > 0) & np.invert(fwhm_was_fit)
-        other_fit    = (fwhm_here > 0) & fwhm_was_fit
-        # Loop over objects in order of S/N ratio (from highest to lowest)
-        for iobj in srt_obj:
-            if (order_snr[iord, iobj] <= min_snr) & (np.sum(other_orders) >= 3):
-                if iobj == ibright:
-                    # If this is the brightest object then we extrapolate the FWHM from a fit
-                    #fwhm_coeffs = np.polyfit(order_vec[other_orders], fwhm_here[other_orders], 1)
-                    #fwhm_fit_eval = np.poly1d(fwhm_coeffs)
-                    #fwhm_fit = fwhm_fit_eval(order_vec[iord])
-                    fwhm_was_fit[iord] = True
-                    # Either perform a linear fit to the FWHM or simply take the median
-                    if fit_fwhm:
-                        minx = 0.0
-                        maxx = fwhm_here[other_orders].max()
-                        # ToDO robust_poly_fit needs to return minv and maxv as outputs for the fits to be usable downstream
-                        fit_mask, fwhm_coeffs = utils.robust_polyfit_djs(order_vec[other_orders], fwhm_here[other_orders],1,
-                                                                        function='polynomial',maxiter=25,lower=2.0, upper=2.0,
-                                                                        maxrej=1,sticky=False, minx=minx, maxx=maxx)
-                        fwhm_this_ord = utils.func_val(fwhm_coeffs, order_vec[iord], 'polynomial', minx=minx, maxx=maxx)
-                        fwhm_all = utils.func_val(fwhm_coeffs, order_vec, 'polynomial', minx=minx, maxx=maxx)
-                        fwhm_str = 'linear fit'
+
+    if n_proc > 1 and (show_profile or show_resids or debug_bkpts):
+        msgs.warn('Cannot show the extraction QA when using multiple processes.  Using n_proc=1.')
+        n_proc = 1
+    images = dict(sciimg=sciimg, sciivar=sciivar, tilts=tilts, waveimg=waveimg, global_sky=global_sky,
+                  rn2_img=rn2img, slitmask=slitmask, gpm=(mask == 0))
+    if spat_pix is not None:
+        images['spat_pix'] = spat_pix
+    kwargs = dict(std=std, bsp=bsp, extract_maskwidth=extract_maskwidth, trim_edg=trim_edg,
+                  prof_nsigma=prof_nsigma, niter=niter, sigrej=sigrej, bkpts_optimal=bkpts_optimal,
+                  sn_gauss=sn_gauss, model_full_slit=model_full_slit, model_noise=model_noise,
+                  debug_bkpts=debug_bkpts, show_resids=show_resids, show_profile=show_profile)
+    with (parallel.SharedArrays(**images) if n_proc > 1 else nullcontext(images)) as images:
+        # Orders waiting to be extracted
+        pending = []
+        # Loop over orders in order of S/N ratio (from highest to lowest) for the brightest object
+        for isrt, iord in enumerate(srt_order_snr):
+            order = order_vec[iord]
+            msgs.info("Local sky subtraction and extraction for slit/order: {:d}/{:d}".format(iord,order))
+            other_orders = (fwhm_here > 0) & np.invert(fwhm_was_fit)
+            other_fit    = (fwhm_here > 0) & fwhm_was_fit
+            # Loop over objects in order of S/N ratio (from highest to lowest)
+            for iobj in srt_obj:
+                if (order_snr[iord, iobj] <= min_snr) & (np.sum(other_orders) >= 3):
+                    if iobj == ibright:
+                        # If this is the brightest object then we extrapolate the FWHM from a fit
+                        #fwhm_coeffs = np.polyfit(order_vec[other_orders], fwhm_here[other_orders], 1)
+                        #fwhm_fit_eval = np.poly1d(fwhm_coeffs)
+                        #fwhm_fit = fwhm_fit_eval(order_vec[iord])
+                        fwhm_was_fit[iord] = True
+                        # Either perform a linear fit to the FWHM or simply take the median
+                        if fit_fwhm:
+                            minx = 0.0
+                            maxx = fwhm_here[other_orders].max()
+                            # ToDO robust_poly_fit needs to return minv and maxv as outputs for the fits to be usable downstream
+                            fit_mask, fwhm_coeffs = utils.robust_polyfit_djs(order_vec[other_orders], fwhm_here[other_orders],1,
+                                                                            function='polynomial',maxiter=25,lower=2.0, upper=2.0,
+                                                                            maxrej=1,sticky=False, minx=minx, maxx=maxx)
+                            fwhm_this_ord = utils.func_val(fwhm_coeffs, order_vec[iord], 'polynomial', minx=minx, maxx=maxx)
+                            fwhm_all = utils.func_val(fwhm_coeffs, order_vec, 'polynomial', minx=minx, maxx=maxx)
+                            fwhm_str = 'linear fit'
+                        else:
+                            fit_mask = np.ones_like(order_vec[other_orders],dtype=bool)
+                            fwhm_this_ord = np.median(fwhm_here[other_orders])
+                            fwhm_all = np.full(norders,fwhm_this_ord)
+                            fwhm_str = 'median '
+                        indx = (sobjs.ECH_OBJID == uni_objid[iobj]) & (sobjs.ECH_ORDERINDX == iord)
+                        for spec in sobjs[indx]:
+                            spec.FWHM = fwhm_this_ord
+
+                        str_out = ''
+                        for slit_now, order_now, snr_now, fwhm_now in zip(slit_vec[other_orders], order_vec[other_orders],order_snr[other_orders,ibright], fwhm_here[other_orders]):
+                            str_out += '{:<8d}{:<8d}{:>10.2f}{:>10.2f}'.format(slit_now, order_now, snr_now, fwhm_now) + msgs.newline()
+                        msgs.info(msgs.newline() + 'Using' +  fwhm_str + ' for FWHM of object={:d}'.format(uni_objid[iobj]) +
+                                  ' on slit/order: {:d}/{:d}'.format(iord,order) + msgs.newline() + dash_big +
+                                  msgs.newline() + '{:<8s}{:<8s}{:>10s}{:>10s}'.format('slit', 'order','SNR','FWHM') +
+                                  msgs.newline() + dash_big +
+                                  msgs.newline() + str_out[:-8] +
+                                  fwhm_str.upper() +  ':{:<8d}{:<8d}{:>10.2f}{:>10.2f}'.format(iord, order, order_snr[iord,ibright], fwhm_this_ord) +
+                                  msgs.newline() + dash_big)
+                        if show_fwhm:
+                            plt.plot(order_vec[other_orders][fit_mask], fwhm_here[other_orders][fit_mask], marker='o', linestyle=' ',
+                            color='k', mfc='k', markersize=4.0, label='orders informing fit')
+                            if np.any(np.invert(fit_mask)):
+                                plt.plot(order_vec[other_orders][np.invert(fit_mask)],
+                                         fwhm_here[other_orders][np.invert(fit_mask)], marker='o', linestyle=' ',
+                                         color='magenta', mfc='magenta', markersize=4.0, label='orders rejected by fit')
+                            if np.any(other_fit):
+                                plt.plot(order_vec[other_fit], fwhm_here[other_fit], marker='o', linestyle=' ',
+                                color='lawngreen', mfc='lawngreen',markersize=4.0, label='fits to other low SNR orders')
+                            plt.plot([order_vec[iord]], [fwhm_this_ord], marker='o', linestyle=' ',color='red', mfc='red', markersize=6.0,label='this order')
+                            plt.plot(order_vec, fwhm_all, color='cornflowerblue', zorder=10, linewidth=2.0, label=fwhm_str)
+                            plt.legend()
+                            plt.show()
                     else:
-                        fit_mask = np.ones_like(order_vec[other_orders],dtype=bool)
-                        fwhm_this_ord = np.median(fwhm_here[other_orders])
-                        fwhm_all = np.full(norders,fwhm_this_ord)
-                        fwhm_str = 'median '
-                    indx = (sobjs.ECH_OBJID == uni_objid[iobj]) & (sobjs.ECH_ORDERINDX == iord)
-                    for spec in sobjs[indx]:
-                        spec.FWHM = fwhm_this_ord
-
-                    str_out = ''
-                    for slit_now, order_now, snr_now, fwhm_now in zip(slit_vec[other_orders], order_vec[other_orders],order_snr[other_orders,ibright], fwhm_here[other_orders]):
-                        str_out += '{:<8d}{:<8d}{:>10.2f}{:>10.2f}'.format(slit_now, order_now, snr_now, fwhm_now) + msgs.newline()
-                    msgs.info(msgs.newline() + 'Using' +  fwhm_str + ' for FWHM of object={:d}'.format(uni_objid[iobj]) +
-                              ' on slit/order: {:d}/{:d}'.format(iord,order) + msgs.newline() + dash_big +
-                              msgs.newline() + '{:<8s}{:<8s}{:>10s}{:>10s}'.format('slit', 'order','SNR','FWHM') +
-                              msgs.newline() + dash_big +
-                              msgs.newline() + str_out[:-8] +
-                              fwhm_str.upper() +  ':{:<8d}{:<8d}{:>10.2f}{:>10.2f}'.format(iord, order, order_snr[iord,ibright], fwhm_this_ord) +
-                              msgs.newline() + dash_big)
-                    if show_fwhm:
-                        plt.plot(order_vec[other_orders][fit_mask], fwhm_here[other_orders][fit_mask], marker='o', linestyle=' ',
-                        color='k', mfc='k', markersize=4.0, label='orders informing fit')
-                        if np.any(np.invert(fit_mask)):
-                            plt.plot(order_vec[other_orders][np.invert(fit_mask)],
-                                     fwhm_here[other_orders][np.invert(fit_mask)], marker='o', linestyle=' ',
-                                     color='magenta', mfc='magenta', markersize=4.0, label='orders rejected by fit')
-                        if np.any(other_fit):
-                            plt.plot(order_vec[other_fit], fwhm_here[other_fit], marker='o', linestyle=' ',
-                            color='lawngreen', mfc='lawngreen',markersize=4.0, label='fits to other low SNR orders')
-                        plt.plot([order_vec[iord]], [fwhm_this_ord], marker='o', linestyle=' ',color='red', mfc='red', markersize=6.0,label='this order')
-                        plt.plot(order_vec, fwhm_all, color='cornflowerblue', zorder=10, linewidth=2.0, label=fwhm_str)
-                        plt.legend()
-                        plt.show()
-                else:
-                    # If this is not the brightest object then assign it the FWHM of the brightest object
-                    indx     = np.where((sobjs.ECH_OBJID == uni_objid[iobj]) & (sobjs.ECH_ORDERINDX == iord))[0][0]
-                    indx_bri = np.where((sobjs.ECH_OBJID == uni_objid[ibright]) & (sobjs.ECH_ORDERINDX == iord))[0][0]
-                    spec = sobjs[indx]
-                    spec.FWHM = sobjs[indx_bri].FWHM
-
-        thisobj = (sobjs.ECH_ORDERINDX == iord) # indices of objects for this slit
-        thismask = (slitmask == iord) # pixels for this slit
-        # True  = Good, False = Bad for inmask
-        inmask = (mask == 0) & thismask
-        # Local sky subtraction and extraction
-        skymodel[thismask], objmodel[thismask], ivarmodel[thismask], extractmask[thismask] = local_skysub_extract(
-            sciimg, sciivar, tilts, waveimg, global_sky,rn2img, thismask,
-            tslits_dict['slit_left'][:,iord],tslits_dict['slit_righ'][:, iord], sobjs[thisobj], spat_pix=spat_pix,
-            inmask=inmask,std = std, bsp=bsp, extract_maskwidth=extract_maskwidth, trim_edg=trim_edg,
-            prof_nsigma=prof_nsigma, niter=niter, box_rad=box_rad_order[iord], sigrej=sigrej, bkpts_optimal=bkpts_optimal,
-            sn_gauss=sn_gauss, model_full_slit=model_full_slit, model_noise=model_noise, debug_bkpts=debug_bkpts,
-            show_resids=show_resids, show_profile=show_profile)
-
-        # update the FWHM fitting vector for the brighest object
-        indx = (sobjs.ECH_OBJID == uni_objid[ibright]) & (sobjs.ECH_ORDERINDX == iord)
-        fwhm_here[iord] = np.median(sobjs[indx].FWHMFIT)
-        # Did the FWHM get updated by the profile fitting routine in local_skysub_extract? If so, include this value
-        # for future fits
-        if np.abs(fwhm_here[iord] - sobjs[indx].FWHM) >= 0.01:
-            fwhm_was_fit[iord] = False
+                        # If this is not the brightest object then assign it the FWHM of the brightest object
+                        indx     = np.where((sobjs.ECH_OBJID == uni_objid[iobj]) & (sobjs.ECH_ORDERINDX == iord))[0][0]
+                        indx_bri = np.where((sobjs.ECH_OBJID == uni_objid[ibright]) & (sobjs.ECH_ORDERINDX == iord))[0][0]
+                        spec = sobjs[indx]
+                        spec.FWHM = sobjs[indx_bri].FWHM
+
+            pending += [iord]
+            # Extract the pending orders if this is the last order or if the
+            # next order may adopt the FWHM measured on the pending orders
+            if isrt < norders-1 and np.all(order_snr[srt_order_snr[isrt+1]] > min_snr):
+                continue
+            # Local sky subtraction and extraction
+            tasks = [(iord, tslits_dict['slit_left'][:,iord], tslits_dict['slit_righ'][:,iord],
+                      sobjs[sobjs.ECH_ORDERINDX == iord], box_rad_order[iord]) for iord in pending]
+            results = parallel.run_tasks(local_skysub_extract_slit, tasks, n_proc=n_proc, **images, **kwargs)
+            for iord, (sky, obj, ivar, extract_gpm, sobjs_iord) in zip(pending, results):
+                thisobj = (sobjs.ECH_ORDERINDX == iord) # indices of objects for this slit
+                thismask = (slitmask == iord) # pixels for this slit
+                skymodel[thismask], objmodel[thismask], ivarmodel[thismask], extractmask[thismask] \
+                        = sky, obj, ivar, extract_gpm
+                sobjs.specobjs[thisobj] = sobjs_iord.specobjs
+
+                # update the FWHM fitting vector for the brighest object
+                indx = (sobjs.ECH_OBJID == uni_objid[ibright]) & (sobjs.ECH_ORDERINDX == iord)
+                fwhm_here[iord] = np.median(sobjs[indx].FWHMFIT)
+                # Did the FWHM get updated by the profile fitting routine in local_skysub_extract? If so, include this value
+                # for future fits
+                if np.abs(fwhm_here[iord] - sobjs[indx].FWHM) >= 0.01:
+                    fwhm_was_fit[iord] = False
+            pending = []
 
     # Set the bit for pixels which were masked by the extraction.
     # For extractmask, True = Good, False = Bad
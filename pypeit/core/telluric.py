@@ -9,7 +9,10 @@ import scipy
 import matplotlib.pyplot as plt
 import os
 import pickle
-from pypeit.core import load, flux_calib
+import inspect
+import functools
+from contextlib import nullcontext
+from pypeit.core import load, flux_calib, parallel
 from pypeit.core.wavecal import wvutils
 from astropy import table
 from pypeit.core import save
@@ -122,11 +125,52 @@ def pca_lnprior(theta,pca_dict):
     return gaussian_mixture_model.score_samples(A.reshape(1,-1))
 
 
+@functools.lru_cache(maxsize=4)
+def open_telluric_grid(filename, mtime=None):
+    """
+    Memory-map a telluric grid file.
+
+    The full grid is not read; the pages of the file are only read as the
+    grid is accessed.  The result is cached, such that all the fits that
+    use the same grid file share the same memory map.
+
+    Args:
+        filename (str):
+           Telluric grid filename
+        mtime (float, optional):
+           Modification time of the file.  This is only used to key the
+           cache, such that a file that changes on disk is opened again.
+
+    Returns:
+        tuple: The full wavelength grid, the memory-mapped model grid,
+        with shape (npressure, ntemp, nhumidity, nairmass, nspec), and
+        the pressure, temperature, humidity and airmass grids.
+
+    """
+    hdul = fits.open(filename)
+    wave_grid_full = 10.0*hdul[1].data
+    model_grid_full = hdul[0].data
+
+    pg = hdul[0].header['PRES0']+hdul[0].header['DPRES']*np.arange(0,hdul[0].header['NPRES'])
+    tg = hdul[0].header['TEMP0']+hdul[0].header['DTEMP']*np.arange(0,hdul[0].header['NTEMP'])
+    hg = hdul[0].header['HUM0']+hdul[0].header['DHUM']*np.arange(0,hdul[0].header['NHUM'])
+    if hdul[0].header['NAM'] > 1:
+        ag = hdul[0].header['AM0']+hdul[0].header['DAM']*np.arange(0,hdul[0].header['NAM'])
+    else:
+        ag = hdul[0].header['AM0']+1*np.arange(0,1)
+
+    return wave_grid_full, model_grid_full, pg, tg, hg, ag
+
+
 def read_telluric_grid(filename, wave_min=None, wave_max=None, pad = 0):
     """
     Reads in the telluric grid from a file, and optionally trims the grid to be in within
     wave_min and wave_max adding a padding if requested.
 
+    The grid file is memory-mapped (see :func:`open_telluric_grid`), so the
+    returned telluric grid only reads the wavelength window and grid nodes
+    that are actually used.
+
     Args:
         filename (str):
            Telluric grid filename
@@ -134,8 +178,10 @@ def read_telluric_grid(filename, wave_min=None, wave_max=None, pad = 0):
            Minimum wavelength at which the grid is desired
         wave_max (float):
            Maximum wavelength at which the grid is desired.
-        pad:
-           Padding to be added to the grid boundaries if wave_min or wave_max are input
+        pad (int):
+           Padding in pixels to be added to the grid boundaries if wave_min or wave_max are input. If None, the
+           padding is the number of pixels used to pad the convolutions of the telluric model (see eval_telluric)
+           plus one.
 
     Returns:
         tell_dict (dict):
@@ -143,56 +189,48 @@ def read_telluric_grid(filename, wave_min=None, wave_max=None, pad = 0):
 
     """
 
-    hdul = fits.open(filename)
-    wave_grid_full = 10.0*hdul[1].data
-    model_grid_full = hdul[0].data
+    wave_grid_full, model_grid_full, pg, tg, hg, ag = open_telluric_grid(filename, os.path.getmtime(filename))
     nspec_full = wave_grid_full.size
 
+    if pad is None:
+        pad = int(np.ceil(10.0 * wvutils.get_sampling(wave_grid_full)[3])) + 1
     if wave_min is not None:
-        ind_lower = np.argmin(np.abs(wave_grid_full - wave_min)) - pad
+        ind_lower = np.fmax(np.argmin(np.abs(wave_grid_full - wave_min)) - pad, 0)
     else:
         ind_lower = 0
     if wave_max is not None:
-        ind_upper = np.argmin(np.abs(wave_grid_full - wave_max)) + pad
+        ind_upper = np.fmin(np.argmin(np.abs(wave_grid_full - wave_max)) + pad, nspec_full)
     else:
         ind_upper=nspec_full
     wave_grid = wave_grid_full[ind_lower:ind_upper]
     model_grid = model_grid_full[:,:,:,:, ind_lower:ind_upper]
 
-    pg = hdul[0].header['PRES0']+hdul[0].header['DPRES']*np.arange(0,hdul[0].header['NPRES'])
-    tg = hdul[0].header['TEMP0']+hdul[0].header['DTEMP']*np.arange(0,hdul[0].header['NTEMP'])
-    hg = hdul[0].header['HUM0']+hdul[0].header['DHUM']*np.arange(0,hdul[0].header['NHUM'])
-    if hdul[0].header['NAM'] > 1:
-        ag = hdul[0].header['AM0']+hdul[0].header['DAM']*np.arange(0,hdul[0].header['NAM'])
-    else:
-        ag = hdul[0].header['AM0']+1*np.arange(0,1)
-
     dwave, dloglam, resln_guess, pix_per_sigma = wvutils.get_sampling(wave_grid)
     tell_pad_pix = int(np.ceil(10.0 * pix_per_sigma))
 
     tell_dict = dict(wave_grid=wave_grid, dloglam=dloglam,
                      resln_guess=resln_guess, pix_per_sigma=pix_per_sigma, tell_pad_pix=tell_pad_pix,
-                     pressure_grid=pg, temp_grid=tg, h2o_grid=hg, airmass_grid=ag, tell_grid=model_grid)
+                     pressure_grid=pg, temp_grid=tg, h2o_grid=hg, airmass_grid=ag, tell_grid=model_grid,
+                     ind_offset=ind_lower)
     return tell_dict
 
 
-def interp_telluric_grid(theta,tell_dict):
+def telluric_grid_index(theta, tell_dict):
     """
-    Routine to interpolate the telluric model grid onto an arbitrary location. The telluric models live
-    in a four dimensional parameter space of (pressure, temperature, humidity, airmass). This routine
-    performs nearest gridpoint interpolation to evaluate the telluric model at an arbitrary location in this 4-d space.
+    Routine to find the nearest gridpoint of the telluric model grid to an arbitrary location in the
+    (pressure, temperature, humidity, airmass) space.
 
     Args:
         theta (`numpy.ndarray`_):
            Four dimensional telluric model parameter vector, where:
                pressure, temperature, humidity, airmass = theta
+           This can also be an array with shape (4, nvec) holding nvec parameter vectors.
         tell_dict (dict):
             Dictionary containing the telluric grid
 
     Returns:
-        model_grid (`numpy.ndarray`_):
-            Telluric model evaluated at the location theta. The shape of this output is the same size of the telluric
-            grid (read in by read_telluric_grid above, and possibly trimmed)
+        tuple: The pressure, temperature, humidity, and airmass indices into the telluric grid. These are integers
+        if theta is a single parameter vector, and integer arrays with shape (nvec,) otherwise.
 
     """
 
@@ -200,36 +238,53 @@ def interp_telluric_grid(theta,tell_dict):
     tg = tell_dict['temp_grid']
     hg = tell_dict['h2o_grid']
     ag = tell_dict['airmass_grid']
-    model_grid = tell_dict['tell_grid']
     press,temp,hum,airmass = theta
     if len(pg) > 1:
-        p_ind = int(np.round((press-pg[0])/(pg[1]-pg[0])))
+        p_ind = np.round((press-pg[0])/(pg[1]-pg[0])).astype(int)
     else:
         p_ind = 0
     if len(tg) > 1:
-        t_ind = int(np.round((temp-tg[0])/(tg[1]-tg[0])))
+        t_ind = np.round((temp-tg[0])/(tg[1]-tg[0])).astype(int)
     else:
         t_ind = 0
     if len(hg) > 1:
-        h_ind = int(np.round((hum-hg[0])/(hg[1]-hg[0])))
+        h_ind = np.round((hum-hg[0])/(hg[1]-hg[0])).astype(int)
     else:
         h_ind = 0
     if len(ag) > 1:
-        a_ind = int(np.round((airmass-ag[0])/(ag[1]-ag[0])))
+        a_ind = np.round((airmass-ag[0])/(ag[1]-ag[0])).astype(int)
     else:
         a_ind = 0
 
-    return model_grid[p_ind,t_ind,h_ind,a_ind]
+    return p_ind, t_ind, h_ind, a_ind
 
-def conv_telluric(tell_model, dloglam, res):
+def interp_telluric_grid(theta,tell_dict):
     """
-    Routine to convolve the telluric model to desired resolution.
+    Routine to interpolate the telluric model grid onto an arbitrary location. The telluric models live
+    in a four dimensional parameter space of (pressure, temperature, humidity, airmass). This routine
+    performs nearest gridpoint interpolation to evaluate the telluric model at an arbitrary location in this 4-d space.
+
+    Args:
+        theta (`numpy.ndarray`_):
+           Four dimensional telluric model parameter vector, where:
+               pressure, temperature, humidity, airmass = theta
+        tell_dict (dict):
+            Dictionary containing the telluric grid
+
+    Returns:
+        model_grid (`numpy.ndarray`_):
+            Telluric model evaluated at the location theta. The shape of this output is the same size of the telluric
+            grid (read in by read_telluric_grid above, and possibly trimmed)
+
+    """
+
+    return tell_dict['tell_grid'][telluric_grid_index(theta, tell_dict)]
+
+def conv_kernel(dloglam, res):
+    """
+    Routine to construct the Gaussian kernel used to convolve the telluric model to a desired resolution.
 
     Args:
-        tell_model (`numpy.ndarray`_):
-            Input telluric model at the native resolution of the telluric model grid. The shape of this input is in
-            general  different from the size of the telluric grid (read in by read_telluric_grid above) because it is
-            trimmed to relevant wavelenghts using ind_lower, ind_upper. See eval_telluric below.
         dloglam (float):
             Wavelength spacing of the telluric grid expressed as a a dlog10(lambda), i.e. stored in the
             tell_dict as tell_dict['dloglam']
@@ -238,8 +293,8 @@ def conv_telluric(tell_model, dloglam, res):
             the delta of the log10.
 
     Returns:
-        convolved_model (`numpy.ndarray`_):
-            Resolution convolved telluric model. Shape = same size as input tell_model.
+        kernel (`numpy.ndarray`_):
+            Normalized Gaussian kernel sampled on the telluric grid out to +/- 4 sigma.
 
     """
 
@@ -250,8 +305,44 @@ def conv_telluric(tell_model, dloglam, res):
     x = np.hstack([-1*np.flip(np.arange(sig2pix,4,sig2pix)),np.arange(0,4,sig2pix)])
     # g = Gaussian evaluated at x, sig2pix multiplied in to properly normalize the convolution
     g = (1.0/(np.sqrt(2*np.pi)))*np.exp(-0.5*(x)**2)*sig2pix
-    conv_model = scipy.signal.convolve(tell_model,g,mode='same')
-    return conv_model
+    return g
+
+def conv_telluric(tell_model, dloglam, res):
+    """
+    Routine to convolve the telluric model to desired resolution.
+
+    Args:
+        tell_model (`numpy.ndarray`_):
+            Input telluric model at the native resolution of the telluric model grid. The shape of this input is in
+            general  different from the size of the telluric grid (read in by read_telluric_grid above) because it is
+            trimmed to relevant wavelenghts using ind_lower, ind_upper. See eval_telluric below. This can also be
+            an array with shape (nvec, nspec) holding nvec models, one for each element of res.
+        dloglam (float):
+            Wavelength spacing of the telluric grid expressed as a a dlog10(lambda), i.e. stored in the
+            tell_dict as tell_dict['dloglam']
+        res (float or `numpy.ndarray`_):
+            Desired resolution expressed as lambda/dlambda. Note that here dlambda is linear, whereas dloglam is
+            the delta of the log10. If this is an array with shape (nvec,), each row of tell_model is convolved
+            to its own resolution.
+
+    Returns:
+        convolved_model (`numpy.ndarray`_):
+            Resolution convolved telluric model. Shape = same size as input tell_model.
+
+    """
+
+    if np.ndim(res) == 0:
+        return scipy.signal.convolve(tell_model,conv_kernel(dloglam, res),mode='same')
+
+    # Zero pad the kernels of all the models to a common length, keeping them centered, and convolve all the models
+    # in one go
+    kernels = [conv_kernel(dloglam, this_res) for this_res in res]
+    nkern = np.max([kernel.size for kernel in kernels])
+    g = np.zeros((len(kernels), nkern))
+    for i, kernel in enumerate(kernels):
+        offset = (nkern - 1)//2 - (kernel.size - 1)//2
+        g[i,offset:offset + kernel.size] = kernel
+    return scipy.signal.fftconvolve(tell_model, g, mode='same', axes=-1)
 
 def shift_telluric(tell_model, loglam, dloglam, shift):
     """
@@ -261,15 +352,17 @@ def shift_telluric(tell_model, loglam, dloglam, shift):
         tell_model (`numpy.ndarray`_):
             Input telluric model. The shape of this input is in general  different from the size of the telluric grid
             (read in by read_telluric_grid above) because it is trimmed to relevant wavelenghts using ind_lower, ind_upper.
-            See eval_telluric below.
+            See eval_telluric below. This can also be an array with shape (nvec, nspec) holding nvec models, one for
+            each element of shift.
 
         loglam (`numpy.ndarray`_):
             The log10 of the wavelength grid on which the tell_model is evaluated.
         dloglam (float):
             Wavelength spacing of the telluric grid expressed as a a dlog10(lambda), i.e. stored in the
             tell_dict as tell_dict['dloglam']
-        shift (float):
-            Desired shift.  Note that this shift can be sub-pixel.
+        shift (float or `numpy.ndarray`_):
+            Desired shift.  Note that this shift can be sub-pixel. If this is an array with shape (nvec,), each row of
+            tell_model is shifted by its own amount.
 
     Returns:
         shifted_model (`numpy.ndarray`_):
@@ -277,9 +370,18 @@ def shift_telluric(tell_model, loglam, dloglam, shift):
 
     """
 
-    loglam_shift = loglam + shift*dloglam
-    tell_model_shift = np.interp(loglam_shift, loglam, tell_model)
-    return tell_model_shift
+    if np.ndim(shift) == 0:
+        loglam_shift = loglam + shift*dloglam
+        tell_model_shift = np.interp(loglam_shift, loglam, tell_model)
+        return tell_model_shift
+
+    # Same linear interpolation as np.interp, applied to each row
+    loglam_shift = np.clip(loglam[None,:] + np.asarray(shift)[:,None]*dloglam, loglam[0], loglam[-1])
+    ind = np.clip(np.searchsorted(loglam, loglam_shift, side='right') - 1, 0, loglam.size - 2)
+    frac = (loglam_shift - loglam[ind])/(loglam[ind+1] - loglam[ind])
+    model_lo = np.take_along_axis(tell_model, ind, axis=-1)
+    model_hi = np.take_along_axis(tell_model, ind+1, axis=-1)
+    return model_lo + frac*(model_hi - model_lo)
 
 
 def eval_telluric(theta_tell, tell_dict, ind_lower=None, ind_upper=None):
@@ -313,7 +415,9 @@ def eval_telluric(theta_tell, tell_dict, ind_lower=None, ind_upper=None):
     Args:
         theta_tell (`numpy.ndarray`_):
             Five or six dimensional parameter vector describing the
-            atmosphere. See above for description of parameters.
+            atmosphere. See above for description of parameters. This
+            can also be an array with shape (5, nvec) or (6, nvec) to
+            evaluate nvec parameter vectors at once.
         tell_dict (dict):
             Dictionary containing the telluric grid.
         ind_lower (int):
@@ -327,12 +431,13 @@ def eval_telluric(theta_tell, tell_dict, ind_lower=None, ind_upper=None):
 
     Returns:
         `numpy.ndarray`_: Telluric model evaluated at the desired
-        location theta_tell in atomphere parameter space
+        location theta_tell in atomphere parameter space. If nvec
+        parameter vectors are provided, the shape is (nvec, nspec).
 
     """
 
+    theta_tell = np.asarray(theta_tell)
     ntheta = len(theta_tell)
-    tellmodel_hires = interp_telluric_grid(theta_tell[:4], tell_dict)
 
     ind_lower = 0 if ind_lower is None else ind_lower
     ind_upper = tell_dict['wave_grid'].size - 1 if ind_upper is None else ind_upper
@@ -340,13 +445,19 @@ def eval_telluric(theta_tell, tell_dict, ind_lower=None, ind_upper=None):
     ind_lower_pad = np.fmax(ind_lower - tell_dict['tell_pad_pix'], 0)
     ind_upper_pad = np.fmin(ind_upper + tell_dict['tell_pad_pix'], tell_dict['wave_grid'].size - 1)
     tell_pad_tuple = (ind_lower - ind_lower_pad, ind_upper_pad - ind_upper)
-    tellmodel_conv = conv_telluric(tellmodel_hires[ind_lower_pad:ind_upper_pad + 1], tell_dict['dloglam'], theta_tell[4])
+    if theta_tell.ndim > 1:
+        # Only extract the needed wavelengths of every model from the grid
+        tellmodel_hires = tell_dict['tell_grid'][telluric_grid_index(theta_tell[:4], tell_dict)
+                                                 + (slice(ind_lower_pad, ind_upper_pad + 1),)]
+    else:
+        tellmodel_hires = interp_telluric_grid(theta_tell[:4], tell_dict)[ind_lower_pad:ind_upper_pad + 1]
+    tellmodel_conv = conv_telluric(tellmodel_hires, tell_dict['dloglam'], theta_tell[4])
 
     if ntheta == 6:
         tellmodel_out = shift_telluric(tellmodel_conv, np.log10(tell_dict['wave_grid'][ind_lower_pad: ind_upper_pad+1]), tell_dict['dloglam'], theta_tell[5])
-        return tellmodel_out[tell_pad_tuple[0]:-tell_pad_tuple[1]]
+        return tellmodel_out[...,tell_pad_tuple[0]:-tell_pad_tuple[1]]
     else:
-        return tellmodel_conv[tell_pad_tuple[0]:-tell_pad_tuple[1]]
+        return tellmodel_conv[...,tell_pad_tuple[0]:-tell_pad_tuple[1]]
 
 
 ############################
@@ -362,6 +473,9 @@ def tellfit_chi2(theta, flux, thismask, arg_dict):
     Args:
         theta (`numpy.ndarray`_):
            Parameter vector for the object + telluric model. See documentation of tellfit for a detailed description.
+           This can also be an array with shape (ntheta, nvec) holding a population of nvec parameter vectors, as
+           passed by differential evolution when run with ``vectorized=True``. The telluric models of the full
+           population are then evaluated in a single batched call.
         flux (`numpy.ndarray`_):
            The flux of the object being fit
         thismask (`numpy.ndarray`_, boolean):
@@ -370,9 +484,10 @@ def tellfit_chi2(theta, flux, thismask, arg_dict):
            A dictionary containing the parameters needed to evaluate the telluric model and the object model. See
            documentation of tellfit for a detailed description.
     Returns:
-        loss_function (float):
+        loss_function (float or `numpy.ndarray`_):
            The value of the loss function at the location in parameter space theta. This is loss function is the thing
-           that is minimized to perform the fit.
+           that is minimized to perform the fit. For a population of parameter vectors, this is an array with shape
+           (nvec,).
 
     """
 
@@ -383,8 +498,40 @@ def tellfit_chi2(theta, flux, thismask, arg_dict):
     theta_tell = theta[-6:]
     tell_model = eval_telluric(theta_tell, arg_dict['tell_dict'],
                                ind_lower=arg_dict['ind_lower'], ind_upper=arg_dict['ind_upper'])
-    obj_model, modelmask = obj_model_func(theta_obj, arg_dict['obj_dict'])
+    if theta.ndim == 1:
+        obj_model, modelmask = obj_model_func(theta_obj, arg_dict['obj_dict'])
+        return tellfit_loss(flux, flux_ivar, thismask, tell_model, obj_model, modelmask)
+
+    # The object models are provided by the user one parameter vector at a time
+    loss_function = np.zeros(theta.shape[1])
+    for i in range(theta.shape[1]):
+        obj_model, modelmask = obj_model_func(theta_obj[:,i], arg_dict['obj_dict'])
+        loss_function[i] = tellfit_loss(flux, flux_ivar, thismask, tell_model[i], obj_model, modelmask)
+    return loss_function
+
+def tellfit_loss(flux, flux_ivar, thismask, tell_model, obj_model, modelmask):
+    """
+    Robust (Huber) loss of the object + telluric model fit.
+
+    Args:
+        flux (`numpy.ndarray`_):
+           The flux of the object being fit
+        flux_ivar (`numpy.ndarray`_):
+           Inverse variance of the flux
+        thismask (`numpy.ndarray`_, boolean):
+           A mask indicating which values are to be fit. This is a good pixel mask, i.e. True=Good
+        tell_model (`numpy.ndarray`_):
+           Telluric model
+        obj_model (`numpy.ndarray`_):
+           Object model
+        modelmask (`numpy.ndarray`_, boolean):
+           Mask returned by the object model evaluation function, True=Good
+
+    Returns:
+        loss_function (float):
+           The value of the loss function, or np.inf if the object model is masked everywhere.
 
+    """
     if not np.any(modelmask):
         return np.inf
     else:
@@ -449,7 +596,12 @@ def tellfit(flux, thismask, arg_dict, **kwargs_opt):
 
         **kwargs_opt (dict):
             Optional arguments for the differential evolution
-            optimization
+            optimization. If ``vectorized=True`` is included, the
+            loss function is evaluated for the whole population of
+            each generation in a single batched call; this requires
+            scipy>=1.9 and uses deferred updating of the population,
+            so the result differs from (but, for a given seed, is as
+            reproducible as) the default fit.
 
     Returns:
         tuple:  Returns three objects:
@@ -471,6 +623,12 @@ def tellfit(flux, thismask, arg_dict, **kwargs_opt):
     flux_ivar = arg_dict['ivar'] # Inverse variance of flux or counts
     bounds = arg_dict['bounds']  # bounds for differential evolution optimizaton
     seed = arg_dict['seed']      # Seed for differential evolution optimizaton
+    if kwargs_opt.pop('vectorized', False):
+        if 'vectorized' in inspect.signature(scipy.optimize.differential_evolution).parameters:
+            kwargs_opt.update(vectorized=True, updating='deferred')
+        else:
+            msgs.warn('Vectorized differential evolution requires scipy>=1.9.  Evaluating the population '
+                      'one parameter vector at a time.')
     result = scipy.optimize.differential_evolution(tellfit_chi2, bounds, args=(flux, thismask, arg_dict,), seed=seed,
                                                    **kwargs_opt)
 
@@ -496,6 +654,37 @@ def tellfit(flux, thismask, arg_dict, **kwargs_opt):
     return result, tell_model*obj_model, ivartot
 
 
+def tellfit_order(flux, inmask, arg_dict, **kwargs):
+    """
+    Routine to perform the robust object + telluric model fit of a single order or spectrum.
+
+    This is the unit of work distributed to the worker processes by :func:`pypeit.core.parallel.run_tasks` when
+    several orders are fit in parallel; the telluric grid in ``arg_dict['tell_dict']`` can therefore be a
+    :class:`pypeit.core.parallel.SharedArray`.
+
+    Args:
+        flux (`numpy.ndarray`_):
+            The flux of the object being fit
+        inmask (`numpy.ndarray`_, boolean):
+            Good pixel mask, True=Good
+        arg_dict (dict):
+            A dictionary containing the parameters needed to evaluate the telluric model and the object model. See
+            documentation of tellfit for a detailed description.
+        **kwargs:
+            Optional arguments passed to :func:`pypeit.utils.robust_optimize` and on to the differential evolution
+            optimization.
+
+    Returns:
+        tuple: The result object returned by the differential evolution optimizer and the output good pixel mask
+        from the rejection iterations.
+
+    """
+    tell_dict = arg_dict['tell_dict']
+    arg_dict = dict(arg_dict, tell_dict=dict(tell_dict, tell_grid=parallel.as_array(tell_dict['tell_grid'])))
+    result, ymodel, ivartot, outmask = utils.robust_optimize(flux, tellfit, arg_dict, inmask=inmask, **kwargs)
+    return result, outmask
+
+
 # TODO This should be a general reader once we get our act together with the data model.
 #  For echelle:  read in all the orders into a (nspec, nporders) array
 #  FOr longslit: read in the stanard into a (nspec, 1) array
@@ -818,7 +1007,8 @@ class Telluric(object):
                  sn_clip=30.0, airmass_guess=1.5, resln_guess=None,
                  resln_frac_bounds=(0.5, 1.5), pix_shift_bounds=(-5.0, 5.0),
                  maxiter=3, sticky=True, lower=3.0, upper=3.0,
-                 seed=None, tol=1e-3, popsize=30, recombination=0.7, polish=True, disp=True, debug=False):
+                 seed=None, tol=1e-3, popsize=30, recombination=0.7, polish=True, disp=True, vectorized=False,
+                 n_proc=1, debug=False):
 
         # This init function performs the following steps:
         # 1) assignement of relevant input arguments
@@ -845,6 +1035,8 @@ class Telluric(object):
         self.recombination = recombination
         self.polish = polish
         self.disp = disp
+        self.vectorized = vectorized
+        self.n_proc = n_proc
         self.debug = debug
 
         # 2) Reshape all spectra to be (nspec, norders)
@@ -853,11 +1045,14 @@ class Telluric(object):
 
         # Optimizer requires a seed. This guarantees that the fit will be deterministic and hence reproducible
         self.seed = seed if seed is not None else 777
-        rand = np.random.RandomState(seed=seed)
+        rand = np.random.RandomState(seed=self.seed)
         seed_vec = rand.randint(2 ** 32 - 1, size=self.norders)
 
-        # 3) Read the telluric grid and initalize associated parameters
-        self.tell_dict = self.read_telluric_grid()
+        # 3) Read the telluric grid and initalize associated parameters. Only the wavelength range covered by
+        # the data, padded for the convolutions, is used.
+        gdwave = self.wave_in_arr > 1.0
+        self.tell_dict = self.read_telluric_grid(wave_min=self.wave_in_arr[gdwave].min(),
+                                                 wave_max=self.wave_in_arr[gdwave].max(), pad=None)
         self.wave_grid = self.tell_dict['wave_grid']
         self.ngrid = self.wave_grid.size
         self.resln_guess = wvutils.get_sampling(self.wave_in_arr)[2] if resln_guess is None else resln_guess
@@ -925,16 +1120,30 @@ class Telluric(object):
         self.tellmodel_list = [None]*self.norders
         self.theta_obj_list = [None]*self.norders
         self.theta_tell_list = [None]*self.norders
-        for counter, iord in enumerate(self.srt_order_tell):
-            if iord not in good_orders:
-                continue
-            msgs.info('Fitting object + telluric model for order: {:d}, {:d}/{:d}'.format(iord, counter, self.norders) +
-                      ' with user supplied function: {:s}'.format(self.init_obj_model.__name__))
-            self.result_list[iord], ymodel, ivartot, self.outmask_list[iord] = utils.robust_optimize(
-                self.flux_arr[self.ind_lower[iord]:self.ind_upper[iord]+1, iord], tellfit, self.arg_dict_list[iord],
-                inmask=self.mask_arr[self.ind_lower[iord]:self.ind_upper[iord]+1, iord],
-                maxiter=self.maxiter, lower=self.lower, upper=self.upper, sticky=self.sticky,
-                tol=self.tol, popsize=self.popsize, recombination=self.recombination, polish=self.polish, disp=self.disp)
+        # The orders are independent, and each has its own seed, so fitting them in parallel gives the same result.
+        # The QA plots require the fits to be run serially.
+        n_proc = 1 if self.debug else self.n_proc
+        share = n_proc > 1 and len(good_orders) > 1
+        with parallel.SharedArrays(tell_grid=self.tell_dict['tell_grid']) if share else nullcontext() as shared:
+            fit_orders, tasks = [], []
+            for counter, iord in enumerate(self.srt_order_tell):
+                if iord not in good_orders:
+                    continue
+                msgs.info('Fitting object + telluric model for order: {:d}, {:d}/{:d}'.format(iord, counter, self.norders) +
+                          ' with user supplied function: {:s}'.format(self.init_obj_model.__name__))
+                arg_dict = self.arg_dict_list[iord]
+                if share:
+                    arg_dict = dict(arg_dict, tell_dict=dict(self.tell_dict, tell_grid=shared['tell_grid']))
+                fit_orders.append(iord)
+                tasks.append((self.flux_arr[self.ind_lower[iord]:self.ind_upper[iord]+1, iord],
+                              self.mask_arr[self.ind_lower[iord]:self.ind_upper[iord]+1, iord], arg_dict))
+            results = parallel.run_tasks(tellfit_order, tasks, n_proc=n_proc, maxiter=self.maxiter,
+                                         lower=self.lower, upper=self.upper, sticky=self.sticky, tol=self.tol,
+                                         popsize=self.popsize, recombination=self.recombination,
+                                         polish=self.polish, disp=self.disp, vectorized=self.vectorized)
+
+        for iord, (result, outmask) in zip(fit_orders, results):
+            self.result_list[iord], self.outmask_list[iord] = result, outmask
             self.theta_obj_list[iord] = self.result_list[iord].x[:-6]
             self.theta_tell_list[iord] = self.result_list[iord].x[-6:]
             self.obj_model_list[iord], modelmask = self.eval_obj_model(self.theta_obj_list[iord], self.obj_dict_list[iord])
@@ -1036,8 +1245,9 @@ class Telluric(object):
         out_table['CHI2'] = np.zeros(self.norders)
         out_table['SUCCESS'] = np.zeros(self.norders, dtype=bool)
         out_table['NITER'] = np.zeros(self.norders, dtype=int)
-        out_table['IND_LOWER'] = self.ind_lower
-        out_table['IND_UPPER'] = self.ind_upper
+        # Indices are with respect to the full wavelength grid of the telluric grid file
+        out_table['IND_LOWER'] = self.ind_lower + self.tell_dict['ind_offset']
+        out_table['IND_UPPER'] = self.ind_upper + self.tell_dict['ind_offset']
         out_table['WAVE_MIN'] = self.wave_grid[self.ind_lower]
         out_table['WAVE_MAX'] = self.wave_grid[self.ind_upper]
 
@@ -1179,9 +1389,12 @@ class Telluric(object):
         """
         Wrapper for utility function read_telluric_grid
         Args:
-            wave_min:
-            wave_max:
-            pad:
+            wave_min (float):
+                Minimum wavelength at which the grid is desired
+            wave_max (float):
+                Maximum wavelength at which the grid is desired.
+            pad (int):
+                Padding in pixels added to the grid boundaries.
 
         Returns:
 
@@ -1299,7 +1512,7 @@ def mask_star_lines(wave_star, mask_width=10.0):
 def sensfunc_telluric(spec1dfile, telgridfile, outfile, star_type=None, star_mag=None, star_ra=None, star_dec=None,
                       polyorder=8, mask_abs_lines=True, delta_coeff_bounds=(-20.0, 20.0), minmax_coeff_bounds=(-5.0, 5.0),
                       sn_clip=30.0, only_orders=None, tol=1e-3, popsize=30, recombination=0.7, polish=True, disp=True,
-                      debug_init=False, debug=False):
+                      vectorized=False, n_proc=1, debug_init=False, debug=False):
 
 
     # Read in the data
@@ -1343,7 +1556,7 @@ def sensfunc_telluric(spec1dfile, telgridfile, outfile, star_type=None, star_mag
     # parameters lowered for testing
     TelObj = Telluric(wave, counts, counts_ivar, mask_tot, telgridfile, obj_params,
                       init_sensfunc_model, eval_sensfunc_model,  sn_clip=sn_clip, tol=tol, popsize=popsize, recombination=recombination,
-                      polish=polish, disp=disp, debug=debug)
+                      polish=polish, disp=disp, vectorized=vectorized, n_proc=n_proc, debug=debug)
 
     TelObj.run(only_orders=only_orders)
     TelObj.save(outfile)
@@ -1361,7 +1574,7 @@ def create_bal_mask(wave):
 def qso_telluric(spec1dfile, telgridfile, pca_file, z_qso, telloutfile, outfile, npca = 8, create_bal_mask=None,
                  delta_zqso=0.1, bounds_norm=(0.1, 3.0), tell_norm_thresh=0.9, sn_clip=30.0, only_orders=None,
                  tol=1e-3, popsize=30, recombination=0.7, pca_lower=1220.0,
-                 pca_upper=3100.0, polish=True, disp=True, debug=False,
+                 pca_upper=3100.0, polish=True, disp=True, vectorized=False, n_proc=1, debug=False,
                  show=False):
 
 
@@ -1384,7 +1597,7 @@ def qso_telluric(spec1dfile, telgridfile, pca_file, z_qso, telloutfile, outfile,
     # parameters lowered for testing
     TelObj = Telluric(wave, flux, ivar, mask_tot, telgridfile, obj_params, init_qso_model, eval_qso_model,
                       sn_clip=sn_clip, tol=tol, popsize=popsize, recombination=recombination,
-                      polish=polish, disp=disp, debug=debug)
+                      polish=polish, disp=disp, vectorized=vectorized, n_proc=n_proc, debug=debug)
     TelObj.run(only_orders=only_orders)
     TelObj.save(telloutfile)
 
@@ -1404,7 +1617,7 @@ def qso_telluric(spec1dfile, telgridfile, pca_file, z_qso, telloutfile, outfile,
     if show:
         # Median filter
         med_width = int(flux.size*0.001)
-        flux_med = utils.fast_running_median(flux_corr, med_width)
+        flux_med = utils.running_median(flux_corr, med_width)
         fig = plt.figure(figsize=(12, 8))
         plt.plot(wave, flux_corr, drawstyle='steps-mid', color='0.7', label='corrected data', alpha=0.7, zorder=5)
         plt.plot(wave, flux_med, drawstyle='steps-mid', color='k', label='corrected data', alpha=0.7, zorder=5)
@@ -1425,7 +1638,7 @@ def qso_telluric(spec1dfile, telgridfile, pca_file, z_qso, telloutfile, outfile,
 def star_telluric(spec1dfile, telgridfile, telloutfile, outfile, star_type=None, star_mag=None, star_ra=None, star_dec=None,
                   func='legendre', model='exp', polyorder=5, mask_abs_lines=True, delta_coeff_bounds=(-20.0, 20.0),
                   minmax_coeff_bounds=(-5.0, 5.0), only_orders=None, sn_clip=30.0, tol=1e-3, popsize=30, recombination=0.7, polish=True,
-                  disp=True, debug_init=False, debug=False, show=False):
+                  disp=True, vectorized=False, n_proc=1, debug_init=False, debug=False, show=False):
 
 
     # Read in the data
@@ -1469,7 +1682,8 @@ def star_telluric(spec1dfile, telgridfile, telloutfile, outfile, star_type=None,
     # parameters lowered for testing
     TelObj = Telluric(wave, flux, ivar, mask_tot, telgridfile, obj_params,
                       init_star_model, eval_star_model,  sn_clip=sn_clip,
-                      tol=tol, popsize=popsize, recombination=recombination, polish=polish, disp=disp, debug=debug)
+                      tol=tol, popsize=popsize, recombination=recombination, polish=polish, disp=disp,
+                      vectorized=vectorized, n_proc=n_proc, debug=debug)
 
     TelObj.run(only_orders=only_orders)
     TelObj.save(telloutfile)
@@ -1511,7 +1725,8 @@ def star_telluric(spec1dfile, telgridfile, telloutfile, outfile, star_type=None,
 def poly_telluric(spec1dfile, telgridfile, telloutfile, outfile, z_obj=0.0, func='legendre', model='exp', polyorder=3,
                   fit_region_min=None, fit_region_max=None, mask_lyman_a=True, delta_coeff_bounds=(-20.0, 20.0),
                   minmax_coeff_bounds=(-5.0, 5.0), only_orders=None, sn_clip=30.0, tol=1e-3, popsize=30, maxiter=5,
-                  recombination=0.7, polish=True, disp=True, debug_init=False, debug=False, show=False):
+                  recombination=0.7, polish=True, disp=True, vectorized=False, n_proc=1, debug_init=False, debug=False,
+                  show=False):
 
     # Read in the data
     wave, flux, ivar, mask, meta_spec, header = general_spec_reader(spec1dfile, ret_flam=False)
@@ -1557,7 +1772,8 @@ def poly_telluric(spec1dfile, telgridfile, telloutfile, outfile, z_obj=0.0, func
     # parameters lowered for testing
     TelObj = Telluric(wave, flux, ivar, mask_tot, telgridfile, obj_params,
                       init_poly_model, eval_poly_model,  sn_clip=sn_clip, maxiter=maxiter,
-                      tol=tol, popsize=popsize, recombination=recombination, polish=polish, disp=disp, debug=debug)
+                      tol=tol, popsize=popsize, recombination=recombination, polish=polish, disp=disp,
+                      vectorized=vectorized, n_proc=n_proc, debug=debug)
 
     TelObj.run(only_orders=only_orders)
     TelObj.save(telloutfile)
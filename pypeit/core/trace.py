@@ -664,6 +664,115 @@ def follow_centroid(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None,
     return xc, xe, xm
 
 
+def follow_centroid_stack(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None, width=6.0,
+                          maxshift_start=0.5, maxshift_follow=0.15, maxerror=0.2):
+    """
+    Follow the centroid of a single feature in each of a stack of
+    images along their first axis.
+
+    This is equivalent to calling :func:`follow_centroid` (with
+    ``continuous=False``) separately for each image in the stack,
+    but the centroids of all the features are measured together by
+    a single call to :func:`masked_centroid` for each row. This is
+    significantly faster than the separate calls when following many
+    features (e.g., all the arc lines in a slit).
+
+    Args:
+        flux (`numpy.ndarray`_):
+            Stack of images, with shape :math:`(N_{\\rm img}, N_{\\rm
+            row}, N_{\\rm col})`, used to weight the column
+            coordinates when recentering. See :func:`follow_centroid`.
+        start_row (:obj:`int`, `numpy.ndarray`_):
+            Row in each image at which to start the calculation. Can
+            be a single integer used for all images.
+        start_cen (`numpy.ndarray`_):
+            Starting coordinate of the feature in each image.
+        ivar (`numpy.ndarray`_, optional):
+            Inverse variance in the images. If not provided, unity
+            variance is assumed. Shape must match `flux`.
+        bpm (`numpy.ndarray`_, optional):
+            A boolean bad-pixel mask used to ignore pixels in the
+            images (bad pixels are True). Shape must match `flux`.
+        fwgt (`numpy.ndarray`_, optional):
+            An additional weight to apply to each pixel in `flux`. If
+            None, weights are uniform. Shape must match `flux`.
+        width (:obj:`float`, optional):
+            The size of the window about the provided starting center
+            for the moment integration window. See
+            :func:`pypeit.core.moment.moment1d`.
+        maxshift_start (:obj:`float`, optional):
+            Maximum shift in pixels allowed for the adjustment of the
+            first row analyzed.
+        maxshift_follow (:obj:`float`, optional):
+            Maximum shift in pixels between centroids in adjacent
+            rows as the routine follows the feature away from the
+            first row analyzed.
+        maxerror (:obj:`float`, optional):
+             Maximum allowed error in the centroid returned by
+            :func:`pypeit.core.moment.moment1d`.
+
+    Returns:
+        Three numpy arrays with shape :math:`(N_{\\rm row}, N_{\\rm
+        img})` are returned: the optimized center, an estimate of the
+        error, and a bad-pixel mask (masked values are True).
+    """
+    if flux.ndim != 3:
+        raise ValueError('Input image stack must be 3D.')
+    # Shape of the image stack with pixel weights
+    nimg, nr, nc = flux.shape
+
+    # Flatten the stack so that each image is a block of rows in a
+    # single image
+    _flux = flux.reshape(-1,nc)
+    _ivar = np.ones_like(_flux, dtype=float) if ivar is None else ivar.reshape(-1,nc)
+    _bpm = np.zeros_like(_flux, dtype=bool) if bpm is None else bpm.reshape(-1,nc)
+    _fwgt = np.ones_like(_flux, dtype=float) if fwgt is None else fwgt.reshape(-1,nc)
+
+    _row = np.atleast_1d(start_row).astype(int)
+    if _row.size == 1:
+        _row = np.full(nimg, _row[0], dtype=int)
+    _cen = np.atleast_1d(start_cen).astype(float)
+    # Check coordinates are within the images
+    if _cen.shape != (nimg,) or _row.shape != (nimg,):
+        raise ValueError('Must provide one starting row and center for each image.')
+    if np.any((_cen > nc-1) | (_cen < 0)) or np.any((_row < 0) | (_row > nr-1)):
+        raise ValueError('Starting coordinates incompatible with input image!')
+
+    # First row of each image in the flattened stack
+    offset = np.arange(nimg)*nr
+    img = np.arange(nimg)
+
+    # Instantiate output; just repeat input for all image rows.
+    xc = np.tile(_cen, (nr,1))
+    xe = np.zeros_like(xc, dtype=float)
+    xm = np.zeros_like(xc, dtype=bool)
+
+    # Recenter the starting row
+    xc[_row,img], xe[_row,img], xm[_row,img] \
+            = masked_centroid(_flux, xc[_row,img], width, ivar=_ivar, bpm=_bpm, fwgt=_fwgt,
+                              row=offset+_row, maxshift=maxshift_start, maxerror=maxerror,
+                              fill='bound')
+
+    # Step away from the starting rows, first to higher and then to
+    # lower indices, using the result from the previous row in each
+    # image
+    for step in [1,-1]:
+        i = _row + step
+        indx = (i >= 0) & (i < nr)
+        while np.any(indx):
+            _i = i[indx]
+            _img = img[indx]
+            xc[_i,_img], xe[_i,_img], xm[_i,_img] \
+                    = masked_centroid(_flux, xc[_i-step,_img], width, ivar=_ivar, bpm=_bpm,
+                                      fwgt=_fwgt, row=offset[_img]+_i, maxshift=maxshift_follow,
+                                      maxerror=maxerror, fill='bound')
+            i += step
+            indx = (i >= 0) & (i < nr)
+
+    # Return centers, errors, and mask
+    return xc, xe, xm
+
+
 def masked_centroid(flux, cen, width, ivar=None, bpm=None, fwgt=None, row=None,
                     weighting='uniform', maxshift=None, maxerror=None, bitmask=None, fill='input',
                     fill_error=-1):
@@ -211,9 +211,6 @@ def trace_tilts_work(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=
 
     lines_spat_int = np.round(lines_spat).astype(int)
 
-    spat_min = np.zeros(nlines, dtype=int)
-    spat_max = np.zeros(nlines, dtype=int)
-
     if inmask is None:
         inmask = thismask
 
@@ -250,36 +247,57 @@ def trace_tilts_work(arcimg, lines_spec, lines_spat, thismask, slit_cen, inmask=
     inmask_trans = (inmask * thismask).T.astype(float)
     thismask_trans = thismask.T
 
+    # We sub-image each tilt using a symmetric window about the (integer) spatial location of each line,
+    # which is the slitcen evaluated at the line spectral position.
+    spat_min = lines_spat_int - trace_int  # spat_min is the minium location of the sub-image
+    spat_max = lines_spat_int + trace_int + 1  # spat_max is the maximum location of the sub-image
+    sub_start = np.fmax(spat_min, 0)  # These sub_start and sub_end are to prevent leaving the image
+    sub_end = np.fmin(spat_max, nspat - 1)
+
+    if do_crude: # First time tracing, do a trace crude
+        # NOTE: follow_centroid behaves differently from the old
+        # trace_crude_init within 2-4 pixels at the trace edge
+
+        # Construct the line traces by following the line centroids
+        # as a function of spatial position along the slit. The
+        # smoothed sub-images of the lines are stacked so that the
+        # lines are followed together, in batches that limit the size
+        # of the stack to roughly 10^7 pixels. Sub-images that fall off
+        # the image are padded with masked pixels.
+        # TODO: This also returns error estimates and a mask, but
+        # those weren't used in the previous version of the code.
+        tilts_guess_crude = np.zeros((nsub, nlines), dtype=float)
+        start_row = sub_start - spat_min + (sub_end - sub_start - 1)//2
+        nbatch = max(10**7 // (nsub*nspec), 1)
+        for b in range(0, nlines, nbatch):
+            lines = np.arange(b, min(b+nbatch, nlines))
+            smsub_stack = np.zeros((lines.size, nsub, nspec), dtype=float)
+            subbpm_stack = np.ones((lines.size, nsub, nspec), dtype=bool)
+            for i, iline in enumerate(lines):
+                s = sub_start[iline] - spat_min[iline]
+                e = s + sub_end[iline] - sub_start[iline]
+                sub_inmask = inmask_trans[sub_start[iline]:sub_end[iline],:]
+                smsub_stack[i,s:e] \
+                        = utils.boxcar_smooth_rows(arcimg_trans[sub_start[iline]:sub_end[iline],:],
+                                                   tcrude_nave, wgt=sub_inmask)
+                subbpm_stack[i,s:e] = np.invert(sub_inmask.astype(bool))
+            tilts_guess_crude[:,lines] \
+                    = trace.follow_centroid_stack(smsub_stack, start_row[lines], lines_spec[lines],
+                                                  bpm=subbpm_stack, width=3*fwhm,
+                                                  maxshift_start=tcrude_maxshift0,
+                                                  maxshift_follow=tcrude_maxshift,
+                                                  maxerror=tcrude_maxerr)[0]
+
     # 1) Trace the tilts from a guess. If no guess is provided from a previous iteration use trace_crude
     for iline in range(nlines):
-        # We sub-image each tilt using a symmetric window about the (integer) spatial location of each line,
-        # which is the slitcen evaluated at the line spectral position.
-        spat_min[iline] = lines_spat_int[iline] - trace_int  # spat_min is the minium location of the sub-image
-        spat_max[iline] = lines_spat_int[iline] + trace_int + 1  # spat_max is the maximum location of the sub-image
-        min_spat = np.fmax(spat_min[iline], 0)  # These min_spat and max_spat are to prevent leaving the image
-        max_spat = np.fmin(spat_max[iline], nspat - 1)
-        sub_img = arcimg_trans[min_spat:max_spat, :]
+        min_spat = sub_start[iline]
+        max_spat = sub_end[iline]
+        sub_img = arcimg_trans[min_spat:max_spat,:]
         sub_inmask = inmask_trans[min_spat:max_spat,:]
         sub_thismask = thismask_trans[min_spat:max_spat,:]
-        if do_crude: # First time tracing, do a trace crude
-            # NOTE: follow_centroid behaves differently from the old
-            # trace_crude_init within 2-4 pixels at the trace edge
-
-            # Construct the line trace by following the line centroid as
-            # a function of spatial position along the slit.
-            # TODO: This also returns error estimates and a mask, but
-            # those weren't used in the previous version of the code.
-            smsub_img = utils.boxcar_smooth_rows(sub_img, tcrude_nave, wgt=sub_inmask)
-#            ivar = np.sqrt(smsub_img)
-            ivar = None
-            tilts_guess_now, tge, tgm \
-                    = trace.follow_centroid(smsub_img,
-                                            (sub_img.shape[0]-1)//2, lines_spec[iline], ivar=ivar,
-                                            bpm=np.invert(sub_inmask.astype(bool)), width=3*fwhm,
-                                            maxshift_start=tcrude_maxshift0,
-                                            maxshift_follow=tcrude_maxshift,
-                                            maxerror=tcrude_maxerr, continuous=False)
-            tilts_guess_now = tilts_guess_now.flatten()
+        if do_crude:
+            s = min_spat - spat_min[iline]
+            tilts_guess_now = tilts_guess_crude[s:s+sub_img.shape[0],iline]
         else:
             # A guess was provided, use that as the crutch, but
             # determine if it is a full trace or a sub-trace
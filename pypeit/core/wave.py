@@ -7,7 +7,7 @@ import copy
 from matplotlib import pyplot as plt
 from matplotlib import gridspec
 
-from scipy import interpolate
+from scipy import interpolate, fft
 
 from astropy import units
 from astropy.coordinates import solar_system, ICRS
@@ -19,6 +19,7 @@ from linetools.spectra import xspectrum1d
 from pypeit import msgs
 from pypeit.core import arc
 from pypeit.core import qa
+from pypeit.core.wavecal import wvutils
 from pypeit import utils
 from IPython import embed
 
@@ -38,179 +39,301 @@ def load_sky_spectrum(sky_file):
     return sky_spec
 
 
-def flex_shift(obj_skyspec, arx_skyspec, mxshft=20):
-    """ Calculate shift between object sky spectrum and archive sky spectrum
+def sky_line_widths(wave, flux, nlines=5):
+    """ Measure the widths of the brightest emission lines in a sky spectrum
 
-    Parameters
-    ----------
-    obj_skyspec
-    arx_skyspec
+    Args:
+        wave (ndarray):
+            Wavelengths of the spectrum in Angstroms
+        flux (ndarray):
+            Flux of the spectrum
+        nlines (int, optional):
+            Number of the brightest lines to use
 
-    Returns
-    -------
-    flex_dict: dict
-      Contains flexure info
+    Returns:
+        tuple: The resolution (lambda/delta lambda_FWHM), the squared Gaussian
+        sigma in Angstroms**2, and the dispersion in Angstroms per pixel
+        for each of the brightest lines
     """
+    amp, amp_cont, cent, wid, _, w, yprep, nsig = arc.detect_lines(flux)
+    # Keep only the brightest amplitude lines (keep is array of
+    # indices within w of the brightest)
+    keep = np.argsort(amp[w])[-nlines:]
+    # Calculate wavelength (Angstrom per pixel)
+    disp = np.append(wave[1]-wave[0], wave[1:]-wave[:-1])
+    # Calculate resolution (lambda/delta lambda_FWHM)
+    idx = (cent+0.5).astype(int)[w][keep]   # The +0.5 is for rounding
+    res = wave[idx]/(disp[idx]*(2*np.sqrt(2*np.log(2)))*wid[w][keep])
+    sig2 = np.power(disp[idx]*wid[w][keep], 2)
+    return res, sig2, disp[idx]
 
-    # TODO None of these routines should have dependencies on XSpectrum1d!
 
+def smooth_sky_archive(arx_wave, arx_flux, smooth_sig_pix):
+    """ Smooth an archive sky spectrum to the resolution of the object spectra
 
-    # Determine the brightest emission lines
-    msgs.warn("If we use Paranal, cut down on wavelength early on")
-    arx_amp, arx_amp_cont, arx_cent, arx_wid, _, arx_w, arx_yprep, nsig = arc.detect_lines(arx_skyspec.flux.value)
-    obj_amp, obj_amp_cont, obj_cent, obj_wid, _, obj_w, obj_yprep, nsig_obj= arc.detect_lines(obj_skyspec.flux.value)
+    Args:
+        arx_wave (ndarray):
+            Wavelengths of the archive spectrum in Angstroms
+        arx_flux (ndarray):
+            Flux of the archive spectrum
+        smooth_sig_pix (float):
+            Gaussian sigma in archive pixels used to smooth the archive.
+            No smoothing is done if this is 0.
+
+    Returns:
+        ndarray: The smoothed flux of the archive
+    """
+    if smooth_sig_pix <= 0:
+        return arx_flux
+    arx_skyspec = xspectrum1d.XSpectrum1D.from_tuple((arx_wave, arx_flux))
+    return arx_skyspec.gauss_smooth(smooth_sig_pix*2*np.sqrt(2*np.log(2))).flux.value
 
-    # Keep only 5 brightest amplitude lines (xxx_keep is array of
-    # indices within arx_w of the 5 brightest)
-    arx_keep = np.argsort(arx_amp[arx_w])[-5:]
-    obj_keep = np.argsort(obj_amp[obj_w])[-5:]
 
-    # Calculate wavelength (Angstrom per pixel)
-    arx_disp = np.append(arx_skyspec.wavelength.value[1]-arx_skyspec.wavelength.value[0],
-                         arx_skyspec.wavelength.value[1:]-arx_skyspec.wavelength.value[:-1])
-    #arx_disp = (np.amax(arx_sky.wavelength.value)-np.amin(arx_sky.wavelength.value))/arx_sky.wavelength.size
-    obj_disp = np.append(obj_skyspec.wavelength.value[1]-obj_skyspec.wavelength.value[0],
-                         obj_skyspec.wavelength.value[1:]-obj_skyspec.wavelength.value[:-1])
-    #obj_disp = (np.amax(obj_sky.wavelength.value)-np.amin(obj_sky.wavelength.value))/obj_sky.wavelength.size
-
-    # Calculate resolution (lambda/delta lambda_FWHM)..maybe don't need
-    # this? can just use sigmas
-    arx_idx = (arx_cent+0.5).astype(np.int)[arx_w][arx_keep]   # The +0.5 is for rounding
-    arx_res = arx_skyspec.wavelength.value[arx_idx]/\
-              (arx_disp[arx_idx]*(2*np.sqrt(2*np.log(2)))*arx_wid[arx_w][arx_keep])
-    obj_idx = (obj_cent+0.5).astype(np.int)[obj_w][obj_keep]   # The +0.5 is for rounding
-    obj_res = obj_skyspec.wavelength.value[obj_idx]/ \
-              (obj_disp[obj_idx]*(2*np.sqrt(2*np.log(2)))*obj_wid[obj_w][obj_keep])
-    #obj_res = (obj_sky.wavelength.value[0]+(obj_disp*obj_cent[obj_w][obj_keep]))/(
-    #    obj_disp*(2*np.sqrt(2*np.log(2)))*obj_wid[obj_w][obj_keep])
-
-    if not np.all(np.isfinite(obj_res)):
-        msgs.warn('Failed to measure the resolution of the object spectrum, likely due to error '
-                   'in the wavelength image.')
+def prepare_sky_archive(arx_wave, arx_flux, wave_min, wave_max, nknots=20):
+    """ Prepare an archive sky spectrum for cross-correlation with object sky spectra
+
+    The archive, smoothed to the resolution of the object spectra by
+    :func:`smooth_sky_archive`, is trimmed to the wavelength range covered
+    by the objects, normalized to unit average sky count and the continuum
+    is removed with a b-spline fit.
+
+    Args:
+        arx_wave (ndarray):
+            Wavelengths of the archive spectrum in Angstroms
+        arx_flux (ndarray):
+            Smoothed flux of the archive spectrum
+        wave_min, wave_max (float):
+            Wavelength range covered by the object spectra
+        nknots (int, optional):
+            Approximate number of b-spline knots used for the continuum fit
+
+    Returns:
+        dict: The wavelengths, the normalized flux, and the normalized and
+        continuum subtracted flux of the archive; None if the archive cannot
+        be normalized.
+    """
+    # Keep a few pixels beyond the range used by the objects for the
+    # rebinning
+    indx = np.where((arx_wave >= wave_min) & (arx_wave <= wave_max))[0]
+    indx = np.arange(max(indx[0]-2, 0), min(indx[-1]+3, arx_wave.size))
+    wave = arx_wave[indx]
+    flux = arx_flux[indx]
+
+    # Normalize spectrum to unit average sky count
+    norm = np.sum(flux)/flux.size
+    if norm < 0.:
+        msgs.warn('Bad normalization of archive in flexure. You are probably using wavelengths '
+                  'well beyond the archive.')
         return None
-    msgs.info("Resolution of Archive={0} and Observation={1}".format(np.median(arx_res),
-                                                                     np.median(obj_res)))
+    flux = flux/norm
 
-    # Determine sigma of gaussian for smoothing
-    arx_sig2 = np.power(arx_disp[arx_idx]*arx_wid[arx_w][arx_keep], 2)
-    obj_sig2 = np.power(obj_disp[obj_idx]*obj_wid[obj_w][obj_keep], 2)
+    # Deal with underlying continuum
+    bspline_par = dict(everyn=flux.size//nknots)
+    mask, ct_arx = utils.robust_polyfit(wave, flux, 3, function='bspline', sigma=3.,
+                                        bspline_par=bspline_par)
+    return dict(wave=wave, flux=flux, flux_nocont=flux - utils.func_val(ct_arx, wave, 'bspline'))
 
-    arx_med_sig2 = np.median(arx_sig2)
-    obj_med_sig2 = np.median(obj_sig2)
 
-    if obj_med_sig2 >= arx_med_sig2:
-        smooth_sig = np.sqrt(obj_med_sig2-arx_med_sig2)  # Ang
-        smooth_sig_pix = smooth_sig / np.median(arx_disp[arx_idx])
-        arx_skyspec = arx_skyspec.gauss_smooth(smooth_sig_pix*2*np.sqrt(2*np.log(2)))
+def flex_shift_batch(obj_skyspecs, arx_skyspec, mxshft=20, smooth_step=0.05):
+    """ Calculate the shifts between a set of object sky spectra and an archive sky spectrum
+
+    The archive smoothed to the resolution of the objects (see
+    :func:`smooth_sky_archive`) is cached, keyed by the archive and the
+    smoothing only, such that it is reused for all the objects and masks
+    with the same resolution.  It is then trimmed to the wavelength range
+    of the objects (see :func:`prepare_sky_archive`) once per batch.  The
+    objects are cross-correlated with the archive in a single batched FFT
+    and the shift is refined to sub-pixel precision by fitting a parabola
+    to the peak of the correlation function.
+
+    Args:
+        obj_skyspecs (list):
+            List of XSpectrum1D objects with the object sky spectra
+        arx_skyspec (str, XSpectrum1D):
+            Archive sky spectrum or the name of the file with it
+        mxshft (int, optional):
+            Maximum allowed shift in pixels
+        smooth_step (float, optional):
+            The Gaussian sigma (in archive pixels) used to smooth the archive
+            to the resolution of each object is rounded to a multiple of this
+            step, such that objects with nearly the same resolution share the
+            prepared archive.
+
+    Returns:
+        list: The dictionaries with the flexure information for each
+        object; an element is None if the shift could not be measured.
+    """
+    if isinstance(arx_skyspec, str):
+        arx_key = (arx_skyspec,)
+        arx_skyspec = wvutils.arxiv_cached(('flexure_sky', arx_skyspec), load_sky_spectrum,
+                                           arx_skyspec)
+        arx_wave = arx_skyspec.wavelength.value
+        arx_flux = arx_skyspec.flux.value
     else:
-        msgs.warn("Prefer archival sky spectrum to have higher resolution")
-        smooth_sig_pix = 0.
-        msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
-        #smooth_sig = np.sqrt(arx_med_sig**2-obj_med_sig**2)
-
-    #Determine region of wavelength overlap
-    min_wave = max(np.amin(arx_skyspec.wavelength.value), np.amin(obj_skyspec.wavelength.value))
-    max_wave = min(np.amax(arx_skyspec.wavelength.value), np.amax(obj_skyspec.wavelength.value))
-
-    #Smooth higher resolution spectrum by smooth_sig (flux is conserved!)
-#    if np.median(obj_res) >= np.median(arx_res):
-#        msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
-        #obj_sky_newflux = ndimage.gaussian_filter(obj_sky.flux, smooth_sig)
-#    else:
-        #tmp = ndimage.gaussian_filter(arx_sky.flux, smooth_sig)
-#        arx_skyspec = arx_skyspec.gauss_smooth(smooth_sig_pix*2*np.sqrt(2*np.log(2)))
-        #arx_sky.flux = ndimage.gaussian_filter(arx_sky.flux, smooth_sig)
-
-    # Define wavelengths of overlapping spectra
-    keep_idx = np.where((obj_skyspec.wavelength.value>=min_wave) &
-                         (obj_skyspec.wavelength.value<=max_wave))[0]
-    #keep_wave = [i for i in obj_sky.wavelength.value if i>=min_wave if i<=max_wave]
-
-    #Rebin both spectra onto overlapped wavelength range
-    if len(keep_idx) <= 50:
-        msgs.warn("Not enough overlap between sky spectra")
-        return None
-    else: #rebin onto object ALWAYS
-        keep_wave = obj_skyspec.wavelength[keep_idx]
-        arx_skyspec = arx_skyspec.rebin(keep_wave)
-        obj_skyspec = obj_skyspec.rebin(keep_wave)
+        arx_wave = arx_skyspec.wavelength.value
+        arx_flux = arx_skyspec.flux.value
+        arx_key = wvutils.array_key(arx_wave) + wvutils.array_key(arx_flux)
+
+    # Determine the brightest emission lines in the archive
+    arx_res, arx_sig2, arx_disp = wvutils.arxiv_cached(('flexure_lines',) + arx_key,
+                                                       sky_line_widths, arx_wave, arx_flux)
+    arx_med_sig2 = np.median(arx_sig2)
+
+    # Resolution and wavelength overlap for each object
+    nobj = len(obj_skyspecs)
+    smooth_sig_pix = np.zeros(nobj, dtype=float)
+    keep_idx = [None]*nobj
+    for i, obj_skyspec in enumerate(obj_skyspecs):
+        obj_wave = obj_skyspec.wavelength.value
+        obj_res, obj_sig2, obj_disp = sky_line_widths(obj_wave, obj_skyspec.flux.value)
+        if not np.all(np.isfinite(obj_res)):
+            msgs.warn('Failed to measure the resolution of the object spectrum, likely due to '
+                      'error in the wavelength image.')
+            continue
+        msgs.info("Resolution of Archive={0} and Observation={1}".format(np.median(arx_res),
+                                                                         np.median(obj_res)))
+        # Determine sigma of gaussian for smoothing
+        obj_med_sig2 = np.median(obj_sig2)
+        if obj_med_sig2 >= arx_med_sig2:
+            smooth_sig = np.sqrt(obj_med_sig2-arx_med_sig2)  # Ang
+            smooth_sig_pix[i] = smooth_step*np.round(smooth_sig/np.median(arx_disp)/smooth_step)
+        else:
+            msgs.warn("Prefer archival sky spectrum to have higher resolution")
+            msgs.warn("New Sky has higher resolution than Archive.  Not smoothing")
+
+        # Determine region of wavelength overlap
+        min_wave = max(np.amin(arx_wave), np.amin(obj_wave))
+        max_wave = min(np.amax(arx_wave), np.amax(obj_wave))
+        indx = np.where((obj_wave >= min_wave) & (obj_wave <= max_wave))[0]
+        if len(indx) <= 50:
+            msgs.warn("Not enough overlap between sky spectra")
+            continue
+        keep_idx[i] = indx
+
+    good = np.array([indx is not None for indx in keep_idx])
+    flex_dicts = [None]*nobj
+    if not np.any(good):
+        return flex_dicts
+    wave_min = min(obj_skyspecs[i].wavelength.value[keep_idx[i][0]] for i in np.where(good)[0])
+    wave_max = max(obj_skyspecs[i].wavelength.value[keep_idx[i][-1]] for i in np.where(good)[0])
+
+    # Rebin, normalize and remove the continuum of each object and of
+    # the prepared archive
+    arx_specs = [None]*nobj
+    sky_specs = [None]*nobj
+    arx_sky_flux = [None]*nobj
+    obj_sky_flux = [None]*nobj
+    arx_prepared = {}
+    for i in np.where(good)[0]:
+        if smooth_sig_pix[i] not in arx_prepared:
+            arx_smooth = wvutils.arxiv_cached(('flexure_archive',) + arx_key + (smooth_sig_pix[i],),
+                                              smooth_sky_archive, arx_wave, arx_flux,
+                                              smooth_sig_pix[i])
+            arx_prepared[smooth_sig_pix[i]] = prepare_sky_archive(arx_wave, arx_smooth, wave_min,
+                                                                  wave_max)
+        arx = arx_prepared[smooth_sig_pix[i]]
+        if arx is None:
+            good[i] = False
+            continue
+
+        # Rebin onto object ALWAYS
+        keep_wave = obj_skyspecs[i].wavelength[keep_idx[i]]
+        obj_skyspec = obj_skyspecs[i].rebin(keep_wave)
+        arx_skyspec = xspectrum1d.XSpectrum1D.from_tuple((arx['wave'], arx['flux'])).rebin(keep_wave)
+        arx_nocont = xspectrum1d.XSpectrum1D.from_tuple((arx['wave'], arx['flux_nocont'])
+                                                        ).rebin(keep_wave).flux.value
         # Trim edges (rebinning is junk there)
-        arx_skyspec.data['flux'][0,:2] = 0.
-        arx_skyspec.data['flux'][0,-2:] = 0.
         obj_skyspec.data['flux'][0,:2] = 0.
         obj_skyspec.data['flux'][0,-2:] = 0.
+        arx_skyspec.data['flux'][0,:2] = 0.
+        arx_skyspec.data['flux'][0,-2:] = 0.
+        arx_nocont[:2] = 0.
+        arx_nocont[-2:] = 0.
 
-    # Normalize spectra to unit average sky count
-    norm = np.sum(obj_skyspec.flux.value)/obj_skyspec.npix
-    obj_skyspec.flux = obj_skyspec.flux / norm
-    norm2 = np.sum(arx_skyspec.flux.value)/arx_skyspec.npix
-    arx_skyspec.flux = arx_skyspec.flux / norm2
-    if (norm < 0.):
-        msgs.warn("Bad normalization of object in flexure algorithm")
-        msgs.warn("Will try the median")
-        norm = np.median(obj_skyspec.flux.value)
+        # Normalize spectrum to unit average sky count
+        norm = np.sum(obj_skyspec.flux.value)/obj_skyspec.npix
+        obj_skyspec.flux = obj_skyspec.flux / norm
         if (norm < 0.):
-            msgs.warn("Improper sky spectrum for flexure.  Is it too faint??")
-            return None
-    if (norm2 < 0.):
-        msgs.warn('Bad normalization of archive in flexure. You are probably using wavelengths '
-                   'well beyond the archive.')
-        return None
-
-    # Deal with bad pixels
-    msgs.work("Need to mask bad pixels")
+            msgs.warn("Bad normalization of object in flexure algorithm")
+            msgs.warn("Will try the median")
+            norm = np.median(obj_skyspec.flux.value)
+            if (norm < 0.):
+                msgs.warn("Improper sky spectrum for flexure.  Is it too faint??")
+                good[i] = False
+                continue
 
-    # Deal with underlying continuum
-    msgs.work("Consider taking median first [5 pixel]")
-    everyn = obj_skyspec.npix // 20
-    bspline_par = dict(everyn=everyn)
-    mask, ct = utils.robust_polyfit(obj_skyspec.wavelength.value, obj_skyspec.flux.value, 3,
-                                    function='bspline', sigma=3., bspline_par=bspline_par)
-    obj_sky_cont = utils.func_val(ct, obj_skyspec.wavelength.value, 'bspline')
-    obj_sky_flux = obj_skyspec.flux.value - obj_sky_cont
-    mask, ct_arx = utils.robust_polyfit(arx_skyspec.wavelength.value, arx_skyspec.flux.value, 3,
+        # Deal with underlying continuum
+        everyn = obj_skyspec.npix // 20
+        bspline_par = dict(everyn=everyn)
+        mask, ct = utils.robust_polyfit(obj_skyspec.wavelength.value, obj_skyspec.flux.value, 3,
                                         function='bspline', sigma=3., bspline_par=bspline_par)
-    arx_sky_cont = utils.func_val(ct_arx, arx_skyspec.wavelength.value, 'bspline')
-    arx_sky_flux = arx_skyspec.flux.value - arx_sky_cont
-
-    # Consider sharpness filtering (e.g. LowRedux)
-    msgs.work("Consider taking median first [5 pixel]")
-
-    #Cross correlation of spectra
-    #corr = np.correlate(arx_skyspec.flux, obj_skyspec.flux, "same")
-    corr = np.correlate(arx_sky_flux, obj_sky_flux, "same")
-
-    #Create array around the max of the correlation function for fitting for subpixel max
-    # Restrict to pixels within maxshift of zero lag
-    lag0 = corr.size//2
-    #mxshft = settings.argflag['reduce']['flexure']['maxshift']
-    max_corr = np.argmax(corr[lag0-mxshft:lag0+mxshft]) + lag0-mxshft
-    subpix_grid = np.linspace(max_corr-3., max_corr+3., 7)
-
-    #Fit a 2-degree polynomial to peak of correlation function. JFH added this if/else to not crash for bad slits
-    if np.any(np.isfinite(corr[subpix_grid.astype(np.int)])):
-        fit = utils.func_fit(subpix_grid, corr[subpix_grid.astype(np.int)], 'polynomial', 2)
-        success = True
-        max_fit = -0.5 * fit[1] / fit[2]
-    else:
-        fit = utils.func_fit(subpix_grid, 0.0*subpix_grid, 'polynomial', 2)
-        success = False
-        max_fit = 0.0
-        msgs.warn('Flexure compensation failed for one of your objects')
-
-
-    #Calculate and apply shift in wavelength
-    shift = float(max_fit)-lag0
-    msgs.info("Flexure correction of {:g} pixels".format(shift))
-    #model = (fit[2]*(subpix_grid**2.))+(fit[1]*subpix_grid)+fit[0]
-
-    flex_dict = dict(polyfit=fit, shift=shift, subpix=subpix_grid,
-                     corr=corr[subpix_grid.astype(np.int)],
-                     sky_spec=obj_skyspec,
-                     arx_spec=arx_skyspec,
-                     corr_cen=corr.size/2, smooth=smooth_sig_pix, success=success)
-    # Return
-    return flex_dict
+        obj_sky_cont = utils.func_val(ct, obj_skyspec.wavelength.value, 'bspline')
+        obj_sky_flux[i] = obj_skyspec.flux.value - obj_sky_cont
+        arx_sky_flux[i] = arx_nocont
+        sky_specs[i] = obj_skyspec
+        arx_specs[i] = arx_skyspec
+
+    # Cross-correlate all the spectra in a single FFT
+    gdobj = np.where(good)[0]
+    if len(gdobj) == 0:
+        return flex_dicts
+    npix = np.array([obj_sky_flux[i].size for i in gdobj])
+    nfft = fft.next_fast_len(2*npix.max()-1)
+    arx_fft = fft.rfft(np.array([np.pad(arx_sky_flux[i], (0, nfft-n))
+                                       for i, n in zip(gdobj, npix)]), axis=1)
+    obj_fft = fft.rfft(np.array([np.pad(obj_sky_flux[i], (0, nfft-n))
+                                       for i, n in zip(gdobj, npix)]), axis=1)
+    corr_all = fft.irfft(arx_fft*np.conj(obj_fft), nfft, axis=1)
+
+    for j, (i, n) in enumerate(zip(gdobj, npix)):
+        # Correlation at each lag, ordered as by np.correlate with
+        # mode='same'; zero lag is at the center
+        lag0 = n//2
+        corr = corr_all[j,(np.arange(n)-lag0) % nfft]
+
+        #Create array around the max of the correlation function for fitting for subpixel max
+        # Restrict to pixels within maxshift of zero lag
+        max_corr = np.argmax(corr[lag0-mxshft:lag0+mxshft]) + lag0-mxshft
+        subpix_grid = np.linspace(max_corr-3., max_corr+3., 7)
+
+        #Fit a 2-degree polynomial to peak of correlation function. JFH added this if/else to not crash for bad slits
+        if np.any(np.isfinite(corr[subpix_grid.astype(int)])):
+            fit = utils.func_fit(subpix_grid, corr[subpix_grid.astype(int)], 'polynomial', 2)
+            success = True
+            max_fit = -0.5 * fit[1] / fit[2]
+        else:
+            fit = utils.func_fit(subpix_grid, 0.0*subpix_grid, 'polynomial', 2)
+            success = False
+            max_fit = 0.0
+            msgs.warn('Flexure compensation failed for one of your objects')
+
+        #Calculate and apply shift in wavelength
+        shift = float(max_fit)-lag0
+        msgs.info("Flexure correction of {:g} pixels".format(shift))
+
+        flex_dicts[i] = dict(polyfit=fit, shift=shift, subpix=subpix_grid,
+                             corr=corr[subpix_grid.astype(int)], sky_spec=sky_specs[i],
+                             arx_spec=arx_specs[i], corr_cen=corr.size/2,
+                             smooth=smooth_sig_pix[i], success=success)
+    return flex_dicts
+
+
+def flex_shift(obj_skyspec, arx_skyspec, mxshft=20):
+    """ Calculate shift between object sky spectrum and archive sky spectrum
+
+    See :func:`flex_shift_batch`.
+
+    Parameters
+    ----------
+    obj_skyspec
+    arx_skyspec
+
+    Returns
+    -------
+    flex_dict: dict
+      Contains flexure info
+    """
+    return flex_shift_batch([obj_skyspec], arx_skyspec, mxshft=mxshft)[0]
 
 
 #def flexure_slit():
@@ -272,7 +395,7 @@ def flexure_obj(specobjs, maskslits, method, sky_file, mxshft=None):
         sky_file (str):
             Sky file
         mxshft (int, optional):
-            Passed to flex_shift()
+            Passed to flex_shift_batch()
 
     Returns:
         list:  list of dicts containing flexure results
@@ -281,12 +404,27 @@ def flexure_obj(specobjs, maskslits, method, sky_file, mxshft=None):
     """
     sv_fdict = None
     msgs.work("Consider doing 2 passes in flexure as in LowRedux")
-    # Load Archive
-    sky_spectrum = load_sky_spectrum(sky_file)
 
     nslits = len(maskslits)
     gdslits = np.where(~maskslits)[0]
 
+    # Collect the sky spectra of all objects and compute their shifts
+    # together; the archive is only prepared once.
+    obj_skys = []
+    for slit in gdslits:
+        for specobj in specobjs[specobjs.slitorder_indices(slit)]:
+            if specobj is None or len(specobj._data.keys()) == 1:
+                continue
+            # Using boxcar
+            if method in ['boxcar', 'slitcen']:
+                sky_wave = specobj.BOX_WAVE #.to('AA').value
+                sky_flux = specobj.BOX_COUNTS_SKY
+            else:
+                msgs.error("Not ready for this flexure method: {}".format(method))
+            # Generate 1D spectrum for object
+            obj_skys.append(xspectrum1d.XSpectrum1D.from_tuple((sky_wave, sky_flux)))
+    all_fdicts = flex_shift_batch(obj_skys, sky_file, mxshft=mxshft)[::-1]
+
     # Loop on objects
     flex_list = []
 
@@ -307,24 +445,19 @@ def flexure_obj(specobjs, maskslits, method, sky_file, mxshft=None):
         if slit not in gdslits:
             flex_list.append(flex_dict.copy())
             continue
+        # Shifts of all the objects in this slit
+        fdicts = [all_fdicts.pop() for specobj in this_specobjs
+                    if specobj is not None and len(specobj._data.keys()) > 1]
         for ss, specobj in enumerate(this_specobjs):
             if specobj is None:
                 continue
             if len(specobj._data.keys()) == 1:  # Nothing extracted; only the trace exists
                 continue
             msgs.info("Working on flexure for object # {:d}".format(specobj.OBJID) + "in slit # {:d}".format(specobj.SLITID))
-            # Using boxcar
-            if method in ['boxcar', 'slitcen']:
-                sky_wave = specobj.BOX_WAVE #.to('AA').value
-                sky_flux = specobj.BOX_COUNTS_SKY
-            else:
-                msgs.error("Not ready for this flexure method: {}".format(method))
-
-            # Generate 1D spectrum for object
-            obj_sky = xspectrum1d.XSpectrum1D.from_tuple((sky_wave, sky_flux))
+            sky_wave = specobj.BOX_WAVE #.to('AA').value
 
-            # Calculate the shift
-            fdict = flex_shift(obj_sky, sky_spectrum, mxshft=mxshft)
+            # The shift
+            fdict = fdicts.pop(0)
             punt = False
             if fdict is None:
                 msgs.warn("Flexure shift calculation failed for this spectrum.")
@@ -511,6 +511,31 @@ def semi_brute(spec, lines, wv_cen, disp, sigdetect=30., nonlinear_counts = 1e10
     return best_dict, final_fit
 
 
+def arxiv_line_detections(spec_arxiv, sigdetect=5.0, nonlinear_counts=1e10, fwhm=4.0, debug=False):
+    """ Detect the arc lines in a set of archival arc spectra
+
+    Parameters
+    ----------
+    spec_arxiv:  float ndarray shape (nspec, narxiv)
+       Collection of archival arc spectra
+
+    sigdetect, nonlinear_counts, fwhm, debug:
+       See :func:`pypeit.core.wavecal.wvutils.arc_lines_from_spec`
+
+    Returns
+    -------
+    det_arxiv: dict
+       The pixel locations of the lines detected in each archival spectrum, with keys '0', '1', ... up to
+       str(narxiv-1). See :func:`reidentify`.
+    """
+    det_arxiv = {}
+    for iarxiv in range(spec_arxiv.shape[1]):
+        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, spec_cont_sub_now = wvutils.arc_lines_from_spec(
+            spec_arxiv[:,iarxiv], sigdetect=sigdetect,nonlinear_counts=nonlinear_counts, fwhm = fwhm, debug = debug)
+        det_arxiv[str(iarxiv)] = tcent_arxiv[icut_arxiv]
+    return det_arxiv
+
+
 def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, det_arxiv=None, detections=None, cc_thresh=0.8,cc_local_thresh = 0.8,
                match_toler=2.0, nlocal_cc=11, nonlinear_counts=1e10,sigdetect=5.0,fwhm=4.0,
                debug_xcorr=False, debug_reid=False, debug_peaks = False):
@@ -645,19 +670,16 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     if detections is None:
         detections = tcent[icut]
 
-    spec_arxiv_cont_sub = np.zeros_like(spec_arxiv)
-
-    # Search for lines no matter what to continuum subtract the arxiv arc, also determine the central wavelength and
-    # dispersion of wavelength arxiv
-    det_arxiv1 = {}
-    for iarxiv in range(narxiv):
-        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, spec_cont_sub_now = wvutils.arc_lines_from_spec(
-            spec_arxiv[:,iarxiv], sigdetect=sigdetect,nonlinear_counts=nonlinear_counts, fwhm = fwhm, debug = debug_peaks)
-        spec_arxiv_cont_sub[:,iarxiv] = spec_cont_sub_now
-        det_arxiv1[str(iarxiv)] = tcent_arxiv[icut_arxiv]
-
+    # If the arxiv line detections were not passed in measure them. The detections are computed only once for all the
+    # spectra compared to the same arxiv.
     if det_arxiv is None:
-        det_arxiv = det_arxiv1
+        if debug_peaks:
+            det_arxiv = arxiv_line_detections(spec_arxiv, sigdetect=sigdetect, nonlinear_counts=nonlinear_counts,
+                                              fwhm=fwhm, debug=debug_peaks)
+        else:
+            det_arxiv = wvutils.arxiv_cached(('lines', wvutils.array_key(spec_arxiv), sigdetect, nonlinear_counts, fwhm),
+                                             arxiv_line_detections, spec_arxiv, sigdetect=sigdetect,
+                                             nonlinear_counts=nonlinear_counts, fwhm=fwhm)
 
     wvc_arxiv = np.zeros(narxiv, dtype=float)
     disp_arxiv = np.zeros(narxiv, dtype=float)
@@ -681,16 +703,16 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     shift_vec = np.zeros(narxiv)
     stretch_vec = np.zeros(narxiv)
     ccorr_vec = np.zeros(narxiv)
+    msgs.info('Cross-correlating with {:d} arxiv slits'.format(narxiv))
+    # Match the peaks between the spectrum and all the arxiv spectra. This code attempts to compute the stretch if
+    # cc > cc_thresh
+    success_vec, shift_vec, stretch_vec, ccorr_vec, _, _ = \
+        wvutils.xcorr_shift_stretch_arxiv(spec_cont_sub, spec_arxiv, cc_thresh=cc_thresh, fwhm=fwhm,
+                                          seed=random_state, debug=debug_xcorr)
     for iarxiv in range(narxiv):
-        msgs.info('Cross-correlating with arxiv slit # {:d}'.format(iarxiv))
         this_det_arxiv = det_arxiv[str(iarxiv)]
-        # Match the peaks between the two spectra. This code attempts to compute the stretch if cc > cc_thresh
-        success, shift_vec[iarxiv], stretch_vec[iarxiv], ccorr_vec[iarxiv], _, _ = \
-            wvutils.xcorr_shift_stretch(spec_cont_sub, spec_arxiv[:, iarxiv],
-                                        cc_thresh=cc_thresh, fwhm=fwhm, seed=random_state,
-                                        debug=debug_xcorr)
         # If cc < cc_thresh or if this optimization failed, don't reidentify from this arxiv spectrum
-        if success != 1:
+        if success_vec[iarxiv] != 1:
             continue
         # Estimate wcen and disp for this slit based on its shift/stretch relative to the archive slit
         disp[iarxiv] = disp_arxiv[iarxiv] / stretch_vec[iarxiv]
@@ -743,21 +765,21 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
         corr_local[denom > 0] = prod_smooth[denom > 0]/denom[denom > 0]
         corr_local[denom == 0.0] = -1.0
 
-        # Loop over the current slit line pixel detections and find the nearest arxiv spectrum line
-        for iline in range(detections.size):
-            # match to pixel in shifted/stretch arxiv spectrum
-            pdiff = np.abs(detections[iline] - det_arxiv_ss)
-            bstpx = np.argmin(pdiff)
-            # If a match is found within 2 pixels, consider this a successful match
-            if pdiff[bstpx] < match_toler:
-                # Using the arxiv arc wavelength solution, search for the nearest line in the line list
-                bstwv = np.abs(wvdata - wvval_arxiv[bstpx])
-                # This is a good wavelength match if it is within match_toler disperion elements
-                if bstwv[np.argmin(bstwv)] < match_toler*disp_arxiv[iarxiv]:
-                    line_indx = np.append(line_indx, np.argmin(bstwv))  # index in the line list array wvdata of this match
-                    det_indx = np.append(det_indx, iline)             # index of this line in the detected line array detections
-                    line_cc = np.append(line_cc,np.interp(detections[iline],xrng,corr_local)) # local cross-correlation at this match
-                    line_iarxiv = np.append(line_iarxiv,iarxiv)
+        # For all the current slit line pixel detections, find the nearest arxiv spectrum line
+        # match to pixel in shifted/stretch arxiv spectrum
+        pdiff = np.abs(detections[:,None] - det_arxiv_ss[None,:])
+        bstpx = np.argmin(pdiff, axis=1)
+        # If a match is found within 2 pixels, consider this a successful match
+        good = pdiff[np.arange(detections.size),bstpx] < match_toler
+        # Using the arxiv arc wavelength solution, search for the nearest line in the line list
+        bstwv = np.abs(wvdata[None,:] - wvval_arxiv[bstpx][:,None])
+        bstline = np.argmin(bstwv, axis=1)
+        # This is a good wavelength match if it is within match_toler disperion elements
+        good &= bstwv[np.arange(detections.size),bstline] < match_toler*disp_arxiv[iarxiv]
+        line_indx = np.append(line_indx, bstline[good])  # index in the line list array wvdata of this match
+        det_indx = np.append(det_indx, np.where(good)[0])  # index of this line in the detected line array detections
+        line_cc = np.append(line_cc,np.interp(detections[good],xrng,corr_local)) # local cross-correlation at this match
+        line_iarxiv = np.append(line_iarxiv,np.full(np.sum(good), iarxiv))
 
     narxiv_used = np.sum(wcen != 0.0)
     # Initialise the patterns dictionary, sigdetect not used anywhere
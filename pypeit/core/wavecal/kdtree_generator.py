@@ -230,9 +230,8 @@ def hexagon(linelist, numsrch, maxlin):
     return pattern, index
 
 
-def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30, verbose=False,
-         ret_treeindx=False, outname=None, ):
-    """Driving method for generating the KD Tree
+def generate_patterns(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, verbose=False):
+    """Generate the patterns of the ThAr linelist that are stored in the KD Tree
 
     Parameters
     ----------
@@ -244,8 +243,14 @@ def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30,
       Over how many Angstroms is the solution deemed to be linear
     use_unknowns : bool
       Include unknown lines in the wavelength calibration (these may arise from lines other than Th I/II and Ar I/II)
-    leafsize : int
-      The leaf size of the tree
+
+    Returns
+    -------
+    pattern : ndarray
+      The patterns
+    index : ndarray
+      For each pattern, the corresponding indices in the linelist.
+      None is returned for both if polygon is not supported.
     """
 
     # Load the ThAr linelist
@@ -265,18 +270,42 @@ def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30,
 
     if polygon == 3:
         if verbose: print("Generating patterns for a trigon")
-        pattern, index = trigon(wvdata, numsearch, maxlinear)
+        return trigon(wvdata, numsearch, maxlinear)
     elif polygon == 4:
         if verbose: print("Generating patterns for a tetragon")
-        pattern, index = tetragon(wvdata, numsearch, maxlinear)
+        return tetragon(wvdata, numsearch, maxlinear)
     elif polygon == 5:
         if verbose: print("Generating patterns for a pentagon")
-        pattern, index = pentagon(wvdata, numsearch, maxlinear)
+        return pentagon(wvdata, numsearch, maxlinear)
     elif polygon == 6:
         if verbose: print("Generating patterns for a hexagon")
-        pattern, index = hexagon(wvdata, numsearch, maxlinear)
+        return hexagon(wvdata, numsearch, maxlinear)
     else:
         if verbose: print("Patterns can only be generated with 3 <= polygon <= 6")
+        return None, None
+
+
+def main(polygon, numsearch=8, maxlinear=100.0, use_unknowns=True, leafsize=30, verbose=False,
+         ret_treeindx=False, outname=None, ):
+    """Driving method for generating the KD Tree
+
+    Parameters
+    ----------
+    polygon : int
+      Number of sides to the polygon used in pattern matching
+    numsearch : int
+      Number of adjacent lines to use when deriving patterns
+    maxlinear : float
+      Over how many Angstroms is the solution deemed to be linear
+    use_unknowns : bool
+      Include unknown lines in the wavelength calibration (these may arise from lines other than Th I/II and Ar I/II)
+    leafsize : int
+      The leaf size of the tree
+    """
+
+    pattern, index = generate_patterns(polygon, numsearch=numsearch, maxlinear=maxlinear,
+                                       use_unknowns=use_unknowns, verbose=verbose)
+    if pattern is None:
         return None
 
     if outname is None:
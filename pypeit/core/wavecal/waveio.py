@@ -3,10 +3,18 @@
 import glob
 import os
 import datetime
+import hashlib
+import pickle
+import shutil
+import tempfile
 from pkg_resources import resource_filename
 from collections import OrderedDict
 
 import numpy as np
+import scipy
+from scipy.spatial import cKDTree
+
+import astropy
 
 from astropy.table import Table, Column, vstack
 from astropy.io import fits
@@ -24,6 +32,103 @@ line_path = resource_filename('pypeit', '/data/arc_lines/lists/')
 nist_path = resource_filename('pypeit','/data/arc_lines/NIST/')
 reid_arxiv_path = resource_filename('pypeit','/data/arc_lines/reid_arxiv/')
 
+# Local, on-disk cache of the products built from the arc line data files
+# (line lists, archived wavelength solutions, KD trees).  Set to None, or
+# set the PYPEIT_CACHE environment variable to an empty string, to disable
+# the cache; see also the use_cache parameter of ReduxPar.
+cache_path = os.getenv('PYPEIT_CACHE', os.path.join(os.path.expanduser('~'), '.pypeit', 'cache')) \
+                or None
+cache_version = 1
+"""
+Version of the cache format; change it to invalidate all cached products.
+"""
+
+
+def cache_key(files, *args, **kwargs):
+    """
+    Unique key for a product built from a set of data files.
+
+    The key is the SHA1 digest of the cache version, the versions of the
+    libraries that define the format of the cached products, the
+    content of the files, and the arguments used to build the product.
+
+    Args:
+        files (:obj:`list`):
+            Data files the product is built from.
+        *args, **kwargs:
+            Arguments used to build the product.
+
+    Returns:
+        :obj:`str`: The hexadecimal digest.
+    """
+    sha = hashlib.sha1(repr((cache_version, np.__version__, scipy.__version__, astropy.__version__,
+                             args, sorted(kwargs.items()))).encode())
+    for f in files:
+        with open(f, 'rb') as fh:
+            sha.update(fh.read())
+    return sha.hexdigest()
+
+
+def cache_product_path(name, files, *args, **kwargs):
+    """
+    Path in the cache of a product built from a set of data files.
+
+    Args:
+        name (:obj:`str`):
+            Root name of the product.
+        files (:obj:`list`):
+            Data files the product is built from.
+        *args, **kwargs:
+            Arguments used to build the product; see :func:`cache_key`.
+
+    Returns:
+        :obj:`str`: The path, or None if the cache is disabled or one
+        of the files does not exist.
+    """
+    if cache_path is None or not all([os.path.isfile(f) for f in files]):
+        return None
+    return os.path.join(cache_path, '{0}_{1}'.format(name, cache_key(files, *args, **kwargs)))
+
+
+def load_cached(name, files, func, *args, **kwargs):
+    """
+    Return ``func(*args, **kwargs)``, reading it from the cache if the
+    product was built before from the same files and arguments.
+
+    The product is pickled to the cache.  Files are written atomically,
+    so the cache can be shared by concurrent processes.
+
+    Args:
+        name (:obj:`str`):
+            Root name of the product.
+        files (:obj:`list`):
+            Data files the product is built from.
+        func (callable):
+            Function that builds the product.
+        *args, **kwargs:
+            Arguments passed to `func`.
+
+    Returns:
+        The product.
+    """
+    ofile = cache_product_path(name, files, *args, **kwargs)
+    if ofile is not None and os.path.isfile(ofile + '.pkl'):
+        try:
+            with open(ofile + '.pkl', 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            msgs.warn('Could not read cached {0}: {1}'.format(name, e))
+    product = func(*args, **kwargs)
+    if ofile is not None:
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=cache_path, delete=False) as f:
+                pickle.dump(product, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, ofile + '.pkl')
+        except OSError as e:
+            msgs.warn('Could not cache {0}: {1}'.format(name, e))
+    return product
+
 
 # TODO -- Move this to the WaveCalib object
 def load_wavelength_calibration(filename):
@@ -78,6 +183,23 @@ def load_template(arxiv_file, det):
         calibfile = os.path.join(reid_arxiv_path, arxiv_file)
     else:
         calibfile = arxiv_file
+    return load_cached('template', [calibfile], read_template, calibfile, det)
+
+
+def read_template(calibfile, det):
+    """
+    Read a full template file
+
+    Args:
+        calibfile: str
+        det: int
+
+    Returns:
+        wave: ndarray
+        flux: ndarray
+        binning: int, Of the template arc spectrum
+
+    """
     # Read me
     tbl = Table.read(calibfile)
     # Parse on detector?
@@ -103,6 +225,20 @@ def load_reid_arxiv(arxiv_file):
     """
     # ToDO put in some code to allow user specified files rather than everything in the main directory
     calibfile = os.path.join(reid_arxiv_path, arxiv_file)
+    return load_cached('reid_arxiv', [calibfile], read_reid_arxiv, calibfile)
+
+
+def read_reid_arxiv(calibfile):
+    """
+    Read a REID arxiv file
+
+    Args:
+        calibfile (str):
+
+    Returns:
+        dict, dict-like:
+
+    """
     # This is a hack as it will fail if we change the data model yet again for wavelength solutions
     if calibfile[-4:] == 'json':
         wv_calib_arxiv = load_wavelength_calibration(calibfile)
@@ -259,8 +395,8 @@ def load_line_lists(lines, unknown=False, skip=False, all=False, NIST=False):
             i1 = line_file.rfind('_')
             lines.append(line_file[i0+1:i1])
 
-    # Read standard files
-    lists = []
+    # Find the standard files
+    line_files = []
     for line in lines:
         if NIST:
             line_file = nist_path+'{:s}_vacuum.ascii'.format(line)
@@ -271,10 +407,36 @@ def load_line_lists(lines, unknown=False, skip=False, all=False, NIST=False):
                 import pdb; pdb.set_trace()
                 raise IOError("Input line {:s} is not included in arclines".format(line))
         else:
-            lists.append(load_line_list(line_file, NIST=NIST))
-    # Stack
-    if len(lists) == 0:
+            line_files.append(line_file)
+    if len(line_files) == 0:
         return None
+
+    # Read them, or their cached stack
+    files = line_files + [line_path+'UNKNWNs.dat'] if unknown else line_files
+    return load_cached('line_lists', files, stack_line_lists, line_files, lines, unknown=unknown, NIST=NIST)
+
+
+def stack_line_lists(line_files, lines, unknown=False, NIST=False):
+    """
+    Read and stack a series of line list files
+
+    Parameters
+    ----------
+    line_files : list
+        Line list files
+    lines : list
+        Lines; used to restrict the unknown lines
+    unknown : bool, optional
+    NIST : bool, optional
+        NIST formatted files?
+
+    Returns
+    -------
+    line_list : Table
+
+    """
+    lists = [load_line_list(line_file, NIST=NIST) for line_file in line_files]
+    # Stack
     line_lists = vstack(lists, join_type='exact')
 
     # Unknown
@@ -336,27 +498,97 @@ def load_tree(polygon=4, numsearch=20):
         corresponding index in the linelist
     """
 
-    # TODO: Can we save these as fits files instead?
+    # The built trees are cached, keyed by the ThAr linelist used to
+    # generate them
+    tree_path = cache_product_path('ThAr_patterns_poly{0:d}_search{1:d}'.format(polygon, numsearch),
+                                   [os.path.join(line_path, 'ThAr_lines.dat')])
+    if tree_path is not None and os.path.isdir(tree_path):
+        try:
+            return load_tree_cache(tree_path)
+        except Exception as e:
+            # Any problem with the cached files is a cache miss
+            msgs.warn('Could not read cached KDTree: {0}'.format(e))
+            shutil.rmtree(tree_path, ignore_errors=True)
+
     # TODO: Use os.path.join
-    # TODO: Please don't use imports within functions
-    import pickle
     filename = pypeit.__path__[0] +\
                '/data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.kdtree'.format(polygon, numsearch)
     fileindx = pypeit.__path__[0] +\
                '/data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.index.npy'.format(polygon, numsearch)
-    try:
+    if os.path.isfile(filename) and os.path.isfile(fileindx):
         file_load = pickle.load(open(filename, 'rb'))
         index = np.load(fileindx)
-    except FileNotFoundError:
+    else:
         msgs.info('The requested KDTree was not found on disk' + msgs.newline() +
                   'please be patient while the ThAr KDTree is built and saved to disk.')
         from pypeit.core.wavecal import kdtree_generator
-        file_load, index = kdtree_generator.main(polygon, numsearch=numsearch, verbose=True,
-                                                 ret_treeindx=True, outname=filename)
+        pattern, index = kdtree_generator.generate_patterns(polygon, numsearch=numsearch, verbose=True)
+        file_load = cKDTree(pattern, leafsize=30)
 
+    if tree_path is not None:
+        try:
+            save_tree_cache(tree_path, file_load, index)
+        except Exception as e:
+            msgs.warn('Could not cache KDTree: {0}'.format(e))
     return file_load, index
 
 
+def save_tree_cache(path, tree, index):
+    """
+    Save a KDTree and its index to a directory that can be read by
+    :func:`load_tree_cache`.
+
+    The built tree is pickled, such that it does not have to be rebuilt
+    when loaded, and the index is saved as a ``.npy`` file that is
+    memory-mapped when loaded.  The directory is written atomically:
+    the files are written to a temporary directory that is then
+    renamed.
+
+    Args:
+        path (:obj:`str`):
+            Directory for the files.
+        tree (`scipy.spatial.cKDTree`):
+            The tree.
+        index (`numpy.ndarray`_):
+            For each pattern in the tree, the corresponding index in the
+            linelist.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path))
+    try:
+        with open(os.path.join(tmp_path, 'tree.pkl'), 'wb') as f:
+            pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(os.path.join(tmp_path, 'index.npy'), np.asarray(index))
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Fine if another process cached the same tree first
+            if not os.path.isdir(path):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_tree_cache(path):
+    """
+    Load a KDTree saved by :func:`save_tree_cache`.
+
+    Args:
+        path (:obj:`str`):
+            Directory with the files.
+
+    Returns:
+        tuple: The `scipy.spatial.cKDTree` and the memory-mapped index
+        array; see :func:`load_tree`.
+    """
+    with open(os.path.join(path, 'tree.pkl'), 'rb') as f:
+        tree = pickle.load(f)
+    index = np.load(os.path.join(path, 'index.npy'), mmap_mode='r')
+    if not isinstance(tree, cKDTree) or index.shape[0] != tree.n:
+        raise ValueError('Inconsistent tree and index in {0}'.format(path))
+    return tree, index
+
+
 def load_nist(ion):
     """
     Parse a NIST ASCII table.  Note that the long ---- should have been
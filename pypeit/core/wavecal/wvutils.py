@@ -4,12 +4,16 @@
 .. include common links, assuming primary doc root is up one directory
 .. include:: ../links.rst
 """
+import hashlib
+from collections import OrderedDict
+
 import numpy as np
 import numba as nb
 
 from matplotlib import pyplot as plt
 from scipy.ndimage.filters import gaussian_filter
 from scipy.signal import resample
+from scipy.fftpack import next_fast_len
 import scipy
 from scipy.optimize import curve_fit
 from pypeit import msgs
@@ -19,6 +23,53 @@ from pypeit.core import arc
 
 
 
+# Results of the preprocessing of archive spectra, shared by the calls made
+# for all the slits/orders that are compared to the same archive
+_arxiv_cache = OrderedDict()
+_arxiv_cache_size = 16
+
+
+def array_key(arr):
+    """ Hashable key identifying the content of an array, used to cache results computed from archive spectra
+
+    Args:
+        arr (ndarray):
+            Array to identify
+
+    Returns:
+        tuple: The shape, data type and SHA1 digest of the array
+    """
+    arr = np.ascontiguousarray(arr)
+    return arr.shape, arr.dtype.str, hashlib.sha1(arr.view(np.uint8)).hexdigest()
+
+
+def arxiv_cached(key, func, *args, **kwargs):
+    """ Return func(*args, **kwargs), reusing the result of a previous call with the same key
+
+    The most recent results are kept in memory. The cached results are
+    shared between calls and must not be modified.
+
+    Args:
+        key (tuple):
+            Hashable key that identifies the calculation; see :func:`array_key`
+        func (callable):
+            Function to call if the result is not cached
+        *args, **kwargs:
+            Arguments passed to func
+
+    Returns:
+        The result of func
+    """
+    if key in _arxiv_cache:
+        _arxiv_cache.move_to_end(key)
+        return _arxiv_cache[key]
+    result = func(*args, **kwargs)
+    _arxiv_cache[key] = result
+    if len(_arxiv_cache) > _arxiv_cache_size:
+        _arxiv_cache.popitem(last=False)
+    return result
+
+
 def get_sampling(waves, pix_per_R=3.0):
     """
     Computes the median wavelength sampling of wavelength vector(s)
@@ -268,6 +319,27 @@ def xcorr_shift(inspec1,inspec2, smooth=1.0, percent_ceil=80.0, use_raw_arc=Fals
     corr = scipy.signal.correlate(y1, y2, mode='full')
     corr_denom = np.sqrt(np.sum(y1*y1)*np.sum(y2*y2))
     corr_norm = corr/corr_denom
+    return xcorr_peak(corr_norm, lags, debug=debug)
+
+
+def xcorr_peak(corr_norm, lags, debug=False):
+    """ Find the peak of a normalized cross-correlation.
+
+    Args:
+        corr_norm : ndarray
+            Cross-correlation coefficient as a function of lag
+        lags : ndarray
+            Lags at which corr_norm is evaluated
+        debug: boolean, default = False
+
+    Returns:
+       tuple: Returns the following:
+
+            - shift: float; the lag at the peak of the cross-correlation
+            - cross_corr: float; the maximum of the cross-correlation
+              coefficient at this shift
+
+    """
     tampl_true, tampl, pix_max, twid, centerr, ww, arc_cont, nsig = arc.detect_lines(corr_norm, sigdetect=3.0,
                                                                                      fit_frac_fwhm=1.5, fwhm=5.0,
                                                                                      cont_frac_fwhm=1.0, cont_samp=30, nfind=1)
@@ -378,20 +450,71 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
 
     """
 
-    nspec = inspec1.size
+    success, shift, stretch, corr, shift_cc, corr_cc = xcorr_shift_stretch_arxiv(
+        inspec1, inspec2.reshape(inspec2.size, 1), cc_thresh=cc_thresh, smooth=smooth, percent_ceil=percent_ceil,
+        use_raw_arc=use_raw_arc, shift_mnmx=shift_mnmx, stretch_mnmx=stretch_mnmx, sigdetect=sigdetect, fwhm=fwhm,
+        debug=debug, seed=seed)
+    return success[0], shift[0], stretch[0], corr[0], shift_cc[0], corr_cc[0]
 
-    y1 = smooth_ceil_cont(inspec1,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
-    y2 = smooth_ceil_cont(inspec2,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
 
-    # Do the cross-correlation first and determine the initial shift
-    shift_cc, corr_cc = xcorr_shift(y1, y2, smooth = None, percent_ceil = None, use_raw_arc = True, sigdetect = sigdetect, fwhm=fwhm, debug = debug)
+def xcorr_shift_stretch_arxiv(inspec, spec_arxiv, cc_thresh=-1.0, smooth=1.0, percent_ceil=80.0, use_raw_arc=False,
+                              shift_mnmx=(-0.05,0.05), stretch_mnmx=(0.95,1.05), sigdetect=10.0, fwhm=4.0, debug=False,
+                              seed=None):
+    """ Determine the shift and stretch of each spectrum in an archive relative to inspec.
 
-    if corr_cc < cc_thresh:
-        return -1, shift_cc, 1.0, corr_cc, shift_cc, corr_cc
-    else:
-        bounds = [(shift_cc + nspec*shift_mnmx[0],shift_cc + nspec*shift_mnmx[1]), stretch_mnmx]
-        # TODO Can we make the differential evolution run faster?
-        result = scipy.optimize.differential_evolution(zerolag_shift_stretch, args=(y1,y2), tol=1e-4,
+    This is the same calculation as :func:`xcorr_shift_stretch`, performed for all the archive spectra at once. The
+    spectrum is smoothed and continuum subtracted once, and the initial cross-correlations with all the archive
+    spectra are computed in a single batched FFT. The (expensive) shift and stretch optimization is only performed
+    for the archive spectra whose initial cross-correlation is at least cc_thresh.
+
+    Parameters
+    ----------
+    inspec : ndarray, shape = (nspec,)
+        Reference spectrum
+    spec_arxiv : ndarray, shape = (nspec, narxiv)
+        Spectra for which the shift and stretch are computed such that they will match inspec
+    cc_thresh, smooth, percent_ceil, use_raw_arc, shift_mnmx, stretch_mnmx, sigdetect, fwhm, debug :
+        See :func:`xcorr_shift_stretch`
+    seed: int or np.random.RandomState, optional, default = None
+        Seed for scipy.optimize.differential_evolution optimizer. The optimizations are run in the order of the archive
+        spectra and, if a RandomState is passed, draw from it in turn.
+
+    Returns
+    -------
+    success, shift, stretch, cross_corr, shift_init, cross_corr_init: ndarray, shape = (narxiv,)
+        The values returned by :func:`xcorr_shift_stretch` for each archive spectrum
+
+    """
+
+    nspec, narxiv = spec_arxiv.shape
+
+    y1 = smooth_ceil_cont(inspec,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
+    # The archive spectra and their FFTs are only computed once for all the spectra compared to the archive
+    nfft = next_fast_len(2*nspec - 1)
+    y2, fft_y2, y2_norm = arxiv_cached(('xcorr', array_key(spec_arxiv), smooth, percent_ceil, use_raw_arc, sigdetect,
+                                        fwhm, nfft), prepare_xcorr_arxiv, spec_arxiv, nfft, smooth=smooth,
+                                       percent_ceil=percent_ceil, use_raw_arc=use_raw_arc, sigdetect=sigdetect, fwhm=fwhm)
+
+    # Do the cross-correlations first and determine the initial shifts. The full cross-correlation of y1 and y2 is the
+    # convolution of y1 with the reversed y2, so all of them are computed with a single set of FFTs.
+    lags = np.arange(-nspec + 1, nspec)
+    corr = np.fft.irfft(np.fft.rfft(y1, nfft)[:,None]*fft_y2, nfft, axis=0)[:2*nspec - 1,:]
+    corr_denom = np.sqrt(np.sum(y1*y1)*y2_norm)
+
+    success = np.zeros(narxiv, dtype=int)
+    shift_out = np.zeros(narxiv)
+    stretch_out = np.ones(narxiv)
+    corr_out = np.zeros(narxiv)
+    shift_cc = np.zeros(narxiv)
+    corr_cc = np.zeros(narxiv)
+    for iarxiv in range(narxiv):
+        shift_cc[iarxiv], corr_cc[iarxiv] = xcorr_peak(corr[:,iarxiv]/corr_denom[iarxiv], lags, debug=debug)
+        if corr_cc[iarxiv] < cc_thresh:
+            success[iarxiv], shift_out[iarxiv], corr_out[iarxiv] = -1, shift_cc[iarxiv], corr_cc[iarxiv]
+            continue
+
+        bounds = [(shift_cc[iarxiv] + nspec*shift_mnmx[0],shift_cc[iarxiv] + nspec*shift_mnmx[1]), stretch_mnmx]
+        result = scipy.optimize.differential_evolution(zerolag_shift_stretch, args=(y1,y2[:,iarxiv]), tol=1e-4,
                                                        bounds=bounds, disp=False, polish=True, seed=seed)
         corr_de = -result.fun
         shift_de = result.x[0]
@@ -399,34 +522,68 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
         if not result.success:
             msgs.warn('Fit for shift and stretch did not converge!')
 
-        if(corr_de < corr_cc):
+        if(corr_de < corr_cc[iarxiv]):
             # Occasionally the differential evolution crapps out and returns a value worse that the CC value. In these cases just use the cc value
             msgs.warn('Shift/Stretch optimizer performed worse than simple x-correlation.' +
                       'Returning simple x-correlation shift and no stretch:' + msgs.newline() +
                       '   Optimizer: corr={:5.3f}, shift={:5.3f}, stretch={:7.5f}'.format(corr_de, shift_de,stretch_de) + msgs.newline() +
-                      '     X-corr : corr={:5.3f}, shift={:5.3f}'.format(corr_cc,shift_cc))
-            corr_out = corr_cc
-            shift_out = shift_cc
-            stretch_out = 1.0
-            result_out = 1
+                      '     X-corr : corr={:5.3f}, shift={:5.3f}'.format(corr_cc[iarxiv],shift_cc[iarxiv]))
+            corr_out[iarxiv] = corr_cc[iarxiv]
+            shift_out[iarxiv] = shift_cc[iarxiv]
+            stretch_out[iarxiv] = 1.0
+            success[iarxiv] = 1
         else:
-            corr_out = corr_de
-            shift_out = shift_de
-            stretch_out = stretch_de
-            result_out = int(result.success)
+            corr_out[iarxiv] = corr_de
+            shift_out[iarxiv] = shift_de
+            stretch_out[iarxiv] = stretch_de
+            success[iarxiv] = int(result.success)
 
         if debug:
             x1 = np.arange(nspec)
-            y2_trans = shift_and_stretch(y2, shift_out, stretch_out)
+            y2_trans = shift_and_stretch(y2[:,iarxiv], shift_out[iarxiv], stretch_out[iarxiv])
             plt.figure(figsize=(14, 6))
             plt.plot(x1,y1, 'k-', drawstyle='steps', label ='inspec1, input spectrum')
             plt.plot(x1,y2_trans, 'r-', drawstyle='steps', label = 'inspec2, reference shift & stretch')
-            plt.title('shift= {:5.3f}'.format(shift_out) +
-                      ',  stretch = {:7.5f}'.format(stretch_out) + ', corr = {:5.3f}'.format(corr_out))
+            plt.title('shift= {:5.3f}'.format(shift_out[iarxiv]) +
+                      ',  stretch = {:7.5f}'.format(stretch_out[iarxiv]) + ', corr = {:5.3f}'.format(corr_out[iarxiv]))
             plt.legend()
             plt.show()
 
-        return result_out, shift_out, stretch_out, corr_out, shift_cc, corr_cc
+    return success, shift_out, stretch_out, corr_out, shift_cc, corr_cc
+
+
+def prepare_xcorr_arxiv(spec_arxiv, nfft, smooth=1.0, percent_ceil=80.0, use_raw_arc=False, sigdetect=10.0, fwhm=4.0):
+    """ Smooth and apply a ceiling to a set of archive spectra, and compute the FFTs used to cross-correlate them.
+
+    Parameters
+    ----------
+    spec_arxiv : ndarray, shape = (nspec, narxiv)
+        Archive spectra
+    nfft : int
+        Length of the FFTs
+    smooth, percent_ceil, use_raw_arc, sigdetect, fwhm :
+        See :func:`smooth_ceil_cont`
+
+    Returns
+    -------
+    y2 : ndarray, shape = (nspec, narxiv)
+        The processed archive spectra
+    fft_y2 : ndarray, shape = (nfft//2+1, narxiv)
+        The FFTs of the reversed processed archive spectra
+    y2_norm : ndarray, shape = (narxiv,)
+        The sum of the squares of the processed archive spectra
+
+    """
+    nspec, narxiv = spec_arxiv.shape
+    y2 = np.zeros((nspec, narxiv))
+    for iarxiv in range(narxiv):
+        y2[:,iarxiv] = smooth_ceil_cont(spec_arxiv[:,iarxiv],smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc,
+                                        sigdetect = sigdetect, fwhm = fwhm)
+    fft_y2 = np.fft.rfft(y2[::-1,:], nfft, axis=0)
+    y2_norm = np.sum(y2*y2, axis=0)
+    for arr in (y2, fft_y2, y2_norm):
+        arr.flags.writeable = False
+    return y2, fft_y2, y2_norm
 
 
 
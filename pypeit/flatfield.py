@@ -20,6 +20,7 @@ from pypeit.images import pypeitimage
 from pypeit.core import flat
 from pypeit.core import save
 from pypeit.core import load
+from pypeit.core import parallel
 from pypeit.core import pixels
 from pypeit.core import procimg
 
@@ -244,41 +245,45 @@ class FlatField(calibrationimage.CalibrationImage, masterframe.MasterFrame):
             self.tslits_dict['slit_left_tweak'] = np.zeros_like(self.tslits_dict['slit_left'])
             self.tslits_dict['slit_righ_tweak'] = np.zeros_like(self.tslits_dict['slit_righ'])
 
-        # Loop on slits
-        for slit in range(self.nslits):
-            # Is this a good slit??
-            if maskslits[slit]:
-                msgs.info('Skipping bad slit: {}'.format(slit))
-                continue
-            #
-            msgs.info('Computing flat field image for slit: {:d}/{:d}'.format(slit,self.nslits-1))
-            if self.msbpm is not None:
-                inmask = np.invert(self.msbpm)
-            else:
-                inmask = np.ones_like(self.rawflatimg.image,dtype=bool)
-
-            # Fit flats for a single slit
-            this_tilts_dict = {'tilts':self.tilts_dict['tilts'],
-                               'coeffs':self.tilts_dict['coeffs'][:,:,slit].copy(),
-                               'slitcen':self.tilts_dict['slitcen'][:,slit].copy(),
-                               'func2d':self.tilts_dict['func2d']}
-            nonlinear_counts = self.spectrograph.nonlinear_counts(det=self.det)
-
-            pixelflat, illumflat, flat_model, tilts_out, thismask_out, slit_left_out, \
-                    slit_righ_out \
-                            = flat.fit_flat(self.rawflatimg.image, this_tilts_dict, self.tslits_dict,
-                                           slit, inmask=inmask, nonlinear_counts=nonlinear_counts,
-                                           spec_samp_fine=self.flatpar['spec_samp_fine'],
-                                           spec_samp_coarse=self.flatpar['spec_samp_coarse'],
-                                           spat_samp=self.flatpar['spat_samp'],
-                                           tweak_slits=self.flatpar['tweak_slits'],
-                                           tweak_slits_thresh=self.flatpar['tweak_slits_thresh'],
-                                           tweak_slits_maxfrac=self.flatpar['tweak_slits_maxfrac'],
-                                           debug=debug)
-
-            self.mspixelflat[thismask_out] = pixelflat[thismask_out]
-            self.msillumflat[thismask_out] = illumflat[thismask_out]
-            self.flat_model[thismask_out] = flat_model[thismask_out]
+        # Fit the flats for each good slit.  The fits of different
+        # slits are independent; optionally distribute them to a pool
+        # of processes.
+        gdslits = np.where(np.invert(maskslits))[0]
+        for slit in np.where(maskslits)[0]:
+            msgs.info('Skipping bad slit: {}'.format(slit))
+        n_proc = self.flatpar['n_proc']
+        if debug and n_proc > 1:
+            msgs.warn('Cannot show the flat-field fits when using multiple processes.  Using n_proc=1.')
+            n_proc = 1
+        n_proc = min(n_proc, len(gdslits))
+
+        inmask = np.ones_like(self.rawflatimg.image, dtype=bool) if self.msbpm is None \
+                        else np.invert(self.msbpm)
+        images = dict(rawflat=self.rawflatimg.image, tilts=self.tilts_dict['tilts'], inmask=inmask)
+        tasks = [(slit, self.tilts_dict['coeffs'][:,:,slit].copy(),
+                  self.tilts_dict['slitcen'][:,slit].copy()) for slit in gdslits]
+        kwargs = dict(func2d=self.tilts_dict['func2d'], tslits_dict=self.tslits_dict,
+                      nonlinear_counts=self.spectrograph.nonlinear_counts(det=self.det),
+                      spec_samp_fine=self.flatpar['spec_samp_fine'],
+                      spec_samp_coarse=self.flatpar['spec_samp_coarse'],
+                      spat_samp=self.flatpar['spat_samp'],
+                      tweak_slits=self.flatpar['tweak_slits'],
+                      tweak_slits_thresh=self.flatpar['tweak_slits_thresh'],
+                      tweak_slits_maxfrac=self.flatpar['tweak_slits_maxfrac'], debug=debug)
+        if n_proc > 1:
+            with parallel.SharedArrays(**images) as shared:
+                fits = parallel.run_tasks(fit_flat_slit, tasks, n_proc=n_proc, **shared, **kwargs)
+        else:
+            fits = parallel.run_tasks(fit_flat_slit, tasks, **images, **kwargs)
+
+        # Assemble the images.  The fit of each slit does not depend
+        # on the tweaked boundaries of the slits fit before it, so the
+        # slit boundaries are only updated once all fits are done.
+        for slit, (indx, pixelflat, illumflat, flat_model, tilts_out, slit_left_out, slit_righ_out) \
+                in zip(gdslits, fits):
+            self.mspixelflat[indx] = pixelflat
+            self.msillumflat[indx] = illumflat
+            self.flat_model[indx] = flat_model
 
             # Did we tweak slit boundaries? If so, update the tslits_dict and the tilts_dict
             if self.flatpar['tweak_slits']:
@@ -286,7 +291,7 @@ class FlatField(calibrationimage.CalibrationImage, masterframe.MasterFrame):
                 self.tslits_dict['slit_righ'][:,slit] = slit_righ_out
                 self.tslits_dict['slit_left_tweak'][:,slit] = slit_left_out
                 self.tslits_dict['slit_righ_tweak'][:,slit] = slit_righ_out
-                final_tilts[thismask_out] = tilts_out[thismask_out]
+                final_tilts[indx] = tilts_out
 
         # If we tweaked the slits update the tilts_dict
         if self.flatpar['tweak_slits']:
@@ -386,3 +391,48 @@ class FlatField(calibrationimage.CalibrationImage, masterframe.MasterFrame):
         # Return
         return self.rawflatimg, self.mspixelflat, self.msillumflat
 
+
+def fit_flat_slit(slit, coeffs, slitcen, func2d=None, tslits_dict=None, rawflat=None, tilts=None,
+                  inmask=None, **kwargs):
+    """
+    Fit the flat field of a single slit.
+
+    Used by :func:`FlatField.run`, possibly in a worker process.  The
+    images can be provided directly or as
+    :class:`pypeit.core.parallel.SharedArray` objects.
+
+    Args:
+        slit (:obj:`int`):
+            Slit index.
+        coeffs (`numpy.ndarray`_):
+            Coefficients of the 2D tilts fit for this slit.
+        slitcen (`numpy.ndarray`_):
+            Center of the slit used by the tilts fit.
+        func2d (:obj:`str`):
+            Function used for the 2D tilts fit.
+        tslits_dict (:obj:`dict`):
+            Slit boundaries of all slits.
+        rawflat (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Flat-field image.
+        tilts (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Spectral tilts image.
+        inmask (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Good-pixel mask.
+        **kwargs:
+            Passed to :func:`pypeit.core.flat.fit_flat`.
+
+    Returns:
+        tuple: The indices of the pixels in the (possibly tweaked)
+        slit, the pixel flat, illumination flat, flat model, and
+        tilts at those pixels, and the left and right slit
+        boundaries.
+    """
+    msgs.info('Computing flat field image for slit: {:d}/{:d}'.format(slit, tslits_dict['nslits']-1))
+    tilts_dict = {'tilts': parallel.as_array(tilts), 'coeffs': coeffs, 'slitcen': slitcen,
+                  'func2d': func2d}
+    pixelflat, illumflat, flat_model, tilts_out, thismask_out, slit_left_out, slit_righ_out \
+            = flat.fit_flat(parallel.as_array(rawflat), tilts_dict, tslits_dict, slit,
+                            inmask=parallel.as_array(inmask), **kwargs)
+    indx = np.where(thismask_out)
+    return indx, pixelflat[indx], illumflat[indx], flat_model[indx], tilts_out[indx], \
+                slit_left_out, slit_righ_out
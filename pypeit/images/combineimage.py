@@ -4,6 +4,8 @@
 import inspect
 
 import os
+import shutil
+import tempfile
 import numpy as np
 
 
@@ -51,7 +53,8 @@ class CombineImage(object):
         if self.nfiles == 0:
             msgs.error('Combineimage requires a list of files to instantiate')
 
-    def process_one(self, filename, process_steps, bias, pixel_flat=None, illum_flat=None, bpm=None):
+    def process_one(self, filename, process_steps, bias, pixel_flat=None, illum_flat=None, bpm=None,
+                    slitmask=None):
         """
         Process a single image
 
@@ -68,6 +71,9 @@ class CombineImage(object):
                 Illumination image
             bpm (np.ndarray, optional):
                 Bad pixel mask
+            slitmask (np.ndarray, optional):
+                Slit mask image; see
+                :func:`pypeit.images.processrawimage.ProcessRawImage.process`.
 
         Returns:
             :class:`pypeit.images.pypeitimage.PypeItImage`:
@@ -78,12 +84,13 @@ class CombineImage(object):
         # Process
         processrawImage = processrawimage.ProcessRawImage(rawImage, self.par, bpm=bpm)
         processedImage = processrawImage.process(process_steps, bias=bias, pixel_flat=pixel_flat,
-                                                 illum_flat=illum_flat)
+                                                 illum_flat=illum_flat, slitmask=slitmask)
         # Return
         return processedImage
 
     def run(self, process_steps, bias, pixel_flat=None, illum_flat=None,
-            ignore_saturation=False, sigma_clip=True, bpm=None, sigrej=None, maxiters=5):
+            ignore_saturation=False, sigma_clip=True, bpm=None, sigrej=None, maxiters=5,
+            tile_size=2**22, slitmask=None):
         """
         Generate a PypeItImage from a list of images
 
@@ -91,6 +98,14 @@ class CombineImage(object):
 
         This may also generate the ivar, crmask, rn2img and mask
 
+        The images are combined as they are processed, such that only
+        one processed image is held in memory at a time.  Without sigma
+        clipping, the images are accumulated in running sums.  With
+        sigma clipping, the processed images are written to temporary,
+        memory-mapped stacks on disk and combined in tiles of rows.  The
+        ``spill_dir`` parameter in :attr:`par` sets the directory for
+        the stacks.
+
         Args:
             process_steps (list):
             bias (np.ndarray or None):
@@ -111,65 +126,47 @@ class CombineImage(object):
                 If True, turn off the saturation flag in the individual images before stacking
                 This avoids having such values set to 0 which for certain images (e.g. flat calibrations)
                 can have unintended consequences.
+            tile_size (int, optional):
+                Maximum number of stacked pixels (i.e., the number of
+                images times the number of pixels in the tile) to
+                sigma clip at once.
+            slitmask (np.ndarray, optional):
+                Slit mask image.  If provided, cosmic rays are only
+                searched for within the slits.
 
         Returns:
             :class:`pypeit.images.pypeitimage.PypeItImage`:
 
         """
-        # Loop on the files
+        # Are we all done?
         nimages = len(self.files)
-        for kk, ifile in enumerate(self.files):
-            # Process a single image
-            pypeitImage = self.process_one(ifile, process_steps, bias, pixel_flat=pixel_flat,
-                                           illum_flat=illum_flat, bpm=bpm)
-            # Are we all done?
-            if len(self.files) == 1:
-                return pypeitImage
-            elif kk == 0:
-                # Get ready
-                shape = (nimages, pypeitImage.bpm.shape[0], pypeitImage.bpm.shape[1])
-                img_stack = np.zeros(shape)
-                ivar_stack= np.zeros(shape)
-                rn2img_stack = np.zeros(shape)
-                crmask_stack = np.zeros(shape, dtype=bool)
-                # Mask
-                bitmask = maskimage.ImageBitMask()
-                mask_stack = np.zeros(shape, bitmask.minimum_dtype(asuint=True))
-            # Process
-            img_stack[kk,:,:] = pypeitImage.image
-            # Construct raw variance image and turn into inverse variance
-            if pypeitImage.ivar is not None:
-                ivar_stack[kk, :, :] = pypeitImage.ivar
-            else:
-                ivar_stack[kk, :, :] = 1.
-            # Mask cosmic rays
-            if pypeitImage.crmask is not None:
-                crmask_stack[kk, :, :] = pypeitImage.crmask
-            # Read noise squared image
-            if pypeitImage.rn2img is not None:
-                rn2img_stack[kk, :, :] = pypeitImage.rn2img
-            # Final mask for this image
-            # TODO This seems kludgy to me. Why not just pass ignore_saturation to process_one and ignore the saturation
-            # when the mask is actually built, rather than untoggling the bit here
-            if ignore_saturation:  # Important for calibrations as we don't want replacement by 0
-                indx = pypeitImage.bitmask.flagged(pypeitImage.mask, flag=['SATURATION'])
-                pypeitImage.mask[indx] = pypeitImage.bitmask.turn_off(pypeitImage.mask[indx], 'SATURATION')
-            mask_stack[kk, :, :] = pypeitImage.mask
+        if nimages == 1:
+            return self.process_one(self.files[0], process_steps, bias, pixel_flat=pixel_flat,
+                                    illum_flat=illum_flat, bpm=bpm, slitmask=slitmask)
+
+        # Generator for the processed images
+        images = self._processed_images(process_steps, bias, pixel_flat=pixel_flat,
+                                        illum_flat=illum_flat, bpm=bpm,
+                                        ignore_saturation=ignore_saturation, slitmask=slitmask)
 
         # Coadd them
         weights = np.ones(nimages)/float(nimages)
-        img_list = [img_stack]
-        var_stack = utils.inverse(ivar_stack)
-        var_list = [var_stack, rn2img_stack]
-        img_list_out, var_list_out, outmask, nused = combine.weighted_combine(
-            weights, img_list, var_list, (mask_stack == 0),
-            sigma_clip=sigma_clip, sigma_clip_stack=img_stack, sigrej=sigrej, maxiters=maxiters)
+        if sigma_clip and nimages < 3:
+            msgs.warn('Sigma clipping requested, but you cannot sigma clip with less than 3 images. '
+                      'Proceeding without sigma clipping')
+            sigma_clip = False
+        if sigma_clip:
+            pypeitImage, img, var, rn2img, outmask = self._tiled_combine(
+                images, weights, sigrej=sigrej, maxiters=maxiters, tile_size=tile_size,
+                spill_dir=self.par['spill_dir'])
+        else:
+            pypeitImage, img, var, rn2img, outmask = self._running_combine(images, weights)
 
         # Build the last one
-        final_pypeitImage = pypeitimage.PypeItImage(img_list_out[0],
-                                                    ivar=utils.inverse(var_list_out[0]),
+        final_pypeitImage = pypeitimage.PypeItImage(img,
+                                                    ivar=utils.inverse(var),
                                                     bpm=pypeitImage.bpm,
-                                                    rn2img=var_list_out[1],
+                                                    rn2img=rn2img,
                                                     crmask=np.invert(outmask),
                                                     binning=pypeitImage.binning)
         nonlinear_counts = self.spectrograph.nonlinear_counts(self.det,
@@ -180,6 +177,146 @@ class CombineImage(object):
         # Return
         return final_pypeitImage
 
+    def _processed_images(self, process_steps, bias, pixel_flat=None, illum_flat=None, bpm=None,
+                          ignore_saturation=False, slitmask=None):
+        """
+        Process the images one at a time.
+
+        Args:
+            See :func:`run`.
+
+        Yields:
+            tuple: The processed image
+            (:class:`pypeit.images.pypeitimage.PypeItImage`), and the
+            image, variance, read-noise variance, and good-pixel mask
+            to combine.
+        """
+        for ifile in self.files:
+            # Process a single image
+            pypeitImage = self.process_one(ifile, process_steps, bias, pixel_flat=pixel_flat,
+                                           illum_flat=illum_flat, bpm=bpm, slitmask=slitmask)
+            # Construct raw variance image
+            var = np.ones(pypeitImage.image.shape) if pypeitImage.ivar is None \
+                    else utils.inverse(pypeitImage.ivar)
+            # Read noise squared image
+            rn2img = np.zeros(pypeitImage.image.shape) if pypeitImage.rn2img is None \
+                    else pypeitImage.rn2img
+            # Final mask for this image
+            # TODO This seems kludgy to me. Why not just pass ignore_saturation to process_one and ignore the saturation
+            # when the mask is actually built, rather than untoggling the bit here
+            if ignore_saturation:  # Important for calibrations as we don't want replacement by 0
+                indx = pypeitImage.bitmask.flagged(pypeitImage.mask, flag=['SATURATION'])
+                pypeitImage.mask[indx] = pypeitImage.bitmask.turn_off(pypeitImage.mask[indx], 'SATURATION')
+            yield pypeitImage, pypeitImage.image, var, rn2img, pypeitImage.mask == 0
+
+    @staticmethod
+    def _running_combine(images, weights):
+        """
+        Compute the weighted mean of the images using running sums.
+
+        This is identical to :func:`pypeit.core.combine.weighted_combine`
+        without sigma clipping.
+
+        Args:
+            images (generator):
+                Provides the processed images; see
+                :func:`_processed_images`.
+            weights (`numpy.ndarray`_):
+                Weight of each image.
+
+        Returns:
+            tuple: The last processed image, and the combined image,
+            variance, read-noise variance, and good-pixel mask.
+        """
+        for kk, (pypeitImage, img, var, rn2img, gpm) in enumerate(images):
+            wgt = weights[kk]*gpm
+            if kk == 0:
+                img_sum = img*wgt
+                var_sum = var*wgt**2
+                rn2_sum = rn2img*wgt**2
+                wgt_sum = wgt
+                outmask = gpm.copy()
+                continue
+            img_sum += img*wgt
+            var_sum += var*wgt**2
+            rn2_sum += rn2img*wgt**2
+            wgt_sum = wgt_sum + wgt
+            outmask |= gpm
+        norm = wgt_sum + (wgt_sum == 0.0)
+        return pypeitImage, img_sum/norm, var_sum/norm**2, rn2_sum/norm**2, outmask
+
+    @staticmethod
+    def _tiled_combine(images, weights, sigrej=None, maxiters=5, tile_size=2**22,
+                       spill_dir=None):
+        """
+        Compute the sigma-clipped weighted mean of the images.
+
+        The images are written to temporary, memory-mapped stacks on
+        disk and then combined by
+        :func:`pypeit.core.combine.weighted_combine` in tiles of rows,
+        such that only one image and one tile of the stacks are held in
+        memory at a time.  The clipping is independent for each pixel,
+        so the result is identical to combining the full stack at once.
+
+        Args:
+            images (generator):
+                Provides the processed images; see
+                :func:`_processed_images`.
+            weights (`numpy.ndarray`_):
+                Weight of each image.
+            sigrej (int or float, optional):
+            maxiters (int, optional):
+                See :func:`pypeit.core.combine.weighted_combine`.
+            tile_size (int, optional):
+                Maximum number of stacked pixels combined at once.
+            spill_dir (:obj:`str`, optional):
+                Directory in which to create the temporary directory
+                for the stacks, which is removed when done.  If None,
+                use the default temporary directory of the system; see
+                `tempfile.mkdtemp`.
+
+        Returns:
+            tuple: The last processed image, and the combined image,
+            variance, read-noise variance, and good-pixel mask.
+        """
+        nimages = len(weights)
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+        tmpdir = tempfile.mkdtemp(prefix='pypeit_combine_', dir=spill_dir)
+        try:
+            for kk, (pypeitImage, img, var, rn2img, gpm) in enumerate(images):
+                if kk == 0:
+                    shape = (nimages,) + img.shape
+                    stacks = [np.lib.format.open_memmap(os.path.join(tmpdir, key + '.npy'),
+                                                        mode='w+', dtype=dtype, shape=shape)
+                                for key, dtype in zip(['img', 'var', 'rn2', 'gpm'],
+                                                      [float, float, float, bool])]
+                for stack, data in zip(stacks, [img, var, rn2img, gpm]):
+                    stack[kk] = data
+
+            # Combine in tiles of rows
+            img_stack, var_stack, rn2_stack, gpm_stack = stacks
+            img = np.zeros(shape[1:], dtype=float)
+            var = np.zeros(shape[1:], dtype=float)
+            rn2img = np.zeros(shape[1:], dtype=float)
+            outmask = np.zeros(shape[1:], dtype=bool)
+            nrows = max(1, tile_size // (nimages*int(np.prod(shape[2:]))))
+            for start in range(0, shape[1], nrows):
+                tile = slice(start, min(start+nrows, shape[1]))
+                _img_stack = np.asarray(img_stack[:,tile])
+                img_list_out, var_list_out, outmask[tile], _ = combine.weighted_combine(
+                    weights, [_img_stack], [np.asarray(var_stack[:,tile]),
+                                            np.asarray(rn2_stack[:,tile])],
+                    np.asarray(gpm_stack[:,tile]), sigma_clip=True,
+                    sigma_clip_stack=_img_stack, sigrej=sigrej, maxiters=maxiters)
+                img[tile] = img_list_out[0]
+                var[tile], rn2img[tile] = var_list_out
+            # Release the memory maps before the files are removed
+            del stacks, img_stack, var_stack, rn2_stack, gpm_stack
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return pypeitImage, img, var, rn2img, outmask
+
     @property
     def nfiles(self):
         """
@@ -67,7 +67,8 @@ class ImageMask(object):
         # Data model
         self.mask_attributes = ('bpm', 'crmask', 'mask')
 
-    def build_crmask(self, spectrograph, det, par, image, rawvarframe, subtract_img=None):
+    def build_crmask(self, spectrograph, det, par, image, rawvarframe, subtract_img=None,
+                     slitmask=None):
         """
         Generate the CR mask frame
 
@@ -88,6 +89,10 @@ class ImageMask(object):
                 Variance image
             subtract_img (np.ndarray, optional):
                 If provided, subtract this from the image prior to CR detection
+            slitmask (np.ndarray, optional):
+                Slit mask image, with -1 for pixels that are not in any
+                slit.  If provided, only pixels in the slits are searched
+                for CR's.
 
         Returns:
             np.ndarray: Copy of self.crmask (boolean)
@@ -104,7 +109,9 @@ class ImageMask(object):
                                   remove_compact_obj=par['rmcompact'],
                                   sigclip=par['sigclip'],
                                   sigfrac=par['sigfrac'],
-                                  objlim=par['objlim'])
+                                  objlim=par['objlim'],
+                                  mask=None if slitmask is None else slitmask > -1,
+                                  n_threads=par['n_threads'])
         # Return
         return self.crmask.copy()
 
@@ -164,7 +164,7 @@ class ProcessRawImage(object):
         # Return
         return self.rn2img.copy()
 
-    def process(self, process_steps, pixel_flat=None, illum_flat=None, bias=None):
+    def process(self, process_steps, pixel_flat=None, illum_flat=None, bias=None, slitmask=None):
         """
         Process the image
 
@@ -192,6 +192,10 @@ class ProcessRawImage(object):
                 Bias image
             bpm (np.ndarray, optional):
                 Bad pixel mask image
+            slitmask (np.ndarray, optional):
+                Slit mask image, with -1 for pixels that are not in any
+                slit.  If provided, cosmic rays are only searched for
+                within the slits.
 
         Returns:
             :class:`pypeit.images.pypeitimage.PypeItImage`:
@@ -241,7 +245,8 @@ class ProcessRawImage(object):
             else:
                 var = np.ones_like(pypeitImage.image)
             #
-            pypeitImage.build_crmask(self.spectrograph, self.det, self.par, pypeitImage.image, var)
+            pypeitImage.build_crmask(self.spectrograph, self.det, self.par, pypeitImage.image, var,
+                                     slitmask=slitmask)
             steps_copy.remove('crmask')
         nonlinear_counts = self.spectrograph.nonlinear_counts(self.det,
                                                               apply_gain='apply_gain' in process_steps)
@@ -44,12 +44,15 @@ class ScienceImage(pypeitimage.PypeItImage):
         mask (np.ndarray, optional):
         files (list, optional):
             List of filenames that went into the loaded image
+        slitmask (np.ndarray, optional):
+            Slit mask image.  If provided, cosmic rays are only searched
+            for within the slits.
 
     """
     frametype = 'science'
 
     def __init__(self, spectrograph, det, par, image, ivar, bpm, rn2img=None,
-                 crmask=None, mask=None, files=[]):
+                 crmask=None, mask=None, files=[], slitmask=None):
 
         # Init me
         pypeitimage.PypeItImage.__init__(self, image, ivar=ivar, rn2img=rn2img,
@@ -64,6 +67,7 @@ class ScienceImage(pypeitimage.PypeItImage):
 
         # Not required
         self.files = files
+        self.slitmask = slitmask
 
     def build_crmask(self, subtract_img=None):
         """
@@ -81,7 +85,8 @@ class ScienceImage(pypeitimage.PypeItImage):
         return super(ScienceImage, self).build_crmask(self.spectrograph, self.det,
                                                       self.par, self.image,
                                                       utils.inverse(self.ivar),
-                                                      subtract_img=subtract_img).copy()
+                                                      subtract_img=subtract_img,
+                                                      slitmask=self.slitmask).copy()
 
     def build_mask(self, saturation=1e10, mincounts=-1e10, slitmask=None):
         """
@@ -119,7 +124,8 @@ class ScienceImage(pypeitimage.PypeItImage):
         super(ScienceImage, self).build_crmask(self.spectrograph, self.det,
                                                self.par, self.image,
                                                utils.inverse(self.ivar),
-                                               subtract_img=subtract_img).copy()
+                                               subtract_img=subtract_img,
+                                               slitmask=self.slitmask).copy()
         # Now update the mask
         super(ScienceImage, self).update_mask_cr(self.crmask)
 
@@ -161,7 +167,7 @@ class ScienceImage(pypeitimage.PypeItImage):
 
         # Instantiate
         new_sciImg = ScienceImage(self.spectrograph, self.det, self.par,
-            newimg, new_ivar, self.bpm, rn2img=new_rn2, files=new_files)
+            newimg, new_ivar, self.bpm, rn2img=new_rn2, files=new_files, slitmask=self.slitmask)
         #TODO: KW properly handle adding the bits
         crmask_diff = new_sciImg.build_crmask()
         # crmask_eff assumes evertything masked in the outmask_comb is a CR in the individual images
@@ -188,7 +194,7 @@ class ScienceImage(pypeitimage.PypeItImage):
 
 def build_from_file_list(spectrograph, det, par, bpm,
                    file_list, bias, pixel_flat, illum_flat=None,
-                   sigma_clip=False, sigrej=None, maxiters=5):
+                   sigma_clip=False, sigrej=None, maxiters=5, slitmask=None):
     """
     Build a ScienceImage from a file list
     using a default set of process steps
@@ -217,6 +223,9 @@ def build_from_file_list(spectrograph, det, par, bpm,
         sigrej (int or float, optional): Rejection threshold for sigma clipping.
              Code defaults to determining this automatically based on the numberr of images provided.
         maxiters (int, optional):
+        slitmask (np.ndarray, optional):
+            Slit mask image.  If provided, cosmic rays are only searched
+            for within the slits.
 
     Returns:
         ScienceImage:
@@ -234,13 +243,13 @@ def build_from_file_list(spectrograph, det, par, bpm,
     combineImage = combineimage.CombineImage(spectrograph, det, par, file_list)
     pypeitImage = combineImage.run(process_steps, bias, bpm=bpm, pixel_flat=pixel_flat,
                                  illum_flat=illum_flat, sigma_clip=sigma_clip,
-                                 sigrej=sigrej, maxiters=maxiters)
+                                 sigrej=sigrej, maxiters=maxiters, slitmask=slitmask)
 
     # Instantiate
     slf = ScienceImage(spectrograph, det, par, pypeitImage.image, pypeitImage.ivar,
                                 pypeitImage.bpm, rn2img=pypeitImage.rn2img,
                                 crmask=pypeitImage.crmask, mask=pypeitImage.mask,
-                                files=file_list)
+                                files=file_list, slitmask=slitmask)
     # Return
     return slf
 
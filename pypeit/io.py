@@ -11,6 +11,7 @@ import sys
 import warnings
 import gzip
 import shutil
+import json
 from packaging import version
 
 import numpy
@@ -286,3 +287,94 @@ def header_version_check(hdr, warning_only=True):
     # Return if all versions are identical
     return all_identical
 
+
+class HeaderCache(object):
+    """
+    Persistent, on-disk cache of the headers read from a set of FITS
+    files.
+
+    Each cached entry is keyed by the absolute path of the file and is
+    only used if the modification time and size of the file are
+    unchanged.  The headers are stored as their card strings in a JSON
+    file.
+
+    Args:
+        filename (:obj:`str`):
+            Name of the cache file.  If the file exists, it is read;
+            otherwise the cache is empty until :func:`write` is called.
+    """
+    version = 1
+    """
+    Version of the cache file format; cache files with a different
+    version are ignored.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        if os.path.isfile(self.filename):
+            try:
+                with open(self.filename, 'r') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                warnings.warn('Could not read header cache {0}; ignoring it.'.format(filename))
+            else:
+                if cache.get('version') == self.version:
+                    self.entries = cache['entries']
+
+    @staticmethod
+    def _stat(ifile):
+        """Return the absolute path, modification time, and size of a file."""
+        stat = os.stat(ifile)
+        return os.path.abspath(ifile), stat.st_mtime, stat.st_size
+
+    def get(self, ifile, numhead):
+        """
+        Get the cached headers of a file.
+
+        Args:
+            ifile (:obj:`str`):
+                File name.
+            numhead (:obj:`int`):
+                Number of headers needed.
+
+        Returns:
+            :obj:`list`: The list of `numhead`
+            `astropy.io.fits.Header`_ objects, or None if the headers
+            are not cached, the file has changed, or it cannot be
+            accessed.
+        """
+        try:
+            path, mtime, size = self._stat(ifile)
+        except OSError:
+            return None
+        entry = self.entries.get(path)
+        if entry is None or entry['mtime'] != mtime or entry['size'] != size \
+                or len(entry['headers']) < numhead:
+            return None
+        return [fits.Header.fromstring(hdr) for hdr in entry['headers'][:numhead]]
+
+    def add(self, ifile, headarr):
+        """
+        Add the headers of a file to the cache.
+
+        Args:
+            ifile (:obj:`str`):
+                File name.
+            headarr (:obj:`list`):
+                List of `astropy.io.fits.Header`_ objects.
+        """
+        path, mtime, size = self._stat(ifile)
+        self.entries[path] = dict(mtime=mtime, size=size,
+                                  headers=[hdr.tostring() for hdr in headarr])
+
+    def write(self):
+        """
+        Write the cache to disk.
+        """
+        # Write to a temporary file first so that an interrupted write
+        # does not corrupt the cache
+        tmp = '{0}.{1}.tmp'.format(self.filename, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(dict(version=self.version, entries=self.entries), f)
+        os.replace(tmp, self.filename)
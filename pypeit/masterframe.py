@@ -5,6 +5,13 @@ Implements the master frame base class.
 .. include:: ../links.rst
 """
 import os
+import time
+import shutil
+import socket
+import hashlib
+import tempfile
+import threading
+import uuid
 from IPython import embed
 
 from abc import ABCMeta
@@ -13,7 +20,9 @@ import numpy as np
 
 from astropy.io import fits
 
+from pypeit import __version__
 from pypeit import msgs
+from pypeit.par.parset import ParSet
 from pypeit.images import pypeitimage
 from pypeit.io import initialize_header
 from pypeit.spectrographs import util
@@ -205,3 +214,373 @@ def items_from_master_file(master_file):
     return spectrograph, extras
 
 
+# Digests of the raw files, keyed by the file path, size, and
+# modification time, so that each file is read only once per session
+_file_digests = {}
+
+
+def file_digest(filename):
+    """
+    Compute the SHA-256 digest of the content of a file.
+
+    Digests are cached for the duration of the session; the file is
+    only read again if its size or modification time changes.
+
+    Args:
+        filename (:obj:`str`):
+            Name of the file.
+
+    Returns:
+        :obj:`str`: Hexadecimal digest of the file content.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        sha = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        _file_digests[key] = sha.hexdigest()
+    return _file_digests[key]
+
+
+def _par_lines(par, ignore=('n_proc',)):
+    """
+    Recursively list the values in a parameter set, skipping the
+    parameters in `ignore` that do not change the calibrations.
+    """
+    lines = []
+    for key in par.keys():
+        if key in ignore:
+            continue
+        if isinstance(par[key], ParSet):
+            lines += ['[{0}]'.format(key)] + _par_lines(par[key], ignore=ignore) + ['[end]']
+        else:
+            lines += ['{0} = {1!r}'.format(key, par[key])]
+    return lines
+
+
+def master_digest(master_type, spectrograph, det, files=None, pars=None, inputs=None):
+    """
+    Compute the digest identifying the content of a master frame.
+
+    The digest combines the PypeIt version, the spectrograph and
+    detector, the content of the raw files, the values of the relevant
+    parameters, and the master frames (or arrays) the master frame is
+    built from.  Two master frames with the same digest are expected
+    to be identical, regardless of the names and locations of the raw
+    files, and they can be shared by different reductions; see
+    :class:`MasterStore`.
+
+    Args:
+        master_type (:obj:`str`):
+            Master frame type, e.g. 'Arc'.
+        spectrograph (:class:`pypeit.spectrographs.spectrograph.Spectrograph`):
+            Spectrograph used to take the data.
+        det (:obj:`int`):
+            Detector number.
+        files (:obj:`list`, optional):
+            Raw files combined to build the master frame.
+        pars (:obj:`list`, optional):
+            :class:`pypeit.par.parset.ParSet` instances with the
+            parameters used to build the master frame.  The number of
+            processes (``n_proc``) is ignored.
+        inputs (:obj:`list`, optional):
+            Digests of the master frames used to build the master
+            frame, or arrays (e.g. the bad-pixel mask), which are
+            included by content.
+
+    Returns:
+        :obj:`str`: Hexadecimal digest.
+    """
+    lines = ['pypeit {0}'.format(__version__), 'type {0}'.format(master_type),
+             'spectrograph {0}'.format(spectrograph.spectrograph), 'det {0}'.format(det)]
+    if files is not None:
+        lines += ['file {0}'.format(file_digest(f)) for f in files]
+    if pars is not None:
+        for par in pars:
+            lines += _par_lines(par)
+    if inputs is not None:
+        for inp in inputs:
+            if isinstance(inp, np.ndarray):
+                arr = np.ascontiguousarray(inp)
+                lines += ['array {0} {1} {2}'.format(arr.dtype.str, arr.shape,
+                                                     hashlib.sha256(arr.tobytes()).hexdigest())]
+            else:
+                lines += ['input {0}'.format(inp)]
+    return hashlib.sha256('\n'.join(lines).encode()).hexdigest()
+
+
+class FileLock(object):
+    """
+    Context manager that holds an exclusive lock file.
+
+    The lock file is created atomically and records the host and
+    process that hold the lock, and a token unique to this lock.
+    Processes waiting for the lock poll for its removal.  A lock is
+    considered abandoned, and removed, if the process that holds it no
+    longer exists on this host or if the lock file was not touched for
+    `stale` seconds.  While the lock is held, its modification time is
+    updated every `stale`/4 seconds, such that long-running holders on
+    other hosts are not mistaken for abandoned locks.
+
+    An abandoned lock file is first renamed to a unique name and only
+    removed if it is still the lock that was inspected.  Otherwise, it
+    was replaced by a new holder in the meantime and is put back.
+
+    Args:
+        filename (:obj:`str`):
+            Name of the lock file.  If None, no lock is held.
+        stale (:obj:`float`, optional):
+            Time in seconds since the last update of a lock file held
+            by another host after which it is considered abandoned.
+        poll (:obj:`float`, optional):
+            Time in seconds between attempts to acquire the lock.
+    """
+    def __init__(self, filename, stale=3600., poll=1.):
+        self.filename = filename
+        self.stale = stale
+        self.poll = poll
+        self.owner = None
+        self._stop = None
+        self._heartbeat = None
+
+    @staticmethod
+    def _read(filename):
+        """
+        Read the owner recorded in a lock file.
+        """
+        with open(filename) as f:
+            return f.read()
+
+    def _abandoned(self):
+        """
+        Check if the existing lock file was abandoned.
+
+        Returns:
+            :obj:`str`: The content of the abandoned lock file, or None
+            if the lock is not abandoned.
+        """
+        try:
+            owner = self._read(self.filename)
+            host, pid = owner.split()[:2]
+            age = time.time() - os.path.getmtime(self.filename)
+        except (OSError, ValueError):
+            # Removed or being written
+            return None
+        if host == socket.gethostname():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return owner
+            except PermissionError:
+                pass
+            return None
+        return owner if age > self.stale else None
+
+    def _remove(self, owner):
+        """
+        Remove the lock file if it is held by `owner`.
+
+        The file is atomically renamed to a unique name before checking
+        its owner, such that a lock acquired by another process after
+        `owner` was read is never removed.
+
+        Args:
+            owner (:obj:`str`):
+                Content of the lock file to remove.
+        """
+        moved = '{0}.{1}'.format(self.filename, uuid.uuid4().hex)
+        try:
+            os.rename(self.filename, moved)
+        except FileNotFoundError:
+            return
+        try:
+            if self._read(moved) != owner:
+                # Not the inspected lock; put it back, unless yet
+                # another process acquired the lock meanwhile.
+                try:
+                    os.link(moved, self.filename)
+                except FileExistsError:
+                    pass
+        finally:
+            os.remove(moved)
+
+    def _touch(self):
+        """
+        Update the modification time of the lock file until the lock
+        is released.
+        """
+        while not self._stop.wait(self.stale/4):
+            try:
+                os.utime(self.filename)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        if self.filename is None:
+            return self
+        owner = '{0} {1} {2}'.format(socket.gethostname(), os.getpid(), uuid.uuid4().hex)
+        waiting = False
+        while True:
+            try:
+                fd = os.open(self.filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                abandoned = self._abandoned()
+                if abandoned is not None:
+                    msgs.warn('Removing abandoned lock file: {0}'.format(self.filename))
+                    self._remove(abandoned)
+                    continue
+                if not waiting:
+                    msgs.info('Waiting for lock: {0}'.format(self.filename))
+                    waiting = True
+                time.sleep(self.poll)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(owner)
+            self.owner = owner
+            self._stop = threading.Event()
+            self._heartbeat = threading.Thread(target=self._touch, daemon=True)
+            self._heartbeat.start()
+            return self
+
+    def __exit__(self, *args):
+        if self.filename is None:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self._remove(self.owner)
+        self.owner = None
+
+
+def _atomic_copy(src, dst):
+    """
+    Copy a file such that `dst` is either absent, or complete.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dst), prefix='.tmp_')
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        shutil.copymode(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        # Only left behind if the copy failed
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+
+class MasterStore(object):
+    """
+    Content-addressed store of master frames shared by different
+    reductions.
+
+    Master frames are stored with their digest (see
+    :func:`master_digest`) as file name, such that reductions of other
+    nights or setups that use the same raw calibration frames and
+    parameters retrieve them instead of rebuilding them.  Files are
+    added atomically.  Each entry can be locked while it is built,
+    such that concurrent reductions that need the same master frame
+    wait for it instead of building it twice::
+
+        with store.lock(digest):
+            if not store.fetch(master, digest):
+                # Build and save the master frame
+                ...
+                store.add(master, digest)
+
+    Args:
+        path (:obj:`str`):
+            Directory with the store.  Created if it does not exist.
+        stale (:obj:`float`, optional):
+            Age in seconds of a lock held by another host after which
+            it is considered abandoned; see :class:`FileLock`.
+    """
+    def __init__(self, path, stale=3600.):
+        self.path = path
+        self.stale = stale
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path, exist_ok=True)
+
+    def file_path(self, master_type, digest, file_format='fits'):
+        """
+        Full path to the stored master frame.
+
+        Args:
+            master_type (:obj:`str`):
+                Master frame type.
+            digest (:obj:`str`):
+                Digest of the master frame.
+            file_format (:obj:`str`, optional):
+                File format (extension) of the master frame.
+
+        Returns:
+            :obj:`str`: File path.
+        """
+        return os.path.join(self.path, digest[:2],
+                            MasterFrame.construct_file_name(master_type, digest,
+                                                            file_format=file_format))
+
+    def lock(self, digest):
+        """
+        Return the lock of an entry in the store.
+
+        Args:
+            digest (:obj:`str`):
+                Digest of the master frame.
+
+        Returns:
+            :class:`FileLock`: Context manager holding the lock.
+        """
+        subdir = os.path.join(self.path, digest[:2])
+        os.makedirs(subdir, exist_ok=True)
+        return FileLock(os.path.join(subdir, '{0}.lock'.format(digest)), stale=self.stale)
+
+    def fetch(self, master, digest):
+        """
+        Copy a stored master frame to its file in the master directory.
+
+        Args:
+            master (:class:`MasterFrame`):
+                The master frame.
+            digest (:obj:`str`):
+                Digest of the master frame.
+
+        Returns:
+            :obj:`bool`: True if the master frame was in the store.
+        """
+        stored = self.file_path(master.master_type, digest, file_format=master.file_format)
+        if not os.path.isfile(stored):
+            return False
+        if not os.path.isdir(master.master_dir):
+            os.makedirs(master.master_dir, exist_ok=True)
+        _atomic_copy(stored, master.master_file_path)
+        msgs.info('Master {0} frame found in the store: {1}'.format(master.master_type, stored))
+        return True
+
+    def add(self, master, digest, since=None):
+        """
+        Add a master frame to the store.
+
+        Args:
+            master (:class:`MasterFrame`):
+                The master frame, which must have been saved to its
+                file in the master directory.
+            digest (:obj:`str`):
+                Digest of the master frame.
+            since (:obj:`float`, optional):
+                Only add the file if it was written at or after this
+                time (in seconds since the epoch).  Used to avoid
+                storing an outdated file when no new master frame was
+                saved.
+
+        Returns:
+            :obj:`bool`: True if the master frame was added.
+        """
+        ifile = master.master_file_path
+        if not os.path.isfile(ifile) \
+                or (since is not None and os.path.getmtime(ifile) < np.floor(since)):
+            return False
+        stored = self.file_path(master.master_type, digest, file_format=master.file_format)
+        _atomic_copy(ifile, stored)
+        msgs.info('Master {0} frame added to the store: {1}'.format(master.master_type, stored))
+        return True
@@ -15,6 +15,7 @@ from astropy import table, coordinates, time
 
 from pypeit import msgs
 from pypeit import utils
+from pypeit.io import HeaderCache
 from pypeit.core import framematch
 from pypeit.core import flux_calib
 from pypeit.core import parse
@@ -282,17 +283,19 @@ class PypeItMetaData:
         data['directory'] = ['None']*len(_files)
         data['filename'] = ['None']*len(_files)
 
+        # Read the fits headers
+        cache = None if self.par['rdx']['header_cache'] is None \
+                    else HeaderCache(self.par['rdx']['header_cache'])
+        headarrs = self.spectrograph.get_headarrs(_files, strict=strict, cache=cache)
+
         # Build the table
-        for idx, ifile in enumerate(_files):
+        for idx, (ifile, headarr) in enumerate(zip(_files, headarrs)):
             # User data (for frame type)
             usr_row = None if usrdata is None else usrdata[idx]
 
             # Add the directory and file name to the table
             data['directory'][idx], data['filename'][idx] = os.path.split(ifile)
 
-            # Read the fits headers
-            headarr = self.spectrograph.get_headarr(ifile, strict=strict)
-
             # Grab Meta
             for meta_key in self.spectrograph.meta.keys():
                 value = self.spectrograph.get_meta_value(headarr, meta_key, required=strict, usr_row=usr_row,
@@ -1733,6 +1736,40 @@ class PypeItMetaData:
         """
         return self.calib_bitmask.flagged_bits(self['calibbit'][row])
 
+    def linked_calib_groups(self):
+        """
+        Collect the calibration groups that share frames.
+
+        The master key of a calibration frame includes all of its
+        calibration groups (see :func:`master_key`), meaning that any
+        group that shares a frame with another group also shares the
+        MasterFrames built from it.  This function collects the groups
+        linked by shared frames, either directly or through other
+        groups, such that each returned collection can be calibrated
+        independently of all the others.
+
+        Returns:
+            list: A list of lists, each with the sorted calibration
+            groups that are linked.  The list is sorted by the first
+            group in each collection.
+
+        Raises:
+            PypeItError:
+                Raised if the 'calibbit' column is not defined.
+        """
+        if 'calibbit' not in self.keys():
+            msgs.error('Calibration groups are not set.  First run set_calibration_groups.')
+        # Start with each group only linked to itself
+        link = np.arange(self.n_calib_groups)
+        for i in range(len(self)):
+            grp = np.array(self.find_frame_calib_groups(i), dtype=int)
+            if len(grp) < 2:
+                continue
+            # Link all groups connected to any group of this frame
+            indx = np.isin(link, link[grp])
+            link[indx] = np.amin(link[indx])
+        return [np.where(link == l)[0].tolist() for l in np.unique(link)]
+
 
 def row_match_config(row, config, spectrograph):
     """
@@ -191,7 +191,8 @@ class ProcessImagesPar(ParSet):
     def __init__(self, overscan=None, overscan_par=None, match=None, combine=None, satpix=None,
                  cr_reject=None,
                  sigrej=None, n_lohi=None, sig_lohi=None, replace=None, lamaxiter=None, grow=None,
-                 rmcompact=None, sigclip=None, sigfrac=None, objlim=None, bias=None):
+                 rmcompact=None, sigclip=None, sigfrac=None, objlim=None, n_threads=None,
+                 bias=None, spill_dir=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -297,6 +298,16 @@ class ProcessImagesPar(ParSet):
         dtypes['objlim'] = [int, float]
         descr['objlim'] = 'Object detection limit in LA cosmics routine'
 
+        defaults['n_threads'] = 1
+        dtypes['n_threads'] = int
+        descr['n_threads'] = 'Number of threads used by the LA cosmics routine.  The image is ' \
+                             'processed in tiles, which are distributed to the threads.'
+
+        dtypes['spill_dir'] = str
+        descr['spill_dir'] = 'Directory for the temporary, memory-mapped image stacks used ' \
+                             'when sigma clipping the combined frames.  If None, the default ' \
+                             'temporary directory of the system is used.'
+
         # Instantiate the parameter set
         super(ProcessImagesPar, self).__init__(list(pars.keys()),
                                                values=list(pars.values()),
@@ -314,7 +325,7 @@ class ProcessImagesPar(ParSet):
         parkeys = [ 'bias', 'overscan', 'overscan_par', 'match',
                     'combine', 'satpix', 'cr_reject', 'sigrej', 'n_lohi',
                     'sig_lohi', 'replace', 'lamaxiter', 'grow',
-                    'rmcompact', 'sigclip', 'sigfrac', 'objlim']
+                    'rmcompact', 'sigclip', 'sigfrac', 'objlim', 'n_threads', 'spill_dir']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -437,7 +448,8 @@ class FlatFieldPar(ParSet):
     see :ref:`pypeitpar`.
     """
     def __init__(self, method=None, frame=None, illumflatten=None, spec_samp_fine=None, spec_samp_coarse=None,
-                 spat_samp=None, tweak_slits=None, tweak_slits_thresh=None, tweak_slits_maxfrac=None):
+                 spat_samp=None, tweak_slits=None, tweak_slits_thresh=None, tweak_slits_maxfrac=None,
+                 n_proc=None):
 
     
         # Grab the parameter names and values from the function
@@ -505,6 +517,16 @@ class FlatFieldPar(ParSet):
                                        'allowed for trimming each (i.e. left and right) slit boundary, i.e. the default is 10% ' \
                                        'which means slits would shrink or grow by at most 20% (10% on each side)'
 
+        defaults['n_proc'] = 1
+        dtypes['n_proc'] = int
+        descr['n_proc'] = 'Number of processes to use for the flat-field fits.  If n_proc > 1, ' \
+                          'the slits are fit concurrently in a pool of worker processes; the ' \
+                          'result is identical to the serial calculation.  This only helps ' \
+                          'if more than one CPU is available and each slit takes at least ' \
+                          'about a second to fit (long slits); otherwise, starting the ' \
+                          'processes and sharing the images costs as much as it saves.  ' \
+                          'See the benchmark in pypeit/tests/test_flatfield.py.'
+
 
         # Instantiate the parameter set
         super(FlatFieldPar, self).__init__(list(pars.keys()),
@@ -521,7 +543,7 @@ class FlatFieldPar(ParSet):
     def from_dict(cls, cfg):
         k = cfg.keys()
         parkeys = [ 'method', 'frame', 'illumflatten', 'spec_samp_fine', 'spec_samp_coarse', 'spat_samp',
-                    'tweak_slits', 'tweak_slits_thresh', 'tweak_slits_maxfrac']
+                    'tweak_slits', 'tweak_slits_thresh', 'tweak_slits_maxfrac', 'n_proc']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -557,6 +579,9 @@ class FlatFieldPar(ParSet):
         #                     'pixels, number of repeats')
         #if self.data['method'] == 'bspline' and len(self.data['params']) != 1:
         #    raise ValueError('For bspline method, set params = spacing (integer).')
+        if self.data['n_proc'] is not None and self.data['n_proc'] < 1:
+            raise ValueError('n_proc must be a positive integer.')
+
         if self.data['frame'] in FlatFieldPar.valid_frames() or self.data['frame'] is None:
             return
 
@@ -976,7 +1001,8 @@ class ReduxPar(ParSet):
     see :ref:`pypeitpar`.
     """
     def __init__(self, spectrograph=None, detnum=None, sortroot=None, calwin=None, scidir=None,
-                 qadir=None, redux_path=None, ignore_bad_headers=None):
+                 qadir=None, redux_path=None, ignore_bad_headers=None, n_proc=None,
+                 header_cache=None, spec1d_format=None, use_cache=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -1030,6 +1056,41 @@ class ReduxPar(ParSet):
         descr['redux_path'] = 'Path to folder for performing reductions.  Default is the ' \
                               'current working directory.'
 
+        defaults['n_proc'] = 1
+        dtypes['n_proc'] = int
+        descr['n_proc'] = 'Number of processes to use for the reduction.  If n_proc > 1 ' \
+                          'and the calibration groups can be split into independent sets ' \
+                          '(i.e., sets that do not share any frames), the sets are reduced ' \
+                          'concurrently in a pool of worker processes.  Otherwise, the ' \
+                          'detectors of multi-detector exposures are calibrated and ' \
+                          'extracted concurrently.  The default (1) reduces everything ' \
+                          'serially.  Parallel reductions are disabled if the reduction ' \
+                          'steps are shown interactively.'
+
+        dtypes['header_cache'] = str
+        descr['header_cache'] = 'Name of a file used to cache the headers of the raw files.  ' \
+                                'Headers are only read from files that are not in the cache or ' \
+                                'have been modified (based on their modification time and ' \
+                                'size) since they were cached.  If None, all headers are read.'
+
+        defaults['spec1d_format'] = 'multiext'
+        options['spec1d_format'] = ReduxPar.valid_spec1d_formats()
+        dtypes['spec1d_format'] = str
+        descr['spec1d_format'] = 'Layout of the spec1d files.  With multiext, each object is ' \
+                                 'written to its own binary table extension.  With columnar, ' \
+                                 'each extracted quantity is written to a single extension ' \
+                                 'for all objects, which allows the spectra of one object to ' \
+                                 'be read without reading the full file.  Options are: ' \
+                                 '{0}'.format(', '.join(options['spec1d_format']))
+
+        defaults['use_cache'] = True
+        dtypes['use_cache'] = bool
+        descr['use_cache'] = 'Cache the products built from the arc line data files (line ' \
+                             'lists, archived wavelength solutions, and pattern-matching KD ' \
+                             'trees) on disk, in the directory given by the PYPEIT_CACHE ' \
+                             'environment variable (default is ~/.pypeit/cache).  If False, ' \
+                             'the products are rebuilt and nothing is written to the cache.'
+
         # Instantiate the parameter set
         super(ReduxPar, self).__init__(list(pars.keys()),
                                         values=list(pars.values()),
@@ -1045,12 +1106,20 @@ class ReduxPar(ParSet):
 
         # Basic keywords
         parkeys = [ 'spectrograph', 'detnum', 'sortroot', 'calwin', 'scidir', 'qadir',
-                    'redux_path', 'ignore_bad_headers']
+                    'redux_path', 'ignore_bad_headers', 'n_proc', 'header_cache',
+                    'spec1d_format', 'use_cache']
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
         return cls(**kwargs)
 
+    @staticmethod
+    def valid_spec1d_formats():
+        """
+        Return the valid layouts of the spec1d files.
+        """
+        return ['multiext', 'columnar']
+
     @staticmethod
     def valid_spectrographs():
         # WARNING: Needs this to determine the valid spectrographs.
@@ -1068,7 +1137,8 @@ class ReduxPar(ParSet):
                 'lbt_mods1r', 'lbt_mods1b', 'lbt_mods2r', 'lbt_mods2b', 'vlt_fors2']
 
     def validate(self):
-        pass
+        if self.data['n_proc'] is not None and self.data['n_proc'] < 1:
+            raise ValueError('n_proc must be a positive integer.')
 
     
 class WavelengthSolutionPar(ParSet):
@@ -1794,7 +1864,8 @@ class WaveTiltsPar(ParSet):
     """
     def __init__(self, idsonly=None, tracethresh=None, sig_neigh=None, nfwhm_neigh=None,
                  maxdev_tracefit=None, sigrej_trace=None, spat_order=None, spec_order=None,
-                 func2d=None, maxdev2d=None, sigrej2d=None, rm_continuum=None, cont_rej=None):
+                 func2d=None, maxdev2d=None, sigrej2d=None, rm_continuum=None, cont_rej=None,
+                 n_proc=None):
 #                 cont_function=None, cont_order=None,
 
         # Grab the parameter names and values from the function
@@ -1897,6 +1968,11 @@ class WaveTiltsPar(ParSet):
         descr['cont_rej'] = 'The sigma threshold for rejection.  Can be a single number or two ' \
                             'numbers that give the low and high sigma rejection, respectively.'
 
+        defaults['n_proc'] = 1
+        dtypes['n_proc'] = int
+        descr['n_proc'] = 'Number of processes to use to trace and fit the tilts.  If n_proc > 1, ' \
+                          'the slits are distributed to a pool of worker processes.'
+
         # Right now this is not used the fits are hard wired to be legendre for the individual fits.
         #defaults['function'] = 'legendre'
         # TODO: Allowed values?
@@ -1934,7 +2010,7 @@ class WaveTiltsPar(ParSet):
         k = cfg.keys()
         parkeys = ['idsonly', 'tracethresh', 'sig_neigh', 'maxdev_tracefit', 'sigrej_trace',
                    'nfwhm_neigh', 'spat_order', 'spec_order', 'func2d', 'maxdev2d', 'sigrej2d',
-                   'rm_continuum', 'cont_rej'] #'cont_function', 'cont_order',
+                   'rm_continuum', 'cont_rej', 'n_proc'] #'cont_function', 'cont_order',
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
@@ -1946,6 +2022,8 @@ class WaveTiltsPar(ParSet):
             if len(self.data['cont_rej']) != 2:
                 raise ValueError('Continuum rejection threshold must be a single number or a '
                                  'two-element list/array.')
+        if self.data['n_proc'] is not None and self.data['n_proc'] < 1:
+            raise ValueError('n_proc must be a positive integer.')
 
     #@staticmethod
     #def valid_methods():
@@ -2157,7 +2235,7 @@ class SkySubPar(ParSet):
 
     def __init__(self,
                  bspline_spacing=None, sky_sigrej=None,
-                 global_sky_std=None, no_poly=None
+                 global_sky_std=None, no_poly=None, n_proc=None
                  ):
         # Grab the parameter names and values from the function
         # arguments
@@ -2192,6 +2270,17 @@ class SkySubPar(ParSet):
         dtypes['no_poly'] = bool
         descr['no_poly'] = 'Turn off polynomial basis (Legendre) in global sky subtraction'
 
+        defaults['n_proc'] = 1
+        dtypes['n_proc'] = int
+        descr['n_proc'] = 'Number of processes to use for the global and local sky ' \
+                          'subtraction and extraction.  If n_proc > 1, the slits are ' \
+                          'processed concurrently in a pool of worker processes; the result ' \
+                          'is identical to the serial calculation.  For echelle data, orders ' \
+                          'that adopt the FWHM measured on brighter orders are only extracted ' \
+                          'after those orders are finished.  ' \
+                          'Note that the total number of processes is multiplied by the ' \
+                          'number of processes used to reduce the detectors (see ' \
+                          '``[rdx]`` ``n_proc``).'
 
         # Instantiate the parameter set
         super(SkySubPar, self).__init__(list(pars.keys()),
@@ -2208,7 +2297,7 @@ class SkySubPar(ParSet):
 
         # Basic keywords
         parkeys = ['bspline_spacing', 'sky_sigrej', 'global_sky_std',
-                   'no_poly'
+                   'no_poly', 'n_proc'
                    ]
         kwargs = {}
         for pk in parkeys:
@@ -2216,7 +2305,8 @@ class SkySubPar(ParSet):
         return cls(**kwargs)
 
     def validate(self):
-        pass
+        if self.data['n_proc'] is not None and self.data['n_proc'] < 1:
+            raise ValueError('n_proc must be a positive integer.')
 
 
 class ExtractionPar(ParSet):
@@ -2325,7 +2415,7 @@ class CalibrationsPar(ParSet):
     def __init__(self, caldir=None, setup=None, trim=None, badpix=None, biasframe=None,
                  darkframe=None, arcframe=None, tiltframe=None, pixelflatframe=None,
                  pinholeframe=None, traceframe=None, standardframe=None, flatfield=None,
-                 wavelengths=None, slitedges=None, tilts=None):
+                 wavelengths=None, slitedges=None, tilts=None, master_store=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -2345,6 +2435,15 @@ class CalibrationsPar(ParSet):
         dtypes['caldir'] = str
         descr['caldir'] = 'If provided, it must be the full path to calling directory to write master files.'
 
+        dtypes['master_store'] = str
+        descr['master_store'] = 'Directory with a store of master frames shared by different ' \
+                                'reductions (e.g., of other nights or by concurrent runs).  ' \
+                                'Master frames are identified by a digest of their raw files, ' \
+                                'the relevant parameters, and the PypeIt version; they are ' \
+                                'copied from the store instead of being rebuilt when ' \
+                                'available, and new master frames are added to it.  If None, ' \
+                                'no store is used.'
+
         dtypes['setup'] = str
         descr['setup'] = 'If masters=\'force\', this is the setup name to be used: e.g., ' \
                          'C_02_aa .  The detector number is ignored but the other information ' \
@@ -2424,7 +2523,7 @@ class CalibrationsPar(ParSet):
         k = cfg.keys()
 
         # Basic keywords
-        parkeys = [ 'caldir', 'setup', 'trim', 'badpix' ]
+        parkeys = [ 'caldir', 'setup', 'trim', 'badpix', 'master_store' ]
         kwargs = {}
         for pk in parkeys:
             kwargs[pk] = cfg[pk] if pk in k else None
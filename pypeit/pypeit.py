@@ -5,6 +5,7 @@ import time
 import os
 import numpy as np
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from astropy.io import fits
 from pypeit import msgs
 from pypeit import calibrations
@@ -16,6 +17,7 @@ from pypeit.core import wave
 from pypeit.core import save
 from pypeit import specobjs
 from pypeit.core import pixels
+from pypeit.core.wavecal import waveio
 from pypeit.spectrographs.util import load_spectrograph
 
 from configobj import ConfigObj
@@ -102,6 +104,10 @@ class PypeIt(object):
         if redux_path is not None:
             self.par['rdx']['redux_path'] = redux_path
 
+        # Disable the on-disk cache of the arc line products
+        if not self.par['rdx']['use_cache']:
+            waveio.cache_path = None
+
         # TODO: Write the full parameter set here?
         # --------------------------------------------------------------
 
@@ -243,6 +249,12 @@ class PypeIt(object):
 
         Calibration and extraction via a series of calls to reduce_exposure()
 
+        If the `rdx` parameter `n_proc` is larger than one and the
+        calibration groups can be split into independent sets (see
+        :func:`pypeit.metadata.PypeItMetaData.linked_calib_groups`),
+        the sets are reduced in parallel; see
+        :func:`reduce_calib_groups_parallel`.
+
         """
         # Validate the parameter set
         required = ['rdx', 'calibrations', 'scienceframe', 'scienceimage', 'flexure', 'fluxcalib']
@@ -251,73 +263,227 @@ class PypeIt(object):
 
         self.tstart = time.time()
 
+        # Find the sets of calibration groups that can be reduced
+        # independently
+        calib_sets = self.fitstbl.linked_calib_groups()
+        n_proc = min(self.par['rdx']['n_proc'], len(calib_sets))
+        if n_proc > 1 and self.show:
+            msgs.warn('Cannot show the reduction steps when reducing calibration groups in '
+                      'parallel.  Reducing the calibration groups serially.')
+            n_proc = 1
+
+        if n_proc > 1:
+            self.reduce_calib_groups_parallel(calib_sets, n_proc=n_proc)
+        else:
+            # Iterate over each calibration group and reduce the standards
+            for i in range(self.fitstbl.n_calib_groups):
+                self.reduce_standards(i)
+
+            # Iterate over each calibration group again and reduce the
+            # science frames
+            for i in range(self.fitstbl.n_calib_groups):
+                self.reduce_science(i)
+
+        # Finish
+        self.print_end_time()
+
+    def reduce_standards(self, calib_ID):
+        """
+        Reduce all the standard frames in a calibration group.
+
+        Args:
+            calib_ID (:obj:`int`):
+                The calibration group.
+        """
+        # Find all the frames in this calibration group
+        in_grp = self.fitstbl.find_calib_group(calib_ID)
+
+        # Find the indices of the standard frames in this calibration group:
+        grp_standards = np.where(self.fitstbl.find_frames('standard') & in_grp)[0]
+
+        # Reduce all the standard frames, loop on unique comb_id
+        u_combid_std= np.unique(self.fitstbl['comb_id'][grp_standards])
+        for j, comb_id in enumerate(u_combid_std):
+            frames = np.where(self.fitstbl['comb_id'] == comb_id)[0]
+            bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
+            if not self.outfile_exists(frames[0]) or self.overwrite:
+                std_dict = self.reduce_exposure(frames, bg_frames=bg_frames)
+                # TODO come up with sensible naming convention for save_exposure for combined files
+                self.save_exposure(frames[0], std_dict, self.basename)
+            else:
+                msgs.info('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
+                          '. Set overwrite=True to recreate and overwrite.')
+
+    def reduce_science(self, calib_ID):
+        """
+        Reduce all the science frames in a calibration group.
+
+        The standards must have already been reduced; see
+        :func:`reduce_standards`.
+
+        Args:
+            calib_ID (:obj:`int`):
+                The calibration group.
+        """
+        # Find all the frames in this calibration group
+        in_grp = self.fitstbl.find_calib_group(calib_ID)
+
         # Find the standard frames
         is_standard = self.fitstbl.find_frames('standard')
 
-        # Find the science frames
-        is_science = self.fitstbl.find_frames('science')
+        # Find the indices of the science frames in this calibration group:
+        grp_science = np.where(self.fitstbl.find_frames('science') & in_grp)[0]
+        # Associate standards (previously reduced above) for this setup
+        std_outfile = self.get_std_outfile(np.where(is_standard)[0])
+        # Reduce all the science frames; keep the basenames of the science frames for use in flux calibration
+        science_basename = [None]*len(grp_science)
+        # Loop on unique comb_id
+        u_combid = np.unique(self.fitstbl['comb_id'][grp_science])
+        for j, comb_id in enumerate(u_combid):
+            frames = np.where(self.fitstbl['comb_id'] == comb_id)[0]
+            # Find all frames whose comb_id matches the current frames bkg_id.
+            bg_frames = np.where((self.fitstbl['comb_id'] == self.fitstbl['bkg_id'][frames][0]) &
+                                 (self.fitstbl['comb_id'] >= 0))[0]
+            # JFH changed the syntax below to that above, which allows frames to be used more than once
+            # as a background image. The syntax below would require that we could somehow list multiple
+            # numbers for the bkg_id which is impossible without a comma separated list
+#            bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
+            if not self.outfile_exists(frames[0]) or self.overwrite:
+                sci_dict = self.reduce_exposure(frames, bg_frames=bg_frames,
+                                                std_outfile=std_outfile)
+                science_basename[j] = self.basename
+                # TODO come up with sensible naming convention for save_exposure for combined files
+                self.save_exposure(frames[0], sci_dict, self.basename)
+            else:
+                msgs.warn('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
+                          '. Set overwrite=True to recreate and overwrite.')
 
-        # Frame indices
-        frame_indx = np.arange(len(self.fitstbl))
+        msgs.info('Finished calibration group {0}'.format(calib_ID))
 
-        # Iterate over each calibration group and reduce the standards
-        for i in range(self.fitstbl.n_calib_groups):
+    def reduction_graph(self, calib_sets):
+        """
+        Construct the dependency graph for the reduction of independent
+        sets of calibration groups.
 
-            # Find all the frames in this calibration group
-            in_grp = self.fitstbl.find_calib_group(i)
+        Each set of calibration groups has up to two nodes in the
+        graph, one for the reduction of its standards and one for the
+        reduction of its science frames.  The science frames depend on
+        the reduction of the standards in the same set, which builds
+        the MasterFrames, and on the reduction of the set with the
+        standard used for all science frames; see
+        :func:`get_std_outfile`.
 
-            # Find the indices of the standard frames in this calibration group:
-            grp_standards = frame_indx[is_standard & in_grp]
+        Args:
+            calib_sets (:obj:`list`):
+                The list of independent sets of calibration groups;
+                see
+                :func:`pypeit.metadata.PypeItMetaData.linked_calib_groups`.
 
-            # Reduce all the standard frames, loop on unique comb_id
-            u_combid_std= np.unique(self.fitstbl['comb_id'][grp_standards])
-            for j, comb_id in enumerate(u_combid_std):
-                frames = np.where(self.fitstbl['comb_id'] == comb_id)[0]
-                bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
-                if not self.outfile_exists(frames[0]) or self.overwrite:
-                    std_dict = self.reduce_exposure(frames, bg_frames=bg_frames)
-                    # TODO come up with sensible naming convention for save_exposure for combined files
-                    self.save_exposure(frames[0], std_dict, self.basename)
-                else:
-                    msgs.info('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
-                              '. Set overwrite=True to recreate and overwrite.')
-
-        # Iterate over each calibration group again and reduce the science frames
-        for i in range(self.fitstbl.n_calib_groups):
-            # Find all the frames in this calibration group
-            in_grp = self.fitstbl.find_calib_group(i)
-
-            # Find the indices of the science frames in this calibration group:
-            grp_science = frame_indx[is_science & in_grp]
-            # Associate standards (previously reduced above) for this setup
-            std_outfile = self.get_std_outfile(frame_indx[is_standard])
-            # Reduce all the science frames; keep the basenames of the science frames for use in flux calibration
-            science_basename = [None]*len(grp_science)
-            # Loop on unique comb_id
-            u_combid = np.unique(self.fitstbl['comb_id'][grp_science])
-            for j, comb_id in enumerate(u_combid):
-                frames = np.where(self.fitstbl['comb_id'] == comb_id)[0]
-                # Find all frames whose comb_id matches the current frames bkg_id.
-                bg_frames = np.where((self.fitstbl['comb_id'] == self.fitstbl['bkg_id'][frames][0]) &
-                                     (self.fitstbl['comb_id'] >= 0))[0]
-                # JFH changed the syntax below to that above, which allows frames to be used more than once
-                # as a background image. The syntax below would require that we could somehow list multiple
-                # numbers for the bkg_id which is impossible without a comma separated list
-#                bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
-                if not self.outfile_exists(frames[0]) or self.overwrite:
-                    sci_dict = self.reduce_exposure(frames, bg_frames=bg_frames,
-                                                    std_outfile=std_outfile)
-                    science_basename[j] = self.basename
-                    # TODO come up with sensible naming convention for save_exposure for combined files
-                    self.save_exposure(frames[0], sci_dict, self.basename)
-                else:
-                    msgs.warn('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
-                              '. Set overwrite=True to recreate and overwrite.')
+        Returns:
+            `collections.OrderedDict`_: The dependency graph.  Each
+            key is a node given by a tuple with the frame type
+            ('standard' or 'science') and the index of the set in
+            `calib_sets`; the value is the list of nodes that must be
+            completed first.
+        """
+        is_standard = self.fitstbl.find_frames('standard')
+        is_science = self.fitstbl.find_frames('science')
+        in_set = [np.any([self.fitstbl.find_calib_group(i) for i in calib_groups], axis=0)
+                    for calib_groups in calib_sets]
+
+        # Find the set with the standard used for all science frames
+        std_set = None
+        if np.any(is_standard):
+            std_grp = self.fitstbl.find_frame_calib_groups(np.where(is_standard)[0][0])
+            if len(std_grp) > 0:
+                std_set = [i for i, calib_groups in enumerate(calib_sets)
+                                if int(std_grp[0]) in calib_groups][0]
+
+        graph = OrderedDict()
+        for i in range(len(calib_sets)):
+            if np.any(is_standard & in_set[i]):
+                graph[('standard', i)] = []
+        for i in range(len(calib_sets)):
+            if not np.any(is_science & in_set[i]):
+                continue
+            graph[('science', i)] = [node for node in [('standard', i), ('standard', std_set)]
+                                        if node in graph]
+            graph[('science', i)] = list(OrderedDict.fromkeys(graph[('science', i)]))
+        return graph
+
+    def _reduce_calib_groups_worker(self, frametype, calib_groups, calib_dict):
+        """
+        Reduce the standard or science frames in a set of calibration
+        groups in a worker process.
 
-            msgs.info('Finished calibration group {0}'.format(i))
+        The detectors are reduced serially by the worker.
 
-        # Finish
-        self.print_end_time()
+        Args:
+            frametype (:obj:`str`):
+                The frame type to reduce, either 'standard' or
+                'science'.
+            calib_groups (:obj:`list`):
+                The calibration groups to reduce.
+            calib_dict (:obj:`dict`):
+                Calibrations previously built for these calibration
+                groups.
+
+        Returns:
+            dict: The calibrations built for the calibration groups.
+        """
+        self.par['rdx']['n_proc'] = 1
+        self.caliBrate.calib_dict = calib_dict
+        reduce_frames = self.reduce_standards if frametype == 'standard' \
+                            else self.reduce_science
+        for i in calib_groups:
+            reduce_frames(i)
+        return self.caliBrate.calib_dict
+
+    def reduce_calib_groups_parallel(self, calib_sets, n_proc=2):
+        """
+        Reduce independent sets of calibration groups in parallel.
+
+        The nodes of the dependency graph constructed by
+        :func:`reduction_graph` are dispatched to a pool of worker
+        processes as soon as the nodes they depend on are complete.
+        The calibrations built when reducing the standards of a set are
+        passed to the worker that reduces its science frames, such
+        that the MasterFrames are only built once.  The output files
+        are written by the workers.
+
+        Args:
+            calib_sets (:obj:`list`):
+                The list of independent sets of calibration groups;
+                see
+                :func:`pypeit.metadata.PypeItMetaData.linked_calib_groups`.
+            n_proc (:obj:`int`, optional):
+                Number of worker processes.
+        """
+        graph = self.reduction_graph(calib_sets)
+        msgs.info('Reducing {0} independent sets of calibration groups using {1} '
+                  'processes'.format(len(calib_sets), n_proc))
+
+        calib_dicts = [{} for i in range(len(calib_sets))]
+        done = []
+        running = {}
+        with ProcessPoolExecutor(max_workers=n_proc) as executor:
+            while len(done) < len(graph):
+                # Submit all the nodes with completed dependencies
+                for node, depends in graph.items():
+                    if node in done or node in running.values() \
+                            or not np.all([d in done for d in depends]):
+                        continue
+                    frametype, i = node
+                    running[executor.submit(self._reduce_calib_groups_worker, frametype,
+                                            calib_sets[i], calib_dicts[i])] = node
+                # Wait for at least one node to finish
+                finished, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    frametype, i = running.pop(future)
+                    calib_dicts[i] = future.result()
+                    done += [(frametype, i)]
+                    msgs.info('Finished {0} frames in calibration groups {1}'.format(
+                              frametype, ', '.join([str(g) for g in calib_sets[i]])))
 
     # This is a static method to allow for use in coadding script 
     @staticmethod
@@ -404,29 +570,139 @@ class PypeIt(object):
             msgs.warn('Not reducing detectors: {0}'.format(' '.join([ str(d) for d in 
                                 set(np.arange(self.spectrograph.ndet))-set(detectors)])))
 
+        # Reduce the detectors, either serially or in a pool of worker
+        # processes
+        n_proc = min(self.par['rdx']['n_proc'], len(detectors))
+        if n_proc > 1 and self.show:
+            msgs.warn('Cannot show the reduction steps when reducing detectors in parallel.  '
+                      'Reducing the detectors serially.')
+            n_proc = 1
+
+        if n_proc > 1:
+            self.reduce_detectors_parallel(sci_dict, frames, detectors, bg_frames,
+                                           std_outfile=std_outfile, n_proc=n_proc)
+            return sci_dict
+
         # Loop on Detectors
         for self.det in detectors:
             msgs.info("Working on detector {0}".format(self.det))
-            sci_dict[self.det] = {}
-            # Calibrate
-            #TODO Is the right behavior to just use the first frame?
-            self.caliBrate.set_config(frames[0], self.det, self.par['calibrations'])
-            self.caliBrate.run_the_steps()
-            # Extract
-            # TODO: pass back the background frame, pass in background
-            # files as an argument. extract one takes a file list as an
-            # argument and instantiates science within
-            sci_dict[self.det]['sciimg'], sci_dict[self.det]['sciivar'], \
-                sci_dict[self.det]['skymodel'], sci_dict[self.det]['objmodel'], \
-                sci_dict[self.det]['ivarmodel'], sci_dict[self.det]['outmask'], \
-                sci_dict[self.det]['specobjs'], \
-                        = self.extract_one(frames, self.det, bg_frames,
-                                           std_outfile=std_outfile)
+            sci_dict[self.det] = self.reduce_detector(frames, self.det, bg_frames,
+                                                      std_outfile=std_outfile)
             # JFH TODO write out the background frame?
 
         # Return
         return sci_dict
 
+    def reduce_detector(self, frames, det, bg_frames, std_outfile=None):
+        """
+        Calibrate and extract a single detector of an exposure.
+
+        Args:
+            frames (:obj:`list`):
+                List of frames to extract; stacked if more than one is
+                provided.
+            det (:obj:`int`):
+                1-indexed detector to reduce.
+            bg_frames (:obj:`list`):
+                List of frames to use as the background.  Can be empty.
+            std_outfile (:obj:`str`, optional):
+                File with a previously reduced standard spectrum from
+                PypeIt.
+
+        Returns:
+            dict: The dictionary with the primary outputs of the
+            extraction for this detector.
+        """
+        det_dict = {}
+        # Calibrate
+        #TODO Is the right behavior to just use the first frame?
+        self.caliBrate.set_config(frames[0], det, self.par['calibrations'])
+        self.caliBrate.run_the_steps()
+        # Extract
+        # TODO: pass back the background frame, pass in background
+        # files as an argument. extract one takes a file list as an
+        # argument and instantiates science within
+        det_dict['sciimg'], det_dict['sciivar'], det_dict['skymodel'], det_dict['objmodel'], \
+                det_dict['ivarmodel'], det_dict['outmask'], det_dict['specobjs'] \
+                        = self.extract_one(frames, det, bg_frames, std_outfile=std_outfile)
+        return det_dict
+
+    def _reduce_detector_worker(self, frames, det, bg_frames, std_outfile=None):
+        """
+        Reduce a single detector in a worker process.
+
+        This is a wrapper for :func:`reduce_detector` that also returns
+        the calibration data generated by the worker so that they can be
+        cached by the calling process.
+
+        Returns:
+            tuple: The detector dictionary returned by
+            :func:`reduce_detector`, the new entries in
+            :attr:`caliBrate.calib_dict`, and the
+            :attr:`caliBrate.master_key_dict` for this detector.
+        """
+        cached_keys = list(self.caliBrate.calib_dict.keys())
+        det_dict = self.reduce_detector(frames, det, bg_frames, std_outfile=std_outfile)
+        calib_dict = dict([(key, self.caliBrate.calib_dict[key])
+                           for key in self.caliBrate.calib_dict.keys() if key not in cached_keys])
+        return det_dict, calib_dict, self.caliBrate.master_key_dict
+
+    def reduce_detectors_parallel(self, sci_dict, frames, detectors, bg_frames, std_outfile=None,
+                                  n_proc=2):
+        """
+        Reduce the detectors of an exposure in a pool of worker
+        processes.
+
+        The detectors are distributed to the workers, each of which
+        performs the full calibration and extraction of its detector;
+        see :func:`reduce_detector`.  The results are added to
+        `sci_dict` in the order of `detectors`, independent of the
+        order in which the workers finish, such that the output is
+        identical to the serial reduction.
+
+        The calibrations generated by the workers are added to the
+        cache held by :attr:`caliBrate` so that they are not rebuilt
+        for subsequent exposures in the same calibration group.  The
+        internals of :attr:`caliBrate`, as well as the output basename
+        (:attr:`basename`), are set to those of the last detector, as
+        they would be after the serial reduction.  However, the
+        intermediate products (e.g., :attr:`sciImg` and :attr:`redux`)
+        are only available within the worker processes.
+
+        Args:
+            sci_dict (:obj:`dict`):
+                Dictionary to fill with the primary outputs of the
+                extraction for each detector.  Modified in place.
+            frames (:obj:`list`):
+                List of frames to extract; stacked if more than one is
+                provided.
+            detectors (:obj:`list`):
+                The 1-indexed detectors to reduce.
+            bg_frames (:obj:`list`):
+                List of frames to use as the background.  Can be empty.
+            std_outfile (:obj:`str`, optional):
+                File with a previously reduced standard spectrum from
+                PypeIt.
+            n_proc (:obj:`int`, optional):
+                Number of worker processes.
+        """
+        msgs.info('Reducing detectors {0} using {1} processes'.format(
+                  ', '.join([str(d) for d in detectors]), n_proc))
+        with ProcessPoolExecutor(max_workers=n_proc) as executor:
+            futures = [executor.submit(self._reduce_detector_worker, frames, det, bg_frames,
+                                       std_outfile=std_outfile) for det in detectors]
+            # Collect the results in detector order
+            for self.det, future in zip(detectors, futures):
+                sci_dict[self.det], calib_dict, master_key_dict = future.result()
+                self.caliBrate.calib_dict.update(calib_dict)
+
+        # Set the internals to match the serial reduction
+        self.caliBrate.set_config(frames[0], self.det, self.par['calibrations'])
+        self.caliBrate.master_key_dict = master_key_dict
+        self.objtype, self.setup, self.obstime, self.basename, self.binning \
+                = self.get_sci_metadata(frames[0], self.det)
+        self.std_redux = 'standard' in self.objtype
+
     def get_sci_metadata(self, frame, det):
         """
         Grab the meta data for a given science frame and specific detector
@@ -530,11 +806,13 @@ class PypeIt(object):
         std_trace = self.get_std_trace(self.std_redux, det, std_outfile)
 
         # Build Science image
+        slitmask = pixels.tslits2mask(self.caliBrate.tslits_dict)
         sci_files = self.fitstbl.frame_paths(frames)
         self.sciImg = scienceimage.build_from_file_list(
             self.spectrograph, det, self.par['scienceframe']['process'],
             self.caliBrate.msbpm, sci_files, self.caliBrate.msbias,
-            self.caliBrate.mspixelflat, illum_flat=self.caliBrate.msillumflat)
+            self.caliBrate.mspixelflat, illum_flat=self.caliBrate.msillumflat,
+            slitmask=slitmask)
 
         # Background Image?
         if len(bg_frames) > 0:
@@ -542,10 +820,10 @@ class PypeIt(object):
             self.sciImg = self.sciImg - scienceimage.build_from_file_list(
                 self.spectrograph, det, self.par['scienceframe']['process'],
                 self.caliBrate.msbpm, bg_file_list, self.caliBrate.msbias,
-                self.caliBrate.mspixelflat, illum_flat=self.caliBrate.msillumflat)
+                self.caliBrate.mspixelflat, illum_flat=self.caliBrate.msillumflat,
+                slitmask=slitmask)
 
         # Update mask for slitmask
-        slitmask = pixels.tslits2mask(self.caliBrate.tslits_dict)
         self.sciImg.update_mask_slitmask(slitmask)
 
         # For QA on crash
@@ -612,7 +890,8 @@ class PypeIt(object):
         # Determine the paths/filenames
         save.save_all(sci_dict, self.caliBrate.master_key_dict, self.caliBrate.master_dir,
                       self.spectrograph, head1d, head2d, self.science_path, basename,
-                      update_det=self.par['rdx']['detnum'], binning=self.fitstbl['binning'][frame])
+                      update_det=self.par['rdx']['detnum'], binning=self.fitstbl['binning'][frame],
+                      spec1d_format=self.par['rdx']['spec1d_format'])
 
     def msgs_reset(self):
         """
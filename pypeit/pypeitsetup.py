@@ -166,7 +166,8 @@ class PypeItSetup(object):
                    cfg_lines=cfg_lines, pypeit_file=filename)
 
     @classmethod
-    def from_file_root(cls, root, spectrograph, extension='.fits', output_path=None):
+    def from_file_root(cls, root, spectrograph, extension='.fits', output_path=None,
+                       header_cache=None):
         """
         Instantiate the :class:`PypeItSetup` object by providing a file
         root.
@@ -195,6 +196,10 @@ class PypeItSetup(object):
                 Path to use for the output.  If None, the default is
                 './setup_files'.  If the path doesn't yet exist, it is
                 created.
+            header_cache (:obj:`str`, optional):
+                File used to cache the headers of the raw files; see
+                :class:`pypeit.io.HeaderCache`.  If None, no cache is
+                used.
         
         Returns:
             :class:`PypitSetup`: The instance of the class.
@@ -209,13 +214,15 @@ class PypeItSetup(object):
         msgs.info('A vanilla pypeit file will be written to: {0}'.format(pypeit_file))
         
         # Generate the pypeit file
-        cls.vanilla_pypeit_file(pypeit_file, root, spectrograph, extension=extension)
+        cls.vanilla_pypeit_file(pypeit_file, root, spectrograph, extension=extension,
+                                header_cache=header_cache)
 
         # Now setup PypeIt using that file
         return cls.from_pypeit_file(pypeit_file)
 
     @staticmethod
-    def vanilla_pypeit_file(pypeit_file, root, spectrograph, extension='.fits'):
+    def vanilla_pypeit_file(pypeit_file, root, spectrograph, extension='.fits',
+                            header_cache=None):
         """
         Write a vanilla PypeIt file.
 
@@ -227,6 +234,8 @@ class PypeItSetup(object):
               Name of spectrograph
             extension (str, optional):
               File extension
+            header_cache (str, optional):
+              File used to cache the headers of the raw files
 
         Returns:
 
@@ -237,6 +246,8 @@ class PypeItSetup(object):
         # configuration lines
         cfg_lines = ['[rdx]']
         cfg_lines += ['    spectrograph = {0}'.format(spectrograph)]
+        if header_cache is not None:
+            cfg_lines += ['    header_cache = {0}'.format(header_cache)]
 #        cfg_lines += ['    sortroot = {0}'.format(root)]
         make_pypeit_file(pypeit_file, spectrograph, [dfname], cfg_lines=cfg_lines, setup_mode=True)
 
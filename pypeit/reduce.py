@@ -9,7 +9,7 @@ from linetools import utils as ltu
 
 from pypeit import specobjs
 from pypeit import ginga, msgs, edgetrace
-from pypeit.core import skysub, extract, pixels, wave
+from pypeit.core import skysub, extract, pixels, wave, parallel
 
 from IPython import embed
 
@@ -415,25 +415,33 @@ class Reduce(object):
         # Mask objects using the skymask? If skymask has been set by objfinding, and masking is requested, then do so
         skymask_now = skymask if (skymask is not None) else np.ones_like(self.sciImg.image, dtype=bool)
 
-        # Loop on slits
-        for slit in gdslits:
-            msgs.info("Global sky subtraction for slit: {:d}".format(slit))
-            thismask = (self.slitmask == slit)
-            inmask = (self.sciImg.mask == 0) & thismask & skymask_now
-            # Find sky
-            self.global_sky[thismask] = skysub.global_skysub(self.sciImg.image,
-                                                             self.sciImg.ivar,
-                                                             self.tilts, thismask,
-                                                             self.tslits_dict['slit_left'][:,slit],
-                                                             self.tslits_dict['slit_righ'][:,slit],
-                                                             inmask=inmask,
-                                                             sigrej=sigrej,
-                                                             bsp=self.par['scienceimage']['skysub']['bspline_spacing'],
-                                                             no_poly=self.par['scienceimage']['skysub']['no_poly'],
-                                                             pos_mask=(not self.ir_redux),
-                                                             show_fit=show_fit)
+        # Slits are independent; optionally distribute them to a pool of
+        # processes.  Showing the fits requires the serial calculation.
+        n_proc = self.par['scienceimage']['skysub']['n_proc']
+        if show_fit and n_proc > 1:
+            msgs.warn('Cannot show the sky fits when using multiple processes.  Using n_proc=1.')
+            n_proc = 1
+        n_proc = min(n_proc, len(gdslits))
+
+        images = dict(image=self.sciImg.image, ivar=self.sciImg.ivar, tilts=self.tilts,
+                      slitmask=self.slitmask, gpm=(self.sciImg.mask == 0) & skymask_now)
+        tasks = [(slit, self.tslits_dict['slit_left'][:,slit],
+                  self.tslits_dict['slit_righ'][:,slit]) for slit in gdslits]
+        kwargs = dict(sigrej=sigrej, bsp=self.par['scienceimage']['skysub']['bspline_spacing'],
+                      no_poly=self.par['scienceimage']['skysub']['no_poly'],
+                      pos_mask=(not self.ir_redux), show_fit=show_fit)
+        if n_proc > 1:
+            with parallel.SharedArrays(**images) as shared:
+                skies = parallel.run_tasks(global_skysub_slit, tasks, n_proc=n_proc,
+                                           **shared, **kwargs)
+        else:
+            skies = parallel.run_tasks(global_skysub_slit, tasks, **images, **kwargs)
+
+        # Assemble the sky model
+        for slit, sky in zip(gdslits, skies):
+            self.global_sky[self.slitmask == slit] = sky
             # Mask if something went wrong
-            if np.sum(self.global_sky[thismask]) == 0.:
+            if np.sum(sky) == 0.:
                 self.maskslits[slit] = True
 
         if update_crmask:
@@ -713,44 +721,33 @@ class MultiSlitReduce(Reduce):
 
         """
         gdslits = np.where(np.invert(self.maskslits))[0]
+        specobj_dict = {'setup': self.setup, 'slitid': 999, #'orderindx': 999,
+                        'det': self.det, 'objtype': self.objtype, 'pypeline': self.pypeline}
 
-        # create the ouptut image for skymask
-        skymask = np.zeros_like(image, dtype=bool)
-        # Instantiate the specobjs container
-        sobjs = specobjs.SpecObjs()
-
-        # Loop on slits
-        for slit in gdslits:
-            qa_title ="Finding objects on slit # {:d}".format(slit)
-            msgs.info(qa_title)
-            thismask = (self.slitmask == slit)
-            inmask = (self.sciImg.mask == 0) & thismask
-            # Find objects
-            specobj_dict = {'setup': self.setup, 'slitid': slit, #'orderindx': 999,
-                            'det': self.det, 'objtype': self.objtype, 'pypeline': self.pypeline}
-
-            # TODO we need to add QA paths and QA hooks. QA should be
-            # done through objfind where all the relevant information
-            # is. This will be a png file(s) per slit.
-
-            sobjs_slit, skymask[thismask] = \
-                extract.objfind(image, thismask, self.tslits_dict['slit_left'][:,slit],
-                                self.tslits_dict['slit_righ'][:,slit], inmask=inmask,
-                                ir_redux=self.ir_redux,
-                                ncoeff=self.par['scienceimage']['findobj']['trace_npoly'],
-                                std_trace=std_trace,
-                                sig_thresh=self.par['scienceimage']['findobj']['sig_thresh'],
-                                hand_extract_dict=manual_extract_dict,
-                                specobj_dict=specobj_dict, show_peaks=show_peaks,
-                                show_fits=show_fits, show_trace=show_trace,
-                                trim_edg=self.par['scienceimage']['findobj']['find_trim_edge'],
-                                cont_fit=self.par['scienceimage']['findobj']['find_cont_fit'],
-                                npoly_cont=self.par['scienceimage']['findobj']['find_npoly_cont'],
-                                fwhm=self.par['scienceimage']['findobj']['find_fwhm'],
-                                maxdev=self.par['scienceimage']['findobj']['find_maxdev'],
-                                qa_title=qa_title, nperslit=self.par['scienceimage']['findobj']['maxnumber'],
-                                debug_all=debug)
-            sobjs.add_sobj(sobjs_slit)
+        # TODO we need to add QA paths and QA hooks. QA should be
+        # done through objfind where all the relevant information
+        # is. This will be a png file(s) per slit.
+
+        # Find objects on all slits
+        sobjs, skymask = \
+            extract.multislit_objfind(image, self.slitmask, self.tslits_dict['slit_left'],
+                                      self.tslits_dict['slit_righ'], gdslits,
+                                      inmask=(self.sciImg.mask == 0),
+                                      ir_redux=self.ir_redux,
+                                      ncoeff=self.par['scienceimage']['findobj']['trace_npoly'],
+                                      std_trace=std_trace,
+                                      sig_thresh=self.par['scienceimage']['findobj']['sig_thresh'],
+                                      hand_extract_dict=manual_extract_dict,
+                                      specobj_dict=specobj_dict, show_peaks=show_peaks,
+                                      show_fits=show_fits, show_trace=show_trace,
+                                      trim_edg=self.par['scienceimage']['findobj']['find_trim_edge'],
+                                      cont_fit=self.par['scienceimage']['findobj']['find_cont_fit'],
+                                      npoly_cont=self.par['scienceimage']['findobj']['find_npoly_cont'],
+                                      fwhm=self.par['scienceimage']['findobj']['find_fwhm'],
+                                      maxdev=self.par['scienceimage']['findobj']['find_maxdev'],
+                                      qa_title='Finding objects on slit',
+                                      nperslit=self.par['scienceimage']['findobj']['maxnumber'],
+                                      debug_all=debug)
 
         # Steps
         self.steps.append(inspect.stack()[0][3])
@@ -808,27 +805,45 @@ class MultiSlitReduce(Reduce):
         # Could actually create a model anyway here, but probably
         # overkill since nothing is extracted
         self.sobjs = sobjs.copy()  # WHY DO WE CREATE A COPY HERE?
-        # Loop on slits
-        for slit in gdslits:
-            msgs.info("Local sky subtraction and extraction for slit: {:d}".format(slit))
-            thisobj = (self.sobjs.SLITID == slit) # indices of objects for this slit
-            if np.any(thisobj):
-                thismask = (self.slitmask == slit) # pixels for this slit
-                # True  = Good, False = Bad for inmask
-                inmask = (self.sciImg.mask == 0) & thismask
-                # Local sky subtraction and extraction
-                self.skymodel[thismask], self.objmodel[thismask], self.ivarmodel[thismask], \
-                    self.extractmask[thismask] = skysub.local_skysub_extract(
-                    self.sciImg.image, self.sciImg.ivar, self.tilts, self.waveimg, self.global_sky, self.sciImg.rn2img,
-                    thismask, self.tslits_dict['slit_left'][:,slit], self.tslits_dict['slit_righ'][:, slit],
-                    self.sobjs[thisobj], spat_pix=spat_pix,
-                    model_full_slit=self.par['scienceimage']['extraction']['model_full_slit'],
-                    box_rad=self.par['scienceimage']['extraction']['boxcar_radius']/self.get_platescale(0), #self.spectrograph.detector[self.det-1]['platescale'],
-                    sigrej=self.par['scienceimage']['skysub']['sky_sigrej'],
-                    model_noise=model_noise, std=self.std_redux,
-                    bsp=self.par['scienceimage']['skysub']['bspline_spacing'],
-                    sn_gauss=self.par['scienceimage']['extraction']['sn_gauss'],
-                    inmask=inmask, show_profile=show_profile)
+        # Slits with objects are independent; optionally distribute them
+        # to a pool of processes.  Showing the fits requires the serial
+        # calculation.
+        gdslits = [slit for slit in gdslits if np.any(self.sobjs.SLITID == slit)]
+        n_proc = self.par['scienceimage']['skysub']['n_proc']
+        if show_profile and n_proc > 1:
+            msgs.warn('Cannot show the profile fits when using multiple processes.  Using n_proc=1.')
+            n_proc = 1
+        n_proc = min(n_proc, len(gdslits))
+
+        images = dict(sciimg=self.sciImg.image, sciivar=self.sciImg.ivar, tilts=self.tilts,
+                      waveimg=self.waveimg, global_sky=self.global_sky, rn2_img=self.sciImg.rn2img,
+                      slitmask=self.slitmask, gpm=(self.sciImg.mask == 0))
+        if spat_pix is not None:
+            images['spat_pix'] = spat_pix
+        box_rad = self.par['scienceimage']['extraction']['boxcar_radius']/self.get_platescale(0)
+        tasks = [(slit, self.tslits_dict['slit_left'][:,slit], self.tslits_dict['slit_righ'][:,slit],
+                  self.sobjs[self.sobjs.SLITID == slit], box_rad) for slit in gdslits]
+        kwargs = dict(model_full_slit=self.par['scienceimage']['extraction']['model_full_slit'],
+                      sigrej=self.par['scienceimage']['skysub']['sky_sigrej'],
+                      model_noise=model_noise, std=self.std_redux,
+                      bsp=self.par['scienceimage']['skysub']['bspline_spacing'],
+                      sn_gauss=self.par['scienceimage']['extraction']['sn_gauss'],
+                      show_profile=show_profile)
+        if n_proc > 1:
+            with parallel.SharedArrays(**images) as shared:
+                results = parallel.run_tasks(skysub.local_skysub_extract_slit, tasks,
+                                             n_proc=n_proc, **shared, **kwargs)
+        else:
+            results = parallel.run_tasks(skysub.local_skysub_extract_slit, tasks, **images,
+                                         **kwargs)
+
+        # Assemble the models
+        for slit, (sky, obj, ivar, extract_gpm, sobjs_slit) in zip(gdslits, results):
+            thismask = (self.slitmask == slit) # pixels for this slit
+            self.skymodel[thismask], self.objmodel[thismask], self.ivarmodel[thismask], \
+                    self.extractmask[thismask] = sky, obj, ivar, extract_gpm
+            # Objects extracted in a separate process are copies
+            self.sobjs.specobjs[self.sobjs.SLITID == slit] = sobjs_slit.specobjs
 
         # Set the bit for pixels which were masked by the extraction.
         # For extractmask, True = Good, False = Bad
@@ -1002,7 +1017,8 @@ class EchelleReduce(Reduce):
             sigrej=self.par['scienceimage']['skysub']['sky_sigrej'],
             sn_gauss=self.par['scienceimage']['extraction']['sn_gauss'],
             model_full_slit=self.par['scienceimage']['extraction']['model_full_slit'],
-            model_noise=model_noise, show_profile=show_profile, show_resids=show_resids, show_fwhm=show_fwhm)
+            model_noise=model_noise, show_profile=show_profile, show_resids=show_resids, show_fwhm=show_fwhm,
+            n_proc=self.par['scienceimage']['skysub']['n_proc'])
 
 
         # Step
@@ -1041,4 +1057,42 @@ def instantiate_me(sciImg, spectrograph, par, caliBrate, **kwargs):
                                                          par, caliBrate, **kwargs)
 
 
+def global_skysub_slit(slit, slit_left, slit_righ, image=None, ivar=None, tilts=None,
+                       slitmask=None, gpm=None, **kwargs):
+    """
+    Fit the global sky model of a single slit.
+
+    Used by :func:`Reduce.global_skysub`, possibly in a worker process.
+    The images can be provided directly or as
+    :class:`pypeit.core.parallel.SharedArray` objects.
+
+    Args:
+        slit (:obj:`int`):
+            Slit index in `slitmask`.
+        slit_left (`numpy.ndarray`_):
+            Left edge of the slit.
+        slit_righ (`numpy.ndarray`_):
+            Right edge of the slit.
+        image (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Science image.
+        ivar (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Inverse variance of the science image.
+        tilts (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Spectral tilts.
+        slitmask (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Image with the slit index of each pixel.
+        gpm (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Good-pixel mask for the sky fit, excluding the slit
+            selection.
+        **kwargs:
+            Passed to :func:`pypeit.core.skysub.global_skysub`.
 
+    Returns:
+        `numpy.ndarray`_: Sky model at the pixels in the slit.
+    """
+    msgs.info("Global sky subtraction for slit: {:d}".format(slit))
+    thismask = parallel.as_array(slitmask) == slit
+    inmask = parallel.as_array(gpm) & thismask
+    return skysub.global_skysub(parallel.as_array(image), parallel.as_array(ivar),
+                                parallel.as_array(tilts), thismask, slit_left, slit_righ,
+                                inmask=inmask, **kwargs)
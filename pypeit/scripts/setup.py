@@ -33,6 +33,9 @@ def parser(options=None):
                         help='Include the background-pair columns for the user to edit')
     parser.add_argument('-v', '--verbosity', type=int, default=2,
                         help='Level of verbosity from 0 to 2; default is 2.')
+    parser.add_argument('--header_cache', default=None, type=str,
+                        help='File used to cache the headers of the raw files.  When re-running '
+                             'the setup, only the headers of new or modified files are read.')
 #    parser.add_argument('-q', '--quick', default=False, help='Quick reduction',
 #                        action='store_true')
 #    parser.add_argument('-c', '--cpus', default=False,
@@ -69,7 +72,7 @@ def main(args):
     # Initialize PypeItSetup based on the arguments
     if args.root is not None:
         ps = PypeItSetup.from_file_root(args.root, args.spectrograph, extension=args.extension,
-                                        output_path=sort_dir)
+                                        output_path=sort_dir, header_cache=args.header_cache)
     else:
         # Should never reach here
         raise IOError('Need to set -r !!')
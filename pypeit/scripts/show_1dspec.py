@@ -37,31 +37,29 @@ def main(args, unit_test=False):
 
     from IPython import embed
 
-    sobjs = specobjs.SpecObjs.from_fitsfile(args.file)
-
-    # List only?
-    if args.list:
-        print("Showing object names for input file...")
-        for ii in range(len(sobjs)):
-            name = sobjs[ii].name
-            print("EXT{:07d} = {}".format(ii+1, name))
-        return
-
-    # Load spectrum
-    if args.obj is not None:
-        exten = sobjs.name.index(args.obj)
-        if exten < 0:
-            msgs.error("Bad input object name: {:s}".format(args.obj))
-    else:
-        exten = args.exten-1 # 1-index in FITS file
-
-    # Check Extraction
-    if args.extract == 'OPT':
-        if 'OPT_WAVE' not in sobjs[exten]._data.keys():
-            msgs.error("Spectrum not extracted with OPT.  Try --extract=BOX")
-
-    # XSpectrum1D
-    spec = sobjs[exten].to_xspec1d(extraction=args.extract, fluxed=args.flux)
+    # Only the requested object is read from the file
+    with specobjs.LazySpecObjs(args.file) as lazy:
+
+        # List only?
+        if args.list:
+            print("Showing object names for input file...")
+            for ii, name in enumerate(lazy.names):
+                print("EXT{:07d} = {}".format(ii+1, name))
+            return
+
+        # Load spectrum
+        if args.obj is not None:
+            exten = lazy.index_of(args.obj)
+        else:
+            exten = args.exten-1 # 1-index in FITS file
+
+        # Check Extraction
+        if args.extract == 'OPT':
+            if 'OPT_WAVE' not in lazy.columns(exten):
+                msgs.error("Spectrum not extracted with OPT.  Try --extract=BOX")
+
+        # XSpectrum1D
+        spec = lazy.get_specobj(exten).to_xspec1d(extraction=args.extract, fluxed=args.flux)
 
     if unit_test is False:
         app = QApplication(sys.argv)
@@ -272,6 +272,14 @@ class SpecObj(object):
         except KeyError:
             raise AttributeError(item)
 
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        # Bypass __setattr__ so that the object can be passed to and from
+        # worker processes
+        self.__dict__.update(state)
+
     def __setattr__(self, item, value):
 
         if not '_SpecObj__initialised' in self.__dict__:  # this test allows attributes to be set in the __init__ method
@@ -7,6 +7,7 @@ import numpy as np
 
 from astropy.units import Quantity
 from astropy.io import fits
+from astropy.table import Table
 
 from pypeit import msgs
 from pypeit.core import save
@@ -47,18 +48,21 @@ class SpecObjs(object):
             specobsj.SpecObjs
 
         """
-        # HDUList
-        hdul = fits.open(fits_file)
-        nhdu = len(hdul)
-        # Init
-        slf = cls()
-        # Add on the header
-        slf.header = hdul[0].header
-        # Loop on em
-        for kk in range(1,nhdu):
-            tbl = fits.connect.read_table_fits(hdul, hdu=kk)
-            sobj = specobj.SpecObj.from_table(tbl)
-            slf.add_sobj(sobj)
+        # HDUList; all the data are read before the file is closed
+        with fits.open(fits_file, memmap=False) as hdul:
+            if is_columnar(hdul):
+                # All objects are packed in a few columnar extensions
+                return LazySpecObjs(hdul).to_specobjs()
+            nhdu = len(hdul)
+            # Init
+            slf = cls()
+            # Add on the header
+            slf.header = hdul[0].header
+            # Loop on em
+            for kk in range(1,nhdu):
+                tbl = fits.connect.read_table_fits(hdul, hdu=kk)
+                sobj = specobj.SpecObj.from_table(tbl)
+                slf.add_sobj(sobj)
 
         # JFH I'm commenting this out below. I prefer to just directly write out attributes and reinstantiate them
         # from files. Doing things like this just leads to errors
@@ -343,6 +347,14 @@ class SpecObjs(object):
             # For all, a new table is constructed with slice of all columns
             return SpecObjs(specobjs=self.specobjs[item])
 
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        # Bypass __setattr__ so that the object can be passed to and from
+        # worker processes
+        self.__dict__.update(state)
+
     def __getattr__(self, k):
         """
         Overloaded to generate an array of attribute 'k' from the
@@ -375,10 +387,15 @@ class SpecObjs(object):
         return len(self.specobjs)
 
     def write_to_fits(self, outfile, header=None, spectrograph=None, overwrite=True,
-                      update_det=None):
+                      update_det=None, columnar=False):
         """
         Write the set of SpecObj objects to one multi-extension FITS file
 
+        By default, each object is written to its own binary table
+        extension.  With `columnar`, the objects are instead packed
+        into one image extension per data column and a binary table
+        with one row per object (see :class:`LazySpecObjs`).
+
         Args:
             outfile (str):
             header:
@@ -387,16 +404,33 @@ class SpecObjs(object):
             update_det (int or list, optional):
               If provided, do not clobber the existing file but only update
               the indicated detectors.  Useful for re-running on a subset of detectors
+            columnar (bool, optional):
+              Write the file in the columnar layout.
 
         """
         if os.path.isfile(outfile) and (not overwrite):
             msgs.warn("Outfile exists.  Set overwrite=True to clobber it")
             return
 
+        sobjs = [sobj for sobj in self.specobjs if sobj is not None]
+        update = os.path.isfile(outfile) and (update_det is not None)
+        if update and (columnar or is_columnar(outfile)):
+            # Keep the existing header and the objects on the other
+            # detectors and rewrite the full file
+            existing = SpecObjs.from_fitsfile(outfile)
+            _update_det = np.atleast_1d(update_det)
+            sobjs = [sobj for sobj in existing.specobjs if sobj.DET not in _update_det] + sobjs
+            prihdu = fits.PrimaryHDU(header=existing.header)
+            # The layout and extension cards are set below for the
+            # layout actually written
+            for key in list(prihdu.header.keys()):
+                if key == 'SPECFMT' or re.match('EXT[0-9]{4}$', key) is not None:
+                    prihdu.header.remove(key)
+            hdus = [prihdu]
         # If the file exists and update_det is provided, use the existing header
         #   and load up all the other hdus so that we only over-write the ones
         #   we are updating
-        if os.path.isfile(outfile) and (update_det is not None):
+        elif update:
             hdus, prihdu = save.init_hdus(update_det, outfile)
         else:
             # Build up the Header
@@ -426,24 +460,27 @@ class SpecObjs(object):
                 prihdu.header['LAT-OBS'] = telescope['latitude']
                 prihdu.header['ALT-OBS'] = telescope['elevation']
 
-        ext = len(hdus)-1
-        # Loop on the SpecObj objects
-        for sobj in self.specobjs:
-            if sobj is None:
-                continue
-            ext += 1
-            # Add header keyword
-            keywd = 'EXT{:04d}'.format(ext)
-            prihdu.header[keywd] = sobj.name
-
-            # Table
-            shdu = fits.table_to_hdu(sobj._data)
-            shdu.name = sobj.name
-            # Append
-            hdus += [shdu]
-
-        # A few more for the header
-        prihdu.header['NSPEC'] = len(hdus) - 1
+        if columnar:
+            prihdu.header['SPECFMT'] = ('columnar', 'Layout of the spec1d file')
+            hdus += columnar_hdus(sobjs)
+            prihdu.header['NSPEC'] = len(sobjs)
+        else:
+            ext = len(hdus)-1
+            # Loop on the SpecObj objects
+            for sobj in sobjs:
+                ext += 1
+                # Add header keyword
+                keywd = 'EXT{:04d}'.format(ext)
+                prihdu.header[keywd] = sobj.name
+
+                # Table
+                shdu = fits.table_to_hdu(sobj._data)
+                shdu.name = sobj.name
+                # Append
+                hdus += [shdu]
+
+            # A few more for the header
+            prihdu.header['NSPEC'] = len(hdus) - 1
         #prihdu.header['NPIX'] = specObjs.trace_spat.shape[1]
         # Code versions
         _ = initialize_header(prihdu.header)
@@ -455,6 +492,287 @@ class SpecObjs(object):
         return
 
 
+class LazySpecObjs(object):
+    """
+    Read-only access to the objects in a spec1d file that only reads
+    the data actually requested.
+
+    Two file layouts are supported:
+
+        - The multi-extension layout written by default by
+          :func:`SpecObjs.write_to_fits`, with one binary table per
+          object.  Only the table of the requested object is decoded.
+
+        - The columnar layout (``SPECFMT = 'columnar'`` in the primary
+          header).  The scalar attributes of all objects are held in
+          the ``OBJECTS`` binary table, with one row per object, and
+          each array attribute is held in an image extension named
+          after it that concatenates the arrays of all objects.  Only
+          the pixels of the requested object are read from disk.
+
+    Usage::
+
+        with LazySpecObjs(spec1d_file) as lazy:
+            indx = lazy.index_of(name)
+            wave = lazy.get_column(indx, 'OPT_WAVE')
+
+    The object owns, and :func:`close` closes, the file it opens if
+    given a file name.  If given an opened file, the caller keeps
+    ownership and must close it.  All the arrays returned are copies
+    that remain valid after the file is closed.
+
+    Args:
+        spec1d (:obj:`str`, `astropy.io.fits.HDUList`_):
+            Name of the spec1d file or the opened file.  The file is
+            memory mapped if a file name is provided.
+
+    Attributes:
+        header (`astropy.io.fits.Header`_):
+            Primary header of the file.
+        columnar (:obj:`bool`):
+            True if the file uses the columnar layout.
+    """
+    def __init__(self, spec1d):
+        self._close = not isinstance(spec1d, fits.HDUList)
+        self.hdul = fits.open(spec1d, memmap=True) if self._close else spec1d
+        self.header = self.hdul[0].header
+        self.columnar = is_columnar(self.hdul)
+        if self.columnar:
+            self.objects = self.hdul['OBJECTS'].data
+            self.names = [str(n) for n in self.objects['NAME']]
+        else:
+            self.objects = None
+            self.names = [h.name for h in self.hdul[1:]]
+
+    @property
+    def nobj(self):
+        """
+        Number of objects in the file.
+        """
+        return len(self.names)
+
+    def __len__(self):
+        return self.nobj
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the file, if it was opened by this object.
+        """
+        if self._close and self.hdul is not None:
+            self.hdul.close()
+        self.hdul = None
+        self.objects = None
+
+    def index_of(self, name):
+        """
+        Return the index of a named object.
+
+        Args:
+            name (:obj:`str`):
+                Full name of the object.
+
+        Returns:
+            :obj:`int`: Index of the object.
+        """
+        if name not in self.names:
+            msgs.error('No object named {0} in the spec1d file'.format(name))
+        return self.names.index(name)
+
+    def columns(self, indx):
+        """
+        Return the array attributes of an object.
+
+        Args:
+            indx (:obj:`int`):
+                Index of the object.
+
+        Returns:
+            :obj:`list`: The names of the array attributes.
+        """
+        if not self.columnar:
+            return list(self.hdul[indx+1].columns.names)
+        keys = self.objects['ARRKEYS'][indx]
+        return keys.split(',') if len(keys) > 0 else []
+
+    def meta(self, key):
+        """
+        Return a scalar attribute of all objects.
+
+        Args:
+            key (:obj:`str`):
+                Name of the attribute.
+
+        Returns:
+            `numpy.ndarray`_: The values for all objects.  In the
+            columnar layout, objects without the attribute are
+            given a fill value.
+        """
+        if self.columnar:
+            return np.array(self.objects[key])
+        return np.array([h.header[key] for h in self.hdul[1:]])
+
+    def _meta_dict(self, indx):
+        """
+        Return the scalar attributes of an object as a dictionary.
+        """
+        if not self.columnar:
+            return dict(fits.connect.read_table_fits(self.hdul, hdu=indx+1).meta)
+        keys = self.objects['METAKEYS'][indx]
+        meta = {}
+        for key in (keys.split(',') if len(keys) > 0 else []):
+            value = self.objects[key][indx]
+            meta[key] = value.item() if isinstance(value, np.generic) else value
+        return meta
+
+    def get_column(self, indx, key):
+        """
+        Read an array attribute of an object.
+
+        Args:
+            indx (:obj:`int`):
+                Index of the object.
+            key (:obj:`str`):
+                Name of the attribute.
+
+        Returns:
+            `numpy.ndarray`_: The array.
+        """
+        if key not in self.columns(indx):
+            msgs.error('{0} is not defined for object {1}'.format(key, self.names[indx]))
+        if not self.columnar:
+            # Copy out of the memory-mapped table
+            return np.array(self.hdul[indx+1].data[key])
+        start = self.objects['PIX_START'][indx]
+        hdu = self.hdul[key]
+        # The section is a view of the memory-mapped file
+        data = hdu.section[start:start+self.objects['NPIX'][indx]]
+        return data.astype(bool) if hdu.header.get('BOOLCOL', False) else data.copy()
+
+    def get_specobj(self, indx, columns=None):
+        """
+        Construct one of the objects.
+
+        Args:
+            indx (:obj:`int`):
+                Index of the object.
+            columns (:obj:`list`, optional):
+                Array attributes to read.  If None, all are read.
+
+        Returns:
+            :class:`pypeit.specobj.SpecObj`: The object.
+        """
+        tbl = Table(meta=self._meta_dict(indx))
+        for key in (self.columns(indx) if columns is None else columns):
+            tbl[key] = self.get_column(indx, key)
+        return specobj.SpecObj.from_table(tbl)
+
+    def to_specobjs(self, objs=None, columns=None):
+        """
+        Construct a :class:`SpecObjs` with a set of the objects.
+
+        Args:
+            objs (array-like, optional):
+                Indices of the objects.  If None, all objects are
+                constructed.
+            columns (:obj:`list`, optional):
+                Array attributes to read.  If None, all are read.
+
+        Returns:
+            :class:`SpecObjs`: The objects, with the primary header
+            of the file.
+        """
+        sobjs = SpecObjs()
+        sobjs.header = self.header
+        for indx in (range(self.nobj) if objs is None else objs):
+            sobjs.add_sobj(self.get_specobj(indx, columns=columns))
+        return sobjs
+
+
+def is_columnar(spec1d):
+    """
+    Check if a spec1d file uses the columnar layout.
+
+    Args:
+        spec1d (:obj:`str`, `astropy.io.fits.HDUList`_):
+            Name of the spec1d file or the opened file.
+
+    Returns:
+        :obj:`bool`: True if the file uses the columnar layout.
+    """
+    header = spec1d[0].header if isinstance(spec1d, fits.HDUList) else fits.getheader(spec1d)
+    return header.get('SPECFMT', 'multiext') == 'columnar'
+
+
+def columnar_hdus(sobjs):
+    """
+    Pack a set of SpecObj objects into the extensions of the columnar
+    spec1d layout; see :class:`LazySpecObjs`.
+
+    Args:
+        sobjs (:obj:`list`):
+            The :class:`pypeit.specobj.SpecObj` objects.
+
+    Returns:
+        :obj:`list`: The ``OBJECTS`` binary table followed by one
+        image extension per array attribute.
+    """
+    metas = [dict([(k, v) for k, v in sobj._data.meta.items() if k != 'EXTNAME'])
+             for sobj in sobjs]
+    npix = np.array([len(sobj._data) for sobj in sobjs], dtype=np.int64)
+    pix_start = np.append(0, np.cumsum(npix)[:-1]).astype(np.int64)
+
+    objects = Table()
+    objects['NAME'] = np.array([sobj.name for sobj in sobjs], dtype=str)
+    objects['PIX_START'] = pix_start
+    objects['NPIX'] = npix
+    objects['ARRKEYS'] = np.array([','.join(sobj._data.keys()) for sobj in sobjs], dtype=str)
+    objects['METAKEYS'] = np.array([','.join(meta.keys()) for meta in metas], dtype=str)
+
+    # One column per scalar attribute, filled where an object does not
+    # define it
+    meta_keys = []
+    for meta in metas:
+        meta_keys += [key for key in meta.keys() if key not in meta_keys]
+    for key in meta_keys:
+        values = [meta[key] for meta in metas if key in meta]
+        dtype = np.asarray(values).dtype
+        if dtype.kind in ['U', 'S']:
+            fill, dtype = '', str
+        elif dtype.kind == 'b':
+            fill, dtype = False, bool
+        elif dtype.kind in ['i', 'u']:
+            fill, dtype = 0, np.int64
+        else:
+            fill, dtype = np.nan, np.float64
+        objects[key] = np.array([meta.get(key, fill) for meta in metas], dtype=dtype)
+
+    hdus = [fits.table_to_hdu(objects)]
+    hdus[0].name = 'OBJECTS'
+
+    # One image per array attribute, concatenating all objects
+    arr_keys = []
+    for sobj in sobjs:
+        arr_keys += [key for key in sobj._data.keys() if key not in arr_keys]
+    for key in arr_keys:
+        dtype = np.result_type(*[sobj._data[key].dtype for sobj in sobjs if key in sobj._data.keys()])
+        isbool = dtype == bool
+        data = np.zeros(np.sum(npix), dtype=np.uint8 if isbool else dtype)
+        for sobj, start, n in zip(sobjs, pix_start, npix):
+            if key in sobj._data.keys():
+                data[start:start+n] = sobj._data[key]
+        hdu = fits.ImageHDU(data=data, name=key)
+        if isbool:
+            hdu.header['BOOLCOL'] = (True, 'Stored as uint8')
+        hdus += [hdu]
+    return hdus
+
+
 def lst_to_array(lst, mask=None):
     """
     Simple method to convert a list to an array
@@ -28,8 +28,10 @@ provide instrument-specific:
 """
 import os
 import warnings
+import functools
 
 from abc import ABCMeta
+from concurrent.futures import ThreadPoolExecutor
 from pkg_resources import resource_filename
 
 import numpy as np
@@ -414,17 +416,19 @@ class Spectrograph(object):
 
         Returns:
             tuple:
-                raw_img (np.ndarray) -- Raw image for this detector
+                raw_img (np.ndarray) -- Raw image for this detector;
+                pixels outside the data and overscan sections are 0
                 hdu (astropy.io.fits.HDUList)
                 exptime (float)
-                rawdatasec_img (np.ndarray)
-                oscansec_img (np.ndarray)
-                binning_raw (tuple)
+                rawdatasec_img (np.ndarray) -- Read-only; see
+                :func:`amp_section_images`
+                oscansec_img (np.ndarray) -- Read-only
 
         """
-        # Raw image
+        # Open the file; unless scaled, the image data are memory-mapped
+        # and only read below
         hdu = fits.open(raw_file)
-        raw_img = hdu[self.detector[det-1]['dataext']].data.astype(float)
+        ext = hdu[self.detector[det-1]['dataext']]
 
         # Extras
         headarr = self.get_headarr(hdu)
@@ -438,42 +442,54 @@ class Spectrograph(object):
             binning_raw = (',').join(binning.split(',')[::-1])
         else:
             binning_raw = binning
+        # TODO -- Deal with user windowing of the CCD (e.g. Kast red)
+        #  Code like the following maybe useful
+        #hdr = hdu[self.detector[det - 1]['dataext']].header
+        #image_sections = [hdr[key] for key in self.detector[det - 1][section]]
+        # Grab from DetectorPar in the Spectrograph class
+        rawdatasec_img, oscansec_img, sections \
+                = self.get_amp_section_images(det, ext.shape, binning_raw)
+
+        # Raw image.  Only the data and overscan sections are converted
+        # to float; all other pixels are 0.  Unless the data are scaled
+        # (BZERO/BSCALE), only these sections are read from disk.
+        raw_img = np.zeros(ext.shape, dtype=float)
+        data = ext.data
+        for sec in sections:
+            raw_img[sec] = data[sec]
 
-        for section in ['datasec', 'oscansec']:
+        # Return
+        return raw_img, hdu, exptime, rawdatasec_img, oscansec_img
+
+    def get_amp_section_images(self, det, shape, binning_raw):
+        """
+        Construct the images identifying the amplifier of each pixel in
+        the data and overscan sections of a raw frame.
 
-            # Get the data section
-            # Try using the image sections as header keywords
-            # TODO -- Deal with user windowing of the CCD (e.g. Kast red)
-            #  Code like the following maybe useful
-            #hdr = hdu[self.detector[det - 1]['dataext']].header
-            #image_sections = [hdr[key] for key in self.detector[det - 1][section]]
-            # Grab from DetectorPar in the Spectrograph class
+        The images only depend on the detector parameters, the image
+        shape, and the binning, so they are cached; see
+        :func:`amp_section_images`.
+
+        Args:
+            det (:obj:`int`):
+                1-indexed detector number.
+            shape (:obj:`tuple`):
+                Shape of the raw image.
+            binning_raw (:obj:`str`):
+                Binning of the raw image, as ordered in the raw image.
+
+        Returns:
+            tuple: The read-only data-section and overscan-section
+            images (0 means no amplifier), and a tuple with the slices
+            selecting all data and overscan sections.
+        """
+        sections = []
+        for section in ['datasec', 'oscansec']:
             image_sections = self.detector[det-1][section]
             if not isinstance(image_sections, list):
                 image_sections = [image_sections]
-            # Always assume normal FITS header formatting
-            one_indexed = True
-            include_last = True
-
-            # Initialize the image (0 means no amplifier)
-            pix_img = np.zeros(raw_img.shape, dtype=int)
-            for i in range(self.detector[det-1]['numamplifiers']):
-
-                if image_sections[i] is not None:
-                    # Convert the data section from a string to a slice
-                    datasec = parse.sec2slice(image_sections[i], one_indexed=one_indexed,
-                                              include_end=include_last, require_dim=2,
-                                              binning=binning_raw)
-                    # Assign the amplifier
-                    pix_img[datasec] = i+1
-            # Finish
-            if section == 'datasec':
-                rawdatasec_img = pix_img.copy()
-            else:
-                oscansec_img = pix_img.copy()
-
-        # Return
-        return raw_img, hdu, exptime, rawdatasec_img, oscansec_img
+            sections += [tuple(image_sections[:self.detector[det-1]['numamplifiers']])]
+        return amp_section_images(self.spectrograph, det, tuple(shape), binning_raw, *sections)
 
     def get_meta_value(self, inp, meta_key, required=False, ignore_bad_header=False, usr_row=None):
         """
@@ -610,10 +626,13 @@ class Spectrograph(object):
             objects with the extension headers.
         """
         # Faster to open the whole file and then assign the headers,
-        # particularly for gzipped files (e.g., DEIMOS)
+        # particularly for gzipped files (e.g., DEIMOS).  The HDUs are
+        # loaded lazily, so only the first numhead headers are parsed and
+        # no data are read.
         if isinstance(inp, str):
             try:
-                hdu = fits.open(inp)
+                with fits.open(inp) as hdu:
+                    return [hdu[k].header for k in range(self.numhead)]
             except:
                 if strict:
                     msgs.error('Problem opening {0}.'.format(inp))
@@ -621,9 +640,53 @@ class Spectrograph(object):
                     msgs.warn('Problem opening {0}.'.format(inp) + msgs.newline()
                               + 'Proceeding, but should consider removing this file!')
                     return ['None']*self.numhead
-        else:
-            hdu = inp
-        return [hdu[k].header for k in range(self.numhead)]
+        return [inp[k].header for k in range(self.numhead)]
+
+    def get_headarrs(self, files, strict=True, cache=None, n_threads=None):
+        """
+        Read the headers of a set of files.
+
+        The headers are read concurrently by a pool of threads using
+        :func:`get_headarr`.
+
+        Args:
+            files (:obj:`list`):
+                List of file names.
+            strict (:obj:`bool`, optional):
+                See :func:`get_headarr`.
+            cache (:class:`pypeit.io.HeaderCache`, optional):
+                Cache of previously read headers.  Files with cached
+                headers are not read, and the cache is updated with (and
+                written to disk after reading) the headers of the other
+                files.
+            n_threads (:obj:`int`, optional):
+                Number of threads.  If None, use the default of
+                :class:`concurrent.futures.ThreadPoolExecutor`.
+
+        Returns:
+            :obj:`list`: The list of headers returned by
+            :func:`get_headarr` for each file.
+        """
+        headarrs = [None]*len(files) if cache is None \
+                        else [cache.get(ifile, self.numhead) for ifile in files]
+        indx = [i for i, headarr in enumerate(headarrs) if headarr is None]
+        if cache is not None:
+            msgs.info('Found the headers of {0} of {1} files in {2}'.format(
+                      len(files) - len(indx), len(files), cache.filename))
+        if len(indx) == 0:
+            return headarrs
+
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            for i, headarr in zip(indx, executor.map(functools.partial(self.get_headarr,
+                                                                       strict=strict),
+                                                     [files[i] for i in indx])):
+                headarrs[i] = headarr
+                # Do not cache files that could not be read
+                if cache is not None and not isinstance(headarr[0], str):
+                    cache.add(files[i], headarr)
+        if cache is not None:
+            cache.write()
+        return headarrs
 
     def check_frame_type(self, ftype, fitstbl, exprng=None):
         raise NotImplementedError('Frame typing not defined for {0}.'.format(self.spectrograph))
@@ -829,3 +892,54 @@ class Spectrograph(object):
         txt += '>'
         return txt
 
+
+@functools.lru_cache(maxsize=32)
+def amp_section_images(spectrograph, det, shape, binning_raw, datasec, oscansec):
+    """
+    Construct the images identifying the amplifier of each pixel in the
+    data and overscan sections of a raw frame.
+
+    These are the same for all frames taken with a given detector and
+    binning, so the result is cached.  The returned arrays are
+    read-only; copy them before editing.
+
+    Args:
+        spectrograph (:obj:`str`):
+            Name of the spectrograph.  Only used to identify the cached
+            result.
+        det (:obj:`int`):
+            1-indexed detector number.  Only used to identify the cached
+            result.
+        shape (:obj:`tuple`):
+            Shape of the raw image.
+        binning_raw (:obj:`str`):
+            Binning of the raw image, as ordered in the raw image.
+        datasec (:obj:`tuple`):
+            The data section of each amplifier, using normal FITS header
+            formatting.  None means the amplifier has no data section.
+        oscansec (:obj:`tuple`):
+            As above, but for the overscan sections.
+
+    Returns:
+        tuple: The data-section and overscan-section images (0 means no
+        amplifier), and a tuple with the slices selecting all data and
+        overscan sections.
+    """
+    images = []
+    sections = []
+    for image_sections in [datasec, oscansec]:
+        # Initialize the image (0 means no amplifier)
+        pix_img = np.zeros(shape, dtype=int)
+        for i, sec in enumerate(image_sections):
+            if sec is None:
+                continue
+            # Convert the data section from a string to a slice
+            # Always assume normal FITS header formatting
+            _sec = parse.sec2slice(sec, one_indexed=True, include_end=True, require_dim=2,
+                                   binning=binning_raw)
+            # Assign the amplifier
+            pix_img[_sec] = i+1
+            sections += [_sec]
+        pix_img.setflags(write=False)
+        images += [pix_img]
+    return images[0], images[1], tuple(sections)
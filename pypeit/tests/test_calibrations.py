@@ -11,6 +11,7 @@ import shutil
 import numpy as np
 
 from pypeit import calibrations
+from pypeit import masterframe
 from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 from IPython import embed
@@ -105,6 +106,53 @@ def test_tiltimg(multi_caliBrate):
     tilt = multi_caliBrate.get_tiltimg()
     assert tilt.image.shape == (2048,350)
 
+def test_master_store(fitstbl):
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = spectrograph.default_pypeit_par()['calibrations']
+    par['biasframe']['useframe'] = 'none'
+    par['master_store'] = data_path('tst_store')
+
+    # First reduction builds the arc and adds it to the store
+    caliBrate = reset_calib(calibrations.MultiSlitCalibrations(fitstbl, par, spectrograph,
+                                                               caldir=data_path('tst_masters1')))
+    arc = caliBrate.get_arc()
+    digest = caliBrate.master_digest_dict['arc']
+    assert os.path.isfile(caliBrate.store.file_path('Arc', digest)), 'Arc not stored'
+
+    # Another reduction gets it from the store
+    caliBrate = reset_calib(calibrations.MultiSlitCalibrations(fitstbl, par, spectrograph,
+                                                               caldir=data_path('tst_masters2')))
+    _arc = caliBrate.get_arc()
+    assert caliBrate.master_digest_dict['arc'] == digest, 'Digest should be the same'
+    assert caliBrate.arcImage.reuse_masters, 'Arc should be loaded from the store'
+    assert np.array_equal(arc.image, _arc.image), 'Bad stored arc'
+
+    # Changing the parameters rebuilds it
+    sigrej = par['arcframe']['process']['sigrej']
+    par['arcframe']['process']['sigrej'] = 3.
+    caliBrate = reset_calib(calibrations.MultiSlitCalibrations(fitstbl, par, spectrograph,
+                                                               caldir=data_path('tst_masters2')))
+    caliBrate.get_arc()
+    assert caliBrate.master_digest_dict['arc'] != digest, 'Digest should change'
+    assert not caliBrate.arcImage.reuse_masters, 'Arc should be rebuilt'
+
+    # Reused local masters are never replaced by the stored ones
+    par['arcframe']['process']['sigrej'] = sigrej
+    caliBrate = reset_calib(calibrations.MultiSlitCalibrations(fitstbl, par, spectrograph,
+                                                               caldir=data_path('tst_masters2'),
+                                                               reuse_masters=True))
+    local_file = glob.glob(os.path.join(data_path('tst_masters2'), 'MasterArc_*'))[0]
+    stat = os.stat(local_file)
+    caliBrate.get_arc()
+    assert caliBrate.master_digest_dict['arc'] == digest, 'Digest should be the same'
+    _stat = os.stat(local_file)
+    assert (stat.st_ino, stat.st_mtime_ns) == (_stat.st_ino, _stat.st_mtime_ns), \
+            'Local master should not be overwritten'
+
+    for d in ['tst_store', 'tst_masters1', 'tst_masters2']:
+        shutil.rmtree(data_path(d))
+
+
 def test_bpm(multi_caliBrate):
     # Prep
     multi_caliBrate.shape = (2048,350)
@@ -274,3 +322,41 @@ def test_reuse(multi_caliBrate_reuse):
     # Clean-up
     shutil.rmtree(multi_caliBrate_reuse.master_dir)
 
+
+
+@dev_suite_required
+def test_master_store_tweak_slits(multi_caliBrate_reuse):
+    """
+    Test that rerunning with the store keeps the slits tweaked by the
+    flats.
+    """
+    calib = multi_caliBrate_reuse
+    if os.path.isdir(calib.master_dir):
+        shutil.rmtree(calib.master_dir)
+    os.makedirs(calib.master_dir)
+    calib.par['flatfield']['tweak_slits'] = True
+    calib.store = masterframe.MasterStore(data_path('tst_store'))
+
+    def run(calib):
+        reset_calib(calib)
+        calib.shape = (2048,350)
+        calib.get_bpm()
+        calib.get_arc()
+        calib.get_tiltimg()
+        calib.get_slits(write_qa=False)
+        calib.get_wv_calib()
+        calib.get_tilts()
+        calib.get_flats()
+        return calib.tslits_dict['slit_left'].copy(), calib.tilts_dict['tilts'].copy()
+
+    slit_left, tilts = run(calib)
+    # Rerun from the tweaked local masters
+    calib.calib_dict = {}
+    _slit_left, _tilts = run(calib)
+    assert np.array_equal(slit_left, _slit_left), 'Slits should be tweaked'
+    assert np.array_equal(tilts, _tilts), 'Tilts should be computed with the tweaked slits'
+    assert len(glob.glob(os.path.join(data_path('tst_store'), '*', 'MasterEdges_*'))) == 0, \
+            'Tweaked slits should not be stored'
+
+    shutil.rmtree(calib.master_dir)
+    shutil.rmtree(data_path('tst_store'))
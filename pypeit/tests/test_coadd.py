@@ -339,3 +339,31 @@ def test_sigma_clip():
 
 
 '''
+
+def test_compute_stack():
+    rng = np.random.RandomState(1)
+    nspec, nexp = 500, 4
+    waves = np.linspace(5000., 6000., nspec)[:,None]*(1. + rng.uniform(-1e-3, 1e-3, nexp))[None,:]
+    waves[:3,0] = 0.
+    fluxes = 10. + rng.normal(size=(nspec, nexp))
+    ivars = np.ones_like(fluxes)
+    masks = rng.uniform(size=(nspec, nexp)) > 0.05
+    weights = rng.uniform(size=(nspec, nexp))
+    wave_grid = np.linspace(5000., 6000., 201)
+    bin_index = coadd1d.wave_grid_index(wave_grid, waves)
+    assert np.array_equal(bin_index[:3,0], np.full(3, -1)), 'Pixels off the grid should not be binned'
+
+    wave_stack, flux_stack, ivar_stack, mask_stack, nused \
+            = coadd1d.compute_stack(wave_grid, waves, fluxes, ivars, masks, weights, bin_index=bin_index)
+    # Compare to np.histogram
+    gpm = masks & (waves > 1.0)
+    assert np.array_equal(nused, np.histogram(waves[gpm], bins=wave_grid)[0]), 'Bad number of pixels'
+    weights_total = np.histogram(waves[gpm], bins=wave_grid, weights=weights[gpm])[0]
+    flux_total = np.histogram(waves[gpm], bins=wave_grid, weights=(fluxes*weights)[gpm])[0]
+    assert np.allclose(flux_stack[mask_stack], flux_total[mask_stack]/weights_total[mask_stack]), \
+            'Bad stacked flux'
+    # Reusing the index is the same as recomputing it
+    _stack = coadd1d.compute_stack(wave_grid, waves, fluxes, ivars, masks, weights)
+    assert np.all([np.array_equal(s, _s) for s, _s in zip(_stack, [wave_stack, flux_stack, ivar_stack,
+                                                                    mask_stack, nused])]), \
+            'Bad stack with precomputed bin index'
@@ -0,0 +1,39 @@
+"""
+Module to run tests on coadd2d functions
+"""
+import numpy as np
+
+from pypeit.core import coadd2d
+
+
+def test_rebin2d():
+    rng = np.random.default_rng(0)
+    nimgs, nspec, nspat = 2, 60, 30
+    waveimg = np.linspace(5000., 5100., nspec)[None,:,None] + rng.normal(0, 0.5, (nimgs,nspec,nspat))
+    spatimg = np.zeros((nimgs,nspec,nspat)) + np.arange(nspat)[None,None,:] - 5.
+    thismask = np.zeros((nimgs,nspec,nspat), dtype=bool)
+    thismask[...,5:25] = True
+    inmask = rng.random((nimgs,nspec,nspat)) > 0.1
+    spec_bins = np.linspace(5000., 5100., 41)
+    spat_bins = np.arange(-0.5, 20.)
+    sci = rng.normal(size=(nimgs,nspec,nspat))
+    var = rng.random((nimgs,nspec,nspat))
+
+    sci_list_out, var_list_out, norm_rebin_stack, nsmp_rebin_stack \
+            = coadd2d.rebin2d(spec_bins, spat_bins, waveimg, spatimg, thismask, inmask, [sci], [var])
+
+    for img in range(nimgs):
+        nsmp = np.histogram2d(waveimg[img][thismask[img]], spatimg[img][thismask[img]],
+                              bins=[spec_bins, spat_bins])[0]
+        assert np.array_equal(nsmp_rebin_stack[img], nsmp), 'Bad number of samples'
+        gpm = thismask[img] & inmask[img]
+        norm = np.histogram2d(waveimg[img][gpm], spatimg[img][gpm], bins=[spec_bins, spat_bins])[0]
+        assert np.array_equal(norm_rebin_stack[img], norm), 'Bad number of unmasked samples'
+        wsci = np.histogram2d(waveimg[img][gpm], spatimg[img][gpm], bins=[spec_bins, spat_bins],
+                              weights=sci[img][gpm])[0]
+        assert np.allclose(sci_list_out[0][img], (norm > 0)*wsci/(norm + (norm == 0))), \
+                'Bad rebinned image'
+        wvar = np.histogram2d(waveimg[img][gpm], spatimg[img][gpm], bins=[spec_bins, spat_bins],
+                              weights=var[img][gpm])[0]
+        assert np.allclose(var_list_out[0][img], (norm > 0)*wvar/(norm + (norm == 0))**2), \
+                'Bad rebinned variance'
@@ -0,0 +1,99 @@
+"""
+Module to test the combination of images in CombineImage
+"""
+import os
+import shutil
+import tracemalloc
+
+import numpy as np
+
+from pypeit.core import combine
+from pypeit.images.combineimage import CombineImage
+
+
+def image_stacks(nimages=5, shape=(37,23)):
+    rng = np.random.default_rng(4)
+    img = rng.normal(loc=100., scale=10., size=(nimages,)+shape)
+    # Add some cosmic rays
+    img[rng.random(img.shape) > 0.99] += 1e4
+    var = np.abs(rng.normal(loc=100., scale=5., size=img.shape))
+    rn2 = np.full(img.shape, 9.)
+    gpm = rng.random(img.shape) > 0.05
+    # A pixel that is masked in all images
+    gpm[:,3,4] = False
+    return img, var, rn2, gpm
+
+
+def image_generator(img, var, rn2, gpm):
+    for i in range(img.shape[0]):
+        yield None, img[i], var[i], rn2[i], gpm[i]
+
+
+def test_running_combine():
+    img, var, rn2, gpm = image_stacks()
+    weights = np.ones(img.shape[0])/img.shape[0]
+    _img, _var, _rn2, _gpm = CombineImage._running_combine(image_generator(img, var, rn2, gpm),
+                                                           weights)[1:]
+    sci_list, var_list, outmask, _ = combine.weighted_combine(weights, [img], [var, rn2], gpm)
+    assert np.allclose(_img, sci_list[0], rtol=1e-14, atol=0), 'Bad running mean'
+    assert np.allclose(_var, var_list[0], rtol=1e-14, atol=0), 'Bad running variance'
+    assert np.allclose(_rn2, var_list[1], rtol=1e-14, atol=0), 'Bad running variance'
+    assert np.array_equal(_gpm, outmask), 'Bad combined mask'
+    assert not _gpm[3,4], 'Pixel should be masked'
+
+
+def test_tiled_combine():
+    img, var, rn2, gpm = image_stacks()
+    weights = np.ones(img.shape[0])/img.shape[0]
+    # Tiles of 2 rows, which do not evenly divide the image
+    tile_size = 2*img.shape[0]*img.shape[2]
+    _img, _var, _rn2, _gpm = CombineImage._tiled_combine(image_generator(img, var, rn2, gpm),
+                                                         weights, tile_size=tile_size)[1:]
+    sci_list, var_list, outmask, _ = combine.weighted_combine(weights, [img], [var, rn2], gpm,
+                                                              sigma_clip=True,
+                                                              sigma_clip_stack=img)
+    assert np.array_equal(_img, sci_list[0]), 'Tiling should not change the result'
+    assert np.array_equal(_var, var_list[0]), 'Tiling should not change the result'
+    assert np.array_equal(_rn2, var_list[1]), 'Tiling should not change the result'
+    assert np.array_equal(_gpm, outmask), 'Tiling should not change the result'
+    assert np.all(_img < 1e3), 'Cosmic rays should have been clipped'
+
+
+def test_tiled_combine_spill():
+    img, var, rn2, gpm = image_stacks()
+    weights = np.ones(img.shape[0])/img.shape[0]
+    tile_size = 2*img.shape[0]*img.shape[2]
+    spill_dir = os.path.join(os.path.dirname(__file__), 'files', 'tst_combine_spill')
+    try:
+        spilled = CombineImage._tiled_combine(image_generator(img, var, rn2, gpm), weights,
+                                              tile_size=tile_size, spill_dir=spill_dir)[1:]
+        assert len(os.listdir(spill_dir)) == 0, 'Temporary stacks should be removed'
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    default = CombineImage._tiled_combine(image_generator(img, var, rn2, gpm), weights,
+                                          tile_size=tile_size)[1:]
+    for a, b in zip(spilled, default):
+        assert np.array_equal(a, b), 'The spill directory should not change the result'
+
+
+def test_tiled_combine_memory():
+    # The images are generated one at a time, so the memory used should
+    # be that of a few images, not of the full stack
+    nimages, shape = 30, (200,100)
+    rng = np.random.default_rng(5)
+
+    def images():
+        for i in range(nimages):
+            yield None, rng.normal(loc=100., scale=10., size=shape), np.full(shape, 100.), \
+                    np.full(shape, 9.), np.ones(shape, dtype=bool)
+
+    weights = np.ones(nimages)/nimages
+    tracemalloc.start()
+    try:
+        CombineImage._tiled_combine(images(), weights, tile_size=nimages*10*shape[1])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # The in-memory image stack alone would be nimages images
+    image_size = np.prod(shape)*8
+    assert peak < 20*image_size, 'The full stack should never be held in memory'
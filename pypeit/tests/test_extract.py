@@ -0,0 +1,62 @@
+"""
+Module to test object finding and extraction
+"""
+import numpy as np
+
+from pypeit.core import extract
+from pypeit.core import pixels
+
+
+def synthetic_multislit(nspec=400, nspat=300, width=40, gap=6, seed=3):
+    # Curved slits with one or two point sources each
+    rng = np.random.default_rng(seed)
+    spec = np.arange(nspec)
+    lefts = np.arange(4, nspat-width-4, width+gap)
+    slit_left = lefts[None,:] + 2*np.sin(spec/nspec*np.pi)[:,None] + 0.3
+    slit_righ = slit_left + width
+    slitmask = pixels.slit_pixels(slit_left, slit_righ, nspat)
+    spat = np.arange(nspat)
+    image = rng.normal(0, 1, (nspec, nspat))
+    for i in range(lefts.size):
+        for frac in rng.uniform(0.15, 0.85, rng.integers(1,3)):
+            trace = slit_left[:,i] + frac*width
+            image += rng.uniform(5, 40)*np.exp(-0.5*((spat[None,:]-trace[:,None])/1.5)**2)
+    return image, slitmask, slit_left, slit_righ
+
+
+def test_ximg_and_edgemask():
+    slit_left = np.full(10, 2.5)
+    slit_righ = np.full(10, 12.5)
+    ximg, edgmask = pixels.ximg_and_edgemask(slit_left, slit_righ, np.ones((10,20), dtype=int),
+                                             trim_edg=(2,2))
+    assert np.allclose(ximg[:,3:13], (np.arange(3,13) - 2.5)/10.)
+    assert np.all(ximg[:,:3] == 0) and np.all(ximg[:,13:] == 0)
+    assert np.array_equal(np.where(edgmask[0])[0], np.r_[0:5,11:20])
+
+
+def test_multislit_objfind():
+    image, slitmask, slit_left, slit_righ = synthetic_multislit()
+    inmask = np.ones(image.shape, dtype=bool)
+    inmask[100:110,100:110] = False
+    gdslits = np.arange(slit_left.shape[1])
+    specobj_dict = dict(setup=None, slitid=999, det=1, objtype='science', pypeline='MultiSlit')
+
+    sobjs, skymask = extract.multislit_objfind(image, slitmask, slit_left, slit_righ, gdslits,
+                                               inmask=inmask, specobj_dict=specobj_dict)
+
+    # Same objects as searching each slit over the full image
+    skymask_slit = np.zeros_like(skymask)
+    nobj = 0
+    for slit in gdslits:
+        thismask = slitmask == slit
+        sobjs_slit, skymask_slit[thismask] \
+                = extract.objfind(image, thismask, slit_left[:,slit], slit_righ[:,slit],
+                                  inmask=inmask & thismask,
+                                  specobj_dict=dict(specobj_dict, slitid=slit))
+        for iobj in range(len(sobjs_slit)):
+            assert sobjs[nobj].name == sobjs_slit[iobj].name
+            assert np.allclose(sobjs[nobj].TRACE_SPAT, sobjs_slit[iobj].TRACE_SPAT, rtol=0, atol=1e-4)
+            assert np.isclose(sobjs[nobj].FWHM, sobjs_slit[iobj].FWHM)
+            nobj += 1
+    assert nobj == len(sobjs)
+    assert np.array_equal(skymask, skymask_slit)
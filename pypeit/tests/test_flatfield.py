@@ -3,16 +3,20 @@ Module to run tests on FlatField class
 Requires files in Development suite and an Environmental variable
 """
 import os
+import copy
+import time
 
 import pytest
 import glob
 import numpy as np
 
 from pypeit.tests.tstutils import dev_suite_required, load_kast_blue_masters, cooked_required
+from pypeit.tests.tstutils import benchmark_required
 from pypeit import flatfield
 from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit.images import pypeitimage
+from pypeit.core import pixels
 
 # TODO: Bring this test back in some way?
 #def test_step_by_step():
@@ -55,3 +59,88 @@ def test_run():
     mspixelflatnrm, msillumflat = flatField.run()
     assert np.isclose(np.median(mspixelflatnrm), 1.0)
 
+
+
+def synthetic_flat(nspec=300, nspat=200, nslits=4, seed=1):
+    # Multi-slit flat with a blaze function, a slit illumination profile
+    # and pixel-to-pixel variations
+    rng = np.random.default_rng(seed)
+    spec = np.arange(nspec)
+    spat = np.arange(nspat)
+    width = nspat/nslits - 8
+    slit_left = 4 + np.arange(nslits)[None,:]*(width+8) + 1.5*np.sin(spec/nspec*np.pi)[:,None]
+    slit_righ = slit_left + width
+    tslits_dict = dict(slit_left=slit_left, slit_righ=slit_righ, nslits=nslits, nspec=nspec,
+                       nspat=nspat, spec_min=np.zeros(nslits), spec_max=np.full(nslits, nspec-1),
+                       pad=0)
+    blaze = 2e4*np.exp(-0.5*((spec-nspec/2)/nspec)**2)
+    image = np.zeros((nspec, nspat))
+    for slit in range(nslits):
+        x = (spat[None,:] - slit_left[:,slit,None])/width
+        onslit = (x > 0) & (x < 1)
+        image += onslit*blaze[:,None]*(1 - 0.1*(x-0.5)**2)
+    image *= 1 + 0.01*rng.normal(size=image.shape)
+    coeffs = np.zeros((2,1,nslits))
+    coeffs[:,0,:] = 0.5
+    tilts_dict = dict(tilts=np.outer(spec/(nspec-1), np.ones(nspat)), coeffs=coeffs,
+                      slitcen=(slit_left+slit_righ)/2, func2d='legendre2d')
+    return image, tslits_dict, tilts_dict
+
+
+def test_run_nproc():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = pypeitpar.FrameGroupPar('pixelflat')
+    image, tslits_dict, tilts_dict = synthetic_flat()
+
+    flats = []
+    for n_proc in [1, 2]:
+        flatpar = pypeitpar.FlatFieldPar(n_proc=n_proc)
+        flatField = flatfield.FlatField(spectrograph, par, det=1, flatpar=flatpar,
+                                        tilts_dict=copy.deepcopy(tilts_dict),
+                                        tslits_dict=copy.deepcopy(tslits_dict))
+        flatField.rawflatimg = pypeitimage.PypeItImage(image.copy())
+        flatField.run(maskslits=np.array([False, True, False, False]))
+        flats += [flatField]
+
+    serial, parallel = flats
+    assert np.isclose(np.median(serial.mspixelflat[serial.flat_model > 0]), 1.0, atol=1e-3)
+    assert np.all(serial.mspixelflat[pixels.tslits2mask(tslits_dict) == 1] == 1)
+    for attr in ['mspixelflat', 'msillumflat', 'flat_model']:
+        assert np.array_equal(getattr(serial, attr), getattr(parallel, attr)), \
+                'Parallel flats should be identical to serial flats'
+    for key in ['slit_left', 'slit_righ', 'slit_left_tweak', 'slit_righ_tweak']:
+        assert np.array_equal(serial.tslits_dict[key], parallel.tslits_dict[key])
+    assert np.array_equal(serial.tilts_dict['tilts'], parallel.tilts_dict['tilts'])
+
+
+@benchmark_required
+def test_run_nproc_benchmark():
+    # Time the flat-field fits of long slits with and without parallel
+    # processes.  On a single CPU, both take the same time (e.g., 9.6 s
+    # and 9.4 s); with more CPUs, the parallel fits are faster.
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = pypeitpar.FrameGroupPar('pixelflat')
+    image, tslits_dict, tilts_dict = synthetic_flat(nspec=1024, nspat=400, nslits=4)
+
+    n_procs = [1, 2, 4]
+    timing = []
+    flats = []
+    for n_proc in n_procs:
+        flatpar = pypeitpar.FlatFieldPar(n_proc=n_proc)
+        flatField = flatfield.FlatField(spectrograph, par, det=1, flatpar=flatpar,
+                                        tilts_dict=copy.deepcopy(tilts_dict),
+                                        tslits_dict=copy.deepcopy(tslits_dict))
+        flatField.rawflatimg = pypeitimage.PypeItImage(image.copy())
+        t = time.perf_counter()
+        flatField.run()
+        timing += [time.perf_counter() - t]
+        flats += [flatField.mspixelflat]
+    print('\nFlat-field fits of {0} slits on {1} CPUs'.format(tslits_dict['nslits'],
+                                                           os.cpu_count()))
+    for n_proc, t in zip(n_procs, timing):
+        print('    n_proc={0}: {1:.1f} s ({2:.2f}x)'.format(n_proc, t, timing[0]/t))
+    for flat in flats[1:]:
+        assert np.array_equal(flats[0], flat), 'Parallel flats should be identical to serial flats'
+    if os.cpu_count() > 1:
+        assert timing[1] < timing[0], 'Parallel fits should be faster with more than one CPU'
+
@@ -8,9 +8,11 @@ import pytest
 import numpy as np
 
 from linetools.spectra.io import readspec
+from linetools.spectra import xspectrum1d
 
 import pypeit
 from pypeit.core import wave
+from pypeit.core.wavecal import wvutils
 
 
 def data_path(filename):
@@ -43,3 +45,31 @@ def test_flex_shift():
 #    pyplot.show()
     assert np.abs(flex_dict['shift'] - 43.7) < 0.1
 
+
+def test_flex_shift_batch():
+    obj_spec = readspec(data_path('obj_lrisb_600_sky.fits'))
+    arx_file = pypeit.__path__[0]+'/data/sky_spec/sky_LRISb_600.fits'
+    # Shift the object spectrum by a few pixels
+    wave_obj = obj_spec.wavelength.value
+    disp = np.median(np.diff(wave_obj))
+    pix_shift = np.array([0., 1.5, -2.])
+    obj_specs = [xspectrum1d.XSpectrum1D.from_tuple((wave_obj[100:1900] + p*disp,
+                                                     obj_spec.flux.value[100:1900]))
+                    for p in pix_shift]
+    wvutils._arxiv_cache.clear()
+    flex_dicts = wave.flex_shift_batch(obj_specs, arx_file, mxshft=60)
+    # The archive is prepared once for all the objects
+    assert len([k for k in wvutils._arxiv_cache if k[0] == 'flexure_archive']) == 1, \
+            'Archive should be shared by the objects'
+    shift = np.array([d['shift'] for d in flex_dicts])
+    assert np.allclose(shift - shift[0], -pix_shift, atol=0.1), 'Bad relative shifts'
+    # Same result as the objects on their own
+    for obj, d in zip(obj_specs, flex_dicts):
+        assert np.isclose(wave.flex_shift(obj, arx_file, mxshft=60)['shift'], d['shift'],
+                          rtol=0, atol=0.02), 'Batched shifts should match'
+    # The smoothed archive is reused for a different wavelength range
+    obj = xspectrum1d.XSpectrum1D.from_tuple((wave_obj[200:1900], obj_spec.flux.value[200:1900]))
+    assert wave.flex_shift(obj, arx_file, mxshft=60) is not None, 'Shift not measured'
+    assert [k for k in wvutils._arxiv_cache if k[0] == 'flexure_archive'] \
+                == [('flexure_archive', arx_file, flex_dicts[0]['smooth'])], \
+            'Archive should be cached by file and smoothing only'
@@ -3,8 +3,16 @@ Module to run tests loading
 """
 import os
 import pytest
+
+import numpy as np
+
+from astropy.io import fits
+
+from pypeit.pypmsgs import PypeItError
+from pypeit.core import load
 from pypeit import specobjs
 from pypeit import specobj
+from pypeit.spectrographs.util import load_spectrograph
 
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'files')
@@ -22,3 +30,106 @@ def test_load_specobjs():
 
     assert isinstance(sobjs[0], specobj.SpecObj)
 
+
+
+def test_load_1dspec_to_array():
+    spec_file = data_path('spec1d_r153-J0025-0312_KASTr_2015Jan23T025323.850.fits')
+    with fits.open(spec_file) as hdu:
+        counts = hdu[1].data['OPT_COUNTS'].copy()
+        file_mask = hdu[1].data['OPT_MASK'].copy()
+
+    # Single file
+    wave, flux, ivar, mask, header = load.load_1dspec_to_array(spec_file, gdobj=['SPAT0132'],
+                                                               flux_value=False, nmaskedge=2)
+    assert flux.shape == (1200,)
+    assert np.array_equal(flux, counts)
+    assert not np.any(mask[:2]) and not np.any(mask[-2:])
+    assert header['PYPELINE'] == 'MultiSlit'
+    # Edge masking does not modify the file
+    assert np.array_equal(file_mask, fits.getdata(spec_file, 1)['OPT_MASK'])
+
+    # Stream a list of files
+    waves, fluxes, ivars, masks, header = load.load_1dspec_to_array([spec_file]*3, gdobj=['SPAT0132']*3,
+                                                                    flux_value=False, nmaskedge=2)
+    assert fluxes.shape == (1200, 3)
+    assert np.array_equal(fluxes, np.repeat(counts[:,None], 3, axis=1))
+    assert np.array_equal(masks, np.repeat(mask[:,None], 3, axis=1))
+
+
+def test_columnar_spec1d():
+    spec_file = data_path('spec1d_r153-J0025-0312_KASTr_2015Jan23T025323.850.fits')
+    sobjs = specobjs.SpecObjs.from_fitsfile(spec_file)
+    # Add the same object on a second detector, without boxcar extraction
+    sobj = specobjs.SpecObjs.from_fitsfile(spec_file)[0]
+    sobj.DET = 2
+    sobj.set_name()
+    for key in [k for k in sobj._data.keys() if k.startswith('BOX')]:
+        sobj._data.remove_column(key)
+    sobjs.add_sobj(sobj)
+
+    ofile = data_path('tst_spec1d_columnar.fits')
+    spectrograph = load_spectrograph(sobjs.header['PYP_SPEC'])
+    sobjs.write_to_fits(ofile, header=sobjs.header, spectrograph=spectrograph, columnar=True)
+    assert specobjs.is_columnar(ofile), 'Should be written in the columnar layout'
+    assert not specobjs.is_columnar(spec_file), 'Should be in the multi-extension layout'
+
+    # Full round trip
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    assert np.array_equal(_sobjs.name, sobjs.name), 'Bad object names'
+    for sobj, _sobj in zip(sobjs, _sobjs):
+        assert dict(sobj._data.meta) == dict(_sobj._data.meta), 'Bad scalar attributes'
+        assert sobj._data.keys() == _sobj._data.keys(), 'Bad array attributes'
+        for key in sobj._data.keys():
+            assert np.array_equal(sobj._data[key], _sobj._data[key]), 'Bad {0}'.format(key)
+            assert sobj._data[key].dtype == _sobj._data[key].dtype, 'Bad {0} type'.format(key)
+
+    # Only read what is requested
+    with specobjs.LazySpecObjs(ofile) as lazy:
+        assert lazy.nobj == 2, 'Wrong number of objects'
+        assert np.array_equal(lazy.meta('DET'), [1, 2]), 'Bad detectors'
+        indx = lazy.index_of(sobj.name)
+        assert indx == 1, 'Bad object index'
+        with pytest.raises(PypeItError):
+            # Names must match exactly
+            lazy.index_of('DET02')
+        assert 'BOX_COUNTS' not in lazy.columns(indx), 'Object should not have boxcar spectra'
+        assert np.array_equal(lazy.get_column(indx, 'OPT_MASK'), sobj.OPT_MASK), 'Bad mask'
+        _sobj = lazy.get_specobj(indx, columns=['OPT_WAVE', 'OPT_COUNTS'])
+        assert _sobj.name == sobj.name and _sobj._data.keys() == ['OPT_WAVE', 'OPT_COUNTS'], \
+                'Bad partially read object'
+        wave = lazy.get_column(indx, 'OPT_WAVE')
+        det = lazy.meta('DET')
+    with specobjs.LazySpecObjs(spec_file) as lazy:
+        _wave = lazy.get_column(0, 'OPT_WAVE')
+    # The arrays are copies that outlive the memory-mapped files
+    for arr in [wave, det, _wave]:
+        assert arr.flags.owndata, 'Arrays should be copies'
+    assert np.array_equal(wave, sobj.OPT_WAVE) and np.array_equal(_wave, sobj.OPT_WAVE), \
+            'Bad wavelengths'
+
+    # Same spectra as the multi-extension file
+    wave, flux, ivar, mask, header = load.load_1dspec_to_array([spec_file, ofile],
+                                                               gdobj=['SPAT0132']*2,
+                                                               flux_value=False, nmaskedge=2)
+    assert np.array_equal(flux[:,0], flux[:,1]) and np.array_equal(mask[:,0], mask[:,1]), \
+            'Spectra should not depend on the layout'
+
+    # Update one detector
+    sobjs = specobjs.SpecObjs.from_fitsfile(spec_file)
+    sobjs[0].FWHM = 10.
+    sobjs.write_to_fits(ofile, header=sobjs.header, spectrograph=spectrograph, columnar=True,
+                        update_det=[1])
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    assert np.array_equal(np.sort(_sobjs.DET), [1, 2]), 'Other detectors should be kept'
+    assert _sobjs[_sobjs.DET == 1][0].FWHM == 10., 'Detector was not updated'
+    assert _sobjs.header['NSPEC'] == 2, 'Bad number of objects'
+
+    # Update one detector, switching to the multi-extension layout
+    sobjs[0].FWHM = 11.
+    sobjs.write_to_fits(ofile, header=sobjs.header, spectrograph=spectrograph, update_det=[1])
+    assert not specobjs.is_columnar(ofile), 'Should be written in the multi-extension layout'
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    assert np.array_equal(np.sort(_sobjs.DET), [1, 2]), 'Other detectors should be kept'
+    assert _sobjs[_sobjs.DET == 1][0].FWHM == 11., 'Detector was not updated'
+    assert _sobjs.header['NSPEC'] == 2, 'Bad number of objects'
+    os.remove(ofile)
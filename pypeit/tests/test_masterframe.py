@@ -2,10 +2,15 @@
 Module to run tests on armasters
 """
 import os
+import time
+import shutil
+import socket
 import numpy as np
 import pytest
 
 from pypeit import masterframe
+from pypeit.par import pypeitpar
+from pypeit.spectrographs.util import load_spectrograph
 
 def data_root():
     return os.path.join(os.path.dirname(__file__), 'files')
@@ -28,3 +33,105 @@ def test_master_io():
     for key in ['MSTRTYP', 'MSTRDIR', 'MSTRKEY']:
         assert key in hdr.keys()
 
+
+
+def test_master_digest():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = pypeitpar.FrameGroupPar(frametype='arc')
+    raw_file = os.path.join(data_root(), 'b1.fits.gz')
+    digest = masterframe.master_digest('Arc', spectrograph, 1, files=[raw_file], pars=[par],
+                                       inputs=[None, np.zeros((5,5), dtype=bool)])
+    # Same content in a different file
+    copy_file = os.path.join(data_root(), 'tst_b1.fits.gz')
+    shutil.copyfile(raw_file, copy_file)
+    assert masterframe.master_digest('Arc', spectrograph, 1, files=[copy_file], pars=[par],
+                                     inputs=[None, np.zeros((5,5), dtype=bool)]) == digest, \
+            'Digest should only depend on the file content'
+    os.remove(copy_file)
+    # Any change in the inputs changes the digest
+    assert masterframe.master_digest('Arc', spectrograph, 2, files=[raw_file], pars=[par],
+                                     inputs=[None, np.zeros((5,5), dtype=bool)]) != digest
+    par['process']['sigrej'] = 3.
+    assert masterframe.master_digest('Arc', spectrograph, 1, files=[raw_file], pars=[par],
+                                     inputs=[None, np.zeros((5,5), dtype=bool)]) != digest
+    assert masterframe.master_digest('Arc', spectrograph, 1, files=[raw_file], pars=[par],
+                                     inputs=[None, np.ones((5,5), dtype=bool)]) != digest
+    # ... but not the number of processes
+    par = pypeitpar.WaveTiltsPar()
+    digest = masterframe.master_digest('Tilts', spectrograph, 1, pars=[par])
+    par['n_proc'] = 4
+    assert masterframe.master_digest('Tilts', spectrograph, 1, pars=[par]) == digest
+
+
+def test_master_store():
+    store_dir = os.path.join(data_root(), 'tst_store')
+    store = masterframe.MasterStore(store_dir)
+    mf = masterframe.MasterFrame('Test', master_dir=os.path.join(data_root(), 'tst_masters'),
+                                 master_key='A_1_01')
+    digest = '0123456789abcdef'
+    with store.lock(digest):
+        assert not store.fetch(mf, digest), 'Store should be empty'
+        os.makedirs(mf.master_dir)
+        with open(mf.master_file_path, 'w') as f:
+            f.write('master')
+        assert not store.add(mf, digest, since=time.time()+10), 'Outdated file should not be added'
+        assert store.add(mf, digest), 'File not added'
+    os.remove(mf.master_file_path)
+    assert store.fetch(mf, digest), 'File not found in the store'
+    with open(mf.master_file_path) as f:
+        assert f.read() == 'master', 'Bad file'
+    assert os.listdir(os.path.join(store_dir, digest[:2])) == ['MasterTest_{0}.fits'.format(digest)], \
+            'Lock or temporary files left in the store'
+    shutil.rmtree(store_dir)
+    shutil.rmtree(mf.master_dir)
+
+
+def test_file_lock():
+    lock_file = os.path.join(data_root(), 'tst.lock')
+    with masterframe.FileLock(lock_file) as lock:
+        assert os.path.isfile(lock_file), 'No lock file'
+        assert not lock._abandoned(), 'Lock held by this process'
+    assert not os.path.isfile(lock_file), 'Lock file not removed'
+    # Lock left by a process that no longer exists
+    with open(lock_file, 'w') as f:
+        f.write('{0} {1}'.format(socket.gethostname(), 2**22+1))
+    with masterframe.FileLock(lock_file, poll=0.01):
+        pass
+    assert not os.path.isfile(lock_file), 'Lock file not removed'
+
+
+def test_file_lock_race():
+    lock_file = os.path.join(data_root(), 'tst.lock')
+    # Abandoned lock replaced by a new holder after it was inspected
+    with open(lock_file, 'w') as f:
+        f.write('{0} {1}'.format(socket.gethostname(), 2**22+1))
+    lock = masterframe.FileLock(lock_file)
+    abandoned = lock._abandoned()
+    assert abandoned is not None, 'Lock should be abandoned'
+    os.remove(lock_file)
+    with open(lock_file, 'w') as f:
+        f.write('{0} {1} new'.format(socket.gethostname(), os.getpid()))
+    lock._remove(abandoned)
+    with open(lock_file) as f:
+        assert f.read().split()[-1] == 'new', 'New lock should not be removed'
+    assert not any(f.startswith('tst.lock.') for f in os.listdir(data_root())), \
+            'Renamed lock file left behind'
+    os.remove(lock_file)
+
+
+def test_file_lock_heartbeat():
+    lock_file = os.path.join(data_root(), 'tst.lock')
+    with masterframe.FileLock(lock_file, stale=0.4) as lock:
+        os.utime(lock_file, (0, 0))
+        time.sleep(0.3)
+        assert time.time() - os.path.getmtime(lock_file) < 0.4, 'Lock file not touched'
+    assert not os.path.isfile(lock_file), 'Lock file not removed'
+    # Stale lock held by another host
+    with open(lock_file, 'w') as f:
+        f.write('another-host 1 token')
+    os.utime(lock_file, (0, 0))
+    with masterframe.FileLock(lock_file, poll=0.01):
+        with open(lock_file) as f:
+            assert f.read().split()[0] == socket.gethostname(), 'Lock not acquired'
+    assert not os.path.isfile(lock_file), 'Lock file not removed'
+
@@ -10,6 +10,7 @@ from pypeit.par.util import parse_pypeit_file
 from pypeit.pypeitsetup import PypeItSetup
 from pypeit.tests.tstutils import dev_suite_required, data_path
 from pypeit.metadata import PypeItMetaData
+from pypeit.io import HeaderCache
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit.scripts import setup
 
@@ -151,3 +152,49 @@ def test_lris_blue_pypeit_overwrite():
     assert fitstbl['target'][0] != fitstbl_usr['target'][0], \
             'Fits header value and input pypeit file value expected to be different.'
 
+
+def test_linked_calib_groups():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    pmd = PypeItMetaData(spectrograph, spectrograph.default_pypeit_par(),
+                         files=[data_path('b1.fits.gz'), data_path('b27.fits.gz')], strict=False)
+
+    # Independent calibration groups
+    pmd.table['calib'] = np.array(['0', '1'], dtype=object)
+    pmd._set_calib_group_bits()
+    assert pmd.linked_calib_groups() == [[0], [1]], 'Groups should be independent'
+
+    # A frame shared by two groups links them
+    pmd.table['calib'] = np.array(['0,2', '1'], dtype=object)
+    pmd._set_calib_group_bits()
+    assert pmd.linked_calib_groups() == [[0, 2], [1]], 'Groups 0 and 2 should be linked'
+
+
+def test_header_cache():
+    spectrograph = load_spectrograph('shane_kast_blue')
+    files = [data_path('tmp_b1.fits.gz'), data_path('b27.fits.gz')]
+    shutil.copy(data_path('b1.fits.gz'), files[0])
+    cache_file = data_path('tmp_header_cache.json')
+    if os.path.isfile(cache_file):
+        os.remove(cache_file)
+
+    par = spectrograph.default_pypeit_par()
+    pmd = PypeItMetaData(spectrograph, par, files=files, strict=False)
+    par['rdx']['header_cache'] = cache_file
+    for i in range(2):
+        # The first pass fills the cache, the second uses it
+        _pmd = PypeItMetaData(spectrograph, par, files=files, strict=False)
+        assert os.path.isfile(cache_file), 'Cache not written'
+        for key in pmd.keys():
+            assert np.array_equal(pmd[key], _pmd[key]), 'Cached headers yield different metadata'
+
+    cache = HeaderCache(cache_file)
+    assert len(cache.entries) == 2, 'Should have cached two files'
+    assert cache.get(files[0], spectrograph.numhead)[0]['OBJECT'] \
+                == spectrograph.get_headarr(files[0])[0]['OBJECT'], 'Bad cached header'
+    # Modified files are read again
+    stat = os.stat(files[0])
+    os.utime(files[0], (stat.st_atime, stat.st_mtime + 10))
+    assert cache.get(files[0], spectrograph.numhead) is None, 'Cache should be stale'
+
+    os.remove(files[0])
+    os.remove(cache_file)
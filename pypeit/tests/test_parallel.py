@@ -0,0 +1,173 @@
+"""
+Module to test the utilities used to run tasks in parallel
+"""
+import os
+import pickle
+
+import numpy as np
+
+from pypeit.core import parallel, pixels, skysub
+from pypeit import reduce, specobj, specobjs
+
+
+def scaled_sum(i, scale, image=None):
+    return i, scale * np.sum(parallel.as_array(image))
+
+
+def test_shared_arrays():
+    image = np.arange(12, dtype=float).reshape(3,4)
+    with parallel.SharedArrays(image=image) as shared:
+        path = os.path.dirname(shared['image'].filename)
+        # Only the file name is pickled
+        _shared = pickle.loads(pickle.dumps(shared['image']))
+        assert _shared._data is None, 'Array should be mapped on access'
+        assert np.array_equal(_shared.data, image), 'Bad shared array'
+        assert not _shared.data.flags.writeable, 'Shared array should be read-only'
+    assert not os.path.isdir(path), 'Shared arrays not removed'
+
+
+def test_run_tasks():
+    image = np.ones((10,10), dtype=float)
+    tasks = [(i, float(i)) for i in range(5)]
+    serial = parallel.run_tasks(scaled_sum, tasks, image=image)
+    assert [s[0] for s in serial] == list(range(5)), 'Bad order'
+    with parallel.SharedArrays(image=image) as shared:
+        par = parallel.run_tasks(scaled_sum, tasks, n_proc=2, image=shared['image'])
+    assert par == serial, 'Parallel calculation should match serial calculation'
+
+
+def test_global_skysub_slit():
+    # Two slits with a smoothly varying sky
+    nspec, nspat = 200, 40
+    rng = np.random.default_rng(1)
+    spec = np.arange(nspec, dtype=float)
+    tilts = np.tile((spec/(nspec-1))[:,None], (1,nspat))
+    sky = 100. + 50*np.sin(2*np.pi*spec/50.)
+    ivar = np.full((nspec, nspat), 0.01)
+    image = np.tile(sky[:,None], (1,nspat)) + rng.normal(scale=10., size=(nspec, nspat))
+    slitmask = np.full((nspec, nspat), -1, dtype=int)
+    slitmask[:,2:18] = 0
+    slitmask[:,22:38] = 1
+    gpm = np.ones((nspec, nspat), dtype=bool)
+    tasks = [(0, np.full(nspec, 1.5), np.full(nspec, 18.5)),
+             (1, np.full(nspec, 21.5), np.full(nspec, 38.5))]
+    kwargs = dict(bsp=1.2, sigrej=3.0)
+    images = dict(image=image, ivar=ivar, tilts=tilts, slitmask=slitmask, gpm=gpm)
+    serial = parallel.run_tasks(reduce.global_skysub_slit, tasks, **images, **kwargs)
+    with parallel.SharedArrays(**images) as shared:
+        par = parallel.run_tasks(reduce.global_skysub_slit, tasks, n_proc=2, **shared, **kwargs)
+    for s, p in zip(serial, par):
+        assert np.array_equal(s, p), 'Parallel sky should be identical to serial sky'
+    assert np.allclose(serial[0].reshape(nspec,-1)[:,0], sky, atol=10.), 'Bad sky fit'
+
+
+def test_local_skysub_extract_slit():
+    # Two slits, each with one object
+    nspec, nspat = 300, 60
+    rng = np.random.default_rng(2)
+    spec = np.arange(nspec, dtype=float)
+    spat = np.arange(nspat, dtype=float)
+    tilts = np.tile((spec/(nspec-1))[:,None], (1,nspat))
+    waveimg = 5000. + 1000.*tilts
+    global_sky = np.tile((100. + 50*np.sin(2*np.pi*spec/50.))[:,None], (1,nspat))
+    slitmask = np.full((nspec, nspat), -1, dtype=int)
+    slitmask[:,2:28] = 0
+    slitmask[:,32:58] = 1
+    edges = [(1.5, 28.5), (31.5, 58.5)]
+    image = global_sky.copy()
+    objs = []
+    for slit, (left, righ) in enumerate(edges):
+        cen = (left+righ)/2
+        image += 200*np.exp(-0.5*((spat[None,:]-cen)/1.5)**2) * (slitmask == slit)
+        objs += [dict(slitid=slit, cen=cen)]
+    ivar = 1/(image + 25.)
+    image += rng.normal(size=image.shape)/np.sqrt(ivar)
+    images = dict(sciimg=image, sciivar=ivar, tilts=tilts, waveimg=waveimg,
+                  global_sky=global_sky, rn2_img=np.full_like(image, 25.), slitmask=slitmask,
+                  gpm=np.ones(image.shape, dtype=bool))
+
+    def get_tasks():
+        sobjs = specobjs.SpecObjs()
+        for obj in objs:
+            sobj = specobj.SpecObj('MultiSlit', 1, slitid=obj['slitid'])
+            sobj.TRACE_SPAT = np.full(nspec, obj['cen'])
+            sobj.SPAT_PIXPOS = obj['cen']
+            sobj.FWHM = 3.5
+            sobj.maskwidth = 4*3.5
+            sobj.OBJID = 1
+            sobjs.add_sobj(sobj)
+        return [(slit, np.full(nspec, left), np.full(nspec, righ), sobjs[sobjs.SLITID == slit], 3.)
+                for slit, (left, righ) in enumerate(edges)]
+
+    serial = parallel.run_tasks(skysub.local_skysub_extract_slit, get_tasks(), bsp=1.2, **images)
+    with parallel.SharedArrays(**images) as shared:
+        par = parallel.run_tasks(skysub.local_skysub_extract_slit, get_tasks(), n_proc=2,
+                                 bsp=1.2, **shared)
+    for s, p in zip(serial, par):
+        for _s, _p in zip(s[:4], p[:4]):
+            assert np.array_equal(_s, _p), 'Parallel models should be identical to serial models'
+        assert np.array_equal(s[4][0].OPT_COUNTS, p[4][0].OPT_COUNTS), \
+                'Parallel extraction should be identical to serial extraction'
+
+
+def test_ech_local_skysub_extract():
+    # Four orders with one object; the faintest order adopts the FWHM
+    # measured on the brighter orders
+    nspec, nspat, norders = 300, 120, 4
+    rng = np.random.default_rng(3)
+    spec = np.arange(nspec, dtype=float)
+    spat = np.arange(nspat, dtype=float)
+    tilts = np.tile((spec/(nspec-1))[:,None], (1,nspat))
+    waveimg = 5000. + 1000.*tilts
+    global_sky = np.tile((100. + 50*np.sin(2*np.pi*spec/50.))[:,None], (1,nspat))
+    slit_left = np.tile(1.5 + 30*np.arange(norders, dtype=float), (nspec,1))
+    slit_righ = slit_left + 27.
+    tslits_dict = dict(slit_left=slit_left, slit_righ=slit_righ, nslits=norders, nspec=nspec,
+                       nspat=nspat, spec_min=np.zeros(norders), spec_max=np.full(norders, nspec-1),
+                       pad=0)
+    slitmask = pixels.tslits2mask(tslits_dict)
+    order_vec = np.arange(norders) + 50
+    snr = [20., 15., 10., 1.]
+    image = global_sky.copy()
+    for iord, s in enumerate(snr):
+        cen = (slit_left[0,iord]+slit_righ[0,iord])/2
+        image += 10*s*np.exp(-0.5*((spat[None,:]-cen)/(1.4+0.1*iord))**2) * (slitmask == iord)
+    ivar = 1/(image + 25.)
+    image += rng.normal(size=image.shape)/np.sqrt(ivar)
+
+    def get_sobjs():
+        sobjs = specobjs.SpecObjs()
+        for iord in range(norders):
+            cen = (slit_left[0,iord]+slit_righ[0,iord])/2
+            sobj = specobj.SpecObj('Echelle', 1, ech_order=order_vec[iord], orderindx=iord)
+            sobj.TRACE_SPAT = np.full(nspec, cen)
+            sobj.SPAT_PIXPOS = cen
+            sobj.ECH_FRACPOS = 0.5
+            sobj.ECH_OBJID = 1
+            sobj.OBJID = 1
+            sobj.FWHM = 3.5
+            sobj.maskwidth = 4*3.5
+            sobj.ech_snr = snr[iord]
+            sobjs.add_sobj(sobj)
+        return sobjs
+
+    results = []
+    for n_proc in [1, 2]:
+        results += [skysub.ech_local_skysub_extract(image, ivar, np.zeros(image.shape, dtype=int),
+                                                    tilts, waveimg, global_sky,
+                                                    np.full_like(image, 25.), tslits_dict,
+                                                    get_sobjs(), order_vec, bsp=1.2,
+                                                    box_rad_order=np.full(norders, 3.),
+                                                    n_proc=n_proc)]
+    serial, par = results
+    for s, p in zip(serial[:4], par[:4]):
+        assert np.array_equal(s, p), 'Parallel models should be identical to serial models'
+    for s, p in zip(serial[4], par[4]):
+        assert s.FWHM == p.FWHM, 'Parallel FWHM should be identical to serial FWHM'
+        assert np.array_equal(s.OPT_COUNTS, p.OPT_COUNTS), \
+                'Parallel extraction should be identical to serial extraction'
+    # The faint order adopts the median FWHM of the brighter orders
+    sobjs = serial[4]
+    fwhm = [np.median(sobjs[sobjs.ECH_ORDERINDX == iord][0].FWHMFIT) for iord in range(3)]
+    assert np.isclose(sobjs[sobjs.ECH_ORDERINDX == 3][0].FWHM, np.median(fwhm)), \
+            'Faint order should adopt the FWHM of the brighter orders'
@@ -3,6 +3,7 @@ Module to run tests on core.procimg functions.
 """
 import pytest
 import numpy as np
+from scipy import signal, ndimage
 
 from pypeit.core import procimg
 
@@ -29,3 +30,46 @@ def test_replace_columns():
                           np.repeat(np.arange(4),10).reshape(4,10).T), \
                 'Interpolation failed.'
 
+
+
+def test_laplacian_plus():
+    img = np.random.default_rng(3).normal(size=(31,24))
+    subsam = np.repeat(np.repeat(img, 2, axis=0), 2, axis=1)
+    laplkernel = np.array([[0.0, -1.0, 0.0], [-1.0, 4.0, -1.0], [0.0, -1.0, 0.0]])
+    conved = signal.convolve2d(subsam, laplkernel, mode="same", boundary="symm").clip(min=0.0)
+    lplus = conved.reshape(31,2,24,2).mean(axis=(1,3))
+    assert np.allclose(procimg.laplacian_plus(img), lplus, rtol=0, atol=1e-12), \
+                'Direct Laplacian should match the subsampled convolution'
+
+
+def test_fine_structure():
+    img = np.random.default_rng(4).normal(size=(40,30))
+    m3 = ndimage.median_filter(img, size=3, mode='mirror')
+    f = m3 - ndimage.median_filter(m3, size=7, mode='mirror')
+    indx = np.where(np.ones(img.shape, dtype=bool))
+    assert np.array_equal(procimg.fine_structure(img, indx, chunk=100), f[indx]), \
+                'Bad fine structure image'
+
+
+def test_lacosmic_tiles():
+    rng = np.random.default_rng(5)
+    img = 100 + 50*np.exp(-0.5*((np.arange(120)-80)/3.)**2)[None,:] + rng.normal(0, 10, (200,120))
+    img[:,:40] = rng.normal(0, 3, (200,40))
+    ncr = 40
+    iy, ix = rng.integers(1, 199, ncr), rng.integers(1, 119, ncr)
+    img[iy,ix] += rng.uniform(200, 3000, ncr)
+    img[iy+1,ix] += 300
+    var = np.abs(img) + 9.
+
+    crmask = procimg.lacosmic(1, img, 65535., 0.9, varframe=var, sigclip=4.5, objlim=3.,
+                              tile_size=256)
+    assert np.sum(crmask[iy,ix]) > 0.9*ncr, 'Should find most of the cosmic rays'
+    assert np.array_equal(procimg.lacosmic(1, img, 65535., 0.9, varframe=var, sigclip=4.5,
+                                           objlim=3., tile_size=32, n_threads=2), crmask), \
+                'Tiling should not change the result'
+    mask = np.zeros(img.shape, dtype=bool)
+    mask[:,50:110] = True
+    assert np.array_equal(procimg.lacosmic(1, img, 65535., 0.9, varframe=var, sigclip=4.5,
+                                           objlim=3., tile_size=32, mask=mask), crmask & mask), \
+                'Masking should not change the result within the mask'
+    assert len(procimg.lacosmic_tiles(img.shape, 32, mask=mask)) < 7*4, 'Should skip tiles'
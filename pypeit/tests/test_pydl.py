@@ -2,8 +2,12 @@
 Module to run tests on pyidl functions
 """
 
+import time
+
 import numpy as np
+from pypeit.core import pydl
 from pypeit.core.pydl import bspline
+from pypeit.tests.tstutils import benchmark_required
 import pytest
 
 try:
@@ -28,3 +32,171 @@ def test_bsplinetodict():
 
     assert np.max(np.array(bspline_dict['breakpoints'])-bspline_fromdict.breakpoints) == 0.
 
+
+
+def sky_spectrum(nspec=4096, seed=1):
+    """ Simulated full-slit sky spectrum with emission lines
+    """
+    rng = np.random.RandomState(seed)
+    x = np.arange(nspec, dtype=float)
+    y = 100. + 1000.*np.sum(np.exp(-0.5*((x[:,None] - rng.uniform(0, nspec, 40))/2.)**2),
+                            axis=1)
+    y += rng.normal(size=nspec)*np.sqrt(y)
+    return x, y, 1/y
+
+
+def test_cholesky_band():
+    """ Test that the compiled and python Cholesky decompositions are
+    identical for a full-slit sky fit.
+    """
+    x, y, ivar = sky_spectrum()
+    sset = bspline(x, bkspace=1.2)
+
+    # Grab the band matrix constructed by the fit
+    alpha = []
+    _cholesky_band = pydl.cholesky_band
+    def grab_alpha(l, mininf=0.0):
+        alpha.append(l.copy())
+        return _cholesky_band(l, mininf=mininf)
+    pydl.cholesky_band = grab_alpha
+    try:
+        sset.fit(x, y, ivar)
+    finally:
+        pydl.cholesky_band = _cholesky_band
+
+    n = alpha[0].shape[1] - alpha[0].shape[0]
+    lower_loop = alpha[0].copy()
+    assert pydl._cholesky_band_loop(lower_loop, n) == -1, 'Decomposition failed'
+    lower_nb = alpha[0].copy()
+    assert pydl._cholesky_band_nb(lower_nb, n) == -1, 'Decomposition failed'
+    assert np.array_equal(lower_loop, lower_nb), 'Compiled decomposition is different'
+
+
+@benchmark_required
+def test_cholesky_benchmark():
+    """ Time a full-slit sky fit with the compiled Cholesky functions
+    and with the previous python loops.
+    """
+    x, y, ivar = sky_spectrum()
+
+    def timed_fit(band, solve):
+        _band, _solve = pydl._cholesky_band_nb, pydl._cholesky_solve_nb
+        pydl._cholesky_band_nb, pydl._cholesky_solve_nb = band, solve
+        try:
+            sset = bspline(x, bkspace=1.2)
+            t = time.perf_counter()
+            sset.fit(x, y, ivar)
+            return time.perf_counter() - t, sset.coeff
+        finally:
+            pydl._cholesky_band_nb, pydl._cholesky_solve_nb = _band, _solve
+
+    # Compile first
+    timed_fit(pydl._cholesky_band_nb, pydl._cholesky_solve_nb)
+    t_loop, coeff_loop = timed_fit(pydl._cholesky_band_loop, pydl._cholesky_solve_loop)
+    t_nb, coeff_nb = timed_fit(pydl._cholesky_band_nb, pydl._cholesky_solve_nb)
+    print('\nFull-slit sky fit ({0} pixels): python {1:.3f} s, compiled {2:.3f} s '
+          '({3:.1f}x)'.format(x.size, t_loop, t_nb, t_loop/t_nb))
+    assert np.allclose(coeff_loop, coeff_nb, rtol=1e-10, atol=0), 'Different fits'
+    assert t_nb < t_loop, 'Compiled fit should be faster'
+
+
+def test_cholesky_solve():
+    """ Test the banded solution against a direct solution of the full
+    matrix.
+    """
+    rng = np.random.RandomState(2)
+    bw, n = 4, 50
+    # Symmetric, positive-definite banded matrix stored in the lower
+    # band format used by cholesky_band
+    full = np.zeros((n+bw, n+bw), dtype=float)
+    for k in range(1, bw):
+        diag = rng.uniform(-0.2, 0.2, n+bw-k)
+        full += np.diag(diag, k) + np.diag(diag, -k)
+    full += np.diag(rng.uniform(2., 3., n+bw))
+    # The last bw rows are padding
+    full[n:,:n] = 0.
+    full[:n,n:] = 0.
+    band = np.zeros((bw, n+bw), dtype=float)
+    for k in range(bw):
+        band[k,:n+bw-k] = np.diag(full, k)
+    b = rng.normal(size=n+bw)
+
+    err, a = pydl.cholesky_band(band)
+    assert err == -1, 'Decomposition failed'
+    err, sol = pydl.cholesky_solve(a, b)
+    assert np.allclose(sol[:n], np.linalg.solve(full[:n,:n], b[:n])), 'Bad solution'
+
+    # Single precision uses the python loop
+    err, sol32 = pydl.cholesky_solve(a.astype(np.float32), b.astype(np.float32))
+    assert np.allclose(sol32, sol, rtol=1e-4), 'Bad single-precision solution'
+
+
+@pytest.mark.parametrize('npoly', [1, 3])
+def test_bspline_normal_equations(npoly):
+    """ Test the batched construction of the normal equations against a
+    loop over the breakpoint intervals.
+    """
+    rng = np.random.RandomState(3)
+    x = np.sort(rng.uniform(0, 100, 5000))
+    x2 = rng.uniform(0, 1, x.size)
+    y = rng.normal(size=x.size)
+    ivar = rng.uniform(0.5, 1.5, x.size)
+    sset = bspline(x, bkspace=0.5, npoly=npoly)
+    sset.xmin, sset.xmax = 0., 1.
+    action, lower, upper = sset.action(x, x2=x2 if npoly > 1 else None)
+    nn = sset.mask[sset.nord:].sum()
+    a2 = action*ivar[:,None]
+
+    alpha, beta = pydl.bspline_normal_equations(action, a2, y, lower, upper, nn, sset.nord,
+                                                npoly)
+
+    # Loop over the intervals
+    bw = sset.nord*npoly
+    _alpha = np.zeros_like(alpha)
+    _beta = np.zeros_like(beta)
+    for k in range(nn-sset.nord+1):
+        if upper[k] < lower[k]:
+            continue
+        indx = slice(lower[k], upper[k]+1)
+        work = np.dot(action[indx].T, a2[indx])
+        for r in range(bw):
+            _alpha[:bw-r,k*npoly+r] += work[r,r:]
+        _beta[k*npoly:k*npoly+bw] += np.dot(y[indx], a2[indx])
+
+    assert np.allclose(alpha, _alpha, rtol=1e-12, atol=0), 'Bad normal matrix'
+    assert np.allclose(beta, _beta, rtol=1e-12, atol=1e-12), 'Bad right-hand side'
+
+    # Accumulating small chunks of intervals gives the same result
+    _alpha, _beta = pydl.bspline_normal_equations(action, a2, y, lower, upper, nn, sset.nord,
+                                                  npoly, chunk=1000)
+    assert np.array_equal(alpha, _alpha), 'Chunking should not change the normal matrix'
+    assert np.array_equal(beta, _beta), 'Chunking should not change the right-hand side'
+
+
+def test_iterfit_action_cache():
+    """ Test that the action matrix is only computed once when no
+    breakpoints are dropped.
+    """
+    x, y, ivar = sky_spectrum(nspec=2000)
+    # Add outliers to force a few rejection iterations
+    y[::97] += 1e4
+
+    ncalls = [0]
+    _action = bspline.action
+    def count_action(self, x, x2=None):
+        ncalls[0] += 1
+        return _action(self, x, x2=x2)
+    bspline.action = count_action
+    try:
+        sset, outmask = pydl.iterfit(x, y, invvar=ivar, maxiter=10,
+                                     kwargs_bspline={'bkspace': 8.})
+    finally:
+        bspline.action = _action
+
+    assert np.sum(np.logical_not(outmask)) >= 20, 'Outliers should be rejected'
+    assert ncalls[0] == 1, 'Action matrix should be computed once'
+
+    # Same result without the cache
+    _sset = bspline(x, bkspace=8.)
+    _sset.fit(x, y, ivar*outmask)
+    assert np.allclose(sset.coeff, _sset.coeff), 'Fit changed'
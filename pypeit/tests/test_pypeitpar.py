@@ -42,6 +42,28 @@ def test_spectrographs():
 def test_redux():
     pypeitpar.ReduxPar()
 
+def test_redux_spec1d_format():
+    p = pypeitpar.ReduxPar()
+    assert p['spec1d_format'] == 'multiext', 'Objects should be written to separate extensions'
+    p = pypeitpar.ReduxPar.from_dict({'spec1d_format': 'columnar'})
+    assert p['spec1d_format'] == 'columnar', 'Wrong spec1d layout'
+    with pytest.raises(ValueError):
+        pypeitpar.ReduxPar(spec1d_format='hdf5')
+
+@pytest.mark.parametrize('parset', [pypeitpar.ReduxPar, pypeitpar.SkySubPar,
+                                    pypeitpar.FlatFieldPar, pypeitpar.WaveTiltsPar])
+def test_nproc(parset):
+    assert parset()['n_proc'] == 1, 'Should run serially by default'
+    assert parset.from_dict({'n_proc': 4})['n_proc'] == 4, 'Wrong number of processes'
+    with pytest.raises(ValueError):
+        parset(n_proc=0)
+
+def test_calibrations_master_store():
+    p = pypeitpar.CalibrationsPar()
+    assert p['master_store'] is None, 'No master frame store by default'
+    p = pypeitpar.CalibrationsPar.from_dict({'master_store': '/tmp/store'})
+    assert p['master_store'] == '/tmp/store', 'Wrong store'
+
 def test_reduce():
     pypeitpar.ReducePar()
 
@@ -2,6 +2,7 @@
 Module to run tests on SpecObjs
 """
 import os
+import pickle
 
 import numpy as np
 import pytest
@@ -61,3 +62,11 @@ def test_set():
     assert sobjs.PYPELINE[1] == 'BLAH'
     assert sobjs.PYPELINE[0] == 'MultiSlit'
 
+
+def test_pickle():
+    sobjs = specobjs.SpecObjs([sobj1,sobj2])
+    sobjs[0].TRACE_SPAT = np.arange(10.)
+    _sobjs = pickle.loads(pickle.dumps(sobjs))
+    assert _sobjs.nobj == 2
+    assert np.array_equal(_sobjs[0].TRACE_SPAT, np.arange(10.))
+    assert np.array_equal(_sobjs.SLITID, sobjs.SLITID)
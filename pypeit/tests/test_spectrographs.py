@@ -6,12 +6,15 @@ import os
 import pytest
 import glob
 
+import numpy as np
+from astropy.io import fits
+
 from pkg_resources import resource_filename
 
 from pypeit import spectrographs
 from pypeit.core import procimg
 
-from pypeit.tests.tstutils import dev_suite_required
+from pypeit.tests.tstutils import dev_suite_required, data_path
 
 # TODO: Add a test for Gemini GNIRS
 
@@ -154,3 +157,25 @@ def test_vltxshooternir():
 
 
 
+
+
+def test_rawimage_sections():
+    s = spectrographs.shane_kast.ShaneKastBlueSpectrograph()
+    raw = np.random.default_rng(1).normal(size=(2112, 2200)).astype(np.float32)
+    example_file = data_path('tmp_kast_raw.fits')
+    hdu = fits.PrimaryHDU(raw)
+    hdu.header['EXPTIME'] = 10.
+    hdu.writeto(example_file, overwrite=True)
+    data, hdu, exptime, rawdatasec_img, oscansec_img = s.get_rawimage(example_file, 1)
+    hdu.close()
+    # Only the data and overscan sections are read
+    indx = (rawdatasec_img > 0) | (oscansec_img > 0)
+    assert np.array_equal(data[indx], raw[indx].astype(float))
+    assert np.all(data[np.invert(indx)] == 0)
+    assert np.array_equal(np.unique(rawdatasec_img), [0,1,2])
+    # The amplifier images are cached and read-only
+    _, hdu, _, _rawdatasec_img, _ = s.get_rawimage(example_file, 1)
+    hdu.close()
+    assert _rawdatasec_img is rawdatasec_img
+    assert not rawdatasec_img.flags.writeable
+    os.remove(example_file)
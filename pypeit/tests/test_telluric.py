@@ -0,0 +1,113 @@
+"""
+Module to test the telluric model evaluation and fitting
+"""
+import os
+import mmap
+
+import numpy as np
+
+from astropy.io import fits
+
+from pypeit.core import parallel, telluric
+from pypeit.core.wavecal import wvutils
+from pypeit.tests.tstutils import data_path
+
+
+def synthetic_tell_dict():
+    # Small telluric grid with a few absorption lines whose depth scales with humidity and airmass
+    wave_grid = 10**np.arange(np.log10(7000.), np.log10(7300.), 5e-6)
+    dwave, dloglam, resln_guess, pix_per_sigma = wvutils.get_sampling(wave_grid)
+    pg = np.array([600., 800.])
+    tg = np.array([260., 280.])
+    hg = np.array([10., 50., 90.])
+    ag = np.array([1.0, 1.5, 2.0])
+    lines = np.sum([np.exp(-0.5*((wave_grid - w)/0.1)**2) for w in [7050., 7120., 7200.]], axis=0)
+    tell_grid = np.exp(-lines[None,None,None,None,:]*(1e-2*hg[None,None,:,None,None])*ag[None,None,None,:,None]
+                       *(pg[:,None,None,None,None]/700.)*(tg[None,:,None,None,None]/270.))
+    return dict(wave_grid=wave_grid, dloglam=dloglam, resln_guess=resln_guess, pix_per_sigma=pix_per_sigma,
+                tell_pad_pix=int(np.ceil(10.0*pix_per_sigma)), pressure_grid=pg, temp_grid=tg, h2o_grid=hg,
+                airmass_grid=ag, tell_grid=tell_grid)
+
+
+def synthetic_arg_dict(tell_dict, ind_lower, ind_upper, seed):
+    nspec = ind_upper - ind_lower + 1
+    polymodel = np.full(nspec, 100.)
+    bounds = [(600., 800.), (260., 280.), (10., 90.), (1.0, 2.0), (15000., 30000.), (-2., 2.)]
+    return dict(ivar=np.ones(nspec), tell_dict=tell_dict, ind_lower=ind_lower, ind_upper=ind_upper,
+                obj_model_func=telluric.eval_poly_model, obj_dict=dict(polymodel=polymodel), bounds=bounds,
+                seed=seed, debug=False)
+
+
+def test_eval_telluric_batch():
+    tell_dict = synthetic_tell_dict()
+    rng = np.random.default_rng(2)
+    theta = np.array([rng.uniform(600., 800., 7), rng.uniform(260., 280., 7), rng.uniform(10., 90., 7),
+                      rng.uniform(1., 2., 7), rng.uniform(15000., 30000., 7), rng.uniform(-2., 2., 7)])
+    batch = telluric.eval_telluric(theta, tell_dict, ind_lower=300, ind_upper=1200)
+    single = np.array([telluric.eval_telluric(t, tell_dict, ind_lower=300, ind_upper=1200) for t in theta.T])
+    assert batch.shape == single.shape, 'Bad shape for batched telluric models'
+    assert np.allclose(batch, single, rtol=0, atol=1e-10), 'Batched telluric models should match'
+
+    arg_dict = synthetic_arg_dict(tell_dict, 300, 1200, 1)
+    flux = 100*single[0]
+    thismask = np.ones(flux.size, dtype=bool)
+    chi2 = telluric.tellfit_chi2(theta, flux, thismask, arg_dict)
+    assert np.allclose(chi2, [telluric.tellfit_chi2(t, flux, thismask, arg_dict) for t in theta.T],
+                       rtol=1e-8, atol=1e-8), 'Batched loss should match'
+
+
+def test_tellfit_order():
+    tell_dict = synthetic_tell_dict()
+    theta_true = np.array([700., 270., 40., 1.3, 22000., 0.5])
+    kwargs = dict(maxiter=1, popsize=5, tol=5e-2, polish=False, disp=False)
+    tasks = []
+    for i, (ind_lower, ind_upper) in enumerate([(200, 900), (800, 1500)]):
+        flux = 100*telluric.eval_telluric(theta_true, tell_dict, ind_lower=ind_lower, ind_upper=ind_upper)
+        tasks += [(flux, np.ones(flux.size, dtype=bool), synthetic_arg_dict(tell_dict, ind_lower, ind_upper, i))]
+
+    serial = parallel.run_tasks(telluric.tellfit_order, tasks, **kwargs)
+    with parallel.SharedArrays(tell_grid=tell_dict['tell_grid']) as shared:
+        shared_tasks = [(f, m, dict(a, tell_dict=dict(tell_dict, tell_grid=shared['tell_grid'])))
+                        for f, m, a in tasks]
+        par = parallel.run_tasks(telluric.tellfit_order, shared_tasks, n_proc=2, **kwargs)
+    for s, p in zip(serial, par):
+        assert np.array_equal(s[0].x, p[0].x), 'Parallel fits should be identical to serial fits'
+        assert np.array_equal(s[1], p[1]), 'Parallel fits should be identical to serial fits'
+
+    # The vectorized fits are reproducible and find the model
+    vec = [telluric.tellfit_order(*task, vectorized=True, **kwargs) for task in tasks]
+    vec2 = [telluric.tellfit_order(*task, vectorized=True, **kwargs) for task in tasks]
+    for v, v2 in zip(vec, vec2):
+        assert np.array_equal(v[0].x, v2[0].x), 'Vectorized fits should be reproducible'
+        assert v[0].fun < 1., 'Bad vectorized fit'
+
+
+def test_read_telluric_grid():
+    tell_dict = synthetic_tell_dict()
+    hdu = fits.PrimaryHDU(tell_dict['tell_grid'].astype(np.float32))
+    for key, grid in zip(['PRES', 'TEMP', 'HUM', 'AM'],
+                         ['pressure_grid', 'temp_grid', 'h2o_grid', 'airmass_grid']):
+        hdu.header[key+'0'] = tell_dict[grid][0]
+        hdu.header['D'+key] = tell_dict[grid][1] - tell_dict[grid][0]
+        hdu.header['N'+key] = tell_dict[grid].size
+    ofile = data_path('tst_telgrid.fits')
+    fits.HDUList([hdu, fits.ImageHDU(tell_dict['wave_grid']/10.)]).writeto(ofile, overwrite=True)
+
+    full_dict = telluric.read_telluric_grid(ofile)
+    assert full_dict['ind_offset'] == 0, 'Bad offset'
+    base = full_dict['tell_grid']
+    while isinstance(base, np.ndarray):
+        base = base.base
+    assert isinstance(base, mmap.mmap), 'Grid should be memory mapped'
+    wave = full_dict['wave_grid']
+    win_dict = telluric.read_telluric_grid(ofile, wave_min=wave[1000], wave_max=wave[1500], pad=None)
+    off = win_dict['ind_offset']
+    assert 0 < off < 1000 and off + win_dict['wave_grid'].size < wave.size, 'Grid should be trimmed'
+    assert np.array_equal(win_dict['tell_grid'], full_dict['tell_grid'][...,off:off+win_dict['wave_grid'].size]), \
+            'Bad trimmed grid'
+    # The telluric models within the window are unchanged
+    theta = np.array([700., 270., 40., 1.3, 22000., 1.5])
+    assert np.array_equal(telluric.eval_telluric(theta, full_dict, ind_lower=1000, ind_upper=1500),
+                          telluric.eval_telluric(theta, win_dict, ind_lower=1000-off, ind_upper=1500-off)), \
+            'Bad telluric model for trimmed grid'
+    os.remove(ofile)
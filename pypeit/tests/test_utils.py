@@ -6,6 +6,8 @@ import os
 import numpy as np
 import pytest
 
+from scipy import ndimage
+
 from pypeit import utils
 from pypeit import msgs
 
@@ -108,4 +110,18 @@ def test_boxcar_smooth_rows():
     assert np.allclose(smmimg, _smmimg), 'Difference with brute-force approach masked.'
 
 
-
+def test_running_median():
+    rng = np.random.default_rng(7)
+    seq = np.append(rng.normal(size=200), rng.integers(0, 5, 100))
+    for window_size in [1, 4, 5, 31, 64, 101]:
+        medfilt = ndimage.median_filter(seq, size=window_size, mode='reflect')
+        assert np.array_equal(utils.fast_running_median(seq, window_size), medfilt), \
+                'Running median should match the median filter'
+
+    arr = rng.normal(size=(5,400))
+    for window_size in [7, 80]:
+        medfilt = np.array([utils.fast_running_median(s, window_size) for s in arr])
+        assert np.array_equal(utils.running_median(arr, window_size), medfilt), \
+                'Bad batched running median'
+        assert np.array_equal(utils.running_median(arr.T, window_size, axis=0), medfilt.T), \
+                'Bad batched running median along axis 0'
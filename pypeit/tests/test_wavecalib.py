@@ -3,6 +3,7 @@ Module to run tests on WaveCalib class
 Requires files in Development suite and an Environmental variable
 """
 import os
+import shutil
 
 import pytest
 import glob
@@ -11,8 +12,9 @@ import numpy as np
 from astropy.table import Table
 
 from pypeit import wavecalib
-from pypeit.core.wavecal import waveio
+from pypeit.core.wavecal import waveio, wvutils
 from pypeit.tests.tstutils import dev_suite_required, cooked_required
+from pypeit.par import pypeitpar
 from pypeit.spectrographs import util
 
 @cooked_required
@@ -259,3 +261,94 @@ def test_wavecalib_general():
         assert grade
 
 '''
+
+
+def test_xcorr_shift_stretch_arxiv():
+    # Synthetic arc spectra with the same lines, shifted with respect to one another
+    nspec = 1024
+    rng = np.random.default_rng(3)
+    lines = rng.uniform(50, nspec-50, 25)
+    ampl = rng.uniform(100., 1000., 25)
+    x = np.arange(nspec)
+
+    def arc_spec(shift):
+        return 10. + np.sum(ampl[:,None]*np.exp(-0.5*((x[None,:] - lines[:,None] - shift)/1.5)**2), axis=0)
+
+    spec = arc_spec(0.)
+    shifts = [3., -7., 12.]
+    spec_arxiv = np.array([arc_spec(s) for s in shifts]).T
+    batch = wvutils.xcorr_shift_stretch_arxiv(spec, spec_arxiv, cc_thresh=0.5, seed=1)
+    # Values computed with the original, one spectrum at a time,
+    # implementation of xcorr_shift_stretch
+    success, shift, stretch, cross_corr, shift_init, cross_corr_init = batch
+    assert np.array_equal(success, [1, 1, 1]), 'Bad success flags'
+    assert np.allclose(shift, [-2.99999983, 6.99992812, -12.00012796], rtol=0, atol=1e-3), \
+            'Bad shifts'
+    assert np.allclose(stretch, [1.00013005, 1.00093583, 1.00045307], rtol=0, atol=1e-5), \
+            'Bad stretches'
+    assert np.allclose(cross_corr, 1., rtol=0, atol=1e-6), 'Bad cross-correlations'
+    assert np.allclose(shift_init, [-2.99974249, 7.00025751, -11.99974249], rtol=0, atol=1e-6), \
+            'Bad initial shifts'
+    assert np.allclose(cross_corr_init, 0.99998293, rtol=0, atol=1e-6), \
+            'Bad initial cross-correlations'
+    for i, s in enumerate(shifts):
+        assert np.absolute(shift_init[i] + s) < 0.5, 'Bad initial shift'
+        assert np.absolute(shift[i] + s) < 0.5, 'Bad shift'
+    # The processed arxiv spectra are reused by subsequent calls
+    assert wvutils.array_key(spec_arxiv) \
+            in [key[1] for key in wvutils._arxiv_cache.keys()], 'Arxiv should be cached'
+
+
+def test_waveio_cache():
+    cache_path = waveio.cache_path
+    waveio.cache_path = os.path.join(os.path.dirname(__file__), 'files', 'tst_waveio_cache')
+    try:
+        line_lists = waveio.load_line_lists(['ArI', 'NeI'], unknown=True)
+        assert len(os.listdir(waveio.cache_path)) == 1, 'Line lists should be cached'
+        cached = waveio.load_line_lists(['ArI', 'NeI'], unknown=True)
+        assert np.array_equal(line_lists['wave'], cached['wave']), 'Bad cached line lists'
+        assert waveio.load_line_lists(['ArI'])['wave'].size < line_lists['wave'].size, \
+                'Different lamps should be cached separately'
+
+        tree, index = waveio.load_tree(polygon=3, numsearch=4)
+        cached_tree, cached_index = waveio.load_tree(polygon=3, numsearch=4)
+        assert isinstance(cached_index, np.memmap), 'Cached index should be memory-mapped'
+        assert cached_tree.leafsize == tree.leafsize, 'Bad cached leaf size'
+        assert np.array_equal(index, cached_index), 'Bad cached index'
+        pattern = tree.data[::1000]
+        assert np.array_equal(tree.query(pattern, k=3)[1], cached_tree.query(pattern, k=3)[1]), \
+                'Bad cached tree'
+
+        # The built tree is cached
+        tree_path = glob.glob(os.path.join(waveio.cache_path, 'ThAr_patterns_poly3_search4_*'))[0]
+        assert np.array_equal(np.asarray(cached_tree.indices), np.asarray(tree.indices)), \
+                'Cached tree should not be rebuilt'
+
+        # A corrupt cache is a cache miss
+        with open(os.path.join(tree_path, 'tree.pkl'), 'w') as f:
+            f.write('corrupt')
+        cached_tree, cached_index = waveio.load_tree(polygon=3, numsearch=4)
+        assert np.array_equal(index, cached_index), 'Corrupt cache should be rebuilt'
+    finally:
+        shutil.rmtree(waveio.cache_path, ignore_errors=True)
+        waveio.cache_path = cache_path
+
+
+def test_waveio_cache_off():
+    par = pypeitpar.PypeItPar.from_cfg_lines(merge_with=['[rdx]', 'spectrograph = shane_kast_blue',
+                                                         'use_cache = False'])
+    assert not par['rdx']['use_cache'], 'Cache should be disabled'
+    # Nothing is written anywhere when the cache is disabled
+    cache_path = waveio.cache_path
+    cwd = os.getcwd()
+    tmp_dir = os.path.join(os.path.dirname(__file__), 'files', 'tst_waveio_nocache')
+    os.makedirs(tmp_dir)
+    waveio.cache_path = None
+    try:
+        os.chdir(tmp_dir)
+        waveio.load_line_lists(['ArI'])
+        assert len(os.listdir(tmp_dir)) == 0, 'Nothing should be cached'
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp_dir)
+        waveio.cache_path = cache_path
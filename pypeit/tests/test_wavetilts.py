@@ -10,7 +10,8 @@ import numpy as np
 
 from pypeit.tests.tstutils import dev_suite_required, load_kast_blue_masters, cooked_required
 from pypeit import wavetilts
-from pypeit.core import tracewave, pixels
+from pypeit.core import tracewave, pixels, trace
+from pypeit.images import pypeitimage
 from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 
@@ -20,6 +21,31 @@ def data_path(filename):
     return os.path.join(data_dir, filename)
 
 
+def synthetic_arc(nspec=512, nspat=200, nslits=2, nlines=12, offset=0., seed=2):
+    # Arc with tilted lines in slightly curved slits
+    rng = np.random.default_rng(seed)
+    spec = np.arange(nspec)
+    spat = np.arange(nspat)
+    width = nspat/nslits - 10
+    slit_left = offset + 5 + np.arange(nslits)[None,:]*(width+10) \
+                    + 2*np.sin(spec/nspec*np.pi)[:,None]
+    slit_righ = slit_left + width
+    slitcen = (slit_left+slit_righ)/2
+    tslits_dict = dict(slit_left=slit_left, slit_righ=slit_righ, slitcen=slitcen, nslits=nslits,
+                       nspec=nspec, nspat=nspat, spec_min=np.zeros(nslits),
+                       spec_max=np.full(nslits, nspec-1), pad=0)
+    lines = np.sort(rng.uniform(20, nspec-20, nlines))
+    amp = rng.uniform(500, 5000, nlines)
+    image = np.full((nspec, nspat), 10.)
+    for slit in range(nslits):
+        onslit = (spat[None,:] > slit_left[:,slit,None]) & (spat[None,:] < slit_righ[:,slit,None])
+        dspat = spat[None,:] - slitcen[:,slit,None]
+        for l, a in zip(lines, amp):
+            image += onslit*a*np.exp(-0.5*((spec[:,None] - l - 0.03*dspat - 1e-4*dspat**2)/1.2)**2)
+    image += rng.normal(size=image.shape)*np.sqrt(image)
+    return image, tslits_dict
+
+
 @pytest.fixture
 @cooked_required
 def master_dir():
@@ -82,3 +108,70 @@ def test_run(master_dir):
     tilts_dict, mask = waveTilts.run(doqa=False)
     assert isinstance(tilts_dict['tilts'], np.ndarray)
 
+
+def test_follow_centroid_stack():
+    image, tslits_dict = synthetic_arc()
+    img = image.T[:60]
+    stack = np.array([img, img[::-1], np.roll(img, 3, axis=1)])
+    bpm = np.zeros(stack.shape, dtype=bool)
+    bpm[1,:5] = True
+    start_row = np.array([30, 28, 40])
+    start_cen = np.array([100., 250., 400.])
+    cen, cen_err, cen_bpm = trace.follow_centroid_stack(stack, start_row, start_cen, bpm=bpm,
+                                                        width=12., maxshift_start=3.,
+                                                        maxshift_follow=3., maxerror=1.)
+    for i in range(stack.shape[0]):
+        _cen, _cen_err, _cen_bpm = trace.follow_centroid(stack[i], start_row[i], start_cen[i],
+                                                         bpm=bpm[i], width=12., maxshift_start=3.,
+                                                         maxshift_follow=3., maxerror=1.,
+                                                         continuous=False)
+        assert np.array_equal(cen[:,i], _cen[:,0]), 'Stacked centroids should be identical'
+        assert np.array_equal(cen_err[:,i], _cen_err[:,0]), 'Stacked errors should be identical'
+        assert np.array_equal(cen_bpm[:,i], _cen_bpm[:,0]), 'Stacked masks should be identical'
+
+
+def test_run_nproc():
+    # Lines near the detector edge are traced on padded sub-images
+    image, tslits_dict = synthetic_arc(offset=-8.)
+    spectrograph = load_spectrograph('shane_kast_blue')
+    wavepar = pypeitpar.WavelengthSolutionPar()
+    tilts = []
+    for n_proc in [1, 2]:
+        par = pypeitpar.WaveTiltsPar(n_proc=n_proc)
+        waveTilts = wavetilts.WaveTilts(pypeitimage.PypeItImage(image.copy()), tslits_dict,
+                                        spectrograph, par, wavepar, det=1)
+        tilts_dict, mask = waveTilts.run(doqa=False)
+        assert not np.any(mask), 'No slits should be masked'
+        assert waveTilts.steps == ['extract_arcs'] \
+                    + ['find_lines', 'trace_tilts', 'fit_tilts']*tslits_dict['nslits'], \
+                'Bad steps'
+        tilts += [tilts_dict['tilts']]
+    assert np.array_equal(tilts[0], tilts[1]), 'Parallel tilts should be identical to serial tilts'
+    # The tilts at the slit center are the spectral pixel coordinate
+    nspec = image.shape[0]
+    spec = np.arange(30, nspec-30)
+    for slit in range(tslits_dict['nslits']):
+        spat = np.round(tslits_dict['slitcen'][spec,slit]).astype(int)
+        assert np.allclose(tilts[0][spec,spat]*(nspec-1), spec, rtol=0, atol=0.25), 'Bad tilts'
+
+
+def test_step_by_step_run():
+    # The per-slit methods give the same fit as run
+    image, tslits_dict = synthetic_arc()
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = pypeitpar.WaveTiltsPar()
+    wavepar = pypeitpar.WavelengthSolutionPar()
+    waveTilts = wavetilts.WaveTilts(pypeitimage.PypeItImage(image), tslits_dict, spectrograph, par,
+                                    wavepar, det=1)
+    tilts_dict, mask = waveTilts.run(doqa=False)
+    arccen, arccen_bpm, maskslits = waveTilts.extract_arcs()
+    for slit in range(tslits_dict['nslits']):
+        thismask = waveTilts.slitmask == slit
+        lines_spec, lines_spat = waveTilts.find_lines(arccen[:,slit], waveTilts.slitcen[:,slit],
+                                                      slit, bpm=arccen_bpm[:,slit])
+        trcdict = waveTilts.trace_tilts(waveTilts.msarc.image, lines_spec, lines_spat, thismask,
+                                        waveTilts.slitcen[:,slit])
+        coeffs = waveTilts.fit_tilts(trcdict, thismask, waveTilts.slitcen[:,slit],
+                                     par['spat_order'], par['spec_order'], slit, doqa=False)
+        assert np.array_equal(coeffs, tilts_dict['coeffs'][:,:,slit]), 'Fits should be identical'
+    assert waveTilts.steps[-3:] == ['find_lines', 'trace_tilts', 'fit_tilts'], 'Bad steps'
@@ -28,6 +28,11 @@ cooked_required = pytest.mark.skipif(os.getenv('PYPEIT_DEV') is None or
                             not os.path.isdir(os.path.join(os.getenv('PYPEIT_DEV'), 'Cooked')),
                             reason='no dev-suite cooked directory')
 
+# Timing benchmarks are slow and depend on the machine; only run them on
+# request
+benchmark_required = pytest.mark.skipif(os.getenv('PYPEIT_BENCHMARK') is None,
+                                        reason='set PYPEIT_BENCHMARK to run the benchmarks')
+
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'files')
     return os.path.join(data_dir, filename)
@@ -19,10 +19,6 @@ from astropy import units
 from astropy import stats
 from matplotlib import pyplot as plt
 
-# Imports for fast_running_median
-from collections import deque
-from itertools import islice
-from bisect import insort, bisect_left
 from pypeit.core import pydl
 from pypeit import msgs
 from IPython import embed
@@ -383,9 +379,7 @@ def fast_running_median(seq, window_size):
 
     The input is extended by reflecting about the edge of the last pixel.
 
-    This code has been confirmed to produce identical results to
-    scipy.ndimage.filters.median_filter with the reflect boundary
-    condition, but is ~ 100 times faster.
+    This is a wrapper for :func:`running_median` for a single sequence.
 
     Args:
         seq (list or 1-d numpy array of numbers):
@@ -393,51 +387,151 @@ def fast_running_median(seq, window_size):
 
     Returns:
         ndarray: median filtered values
+    """
+    return running_median(np.asarray(seq), window_size)
+
+
+def running_median(arr, window_size, axis=-1):
+    """
+    Compute the running median of all the sequences of an array along
+    a given axis.
 
-    Code contributed by Peter Otten, made to be consistent with
-    scipy.ndimage.filters.median_filter by Joe Hennawi.
+    The result is identical to
+    `scipy.ndimage.median_filter(seq, size=window_size, mode='reflect')`
+    for each sequence, where the input is extended by reflecting about
+    the edge of the last pixel (`d c b a | a b c d | d c b a`).  For
+    even window sizes, the upper of the two central values is
+    returned.
+
+    All sequences are processed at once.  Small windows select the
+    median of each window directly; larger windows use a wavelet
+    matrix built from the ranks of all the values, which selects the
+    median of every window in ``O(log N)`` vectorized steps.
+
+    Args:
+        arr (`numpy.ndarray`_):
+            Array with the sequences to filter.
+        window_size (:obj:`int`):
+            Size of the running window.  Limited to be between 1 and
+            the length of the sequences minus 1.
+        axis (:obj:`int`, optional):
+            Axis along which to compute the running median.
 
-    See discussion at:
-    http://groups.google.com/group/comp.lang.python/browse_thread/thread/d0e011c87174c2d0
+    Returns:
+        `numpy.ndarray`_: The median filtered array, with the same
+        shape as the input.
     """
     # Enforce that the window_size needs to be smaller than the sequence, otherwise we get arrays of the wrong size
     # upon return (very bad). Added by JFH. Should we print out an error here?
-
-    if (window_size > (len(seq)-1)):
+    nseq = np.asarray(arr).shape[axis]
+    if (window_size > (nseq-1)):
         msgs.warn('window_size > len(seq)-1. Truncating window_size to len(seq)-1, but something is probably wrong....')
     if (window_size < 0):
         msgs.warn('window_size is negative. This does not make sense something is probably wrong. Setting window size to 1')
+    window_size = int(np.fmax(np.fmin(int(window_size), nseq-1),1))
+
+    # Pad each sequence for the reflection
+    _arr = np.moveaxis(np.asarray(arr), axis, -1)
+    shape = _arr.shape
+    _arr = _arr.reshape(-1, nseq)
+    lo = window_size//2
+    padded = np.pad(_arr, [(0,0), (lo, window_size-1-lo)], mode='symmetric')
+    medfilt = running_median_select(padded, window_size) if window_size <= 32 \
+                    else running_median_wavelet(padded, window_size)
+    return np.moveaxis(medfilt.reshape(shape), -1, axis)
+
+
+def running_median_select(padded, window_size, chunk=2**22):
+    """
+    Compute the running median of a set of padded sequences by
+    selecting the median of each window.
+
+    The cost scales with the window size; used by
+    :func:`running_median` for small windows.
+
+    Args:
+        padded (`numpy.ndarray`_):
+            2D array with the sequences to filter, padded by
+            ``window_size//2`` elements at the start and
+            ``window_size-1-window_size//2`` elements at the end.
+        window_size (:obj:`int`):
+            Size of the running window.
+        chunk (:obj:`int`, optional):
+            Maximum number of windowed elements to select from at
+            once.
+
+    Returns:
+        `numpy.ndarray`_: The running median of each sequence.
+    """
+    # Read-only view with the window of each element along the last axis
+    windows = np.lib.stride_tricks.as_strided(
+                    padded, shape=(padded.shape[0], padded.shape[1]-window_size+1, window_size),
+                    strides=padded.strides + padded.strides[1:], writeable=False)
+    medfilt = np.empty(windows.shape[:2], dtype=padded.dtype)
+    m = window_size//2
+    step = max(chunk//windows.shape[1]//window_size, 1)
+    for s in range(0, windows.shape[0], step):
+        medfilt[s:s+step] = np.partition(windows[s:s+step], m, axis=-1)[...,m]
+    return medfilt
+
+
+def running_median_wavelet(padded, window_size):
+    """
+    Compute the running median of a set of padded sequences using a
+    wavelet matrix.
+
+    The values of all sequences are replaced by their (unique) rank.
+    Each level of the wavelet matrix stably partitions the ranks by
+    one bit, from the most significant to the least significant.
+    Counting the zero bits within each window then determines the bits
+    of the rank of the median of all windows simultaneously.  The cost
+    is independent of the window size; used by :func:`running_median`
+    for large windows.
+
+    Args:
+        padded (`numpy.ndarray`_):
+            2D array with the sequences to filter; see
+            :func:`running_median_select`.
+        window_size (:obj:`int`):
+            Size of the running window.
+
+    Returns:
+        `numpy.ndarray`_: The running median of each sequence.
+    """
+    nrow, npad = padded.shape
+    nseq = npad - window_size + 1
+    values = padded.ravel()
+    ntot = values.size
+    itype = np.int32 if ntot < np.iinfo(np.int32).max else np.int64
+    srt = np.argsort(values, kind='stable').astype(itype)
+    ranks = np.empty(ntot, dtype=itype)
+    ranks[srt] = np.arange(ntot, dtype=itype)
+
+    # Window edges and the (0-indexed) order of the median in each
+    # window
+    start = (np.arange(nrow, dtype=itype)[:,None]*npad + np.arange(nseq, dtype=itype)[None,:]).ravel()
+    end = start + window_size
+    order = np.full(start.size, window_size//2, dtype=itype)
+    medrank = np.zeros(start.size, dtype=itype)
+    nzero = np.zeros(ntot+1, dtype=itype)
+    for level in range(max(int(ntot-1).bit_length(), 1)-1, -1, -1):
+        zero = (ranks >> level) & 1 == 0
+        np.cumsum(zero, out=nzero[1:])
+        zstart = nzero[start]
+        zend = nzero[end]
+        nwin = zend - zstart
+        # The median has this bit set if there are not enough zeros in
+        # the window
+        one = (order >= nwin).astype(itype)
+        order -= nwin*one
+        medrank |= one << level
+        # Follow the window into the partitioned ranks; the ones follow
+        # all the zeros
+        start = zstart + one*(nzero[-1] + start - 2*zstart)
+        end = zend + one*(nzero[-1] + end - 2*zend)
+        ranks = np.concatenate((ranks[zero], ranks[np.logical_not(zero)]))
+    return values[srt[medrank]].reshape(nrow, nseq)
 
-    window_size = int(np.fmax(np.fmin(int(window_size), len(seq)-1),1))
-    # pad the array for the reflection
-    seq_pad = np.concatenate((seq[0:window_size][::-1],seq,seq[-1:(-1-window_size):-1]))
-
-    seq_pad = iter(seq_pad)
-    d = deque()
-    s = []
-    result = []
-    for item in islice(seq_pad, window_size):
-        d.append(item)
-        insort(s, item)
-        result.append(s[len(d)//2])
-    m = window_size // 2
-    for item in seq_pad:
-        old = d.popleft()
-        d.append(item)
-        del s[bisect_left(s, old)]
-        insort(s, item)
-        result.append(s[m])
-
-    # This takes care of the offset produced by the original code deducec by trial and error comparison with
-    # scipy.ndimage.filters.medfilt
-
-    result = np.roll(result, -window_size//2 + 1)
-    return result[window_size:-window_size]
-
-
-# Taken from stackoverflow
-# https://stackoverflow.com/questions/30677241/how-to-limit-cross-correlation-window-width-in-numpy
-# slightly modified to return lags
 
 def cross_correlate(x, y, maxlag):
     """
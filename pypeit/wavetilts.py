@@ -18,7 +18,7 @@ from pypeit import masterframe
 from pypeit import ginga
 from pypeit import utils
 from pypeit.core import arc
-from pypeit.core import tracewave, pixels
+from pypeit.core import tracewave, pixels, parallel
 from pypeit.core import save
 from pypeit.core import load
 
@@ -189,11 +189,81 @@ class WaveTilts(masterframe.MasterFrame):
         self.steps.append(inspect.stack()[0][3])
         return arccen, arccen_bpm, arc_maskslit
 
+    def _slit_task(self, slit):
+        """
+        Per-slit arguments of :func:`trace_tilts_slit`.
+
+        Args:
+            slit (:obj:`int`):
+                Slit index.
+
+        Returns:
+            tuple: The positional arguments of :func:`trace_tilts_slit`.
+        """
+        return (slit, self.arccen[:,slit].copy(), self.arccen_bpm[:,slit].copy(),
+                self.slitcen[:,slit].copy(), self._parse_param(self.par, 'tracethresh', slit),
+                self._parse_param(self.par, 'spat_order', slit),
+                self._parse_param(self.par, 'spec_order', slit))
+
+    def _slit_kwargs(self, doqa=True, show=False):
+        """
+        Keyword arguments of :func:`trace_tilts_slit` common to all
+        slits, except for the images.
+
+        Args:
+            doqa (:obj:`bool`, optional):
+                Construct the QA plots.
+            show (:obj:`bool`, optional):
+                Show the QA and debugging plots of the 2D fits.
+
+        Returns:
+            dict: The keyword arguments.
+        """
+        if self.par['idsonly']:
+            # Put in some hook here for getting the lines out of the
+            # wave calib for i.e. LRIS ghosts.
+            raise NotImplementedError('Select lines with IDs for tracing not yet implemented.')
+        return dict(nslits=self.nslits, fwhm=self.wavepar['fwhm'],
+                    nonlinear_counts=self.nonlinear_counts, sig_neigh=self.par['sig_neigh'],
+                    nfwhm_neigh=self.par['nfwhm_neigh'], spat_order_trace=self.par['spat_order'],
+                    maxdev_tracefit=self.par['maxdev_tracefit'],
+                    sigrej_trace=self.par['sigrej_trace'], maxdev2d=self.par['maxdev2d'],
+                    sigrej2d=self.par['sigrej2d'], func2d=self.par['func2d'], doqa=doqa,
+                    master_key=self.master_key, qa_path=self.qa_path, show=show)
+
+    def trace_slit(self, slit, arcimg=None, doqa=True, show=False):
+        """
+        Find, trace, and fit the tilts of a single slit.
+
+        Wrapper to :func:`trace_tilts_slit`.  The arc spectra must
+        have been extracted by :func:`extract_arcs`.
+
+        Args:
+            slit (:obj:`int`):
+                Slit index.
+            arcimg (`numpy.ndarray`_, optional):
+                Arc image to trace.  If None, use :attr:`msarc`.
+            doqa (:obj:`bool`, optional):
+                Construct the QA plot.
+            show (:obj:`bool`, optional):
+                Show the QA and debugging plots of the 2D fit.
+
+        Returns:
+            tuple: None if no lines are found for tracing; otherwise
+            see :func:`trace_tilts_slit`.
+        """
+        steps, fit = trace_tilts_slit(*self._slit_task(slit),
+                                      arcimg=self.msarc.image if arcimg is None else arcimg,
+                                      slitmask=self.slitmask, gpm=self.gpm,
+                                      **self._slit_kwargs(doqa=doqa, show=show))
+        self.steps += steps
+        return fit
+
     def find_lines(self, arcspec, slit_cen, slit, bpm=None, debug=False):
         """
         Find the lines for tracing
 
-        Wrapper to tracewave.tilts_find_lines()
+        Wrapper to :func:`find_slit_lines`.
 
         Args:
             arcspec:
@@ -206,7 +276,6 @@ class WaveTilts(masterframe.MasterFrame):
 
         """
         # TODO: Implement this!
-        only_these_lines = None
         if self.par['idsonly']:
             # Put in some hook here for getting the lines out of the
             # wave calib for i.e. LRIS ghosts.
@@ -214,17 +283,13 @@ class WaveTilts(masterframe.MasterFrame):
 
         tracethresh = self._parse_param(self.par, 'tracethresh', slit)
         lines_spec, lines_spat, good \
-                = tracewave.tilts_find_lines(arcspec, slit_cen, tracethresh=tracethresh,
-                                             sig_neigh=self.par['sig_neigh'],
-                                             nfwhm_neigh=self.par['nfwhm_neigh'],
-                                             only_these_lines=only_these_lines,
-                                             fwhm=self.wavepar['fwhm'],
-                                             nonlinear_counts=self.nonlinear_counts,
-                                             bpm=bpm, debug_peaks=False, debug_lines=debug)
+                = find_slit_lines(arcspec, slit_cen, tracethresh, arccen_bpm=bpm,
+                                  fwhm=self.wavepar['fwhm'], nonlinear_counts=self.nonlinear_counts,
+                                  sig_neigh=self.par['sig_neigh'],
+                                  nfwhm_neigh=self.par['nfwhm_neigh'], debug=debug)
 
-        if debug:
+        if debug and lines_spec is not None:
             mean, median, stddev = stats.sigma_clipped_stats(self.msarc.image, sigma=3.)
-#            vmin, vmax = visualization.ZScaleInterval().get_limits(self.msarc.image)
             vmin = median - 2*stddev
             vmax = median + 2*stddev
             plt.imshow(self.msarc.image, origin='lower', interpolation='nearest', aspect='auto',
@@ -236,13 +301,13 @@ class WaveTilts(masterframe.MasterFrame):
         self.steps.append(inspect.stack()[0][3])
         return (None, None) if lines_spec is None else (lines_spec[good], lines_spat[good])
 
-
-
     def fit_tilts(self, trc_tilt_dict, thismask, slit_cen, spat_order, spec_order, slit,
                   show_QA=False, doqa=True, debug=False):
         """
         Fit the tilts
 
+        Wrapper to :func:`fit_slit_tilts`.
+
         Args:
             trc_tilt_dict (dict): Contains information from tilt tracing
             slit_cen (ndarray): (nspec,) Central trace for this slit
@@ -259,37 +324,23 @@ class WaveTilts(masterframe.MasterFrame):
                 Show additional plots useful for debugging.
 
         Returns:
-           (tilts, coeffs)
-            tilts: ndarray (nspec, nspat)
-               tilts image
-            coeff: ndarray (spat_order + 1, spec_order+1)
-               Array containing the coefficients for the 2d legendre polynomial fit
+            ndarray: (spat_order + 1, spec_order+1) Array containing the
+            coefficients for the 2d legendre polynomial fit
         """
-        # Now perform a fit to the tilts
-#        tilt_fit_dict, trc_tilt_dict_out \
         self.all_fit_dict[slit], self.all_trace_dict[slit] \
-                = tracewave.fit_tilts(trc_tilt_dict, thismask, slit_cen, spat_order=spat_order,
-                                      spec_order=spec_order,maxdev=self.par['maxdev2d'],
-                                      sigrej=self.par['sigrej2d'], func2d=self.par['func2d'],
-                                      doqa=doqa, master_key=self.master_key, slit=slit,
-                                      show_QA=show_QA, out_dir=self.qa_path, debug=debug)
-
-        # Evaluate the fit
-        #tilts = tracewave.fit2tilts((tilt_fit_dict['nspec'], tilt_fit_dict['nspat']), slit_cen,
-        #                            tilt_fit_dict['coeff2'], tilt_fit_dict['func'])
-
-        # Populate the fit dict, and update the all_trace_dict
-#        self.all_fit_dict[slit] = copy.deepcopy(tilt_fit_dict)
-#        self.all_trace_dict[slit] = copy.deepcopy(trc_tilt_dict_out)
-
+                = fit_slit_tilts(trc_tilt_dict, thismask, slit_cen, spat_order, spec_order, slit,
+                                 maxdev2d=self.par['maxdev2d'], sigrej2d=self.par['sigrej2d'],
+                                 func2d=self.par['func2d'], doqa=doqa, master_key=self.master_key,
+                                 qa_path=self.qa_path, show=show_QA, debug=debug)
         self.steps.append(inspect.stack()[0][3])
-#        return tilt_fit_dict['coeff2']
         return self.all_fit_dict[slit]['coeff2']
 
     def trace_tilts(self, arcimg, lines_spec, lines_spat, thismask, slit_cen):
         """
         Trace the tilts
 
+        Wrapper to :func:`trace_slit_tilts`.
+
         Args:
 
             arcimg (`numpy.ndarray`_):
@@ -306,21 +357,18 @@ class WaveTilts(masterframe.MasterFrame):
                Image indicating which pixels lie on the slit in
                equation. True = on the slit. False = not on slit.  Shape
                is (nspec, nspat) with dtype=bool.
-            slit_cen (:obj:`int`):
-                Integer index indicating the slit in question.
+            slit_cen (`numpy.ndarray`_):
+                Central trace for this slit.
 
         Returns:
             dict: Dictionary containing information on the traced tilts required to fit the filts.
 
         """
-        trace_dict = tracewave.trace_tilts(arcimg, lines_spec, lines_spat, thismask, slit_cen,
-                                           inmask=self.gpm, fwhm=self.wavepar['fwhm'],
-                                           spat_order=self.par['spat_order'],
-                                           maxdev_tracefit=self.par['maxdev_tracefit'],
-                                           sigrej_trace=self.par['sigrej_trace'])
-                                           #, debug_pca=True, show_tracefits=True)
-
-        # Return
+        trace_dict = trace_slit_tilts(arcimg, lines_spec, lines_spat, thismask, slit_cen,
+                                      gpm=self.gpm, fwhm=self.wavepar['fwhm'],
+                                      spat_order_trace=self.par['spat_order'],
+                                      maxdev_tracefit=self.par['maxdev_tracefit'],
+                                      sigrej_trace=self.par['sigrej_trace'])
         self.steps.append(inspect.stack()[0][3])
         return trace_dict
 
@@ -527,40 +575,37 @@ class WaveTilts(masterframe.MasterFrame):
         #if show:
         #    viewer,ch = ginga.show_image(self.msarc*(self.slitmask > -1),chname='tilts')
 
-        # Loop on all slits
-        for slit in gdslits:
-            msgs.info('Computing tilts for slit {0}/{1}'.format(slit, self.nslits-1))
-            # Identify lines for tracing tilts
-            msgs.info('Finding lines for tilt analysis')
-            self.lines_spec, self.lines_spat \
-                    = self.find_lines(self.arccen[:,slit], self.slitcen[:,slit], slit,
-                                      bpm=self.arccen_bpm[:,slit], debug=False) #debug)
-            if self.lines_spec is None:
+        # Trace and fit the tilts for each good slit.  The slits are
+        # independent; optionally distribute them to a pool of
+        # processes.
+        kwargs = self._slit_kwargs(doqa=doqa, show=show)
+        n_proc = self.par['n_proc']
+        if show and n_proc > 1:
+            msgs.warn('Cannot show the tilt fits when using multiple processes.  Using n_proc=1.')
+            n_proc = 1
+        n_proc = min(n_proc, len(gdslits))
+
+        images = dict(arcimg=_msarc, slitmask=self.slitmask, gpm=self.gpm)
+        tasks = [self._slit_task(slit) for slit in gdslits]
+        if n_proc > 1:
+            with parallel.SharedArrays(**images) as shared:
+                fits = parallel.run_tasks(trace_tilts_slit, tasks, n_proc=n_proc, **shared,
+                                          **kwargs)
+        else:
+            fits = parallel.run_tasks(trace_tilts_slit, tasks, **images, **kwargs)
+
+        # Assemble the results in slit order
+        for slit, (steps, fit) in zip(gdslits, fits):
+            self.steps += steps
+            if fit is None:
                 self.mask[slit] = True
                 maskslits[slit] = True
                 continue
-
-            thismask = self.slitmask == slit
-
-            # Performs the initial tracing of the line centroids as a
-            # function of spatial position resulting in 1D traces for
-            # each line.
-            msgs.info('Trace the tilts')
-            self.trace_dict = self.trace_tilts(_msarc, self.lines_spec, self.lines_spat,
-                                               thismask, self.slitcen[:,slit])
-
-            # TODO: Show the traces before running the 2D fit
-
-            #if show:
-            #    ginga.show_tilts(viewer, ch, self.trace_dict)
-
             self.spat_order[slit] = self._parse_param(self.par, 'spat_order', slit)
             self.spec_order[slit] = self._parse_param(self.par, 'spec_order', slit)
-            # 2D model of the tilts, includes construction of QA
-            # NOTE: This also fills in self.all_fit_dict and self.all_trace_dict
-            coeff_out = self.fit_tilts(self.trace_dict, thismask, self.slitcen[:,slit],
-                                       self.spat_order[slit], self.spec_order[slit], slit,
-                                       doqa=doqa, show_QA=show, debug=show)
+            self.lines_spec, self.lines_spat, self.trace_dict, self.all_fit_dict[slit], \
+                    self.all_trace_dict[slit] = fit
+            coeff_out = self.all_fit_dict[slit]['coeff2']
             self.coeffs[:self.spec_order[slit]+1,:self.spat_order[slit]+1,slit] = coeff_out
 
             # Tilts are created with the size of the original slitmask,
@@ -739,3 +784,215 @@ class WaveTilts(masterframe.MasterFrame):
         txt += '>'
         return txt
 
+
+def trace_tilts_slit(slit, arccen, arccen_bpm, slitcen, tracethresh, spat_order, spec_order,
+                     arcimg=None, slitmask=None, gpm=None, nslits=None, fwhm=4.0,
+                     nonlinear_counts=1e10, sig_neigh=5.0, nfwhm_neigh=2.0, spat_order_trace=5,
+                     maxdev_tracefit=0.2, sigrej_trace=3.0, maxdev2d=0.2, sigrej2d=3.0,
+                     func2d='legendre2d', doqa=True, master_key=None, qa_path=None, show=False):
+    """
+    Find, trace, and fit the arc-line tilts of a single slit.
+
+    Used by :func:`WaveTilts.run` and :func:`WaveTilts.trace_slit`,
+    possibly in a worker process.  The
+    images can be provided directly or as
+    :class:`pypeit.core.parallel.SharedArray` objects.
+
+    Args:
+        slit (:obj:`int`):
+            Slit index.
+        arccen (`numpy.ndarray`_):
+            Arc spectrum extracted down the center of the slit.
+        arccen_bpm (`numpy.ndarray`_):
+            Bad-pixel mask for `arccen`.
+        slitcen (`numpy.ndarray`_):
+            Center of the slit.
+        tracethresh (:obj:`float`):
+            Significance threshold for the lines to trace.
+        spat_order (:obj:`int`):
+            Order of the 2D fit in the spatial direction.
+        spec_order (:obj:`int`):
+            Order of the 2D fit in the spectral direction.
+        arcimg (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Arc image, possibly continuum subtracted.
+        slitmask (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Image with the slit index of each pixel.
+        gpm (`numpy.ndarray`_, :class:`pypeit.core.parallel.SharedArray`):
+            Good-pixel mask.
+        nslits (:obj:`int`):
+            Total number of slits; only used for the log.
+        fwhm (:obj:`float`, optional):
+            Expected FWHM of the arc lines.
+        nonlinear_counts (:obj:`float`, optional):
+            Counts at which the detector response becomes non-linear.
+        sig_neigh, nfwhm_neigh (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.tilts_find_lines`.
+        spat_order_trace (:obj:`int`, optional):
+            Order of the fit to each traced line.
+        maxdev_tracefit, sigrej_trace (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.trace_tilts`.
+        maxdev2d, sigrej2d (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.fit_tilts`.
+        func2d (:obj:`str`, optional):
+            Function used for the 2D fit.
+        doqa (:obj:`bool`, optional):
+            Construct the QA plot.
+        master_key (:obj:`str`, optional):
+            Master key used in the QA file name.
+        qa_path (:obj:`str`, optional):
+            Directory for the QA output.
+        show (:obj:`bool`, optional):
+            Show the QA and debugging plots of the 2D fit.
+
+    Returns:
+        tuple: The list of the steps performed and the result of the
+        fit.  The result is None if no lines are found for tracing.
+        Otherwise, it is a tuple with the spectral and spatial
+        positions of the traced lines, the dictionary with the line
+        traces, and the dictionaries with the 2D fit and the fitted
+        traces returned by :func:`pypeit.core.tracewave.fit_tilts`.
+    """
+    msgs.info('Computing tilts for slit {0}/{1}'.format(slit, nslits-1))
+    # Identify lines for tracing tilts
+    lines_spec, lines_spat, good \
+            = find_slit_lines(arccen, slitcen, tracethresh, arccen_bpm=arccen_bpm, fwhm=fwhm,
+                              nonlinear_counts=nonlinear_counts, sig_neigh=sig_neigh,
+                              nfwhm_neigh=nfwhm_neigh)
+    if lines_spec is None:
+        return ['find_lines'], None
+    lines_spec, lines_spat = lines_spec[good], lines_spat[good]
+
+    thismask = parallel.as_array(slitmask) == slit
+
+    # Performs the initial tracing of the line centroids as a function
+    # of spatial position resulting in 1D traces for each line.
+    trace_dict = trace_slit_tilts(parallel.as_array(arcimg), lines_spec, lines_spat, thismask,
+                                  slitcen, gpm=parallel.as_array(gpm), fwhm=fwhm,
+                                  spat_order_trace=spat_order_trace,
+                                  maxdev_tracefit=maxdev_tracefit, sigrej_trace=sigrej_trace)
+
+    # 2D model of the tilts, includes construction of QA
+    fit_dict, trace_dict_out \
+            = fit_slit_tilts(trace_dict, thismask, slitcen, spat_order, spec_order, slit,
+                             maxdev2d=maxdev2d, sigrej2d=sigrej2d, func2d=func2d, doqa=doqa,
+                             master_key=master_key, qa_path=qa_path, show=show, debug=show)
+    return ['find_lines', 'trace_tilts', 'fit_tilts'], \
+                (lines_spec, lines_spat, trace_dict, fit_dict, trace_dict_out)
+
+
+def find_slit_lines(arccen, slitcen, tracethresh, arccen_bpm=None, fwhm=4.0,
+                    nonlinear_counts=1e10, sig_neigh=5.0, nfwhm_neigh=2.0, debug=False):
+    """
+    Find the arc lines to trace in a single slit.
+
+    Wrapper to :func:`pypeit.core.tracewave.tilts_find_lines`.
+
+    Args:
+        arccen (`numpy.ndarray`_):
+            Arc spectrum extracted down the center of the slit.
+        slitcen (`numpy.ndarray`_):
+            Center of the slit.
+        tracethresh (:obj:`float`):
+            Significance threshold for the lines to trace.
+        arccen_bpm (`numpy.ndarray`_, optional):
+            Bad-pixel mask for `arccen`.
+        fwhm (:obj:`float`, optional):
+            Expected FWHM of the arc lines.
+        nonlinear_counts (:obj:`float`, optional):
+            Counts at which the detector response becomes non-linear.
+        sig_neigh, nfwhm_neigh (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.tilts_find_lines`.
+        debug (:obj:`bool`, optional):
+            Show the lines found.
+
+    Returns:
+        tuple: The spectral and spatial positions of all the lines
+        found and the boolean array selecting the ones to trace.  The
+        positions are None if no lines are found.
+    """
+    msgs.info('Finding lines for tilt analysis')
+    return tracewave.tilts_find_lines(arccen, slitcen, tracethresh=tracethresh,
+                                      sig_neigh=sig_neigh, nfwhm_neigh=nfwhm_neigh,
+                                      only_these_lines=None, fwhm=fwhm,
+                                      nonlinear_counts=nonlinear_counts, bpm=arccen_bpm,
+                                      debug_peaks=False, debug_lines=debug)
+
+
+def trace_slit_tilts(arcimg, lines_spec, lines_spat, thismask, slitcen, gpm=None, fwhm=4.0,
+                     spat_order_trace=5, maxdev_tracefit=0.2, sigrej_trace=3.0):
+    """
+    Trace the arc lines found in a single slit.
+
+    Wrapper to :func:`pypeit.core.tracewave.trace_tilts`.
+
+    Args:
+        arcimg (`numpy.ndarray`_):
+            Arc image, possibly continuum subtracted.
+        lines_spec, lines_spat (`numpy.ndarray`_):
+            Spectral and spatial positions of the lines to trace.
+        thismask (`numpy.ndarray`_):
+            Boolean image selecting the pixels in the slit.
+        slitcen (`numpy.ndarray`_):
+            Center of the slit.
+        gpm (`numpy.ndarray`_, optional):
+            Good-pixel mask.
+        fwhm (:obj:`float`, optional):
+            Expected FWHM of the arc lines.
+        spat_order_trace (:obj:`int`, optional):
+            Order of the fit to each traced line.
+        maxdev_tracefit, sigrej_trace (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.trace_tilts`.
+
+    Returns:
+        dict: The line traces required to fit the tilts.
+    """
+    msgs.info('Trace the tilts')
+    return tracewave.trace_tilts(arcimg, lines_spec, lines_spat, thismask, slitcen, inmask=gpm,
+                                 fwhm=fwhm, spat_order=spat_order_trace,
+                                 maxdev_tracefit=maxdev_tracefit, sigrej_trace=sigrej_trace)
+
+
+def fit_slit_tilts(trace_dict, thismask, slitcen, spat_order, spec_order, slit, maxdev2d=0.2,
+                   sigrej2d=3.0, func2d='legendre2d', doqa=True, master_key=None, qa_path=None,
+                   show=False, debug=False):
+    """
+    Fit the 2D model of the tilts of a single slit.
+
+    Wrapper to :func:`pypeit.core.tracewave.fit_tilts`.
+
+    Args:
+        trace_dict (:obj:`dict`):
+            Line traces returned by :func:`trace_slit_tilts`.
+        thismask (`numpy.ndarray`_):
+            Boolean image selecting the pixels in the slit.
+        slitcen (`numpy.ndarray`_):
+            Center of the slit.
+        spat_order (:obj:`int`):
+            Order of the 2D fit in the spatial direction.
+        spec_order (:obj:`int`):
+            Order of the 2D fit in the spectral direction.
+        slit (:obj:`int`):
+            Slit index.
+        maxdev2d, sigrej2d (:obj:`float`, optional):
+            See :func:`pypeit.core.tracewave.fit_tilts`.
+        func2d (:obj:`str`, optional):
+            Function used for the 2D fit.
+        doqa (:obj:`bool`, optional):
+            Construct the QA plot.
+        master_key (:obj:`str`, optional):
+            Master key used in the QA file name.
+        qa_path (:obj:`str`, optional):
+            Directory for the QA output.
+        show (:obj:`bool`, optional):
+            Show the QA instead of writing it to disk.
+        debug (:obj:`bool`, optional):
+            Show additional plots useful for debugging.
+
+    Returns:
+        tuple: The dictionaries with the 2D fit and the fitted traces
+        returned by :func:`pypeit.core.tracewave.fit_tilts`.
+    """
+    return tracewave.fit_tilts(trace_dict, thismask, slitcen, spat_order=spat_order,
+                               spec_order=spec_order, maxdev=maxdev2d, sigrej=sigrej2d,
+                               func2d=func2d, doqa=doqa, master_key=master_key, slit=slit,
+                               show_QA=show, out_dir=qa_path, debug=debug)